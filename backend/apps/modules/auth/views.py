@@ -8,14 +8,16 @@ from pydantic import BaseModel
 from typing import Optional
 from loguru import logger
 
+from apps.utils.access_log import TimedRoute
 from apps.utils.jwt_utils import JWTUtil
 from apps.utils.auth_middleware import get_current_user, get_current_user_id
 from apps.utils.dependencies import get_db
+from apps.utils.metrics import AUTH_LOGINS
 from .services import AuthService
 from config.settings import Config
 
 # 创建认证路由
-router = APIRouter(prefix='/api/auth', tags=['认证'])
+router = APIRouter(prefix='/api/auth', tags=['认证'], route_class=TimedRoute)
 
 
 # ====================================
@@ -89,11 +91,14 @@ async def local_login(request: LoginRequest, fastapi_request: Request, db = Depe
         )
         
         if not user:
+            AUTH_LOGINS.inc('local', 'failure')
             raise HTTPException(
                 status_code=400,
                 detail='用户名或密码错误'
             )
         
+        AUTH_LOGINS.inc('local', 'success')
+        
         # 3. 生成JWT Token
         token = JWTUtil.generate_token(
             user['id'],
@@ -0,0 +1,82 @@
+"""
+事件推送路由（FastAPI）
+通过 Server-Sent Events 向当前用户的所有标签页推送提示词和版本变更
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from apps.utils.access_log import TimedRoute
+from apps.utils.auth_middleware import get_current_user_id, get_stream_user_id
+from apps.utils.event_hub import events
+from apps.utils.jwt_utils import JWTUtil
+from config.settings import Config
+
+# 创建事件推送路由
+router = APIRouter(prefix='/api/events', tags=['事件推送'], route_class=TimedRoute)
+
+# 断线后浏览器自动重连的间隔(毫秒)
+RETRY_MS = 3000
+
+
+async def _stream(user_id):
+    # 在生成器内订阅: 响应开始前客户端就断开时不会留下订阅
+    subscription = events.subscribe(user_id)
+    if subscription is None:
+        return
+    try:
+        yield f'retry: {RETRY_MS}\n\n'.encode('utf-8')
+        while True:
+            chunk = await subscription.next_chunk()
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        # 客户端断开时 Starlette 取消生成器,在这里取消订阅
+        events.unsubscribe(subscription)
+
+
+@router.post('/ticket')
+async def create_ticket(user_id: int = Depends(get_current_user_id)):
+    """
+    获取事件推送连接票据
+
+    票据只能使用一次,有效期 SSE_TICKET_TTL 秒;每次建立(或重连) EventSource 前获取新票据
+    """
+    ttl = getattr(Config, 'SSE_TICKET_TTL', 60)
+    return {
+        'code': 200,
+        'data': {
+            'ticket': JWTUtil.generate_stream_ticket(user_id, ttl),
+            'expires_in': ttl
+        }
+    }
+
+
+@router.get('')
+async def stream_events(user_id: int = Depends(get_stream_user_id)):
+    """
+    订阅当前用户的变更事件(text/event-stream)
+
+    事件类型:
+    - prompt.created / prompt.updated: {prompt_id, current_version, update_time}
+    - prompt.deleted: {prompt_id}
+    - version.created: {prompt_id, version_id, current_version, update_time}
+    - resync: 缓冲区溢出丢失了事件,客户端应通过 /api/sync 补齐
+
+    EventSource 不能设置请求头,用 ?ticket= 传递 POST /api/events/ticket 获取的一次性票据
+    (不接受登录 Token: 查询参数会被访问日志和代理记录);连接建立或重连后应先调用 /api/sync
+    """
+    if events.is_full(user_id):
+        logger.warning(f'⚠️  事件推送连接数已达上限: user_id={user_id}')
+        raise HTTPException(status_code=429, detail=f'连接数已达上限({events.max_per_user}),请关闭其他标签页后重试')
+
+    return StreamingResponse(
+        _stream(user_id),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # 关闭 nginx 的响应缓冲,事件立即送达
+            'X-Accel-Buffering': 'no',
+        }
+    )
@@ -0,0 +1,373 @@
+"""
+监控路由（FastAPI）
+提供存活/就绪探针、Prometheus 指标采集接口、SQL 语句统计、索引建议、数据库维护和按需性能分析
+"""
+import asyncio
+import hmac
+import threading
+import time
+import weakref
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from loguru import logger
+
+from apps.utils.access_log import TimedRoute
+from apps.utils.auth_middleware import get_admin_user
+from apps.utils.dependencies import get_db
+from apps.utils.metrics import HTTP_IN_PROGRESS, registry
+from apps.utils.profiler import ProfilerBusy, profiling
+from apps.utils import index_advisor
+from config.settings import Config
+
+# 创建监控路由(不带 /api 前缀,符合 Prometheus 默认采集路径)
+router = APIRouter(tags=['监控'], route_class=TimedRoute)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@router.api_route('/healthz', methods=['GET', 'HEAD'], include_in_schema=False)
+async def healthz():
+    """存活探针: 事件循环能响应即为存活,不访问数据库"""
+    return {'status': 'ok'}
+
+
+def _probe_database(conn):
+    conn.execute('SELECT 1').fetchone()
+
+
+# 每个数据库连接进行中的探测: 超时只取消等待,探测仍在连接线程队列中,
+# 之后的就绪检查等待同一个探测,数据库卡住时队列中最多只有一条探测语句
+_probes = weakref.WeakKeyDictionary()
+
+
+def _ignore_result(task):
+    """超时后无人等待的探测: 取出异常,避免未获取异常的警告"""
+    if not task.cancelled():
+        task.exception()
+
+
+async def _probe(db, timeout):
+    task = _probes.get(db)
+    if task is None or task.done():
+        task = _probes[db] = asyncio.ensure_future(db.run_sync(_probe_database))
+        task.add_done_callback(_ignore_result)
+    await asyncio.wait_for(asyncio.shield(task), timeout)
+
+
+@router.api_route('/readyz', methods=['GET', 'HEAD'], include_in_schema=False)
+async def readyz(request: Request):
+    """
+    就绪探针(未就绪时返回 503,负载均衡器据此暂停向本 worker 分发请求)
+
+    - 连接线程队列中已提交未完成的 SQL 数达到 READINESS_MAX_PENDING 时视为过载,不再排队探测
+    - 否则在连接线程中执行 SELECT 1,与请求的 SQL 在同一队列中排队,
+      超过 READINESS_TIMEOUT_MS 视为未就绪(耗时即为当前的排队等待时间);
+      上一次探测仍在排队时等待它完成,不重复排队
+    """
+    max_pending = max(1, getattr(Config, 'READINESS_MAX_PENDING', 64))
+    timeout = getattr(Config, 'READINESS_TIMEOUT_MS', 500) / 1000
+    
+    started = time.perf_counter()
+    await asyncio.sleep(0)
+    checks = {
+        'in_progress': int(HTTP_IN_PROGRESS.value()),
+        'loop_lag_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+    problems = []
+    
+    db = getattr(request.app.state, 'db', None)
+    if db is None or db.db is None:
+        problems.append('数据库未连接')
+    else:
+        checks['db'] = {
+            'pending': db.pending,
+            'max_pending': max_pending,
+            'saturation': round(db.pending / max_pending, 3),
+        }
+        if db.pending >= max_pending:
+            problems.append(f'数据库队列已满: {db.pending} 条语句等待执行')
+        else:
+            started = time.perf_counter()
+            try:
+                await _probe(db, timeout)
+                checks['db']['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            except asyncio.TimeoutError:
+                problems.append(f'数据库探测超时: 超过 {timeout * 1000:.0f} ms')
+            except Exception as e:
+                problems.append(f'数据库探测失败: {e}')
+    
+    if problems:
+        logger.warning(f'⚠️  就绪检查未通过: {"; ".join(problems)}')
+        return JSONResponse({'status': 'unavailable', 'problems': problems, 'checks': checks}, status_code=503)
+    return {'status': 'ok', 'checks': checks}
+
+
+@router.get('/metrics', include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """
+    Prometheus 指标
+
+    需携带 Authorization: Bearer <METRICS_TOKEN>;未配置 METRICS_TOKEN 时拒绝所有请求
+    (指标中包含 SQL 模板和各路由流量,不能公开)
+    """
+    if not getattr(Config, 'METRICS_ENABLED', True):
+        raise HTTPException(status_code=404, detail='Not Found')
+    
+    token = getattr(Config, 'METRICS_TOKEN', '')
+    if not token:
+        raise HTTPException(status_code=403, detail='未配置 METRICS_TOKEN，指标接口不可用')
+    
+    provided = authorization[7:] if authorization and authorization.startswith('Bearer ') else ''
+    if not hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8')):
+        raise HTTPException(status_code=401, detail='指标接口认证失败')
+
+    return PlainTextResponse(registry.expose(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get('/api/monitoring/queries')
+async def get_query_stats(
+    limit: int = Query(20, ge=1, le=200),
+    sort: str = Query('total', pattern='^(total|avg|max|p95|count|errors)$'),
+    admin_user: dict = Depends(get_admin_user),
+    db = Depends(get_db)
+):
+    """
+    SQL 语句统计(管理员)
+
+    按模板返回执行次数、总耗时、平均/最大/p95 耗时,以及最近一次慢查询的执行计划
+    """
+    stats = db.stats
+    
+    return {
+        'code': 200,
+        'data': {
+            'since': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stats.started)),
+            'slow_query_ms': round(db.slow_query_seconds * 1000),
+            'templates': len(stats),
+            'items': stats.top(limit, sort)
+        }
+    }
+
+
+@router.delete('/api/monitoring/queries')
+async def reset_query_stats(
+    admin_user: dict = Depends(get_admin_user),
+    db = Depends(get_db)
+):
+    """清空 SQL 语句统计(管理员)"""
+    db.stats.reset()
+    logger.info(f'🔄 SQL 语句统计已清空: user_id={admin_user["user_id"]}')
+    
+    return {
+        'code': 200,
+        'message': '已清空'
+    }
+
+
+@router.get('/api/monitoring/index-advice')
+async def get_index_advice(
+    admin_user: dict = Depends(get_admin_user),
+    db = Depends(get_db)
+):
+    """
+    索引建议(管理员)
+
+    对已记录的查询语句样本执行 EXPLAIN QUERY PLAN,标出全表扫描和临时 B 树排序并推荐组合索引;
+    耗时对比和迁移脚本生成请使用 python -m apps.utils.index_advisor
+    """
+    samples = db.stats.sample_queries()
+    
+    def analyze():
+        # 使用独立的只读连接,不占用主连接的执行队列
+        conn = index_advisor.connect_readonly(db.db_path)
+        try:
+            return index_advisor.analyze(conn, samples)
+        finally:
+            conn.close()
+    
+    try:
+        results, candidates = await asyncio.get_running_loop().run_in_executor(None, analyze)
+    except Exception as e:
+        logger.error(f'❌ 索引分析失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'分析失败: {str(e)}')
+    
+    return {
+        'code': 200,
+        'data': {
+            'items': [result for result in results if result.get('issues') or result.get('error')],
+            'proposals': [
+                {
+                    'name': index_advisor.index_name(table, columns),
+                    'table': table,
+                    'columns': list(columns),
+                    'queries': len(queries),
+                    'sql': f'CREATE INDEX IF NOT EXISTS {index_advisor.index_name(table, columns)} ON {table}({", ".join(columns)});'
+                }
+                for (table, columns), queries in candidates.items()
+            ]
+        }
+    }
+
+
+def _get_maintenance(request: Request):
+    scheduler = getattr(request.app.state, 'maintenance', None)
+    if scheduler is None:
+        raise HTTPException(status_code=404, detail='数据库维护未在当前进程启用')
+    return scheduler
+
+
+@router.get('/api/monitoring/maintenance')
+async def get_maintenance_status(
+    request: Request,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """数据库维护状态(管理员): 是否空闲、各任务下次执行时间和最近的运行记录"""
+    scheduler = _get_maintenance(request)
+    
+    return {
+        'code': 200,
+        'data': scheduler.status()
+    }
+
+
+@router.post('/api/monitoring/maintenance/{task}')
+async def run_maintenance_task(
+    task: str,
+    request: Request,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """立即执行一次维护任务(管理员,不等待空闲窗口,仍受时间预算限制)"""
+    scheduler = _get_maintenance(request)
+    if task not in scheduler.tasks:
+        raise HTTPException(status_code=404, detail=f'未知的维护任务: {task}')
+    
+    logger.info(f'🔄 手动执行数据库维护: {task}, user_id={admin_user["user_id"]}')
+    record = await scheduler.run_task(task)
+    
+    return {
+        'code': 200,
+        'data': record
+    }
+
+
+def _check_profiling():
+    if not getattr(Config, 'PROFILING_ENABLED', True):
+        raise HTTPException(status_code=404, detail='Not Found')
+
+
+@router.get('/api/monitoring/profile/cpu')
+async def profile_cpu(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, ge=1, le=100),
+    mode: str = Query('wall', pattern='^(wall|cpu)$'),
+    scope: str = Query('all', pattern='^(all|loop)$'),
+    admin_user: dict = Depends(get_admin_user)
+):
+    """
+    CPU 采样分析(管理员)
+
+    采样 seconds 秒后返回折叠栈文本,可直接用 flamegraph.pl 或 speedscope 生成火焰图;
+    mode=wall 包含等待时间,mode=cpu 忽略处于等待状态的线程;scope=loop 只采样事件循环线程
+    """
+    _check_profiling()
+    max_seconds = getattr(Config, 'PROFILING_MAX_SECONDS', 60)
+    if seconds > max_seconds:
+        raise HTTPException(status_code=400, detail=f'采样时长不能超过 {max_seconds} 秒')
+    
+    thread_ids = {threading.get_ident()} if scope == 'loop' else None
+    logger.info(f'🔄 开始 CPU 采样: {seconds}s, mode={mode}, scope={scope}, user_id={admin_user["user_id"]}')
+    try:
+        profiler = await profiling.profile_cpu(seconds, interval_ms / 1000, mode, thread_ids)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    logger.info(f'✅ CPU 采样完成: {profiler.samples} 次采样, {len(profiler.stacks)} 个调用栈')
+    
+    filename = f'profile-{time.strftime("%Y%m%d-%H%M%S")}-{mode}.collapsed'
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Profile-Samples': str(profiler.samples),
+            'X-Profile-Duration': f'{profiler.duration:.3f}',
+        }
+    )
+
+
+@router.get('/api/monitoring/profile/memory')
+async def get_memory_profile_status(admin_user: dict = Depends(get_admin_user)):
+    """内存跟踪状态(管理员): 是否在跟踪、已跟踪的内存和已保存的快照"""
+    _check_profiling()
+    
+    return {
+        'code': 200,
+        'data': profiling.memory.status()
+    }
+
+
+@router.post('/api/monitoring/profile/memory/snapshots')
+async def take_memory_snapshot(
+    frames: int = Query(1, ge=1, le=50),
+    group: str = Query('lineno', pattern='^(lineno|filename|traceback)$'),
+    limit: int = Query(20, ge=1, le=200),
+    admin_user: dict = Depends(get_admin_user)
+):
+    """
+    保存内存快照(管理员)
+
+    首次调用时开启 tracemalloc(frames 为记录的调用栈深度),开启前的分配不会被跟踪,
+    因此应先取一次快照作为基准,等待一段时间后再取快照对比;开启后所有内存分配都有额外开销,分析完成后请关闭
+    """
+    _check_profiling()
+    try:
+        snapshot_id = await profiling.take_snapshot(frames)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    logger.info(f'📦 内存快照已保存: id={snapshot_id}, user_id={admin_user["user_id"]}')
+    
+    return {
+        'code': 200,
+        'data': profiling.memory.top(snapshot_id, group, limit)
+    }
+
+
+@router.get('/api/monitoring/profile/memory/diff')
+async def diff_memory_snapshots(
+    base: Optional[int] = Query(None, description='基准快照 id,默认最早的快照'),
+    snapshot: Optional[int] = Query(None, description='对比快照 id,默认最新的快照'),
+    group: str = Query('lineno', pattern='^(lineno|filename|traceback)$'),
+    limit: int = Query(20, ge=1, le=200),
+    admin_user: dict = Depends(get_admin_user)
+):
+    """对比两次内存快照(管理员): 按分配位置列出内存增长最多的代码"""
+    _check_profiling()
+    snapshot_ids = list(profiling.memory.snapshots)
+    if len(snapshot_ids) < 2 and (base is None or snapshot is None):
+        raise HTTPException(status_code=400, detail='至少需要两次快照')
+    
+    try:
+        result = profiling.memory.diff(
+            base if base is not None else snapshot_ids[0],
+            snapshot if snapshot is not None else snapshot_ids[-1],
+            group, limit
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    
+    return {
+        'code': 200,
+        'data': result
+    }
+
+
+@router.delete('/api/monitoring/profile/memory')
+async def stop_memory_profile(admin_user: dict = Depends(get_admin_user)):
+    """关闭内存跟踪并丢弃所有快照(管理员)"""
+    _check_profiling()
+    profiling.memory.stop()
+    logger.info(f'🔄 内存跟踪已关闭: user_id={admin_user["user_id"]}')
+    
+    return {
+        'code': 200,
+        'message': '已关闭'
+    }
@@ -2,16 +2,11 @@
 提示词规则数据模型（FastAPI Pydantic）
 """
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class PromptRulesModel(BaseModel):
     """用户提示词规则模型"""
-    system_prompt: Optional[str] = None
-    user_prompt: Optional[str] = None
-    rules: Optional[dict] = None
-    
-    # 详细字段（可选）
     system_prompt_rules: Optional[str] = None
     user_guided_prompt_rules: Optional[str] = None
     requirement_report_rules: Optional[str] = None
@@ -34,3 +29,17 @@ class PromptRulesResponse(BaseModel):
     code: int = 200
     data: Optional[PromptRulesModel] = None
     message: Optional[str] = None
+
+
+class PromptRulesBundleModel(PromptRulesModel):
+    """与默认规则合并后的规则包"""
+    customized: List[str] = []
+    hash: str = ''
+    update_time: str = ''
+
+
+class PromptRulesBundleResponse(BaseModel):
+    """规则包响应模型"""
+    code: int = 200
+    data: Optional[PromptRulesBundleModel] = None
+    message: Optional[str] = None
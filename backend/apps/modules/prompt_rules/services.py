@@ -1,40 +1,203 @@
+"""
+用户提示词规则服务
+规则是较大的文本,前端每个生成步骤都会获取: 按用户缓存预先序列化、压缩好的响应体
+(用户规则,以及与默认规则合并后的规则包)和对应的 ETag,保存和删除时失效
+"""
+import gzip
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
 from loguru import logger
 
+from apps.utils.metrics import CACHE_REQUESTS, register_cache
+from config.settings import Config
+
+# 规则字段
+RULE_FIELDS = [
+    'system_prompt_rules', 'user_guided_prompt_rules', 'requirement_report_rules',
+    'thinking_points_extraction_prompt', 'thinking_points_system_message',
+    'system_prompt_generation_prompt', 'system_prompt_system_message',
+    'optimization_advice_prompt', 'optimization_advice_system_message',
+    'optimization_application_prompt', 'optimization_application_system_message',
+    'quality_analysis_system_prompt', 'user_prompt_quality_analysis',
+    'user_prompt_quick_optimization', 'user_prompt_rules'
+]
+
+# 响应体超过该字节数时预先 gzip 压缩
+COMPRESS_MIN_SIZE = 1024
+
+_defaults = None
+
+
+def load_default_rules():
+    """读取默认规则文件(PROMPT_RULES_DEFAULTS_FILE),只保留规则字段;未配置或读取失败时为空"""
+    global _defaults
+    if _defaults is None:
+        _defaults = {}
+        path = getattr(Config, 'PROMPT_RULES_DEFAULTS_FILE', None)
+        if path:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+                _defaults = {field: data[field] for field in RULE_FIELDS if data.get(field) is not None}
+                logger.info(f'✅ 加载默认提示词规则: {path}, 字段数={len(_defaults)}')
+            except Exception as e:
+                logger.error(f'❌ 加载默认提示词规则失败: {path}, error={e}')
+    return _defaults
+
+
+def encode_response(payload):
+    """
+    预先序列化响应: 响应体的哈希作为 ETag(与 worker 无关,多 worker 部署时同样有效)
+
+    Returns:
+        dict: {'etag', 'body': JSON 响应体, 'gzip': 压缩后的响应体(过小时为 None)}
+    """
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return {
+        'etag': '"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+        'body': body,
+        'gzip': gzip.compress(body, compresslevel=6) if len(body) >= COMPRESS_MIN_SIZE else None,
+    }
+
+
+def build_bundle(row, defaults):
+    """
+    生成缓存条目
+
+    Returns:
+        dict: {
+            'row': 用户规则行,
+            'rules': 用户规则响应(GET /api/prompt-rules/,未自定义时 data 为 None),
+            'bundle': 与默认规则合并后的规则包响应(GET /api/prompt-rules/bundle)
+        }
+    """
+    if row:
+        rules_payload = {'code': 200, 'data': {field: row.get(field) for field in RULE_FIELDS}}
+    else:
+        rules_payload = {'code': 200, 'data': None, 'message': '用户暂无自定义规则'}
+
+    rules = {}
+    customized = []
+    for field in RULE_FIELDS:
+        value = row.get(field) if row else None
+        if value is not None:
+            customized.append(field)
+        rules[field] = value if value is not None else defaults.get(field)
+
+    digest = hashlib.sha256(
+        json.dumps(rules, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    ).hexdigest()[:32]
+
+    data = dict(rules)
+    data['customized'] = customized
+    data['hash'] = digest
+    data['update_time'] = str(row['update_time']) if row and row.get('update_time') else ''
+
+    bundle_payload = {'code': 200, 'data': data}
+    if not customized:
+        bundle_payload['message'] = '用户暂无自定义规则'
+
+    return {
+        'row': row,
+        'rules': encode_response(rules_payload),
+        'bundle': encode_response(bundle_payload),
+    }
+
+
+class RulesBundleCache:
+    """
+    按用户缓存规则包
+
+    - 按 LRU 淘汰,最多保留 max_users 个用户;超过 ttl 秒的条目重新加载
+    - 写入路径调用 invalidate;加载期间发生写入的结果不缓存
+    """
+
+    def __init__(self, max_users=1000, ttl=60):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._users = OrderedDict()
+        self._generation = {}
+        register_cache('prompt_rules', lambda: len(self._users))
+
+    def __len__(self):
+        return len(self._users)
+
+    def get(self, user_id):
+        item = self._users.get(user_id)
+        if item is None:
+            return None
+        expires, entry = item
+        if time.monotonic() >= expires:
+            del self._users[user_id]
+            return None
+        self._users.move_to_end(user_id)
+        return entry
+
+    def generation(self, user_id):
+        return self._generation.get(user_id, 0)
+
+    def put(self, user_id, entry, generation):
+        """缓存规则包(generation 为加载前取得的版本,之后发生过写入时不缓存)"""
+        if self.generation(user_id) != generation:
+            return
+        self._users[user_id] = (time.monotonic() + self.ttl, entry)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        self._generation[user_id] = self.generation(user_id) + 1
+        self._users.pop(user_id, None)
+
+
+# 进程内共享的规则包缓存
+rules_cache = RulesBundleCache(
+    getattr(Config, 'PROMPT_RULES_CACHE_SIZE', 1000),
+    getattr(Config, 'PROMPT_RULES_CACHE_TTL', 60)
+)
+
+
 class PromptRulesService:
     """用户提示词规则服务"""
     
     def __init__(self, db):
         self.db = db
     
-    async def get_user_rules(self, user_id: int):
-        """获取用户的提示词规则"""
+    async def get_rules_bundle(self, user_id: int):
+        """获取用户的缓存条目(用户规则行和预先序列化、压缩的响应,见 build_bundle)"""
+        entry = rules_cache.get(user_id)
+        if entry is not None:
+            CACHE_REQUESTS.inc('prompt_rules', 'hit')
+            return entry
+        
+        CACHE_REQUESTS.inc('prompt_rules', 'miss')
         try:
+            generation = rules_cache.generation(user_id)
             sql = "SELECT * FROM user_prompt_rules WHERE user_id = ?"
-            rules = await self.db.get(sql, [user_id])
-            return rules
+            row = await self.db.get(sql, [user_id])
+            entry = build_bundle(row, load_default_rules())
+            rules_cache.put(user_id, entry, generation)
+            return entry
         except Exception as e:
             logger.error(f'❌ 获取用户提示词规则失败: {e}')
             raise
     
+    async def get_user_rules(self, user_id: int):
+        """获取用户的提示词规则(未自定义时返回 None)"""
+        entry = await self.get_rules_bundle(user_id)
+        return entry['row']
+    
     async def save_user_rules(self, user_id: int, rules_data: dict):
         """保存或更新用户的提示词规则（支持部分更新）"""
         try:
             # 检查用户规则是否存在
             existing = await self.get_user_rules(user_id)
             
-            # 允许的字段列表
-            allowed_fields = [
-                'system_prompt_rules', 'user_guided_prompt_rules', 'requirement_report_rules',
-                'thinking_points_extraction_prompt', 'thinking_points_system_message',
-                'system_prompt_generation_prompt', 'system_prompt_system_message',
-                'optimization_advice_prompt', 'optimization_advice_system_message',
-                'optimization_application_prompt', 'optimization_application_system_message',
-                'quality_analysis_system_prompt', 'user_prompt_quality_analysis',
-                'user_prompt_quick_optimization', 'user_prompt_rules'
-            ]
-            
             # 过滤出实际传入的字段（排除user_id）
-            update_fields = {k: v for k, v in rules_data.items() if k in allowed_fields}
+            update_fields = {k: v for k, v in rules_data.items() if k in RULE_FIELDS}
             
             if not update_fields:
                 logger.warning(f'⚠️  没有需要更新的字段: user_id={user_id}')
@@ -57,13 +220,14 @@ class PromptRulesService:
                 logger.info(f'✅ 更新用户提示词规则成功: user_id={user_id}, 字段数={len(update_fields)}')
             else:
                 # 创建新规则：只插入传入的字段 + user_id
-                update_fields['user_id'] = user_id
-                await self.db.table_insert('user_prompt_rules', update_fields)
+                await self.db.table_insert('user_prompt_rules', {**update_fields, 'user_id': user_id})
                 logger.info(f'✅ 创建用户提示词规则成功: user_id={user_id}, 字段数={len(update_fields)}')
             
-            # 返回更新后的规则
-            return await self.get_user_rules(user_id)
+            rules_cache.invalidate(user_id)
             
+            # 回读写入后的规则(update_time 由触发器维护),同时重新缓存响应
+            return await self.get_user_rules(user_id)
+        
         except Exception as e:
             logger.error(f'❌ 保存用户提示词规则失败: {e}')
             raise
@@ -73,6 +237,7 @@ class PromptRulesService:
         try:
             sql = "DELETE FROM user_prompt_rules WHERE user_id = ?"
             await self.db.execute(sql, [user_id])
+            rules_cache.invalidate(user_id)
             logger.info(f'✅ 删除用户提示词规则成功: user_id={user_id}')
         except Exception as e:
             logger.error(f'❌ 删除用户提示词规则失败: {e}')
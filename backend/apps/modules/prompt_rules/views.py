@@ -1,57 +1,91 @@
 """
 提示词规则路由（FastAPI）
 """
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from loguru import logger
 
+from apps.utils.access_log import TimedRoute
 from apps.utils.auth_middleware import get_current_user_id
 from apps.utils.dependencies import get_db
+from .models import PromptRulesBundleResponse, PromptRulesModel, PromptRulesResponse
 from .services import PromptRulesService
 
-router = APIRouter(prefix='/api/prompt-rules', tags=['提示词规则'])
+router = APIRouter(prefix='/api/prompt-rules', tags=['提示词规则'], route_class=TimedRoute)
 
 
-class PromptRulesModel(BaseModel):
-    system_prompt: Optional[str] = None
-    user_prompt: Optional[str] = None
-    rules: Optional[Dict[str, Any]] = None
+def _etag_matches(if_none_match, etag):
+    """If-None-Match 是否包含该 ETag(弱比较: 反向代理压缩时会把 ETag 改为 W/ 前缀)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in [tag[2:] if tag.startswith('W/') else tag for tag in tags]
 
 
-class PromptRulesResponse(BaseModel):
-    code: int = 200
-    data: Optional[PromptRulesModel] = None
-    message: Optional[str] = None
+def _cached_response(request, encoded):
+    """
+    返回预先序列化的响应
+
+    响应带 ETag,客户端携带 If-None-Match 且内容未变化时返回 304;支持 gzip 时返回预先压缩的响应体
+    """
+    headers = {
+        'ETag': encoded['etag'],
+        # 每次使用前向服务端确认(未变化时 304,不传输规则内容)
+        'Cache-Control': 'private, no-cache',
+        'Vary': 'Accept-Encoding',
+    }
+    if _etag_matches(request.headers.get('if-none-match'), encoded['etag']):
+        return Response(status_code=304, headers=headers)
+    
+    if encoded['gzip'] is not None and 'gzip' in request.headers.get('accept-encoding', ''):
+        headers['Content-Encoding'] = 'gzip'
+        return Response(encoded['gzip'], media_type='application/json', headers=headers)
+    
+    return Response(encoded['body'], media_type='application/json', headers=headers)
 
 
 @router.get('/', response_model=PromptRulesResponse)
 async def get_rules(
+    request: Request,
     user_id: int = Depends(get_current_user_id),
     db = Depends(get_db)
 ):
-    """获取用户的提示词规则"""
+    """
+    获取用户的提示词规则
+
+    未自定义时 data 为 null;支持 ETag/304 和 gzip
+    """
     try:
         service = PromptRulesService(db)
-        rules = await service.get_user_rules(user_id)
-        
-        if not rules:
-            return PromptRulesResponse(
-                code=200,
-                data=None,
-                message='用户暂无自定义规则'
-            )
-        
-        return PromptRulesResponse(
-            code=200,
-            data=PromptRulesModel(**rules)
-        )
+        entry = await service.get_rules_bundle(user_id)
+        return _cached_response(request, entry['rules'])
         
     except Exception as e:
         logger.error(f'❌ 获取提示词规则失败: {e}', exc_info=True)
         raise HTTPException(status_code=500, detail=f'获取提示词规则失败: {str(e)}')
 
 
+@router.get('/bundle', response_model=PromptRulesBundleResponse)
+async def get_rules_bundle(
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """
+    获取与默认规则合并后的规则包
+
+    data 包含全部规则字段、customized（用户自定义的字段）、hash（规则内容哈希）和 update_time;
+    支持 ETag/304 和 gzip
+    """
+    try:
+        service = PromptRulesService(db)
+        entry = await service.get_rules_bundle(user_id)
+        return _cached_response(request, entry['bundle'])
+        
+    except Exception as e:
+        logger.error(f'❌ 获取提示词规则包失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'获取提示词规则包失败: {str(e)}')
+
+
 @router.post('/', response_model=PromptRulesResponse)
 async def save_rules(
     rules_data: PromptRulesModel,
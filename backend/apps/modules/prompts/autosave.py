@@ -0,0 +1,145 @@
+"""
+自动保存合并
+编辑器每隔几秒通过 POST /api/prompts/ 自动保存一次,每次都会更新提示词并创建一个完整的版本快照。
+带 auto_save 的保存请求只做权限检查,放入内存中的待写队列后立即返回;同一用户对同一提示词的连续保存
+合并为一次更新(后到的字段覆盖先到的),并且最多创建一个自动保存版本(is_auto_save=1)
+
+- 防抖: 最后一次保存后 AUTOSAVE_DEBOUNCE_MS 内没有新的保存时写入;持续保存时最迟 AUTOSAVE_MAX_DELAY_MS 写入一次
+- 同一提示词的写入串行执行;手动保存、回滚、创建版本和读取详情前先写入待写的自动保存,删除时丢弃
+- 服务关闭时写入所有待写的自动保存;进程异常退出时最多丢失一个合并窗口内的自动保存
+- 队列在进程内,多 worker 部署时同一编辑器的请求可能落到不同 worker,各自合并
+"""
+import asyncio
+import time
+
+from loguru import logger
+
+from apps.utils.metrics import AUTOSAVE_COALESCED, AUTOSAVE_REQUESTS, register_cache
+from config.settings import Config
+
+
+class _Pending:
+    """一个提示词待写的自动保存"""
+
+    __slots__ = ('db', 'data', 'saves', 'first_at', 'timer')
+
+    def __init__(self, db, data, now):
+        self.db = db
+        self.data = data
+        # 合并的保存次数
+        self.saves = 1
+        self.first_at = now
+        self.timer = None
+
+
+class AutosaveQueue:
+    """
+    自动保存待写队列: (user_id, prompt_id) -> 待写内容
+
+    debounce 为防抖时间(秒),max_delay 为第一次保存到写入的最长时间(秒)
+    """
+
+    def __init__(self, debounce, max_delay):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._pending = {}
+        # (user_id, prompt_id) -> 正在写入的任务
+        self._flushing = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def enabled(self):
+        return self.debounce > 0
+
+    def submit(self, db, user_id, prompt_id, data):
+        """
+        加入待写队列(调用方已检查权限)
+
+        Returns:
+            int: 本次写入前已合并的保存次数
+        """
+        key = (user_id, prompt_id)
+        now = time.monotonic()
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _Pending(db, dict(data), now)
+        else:
+            pending.timer.cancel()
+            pending.saves += 1
+            # 任意一次保存要求创建版本,合并后就创建(最多一个)
+            create_version = pending.data.get('create_version', True) or data.get('create_version', True)
+            pending.data.update(data)
+            pending.data['create_version'] = create_version
+
+        delay = min(self.debounce, max(0.0, pending.first_at + self.max_delay - now))
+        pending.timer = asyncio.get_running_loop().call_later(delay, self._start, key)
+        AUTOSAVE_REQUESTS.inc('queued')
+        return pending.saves
+
+    def _start(self, key):
+        """取出待写内容,创建写入任务(排在同一提示词上一次写入之后)"""
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        pending.timer.cancel()
+        task = asyncio.ensure_future(self._write(key, pending, self._flushing.get(key)))
+        self._flushing[key] = task
+        task.add_done_callback(lambda done: self._flushing.pop(key) if self._flushing.get(key) is done else None)
+
+    async def _write(self, key, pending, previous):
+        if previous is not None:
+            await asyncio.wait([previous])
+
+        from apps.modules.prompts.services import PromptService
+
+        user_id, prompt_id = key
+        data = dict(pending.data, id=prompt_id, is_auto_save=True)
+        data.pop('check_duplicates', None)
+        if not data.get('change_summary'):
+            data['change_summary'] = f'自动保存(合并 {pending.saves} 次)' if pending.saves > 1 else '自动保存'
+        try:
+            await PromptService(pending.db).save_prompt(user_id, data)
+            AUTOSAVE_REQUESTS.inc('written', amount=pending.saves)
+            AUTOSAVE_COALESCED.observe(pending.saves)
+        except Exception as e:
+            # 客户端已经收到确认,只能记录错误(手动保存会覆盖)
+            AUTOSAVE_REQUESTS.inc('failed', amount=pending.saves)
+            logger.error(f'❌ 自动保存写入失败: prompt_id={prompt_id}, user_id={user_id}, 合并 {pending.saves} 次: {e}')
+
+    async def flush(self, user_id, prompt_id):
+        """立即写入该提示词待写的自动保存,并等待正在进行的写入完成(没有时直接返回)"""
+        key = (user_id, prompt_id)
+        self._start(key)
+        task = self._flushing.get(key)
+        if task is not None:
+            # 调用方被取消时写入继续进行
+            await asyncio.shield(task)
+
+    async def discard(self, user_id, prompt_id):
+        """丢弃该提示词待写的自动保存(删除提示词前调用)"""
+        key = (user_id, prompt_id)
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            pending.timer.cancel()
+            AUTOSAVE_REQUESTS.inc('discarded', amount=pending.saves)
+        task = self._flushing.get(key)
+        if task is not None:
+            await asyncio.shield(task)
+
+    async def close(self):
+        """写入所有待写的自动保存(服务关闭时调用)"""
+        for key in list(self._pending):
+            self._start(key)
+        if self._flushing:
+            logger.info(f'🔄 写入待保存的自动保存: {len(self._flushing)} 个提示词')
+            await asyncio.wait(list(self._flushing.values()))
+
+
+# 进程内共享的自动保存队列
+autosaves = AutosaveQueue(
+    getattr(Config, 'AUTOSAVE_DEBOUNCE_MS', 3000) / 1000,
+    getattr(Config, 'AUTOSAVE_MAX_DELAY_MS', 15000) / 1000
+)
+register_cache('autosave_pending', lambda: len(autosaves))
@@ -22,6 +22,9 @@ class SavePromptRequest(BaseModel):
     tags: Optional[List[str]] = None
     create_version: bool = True
     change_summary: Optional[str] = None
+    check_duplicates: bool = False
+    # 编辑器自动保存: 立即返回,连续的自动保存合并为一次写入(仅更新已有提示词时生效)
+    auto_save: bool = False
 
 
 # 提示词信息
@@ -31,9 +34,9 @@ class PromptInfo(BaseModel):
     title: str
     description: Optional[str] = None
     requirement_report: Optional[str] = None
-    thinking_points: Optional[str] = None
+    thinking_points: Optional[List[str]] = None
     initial_prompt: Optional[str] = None
-    advice: Optional[str] = None
+    advice: Optional[List[str]] = None
     final_prompt: str
     language: str
     format: str
@@ -42,7 +45,7 @@ class PromptInfo(BaseModel):
     is_public: int
     view_count: int
     use_count: int
-    tags: Optional[str] = None
+    tags: Optional[List[str]] = None
     current_version: Optional[str] = None
     total_versions: Optional[int] = None
     last_version_time: Optional[str] = None
@@ -88,6 +91,9 @@ class SavePromptData(BaseModel):
     id: int
     create_time: str
     message: Optional[str] = None
+    duplicates: Optional[List[dict]] = None
+    # 自动保存: 待写入的合并保存次数(已接收,尚未写入数据库)
+    pending_saves: Optional[int] = None
 
 
 class SavePromptResponse(BaseModel):
@@ -6,6 +6,13 @@ import json
 import datetime
 from loguru import logger
 
+from apps.modules.search.services import autocomplete_index, fuzzy_index, notify_prompt_saved, notify_prompt_deleted
+from apps.modules.search.semantic import semantic_index
+from apps.modules.search.duplicates import duplicate_detector
+from apps.utils.event_hub import notify_prompt_changed
+from apps.utils.single_flight import single_flight
+from .autosave import autosaves
+
 
 class PromptService:
     """提示词服务类"""
@@ -19,6 +26,64 @@ class PromptService:
         """
         self.db = db
     
+    @staticmethod
+    def parse_tags(tags_str):
+        """
+        解析数据库中存储的标签字符串
+        
+        Args:
+            tags_str: 逗号分隔的标签字符串(兼容 "['tag1', 'tag2']" 格式)
+            
+        Returns:
+            list: 标签列表
+        """
+        if not tags_str or not tags_str.strip():
+            return []
+        
+        # 检测是否是Python list字符串表示（如 "['tag1', 'tag2']"）
+        if tags_str.startswith('[') and tags_str.endswith(']'):
+            try:
+                # 尝试使用json.loads解析
+                return json.loads(tags_str)
+            except:
+                # 如果失败，按逗号分割
+                pass
+        
+        # 正常的逗号分隔格式
+        return [tag.strip() for tag in tags_str.split(',') if tag.strip()]
+    
+    @staticmethod
+    def format_list_item(item):
+        """
+        列表项后处理(原地修改): 标签字符串转数组,时间字段转字符串
+        
+        Args:
+            item: 数据库查询得到的列表项字典
+        """
+        item['tags'] = PromptService.parse_tags(item.get('tags', ''))
+        item['create_time'] = str(item['create_time']) if item.get('create_time') else ''
+        item['update_time'] = str(item['update_time']) if item.get('update_time') else ''
+        item['last_version_time'] = str(item['last_version_time']) if item.get('last_version_time') else ''
+        return item
+    
+    @staticmethod
+    def format_detail(prompt):
+        """
+        详情后处理(原地修改): 解析JSON字段,标签字符串转数组,时间字段转字符串
+        
+        Args:
+            prompt: 数据库查询得到的完整提示词字典
+        """
+        for field in ('thinking_points', 'advice'):
+            if prompt.get(field):
+                try:
+                    prompt[field] = json.loads(prompt[field])
+                except:
+                    prompt[field] = []
+            else:
+                prompt[field] = []
+        return PromptService.format_list_item(prompt)
+    
     async def save_prompt(self, user_id, data):
         """
         统一的保存方法(自动判断新建还是更新,自动创建版本)
@@ -32,6 +97,8 @@ class PromptService:
                 - create_version: 是否创建版本(默认True)
                 - change_summary: 版本变更说明(可选)
                 - change_type: 版本变更类型 major/minor/patch (默认patch)
+                - check_duplicates: 是否检查近似重复(默认False)
+                - is_auto_save: 是否为自动保存(创建的版本标记为自动保存)
                 - ... 其他字段
         
         Returns:
@@ -39,7 +106,8 @@ class PromptService:
                 'id': 提示词ID,
                 'is_new': 是否新建,
                 'version': 版本号(如果创建了版本),
-                'message': 成功消息
+                'message': 成功消息,
+                'duplicates': 近似重复的提示词(仅 check_duplicates 时返回)
             }
         """
         try:
@@ -76,7 +144,8 @@ class PromptService:
                         'change_type': change_type,
                         'change_summary': change_summary or f'更新提示词({change_type})',
                         'change_log': data.get('change_log', ''),
-                        'version_tag': data.get('version_tag', 'stable')
+                        'version_tag': data.get('version_tag', 'stable'),
+                        'is_auto_save': data.get('is_auto_save', False)
                     }
                     
                     version_result = await version_service.create_version(prompt_id, user_id, version_data)
@@ -84,7 +153,7 @@ class PromptService:
                     
                     logger.info(f'✅ 版本创建成功: version={version_number}')
                 
-                return {
+                result = {
                     'id': prompt_id,
                     'is_new': False,
                     'version': version_number,
@@ -111,12 +180,18 @@ class PromptService:
                     await version_service.create_version(prompt_id, user_id, version_data)
                     logger.info(f'✅ 初始版本创建成功: version=1.0.0')
                 
-                return {
+                result = {
                     'id': prompt_id,
                     'is_new': True,
                     'version': '1.0.0' if create_version else None,
                     'message': '创建成功' + (',版本 1.0.0' if create_version else '')
                 }
+            
+            # 可选: 检查是否与已有提示词近似重复(仅提示,不阻止保存)
+            if data.get('check_duplicates'):
+                result['duplicates'] = await self.find_duplicates_of(user_id, prompt_id)
+            
+            return result
         
         except PermissionError:
             raise
@@ -126,6 +201,29 @@ class PromptService:
             logger.error(f'❌ 保存提示词失败: {e}')
             raise
     
+    async def queue_autosave(self, user_id, data):
+        """
+        自动保存: 检查权限后放入待写队列,立即返回(连续的自动保存合并为一次写入)
+        
+        Args:
+            user_id: 用户ID
+            data: 提示词数据字典(必须包含 id)
+        
+        Returns:
+            dict: {'id': 提示词ID, 'pending_saves': 待写入的合并保存次数, 'message': 成功消息}
+        """
+        prompt_id = data['id']
+        check_sql = f"SELECT id FROM prompts WHERE id = {prompt_id} AND user_id = {user_id}"
+        if not await self.db.get(check_sql):
+            raise PermissionError('提示词不存在或无权限修改')
+        
+        pending_saves = autosaves.submit(self.db, user_id, prompt_id, data)
+        return {
+            'id': prompt_id,
+            'pending_saves': pending_saves,
+            'message': '已接收,稍后自动保存'
+        }
+    
     async def create_prompt(self, user_id, data):
         """
         创建提示词
@@ -170,6 +268,10 @@ class PromptService:
             
             # 插入数据库
             prompt_id = await self.db.table_insert('prompts', fields)
+            notify_prompt_saved(user_id, prompt_id, fields['title'], fields['description'], tags_list, 0)
+            notify_prompt_changed(user_id, 'prompt.created', prompt_id, fields['current_version'])
+            await semantic_index.upsert(self.db, user_id, prompt_id, fields['title'], fields['description'], fields['final_prompt'])
+            await duplicate_detector.upsert(self.db, user_id, prompt_id, fields['final_prompt'])
             
             # 更新标签统计
             if tags_list:
@@ -183,9 +285,12 @@ class PromptService:
             logger.error(f'❌ 创建提示词失败: {e}')
             raise
     
-    async def get_prompts_list(self, user_id, page=1, limit=10, keyword='', tag='', is_favorite='', sort='create_time'):
+    @single_flight('prompts_list')
+    async def get_prompts_list(self, user_id, page=1, limit=10, keyword='', tag='', is_favorite='', sort='create_time', fuzzy=False):
         """
         获取提示词列表(分页)
+        
+        fuzzy=True 时关键词使用三元组模糊匹配(容忍拼写错误),结果按相似度排序
         """
         try:
             offset = (page - 1) * limit if page > 0 else 0
@@ -203,7 +308,15 @@ class PromptService:
             # 构建WHERE条件
             conditions = ["user_id = " + str(user_id)]
             
-            if keyword and keyword.strip():
+            fuzzy_ranks = None
+            if keyword and keyword.strip() and fuzzy:
+                # 模糊匹配: 先从三元组索引取候选,再与其他条件组合过滤
+                matches = await fuzzy_index.search(self.db, user_id, keyword.strip())
+                if not matches:
+                    return {'total': 0, 'page': page, 'limit': limit, 'items': []}
+                fuzzy_ranks = {prompt_id: rank for rank, (prompt_id, _) in enumerate(matches)}
+                conditions.append("id IN (" + ",".join(str(int(prompt_id)) for prompt_id in fuzzy_ranks) + ")")
+            elif keyword and keyword.strip():
                 # 安全处理搜索关键词
                 safe_keyword = keyword.replace("'", "").replace("\"", "").replace("\\", "").replace("%", "%%")
                 conditions.append("(title LIKE '%%{}%%' OR description LIKE '%%{}%%')".format(safe_keyword, safe_keyword))
@@ -227,40 +340,36 @@ class PromptService:
             }
             order_by = sort_options.get(sort, 'create_time DESC')
             
-            # 分页
-            pagination = " LIMIT " + str(limit) + " OFFSET " + str(offset)
-            
-            # 完整查询
-            list_sql = base_query + where_clause + " ORDER BY " + order_by + pagination
-            
-            # 执行查询
-            items = await self.db.query(list_sql)
-            
-            # 计数查询
-            count_sql = "SELECT COUNT(*) as total FROM prompts" + where_clause
-            count_result = await self.db.get(count_sql)
-            total = count_result['total'] if count_result else 0
+            if fuzzy_ranks is not None:
+                # 按相似度排序: 先取过滤后的ID,在内存中排序分页,再查询当前页
+                id_rows = await self.db.query("SELECT id FROM prompts" + where_clause)
+                ranked_ids = sorted((row['id'] for row in id_rows), key=fuzzy_ranks.get)
+                total = len(ranked_ids)
+                page_ids = ranked_ids[offset:offset + limit]
+                
+                items = []
+                if page_ids:
+                    page_sql = base_query + " WHERE id IN (" + ",".join(str(prompt_id) for prompt_id in page_ids) + ")"
+                    items = await self.db.query(page_sql)
+                    items.sort(key=lambda item: fuzzy_ranks[item['id']])
+            else:
+                # 分页
+                pagination = " LIMIT " + str(limit) + " OFFSET " + str(offset)
+                
+                # 完整查询
+                list_sql = base_query + where_clause + " ORDER BY " + order_by + pagination
+                
+                # 执行查询
+                items = await self.db.query(list_sql)
+                
+                # 计数查询
+                count_sql = "SELECT COUNT(*) as total FROM prompts" + where_clause
+                count_result = await self.db.get(count_sql)
+                total = count_result['total'] if count_result else 0
             
             # 处理标签
             for item in items:
-                tags_str = item.get('tags', '')
-                if tags_str and tags_str.strip():
-                    # 检测是否是Python list字符串表示（如 "['tag1', 'tag2']"）
-                    if tags_str.startswith('[') and tags_str.endswith(']'):
-                        try:
-                            # 尝试使用json.loads解析
-                            item['tags'] = json.loads(tags_str)
-                        except:
-                            # 如果失败，按逗号分割
-                            item['tags'] = [tag.strip() for tag in tags_str.split(',') if tag.strip()]
-                    else:
-                        # 正常的逗号分隔格式
-                        item['tags'] = [tag.strip() for tag in tags_str.split(',') if tag.strip()]
-                else:
-                    item['tags'] = []
-                item['create_time'] = str(item['create_time']) if item.get('create_time') else ''
-                item['update_time'] = str(item['update_time']) if item.get('update_time') else ''
-                item['last_version_time'] = str(item['last_version_time']) if item.get('last_version_time') else ''
+                self.format_list_item(item)
             
             return {
                 'total': total,
@@ -273,6 +382,7 @@ class PromptService:
             logger.error(f'❌ 查询提示词列表失败: {e}')
             raise
     
+    @single_flight('prompt_detail')
     async def get_prompt_detail(self, user_id, prompt_id):
         """
         获取提示词详情
@@ -283,45 +393,8 @@ class PromptService:
             prompt = await self.db.get(sql)
             
             if prompt:
-                # 解析JSON字段
-                if prompt.get('thinking_points'):
-                    try:
-                        prompt['thinking_points'] = json.loads(prompt['thinking_points'])
-                    except:
-                        prompt['thinking_points'] = []
-                else:
-                    prompt['thinking_points'] = []
-                
-                if prompt.get('advice'):
-                    try:
-                        prompt['advice'] = json.loads(prompt['advice'])
-                    except:
-                        prompt['advice'] = []
-                else:
-                    prompt['advice'] = []
-                
-                if prompt.get('tags'):
-                    tags_str = prompt['tags']
-                    # 检测是否是Python list字符串表示（如 "['tag1', 'tag2']"）
-                    if tags_str.startswith('[') and tags_str.endswith(']'):
-                        try:
-                            # 尝试使用json.loads解析
-                            prompt['tags'] = json.loads(tags_str)
-                        except:
-                            # 如果失败，按逗号分割
-                            prompt['tags'] = [tag.strip() for tag in tags_str.split(',') if tag.strip()]
-                    else:
-                        # 正常的逗号分隔格式
-                        prompt['tags'] = [tag.strip() for tag in tags_str.split(',') if tag.strip()]
-                else:
-                    prompt['tags'] = []
-                
-                # 时间格式化
-                prompt['create_time'] = str(prompt['create_time']) if prompt.get('create_time') else ''
-                prompt['update_time'] = str(prompt['update_time']) if prompt.get('update_time') else ''
-                prompt['last_version_time'] = str(prompt['last_version_time']) if prompt.get('last_version_time') else ''
-                
-                logger.debug(f'✅ 查询提示词详情成功: prompt_id={prompt_id}, user_id={user_id}')
+                self.format_detail(prompt)
+                logger.debug('✅ 查询提示词详情成功: prompt_id={}, user_id={}', prompt_id, user_id)
             else:
                 logger.warning(f'⚠️  提示词不存在或无权限: prompt_id={prompt_id}, user_id={user_id}')
             
@@ -331,6 +404,129 @@ class PromptService:
             logger.error(f'❌ 查询提示词详情失败: {e}')
             raise
     
+    async def _get_ranked_prompts(self, ranked):
+        """按相似度顺序查询提示词摘要信息"""
+        if not ranked:
+            return []
+        
+        scores = dict(ranked)
+        sql = """
+            SELECT id, title, description, tags, prompt_type, current_version, use_count, update_time
+            FROM prompts WHERE id IN (""" + ",".join(str(prompt_id) for prompt_id in scores) + ")"
+        items = await self.db.query(sql)
+        
+        for item in items:
+            item['score'] = round(scores[item['id']], 4)
+            item['tags'] = self.parse_tags(item.get('tags', ''))
+            item['update_time'] = str(item['update_time']) if item.get('update_time') else ''
+        
+        items.sort(key=lambda item: -item['score'])
+        return items
+    
+    async def semantic_search(self, user_id, query, limit=10):
+        """
+        语义搜索提示词
+        
+        Args:
+            user_id: 用户ID
+            query: 查询文本
+            limit: 返回数量
+            
+        Returns:
+            list: 提示词列表(含 score 相似度),按相似度降序
+        """
+        try:
+            ranked = await semantic_index.search(self.db, user_id, query, limit)
+            return await self._get_ranked_prompts(ranked)
+            
+        except Exception as e:
+            logger.error(f'❌ 语义搜索失败: {e}')
+            raise
+    
+    async def get_similar_prompts(self, user_id, prompt_id, limit=10):
+        """
+        查找与指定提示词相似的提示词
+        
+        Args:
+            user_id: 用户ID
+            prompt_id: 提示词ID
+            limit: 返回数量
+            
+        Returns:
+            list: 提示词列表(含 score 相似度),提示词不存在或无权限时返回None
+        """
+        try:
+            check_sql = "SELECT id FROM prompts WHERE id = " + str(prompt_id) + " AND user_id = " + str(user_id)
+            exists = await self.db.get(check_sql)
+            
+            if not exists:
+                return None
+            
+            ranked = await semantic_index.similar(self.db, user_id, prompt_id, limit)
+            return await self._get_ranked_prompts(ranked)
+            
+        except Exception as e:
+            logger.error(f'❌ 查询相似提示词失败: {e}')
+            raise
+    
+    async def find_duplicates_of(self, user_id, prompt_id, threshold=None):
+        """
+        查找与指定提示词近似重复的提示词
+        
+        Args:
+            user_id: 用户ID
+            prompt_id: 提示词ID
+            threshold: 相似度阈值(默认使用配置)
+            
+        Returns:
+            list: 提示词列表(含 score 相似度),按相似度降序
+        """
+        try:
+            matches = await duplicate_detector.find_similar(self.db, user_id, prompt_id, threshold)
+            return await self._get_ranked_prompts(matches)
+            
+        except Exception as e:
+            # 重复检查仅用于提示,失败时不影响保存
+            logger.warning(f'⚠️  检查近似重复失败: prompt_id={prompt_id}, error={e}')
+            return []
+    
+    async def get_duplicate_groups(self, user_id, threshold=None):
+        """
+        检测用户提示词库中的近似重复组
+        
+        Args:
+            user_id: 用户ID
+            threshold: 相似度阈值(默认使用配置)
+            
+        Returns:
+            list: [{'similarity': 组内最低相似度, 'items': [提示词摘要, ...]}, ...]
+        """
+        try:
+            groups = await duplicate_detector.find_groups(self.db, user_id, threshold)
+            if not groups:
+                return []
+            
+            prompt_ids = [prompt_id for group in groups for prompt_id in group['prompt_ids']]
+            sql = """
+                SELECT id, title, description, tags, prompt_type, current_version, use_count, update_time
+                FROM prompts WHERE id IN (""" + ",".join(str(prompt_id) for prompt_id in prompt_ids) + ")"
+            rows = {row['id']: row for row in await self.db.query(sql)}
+            
+            result = []
+            for group in groups:
+                items = [rows[prompt_id] for prompt_id in group['prompt_ids'] if prompt_id in rows]
+                for item in items:
+                    item['tags'] = self.parse_tags(item.get('tags', ''))
+                    item['update_time'] = str(item['update_time']) if item.get('update_time') else ''
+                if len(items) > 1:
+                    result.append({'similarity': group['similarity'], 'items': items})
+            
+            return result
+            
+        except Exception as e:
+            logger.error(f'❌ 检测近似重复失败: {e}')
+            raise
+    
     async def update_prompt(self, user_id, prompt_id, data):
         """
         更新提示词
@@ -345,7 +541,7 @@ class PromptService:
         """
         try:
             # 先检查权限
-            check_sql = "SELECT id FROM prompts WHERE id = " + str(prompt_id) + " AND user_id = " + str(user_id)
+            check_sql = "SELECT id, title, description, tags, current_version FROM prompts WHERE id = " + str(prompt_id) + " AND user_id = " + str(user_id)
             exists = await self.db.get(check_sql)
             
             if not exists:
@@ -408,9 +604,6 @@ class PromptService:
             if 'tags' in data:
                 tags = ','.join(data['tags']) if data['tags'] else ''
                 update_fields.append("tags = '" + escape_sql_string(tags) + "'")
-                # 更新标签统计
-                if data['tags']:
-                    await self._update_tags(user_id, data['tags'])
             
             if not update_fields:
                 logger.warning('⚠️  没有需要更新的字段')
@@ -421,6 +614,28 @@ class PromptService:
                 WHERE id = """ + str(prompt_id) + """ AND user_id = """ + str(user_id)
             
             await self.db.execute(update_sql)
+            notify_prompt_changed(user_id, 'prompt.updated', prompt_id, exists.get('current_version'))
+            
+            if 'title' in data or 'description' in data or 'tags' in data:
+                notify_prompt_saved(
+                    user_id, prompt_id,
+                    data.get('title', exists.get('title')),
+                    data.get('description', exists.get('description')),
+                    data.get('tags', exists.get('tags'))
+                )
+            
+            # 内容变化时重新计算语义向量
+            if 'title' in data or 'description' in data or 'final_prompt' in data:
+                content = await self.db.get("SELECT title, description, final_prompt FROM prompts WHERE id = ?", [prompt_id])
+                await semantic_index.upsert(self.db, user_id, prompt_id, content['title'], content['description'], content['final_prompt'])
+            
+            # 提示词内容变化时重新计算重复检测签名
+            if 'final_prompt' in data:
+                await duplicate_detector.upsert(self.db, user_id, prompt_id, data['final_prompt'])
+            
+            # 更新标签统计(新增的+1,移除的-1)
+            if 'tags' in data:
+                await self._update_tags(user_id, data['tags'], self.parse_tags(exists.get('tags') or ''))
             
             logger.info(f'✅ 更新提示词成功: prompt_id={prompt_id}, user_id={user_id}')
             return True
@@ -442,7 +657,7 @@ class PromptService:
         """
         try:
             # 先检查权限
-            check_sql = "SELECT id FROM prompts WHERE id = " + str(prompt_id) + " AND user_id = " + str(user_id)
+            check_sql = "SELECT id, tags FROM prompts WHERE id = " + str(prompt_id) + " AND user_id = " + str(user_id)
             exists = await self.db.get(check_sql)
             
             if not exists:
@@ -452,6 +667,12 @@ class PromptService:
             # 删除提示词(级联删除关联的分享记录)
             delete_sql = "DELETE FROM prompts WHERE id = " + str(prompt_id) + " AND user_id = " + str(user_id)
             await self.db.execute(delete_sql)
+            notify_prompt_deleted(user_id, prompt_id)
+            notify_prompt_changed(user_id, 'prompt.deleted', prompt_id)
+            await semantic_index.remove(self.db, prompt_id)
+            
+            # 扣减标签统计
+            await self._update_tags(user_id, [], self.parse_tags(exists.get('tags') or ''))
             
             logger.info(f'✅ 删除提示词成功: prompt_id={prompt_id}, user_id={user_id}')
             return True
@@ -504,7 +725,7 @@ class PromptService:
         try:
             sql = "UPDATE prompts SET view_count = view_count + 1 WHERE id = " + str(prompt_id)
             await self.db.execute(sql)
-            logger.debug(f'✅ 增加查看次数: prompt_id={prompt_id}')
+            logger.debug('✅ 增加查看次数: prompt_id={}', prompt_id)
             
         except Exception as e:
             logger.error(f'❌ 增加查看次数失败: {e}')
@@ -524,47 +745,53 @@ class PromptService:
             
             sql = "UPDATE prompts SET use_count = use_count + 1 WHERE id = " + str(prompt_id)
             await self.db.execute(sql)
-            logger.debug(f'✅ 增加使用次数: prompt_id={prompt_id}')
+            autocomplete_index.on_prompt_used(user_id, prompt_id)
+            logger.debug('✅ 增加使用次数: prompt_id={}', prompt_id)
             return True
             
         except Exception as e:
             logger.error(f'❌ 增加使用次数失败: {e}')
             raise
     
-    async def _update_tags(self, user_id, tags):
+    async def _update_tags(self, user_id, tags, old_tags=None):
         """
         更新标签统计(内部方法)
         
+        use_count 表示使用该标签的提示词数量:
+        新增的标签 +1, 移除的标签 -1, 未变化的标签保持不变
+        
         Args:
             user_id: 用户ID
-            tags: 标签列表
+            tags: 保存后的标签列表
+            old_tags: 保存前的标签列表(新建提示词时为空)
         """
         try:
-            for tag in tags:
-                if not tag:
-                    continue
-                
-                # 检查标签是否存在
-                safe_tag = tag.replace("'", "''")
-                check_sql = "SELECT id, use_count FROM prompt_tags WHERE user_id = " + str(user_id) + " AND tag_name = '" + safe_tag + "'"
-                existing = await self.db.get(check_sql)
-                
-                if existing:
-                    # 更新使用次数
-                    update_sql = "UPDATE prompt_tags SET use_count = use_count + 1 WHERE id = " + str(existing['id'])
-                    await self.db.execute(update_sql)
-                else:
-                    # 创建新标签
-                    fields = {
-                        'tag_name': tag,
-                        'user_id': user_id,
-                        'use_count': 1
-                    }
-                    await self.db.table_insert('prompt_tags', fields)
-                
-            logger.debug(f'✅ 更新标签统计成功: user_id={user_id}, tags={tags}')
+            new_tags = {tag.strip() for tag in (tags or []) if tag and tag.strip()}
+            old_tags = {tag.strip() for tag in (old_tags or []) if tag and tag.strip()}
+            
+            added = sorted(new_tags - old_tags)
+            removed = sorted(old_tags - new_tags)
+            
+            # 新增标签: 不存在则创建, 存在则计数+1
+            if added:
+                upsert_sql = """
+                    INSERT INTO prompt_tags (tag_name, user_id, use_count) VALUES (?, ?, 1)
+                    ON CONFLICT(user_id, tag_name) DO UPDATE SET use_count = use_count + 1
+                """
+                await self.db.execute_many(upsert_sql, [[tag, user_id] for tag in added])
+            
+            # 移除标签: 计数-1(不小于0)
+            if removed:
+                decrease_sql = """
+                    UPDATE prompt_tags SET use_count = MAX(use_count - 1, 0)
+                    WHERE user_id = ? AND tag_name = ?
+                """
+                await self.db.execute_many(decrease_sql, [[user_id, tag] for tag in removed])
+            
+            autocomplete_index.on_tags_changed(user_id, added, removed)
+            
+            logger.debug('✅ 更新标签统计成功: user_id={}, added={}, removed={}', user_id, added, removed)
             
         except Exception as e:
             logger.error(f'❌ 更新标签统计失败: {e}')
             # 不抛出异常,因为这不是关键操作
-
@@ -6,13 +6,16 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Optional
 from loguru import logger
 
+from apps.utils.access_log import TimedRoute
 from apps.utils.auth_middleware import get_current_user_id
 from apps.utils.dependencies import get_db
+from apps.utils.rate_limit import ConcurrencyLimit
+from .autosave import autosaves
 from .services import PromptService
 from .models import *
 
 # 创建提示词路由
-router = APIRouter(prefix='/api/prompts', tags=['提示词'])
+router = APIRouter(prefix='/api/prompts', tags=['提示词'], route_class=TimedRoute)
 
 
 @router.post('/', response_model=SavePromptResponse)
@@ -27,6 +30,7 @@ async def save_prompt(
     逻辑:
     1. 如果data中有id且存在 -> 更新已有提示词 + 创建新版本(如果create_version=True)
     2. 如果没有id或id不存在 -> 创建新提示词 + 创建初始版本
+    3. 更新时 auto_save=True -> 放入自动保存队列立即返回,连续的自动保存合并写入,最多创建一个自动保存版本
     """
     try:
         # 参数验证
@@ -38,9 +42,28 @@ async def save_prompt(
         
         # 转换为字典
         data = request.dict(exclude_none=True)
+        auto_save = data.pop('auto_save', False)
+        prompt_service = PromptService(db)
+        
+        if request.id and auto_save and autosaves.enabled:
+            result = await prompt_service.queue_autosave(user_id, data)
+            return SavePromptResponse(
+                code=200,
+                message=result['message'],
+                data=SavePromptData(
+                    id=result['id'],
+                    create_time='',
+                    message=result['message'],
+                    pending_saves=result['pending_saves']
+                )
+            )
+        
+        if request.id:
+            # 先写入待写的自动保存,保证本次保存在其之后
+            await autosaves.flush(user_id, request.id)
+        data['is_auto_save'] = auto_save
         
         # 统一保存(自动判断新建还是更新)
-        prompt_service = PromptService(db)
         result = await prompt_service.save_prompt(user_id, data)
         
         return SavePromptResponse(
@@ -49,7 +72,8 @@ async def save_prompt(
             data=SavePromptData(
                 id=result.get('id'),
                 create_time=result.get('create_time', ''),
-                message=result.get('message')
+                message=result.get('message'),
+                duplicates=result.get('duplicates')
             )
         )
         
@@ -74,6 +98,7 @@ async def get_prompts_list(
     tag: Optional[str] = Query(None),
     is_favorite: Optional[str] = Query(None),
     sort: str = Query('create_time'),
+    fuzzy: bool = Query(False),
     user_id: int = Depends(get_current_user_id),
     db = Depends(get_db)
 ):
@@ -82,17 +107,14 @@ async def get_prompts_list(
         # 查询列表
         prompt_service = PromptService(db)
         result = await prompt_service.get_prompts_list(
-            user_id, page, limit, keyword or '', tag or '', is_favorite or '', sort
+            user_id, page, limit, keyword or '', tag or '', is_favorite or '', sort, fuzzy
         )
         
-        # 转换标签格式（字符串转数组）
+        # 标签已由服务层解析为数组
         items = []
         for item in result.get('items', []):
             item_dict = dict(item) if not isinstance(item, dict) else item
-            if item_dict.get('tags'):
-                item_dict['tags'] = [t.strip() for t in item_dict['tags'].split(',') if t.strip()]
-            else:
-                item_dict['tags'] = []
+            item_dict['tags'] = item_dict.get('tags') or []
             items.append(PromptListItem(**item_dict))
         
         return PromptListResponse(
@@ -110,6 +132,49 @@ async def get_prompts_list(
         raise HTTPException(status_code=500, detail=f'查询失败: {str(e)}')
 
 
+@router.get('/search', dependencies=[Depends(ConcurrencyLimit('semantic_search'))])
+async def search_prompts(
+    semantic: str = Query(..., min_length=1, max_length=2000),
+    limit: int = Query(10, ge=1, le=50),
+    user_id: int = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """语义搜索提示词(本地向量,按相似度排序)"""
+    try:
+        prompt_service = PromptService(db)
+        items = await prompt_service.semantic_search(user_id, semantic, limit)
+        
+        return {
+            'code': 200,
+            'data': items
+        }
+        
+    except Exception as e:
+        logger.error(f'❌ 语义搜索失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'搜索失败: {str(e)}')
+
+
+@router.get('/duplicates', dependencies=[Depends(ConcurrencyLimit('duplicates'))])
+async def get_duplicate_prompts(
+    threshold: Optional[float] = Query(None, ge=0.5, le=1.0),
+    user_id: int = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """检测提示词库中的近似重复组(MinHash + LSH)"""
+    try:
+        prompt_service = PromptService(db)
+        groups = await prompt_service.get_duplicate_groups(user_id, threshold)
+        
+        return {
+            'code': 200,
+            'data': groups
+        }
+        
+    except Exception as e:
+        logger.error(f'❌ 检测近似重复失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'检测失败: {str(e)}')
+
+
 @router.get('/{prompt_id}', response_model=PromptDetailResponse)
 async def get_prompt_detail(
     prompt_id: int,
@@ -118,7 +183,8 @@ async def get_prompt_detail(
 ):
     """获取提示词详情"""
     try:
-        # 查询详情
+        # 查询详情(先写入待写的自动保存)
+        await autosaves.flush(user_id, prompt_id)
         prompt_service = PromptService(db)
         prompt = await prompt_service.get_prompt_detail(user_id, prompt_id)
         
@@ -150,6 +216,8 @@ async def update_prompt(
     """更新提示词"""
     try:
         data = request.dict(exclude_none=True)
+        data.pop('auto_save', None)
+        await autosaves.flush(user_id, prompt_id)
         
         # 更新提示词
         prompt_service = PromptService(db)
@@ -175,7 +243,8 @@ async def delete_prompt(
 ):
     """删除提示词"""
     try:
-        # 删除提示词
+        # 删除提示词(丢弃待写的自动保存)
+        await autosaves.discard(user_id, prompt_id)
         prompt_service = PromptService(db)
         success = await prompt_service.delete_prompt(user_id, prompt_id)
         
@@ -238,3 +307,30 @@ async def record_use(
     except Exception as e:
         logger.error(f'❌ 记录使用次数失败: {e}', exc_info=True)
         raise HTTPException(status_code=500, detail=f'记录失败: {str(e)}')
+
+
+@router.get('/{prompt_id}/similar', dependencies=[Depends(ConcurrencyLimit('similar'))])
+async def get_similar_prompts(
+    prompt_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    user_id: int = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """查找相似提示词"""
+    try:
+        prompt_service = PromptService(db)
+        items = await prompt_service.get_similar_prompts(user_id, prompt_id, limit)
+        
+        if items is None:
+            raise HTTPException(status_code=404, detail='提示词不存在或无权限访问')
+        
+        return {
+            'code': 200,
+            'data': items
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'❌ 查询相似提示词失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'查询失败: {str(e)}')
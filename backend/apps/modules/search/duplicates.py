@@ -0,0 +1,338 @@
+"""
+近似重复提示词检测
+每个提示词保存时计算 MinHash 签名,并按 LSH 分段写入桶索引,
+检测时只比较落入同一桶的候选,避免全库两两比较
+"""
+import asyncio
+import hashlib
+import re
+import zlib
+from loguru import logger
+
+from config.settings import Config
+from .services import normalize_text
+from .semantic import content_hash
+
+DUPLICATE_THRESHOLD = getattr(Config, 'DUPLICATE_THRESHOLD', 0.8)
+
+# 签名长度 = 分段数 x 每段行数;16x4 时候选召回阈值约为 Jaccard 0.5
+MINHASH_BANDS = 16
+MINHASH_ROWS = 4
+MINHASH_PERMUTATIONS = MINHASH_BANDS * MINHASH_ROWS
+
+# 小于 2^32 的最大素数,保证签名值可以用 uint32 存储
+MINHASH_PRIME = 4294967291
+
+# 字符 shingle 长度(同时适用于中英文)
+SHINGLE_SIZE = 5
+
+# 桶内成员超过该数量时只与首个成员比较,避免大桶退化为两两比较
+MAX_PAIRWISE_BUCKET = 50
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def shingles(text):
+    """
+    文本切分为字符 shingle 集合(空白折叠后按固定长度滑窗)
+
+    Returns:
+        set: crc32 哈希后的 shingle 集合
+    """
+    text = WHITESPACE_PATTERN.sub(' ', normalize_text(text))
+    if not text:
+        return set()
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode('utf-8'))}
+    return {
+        zlib.crc32(text[i:i + SHINGLE_SIZE].encode('utf-8'))
+        for i in range(len(text) - SHINGLE_SIZE + 1)
+    }
+
+
+def band_bucket(band_rows):
+    """分段签名映射为64位有符号整数桶号"""
+    return int.from_bytes(hashlib.blake2b(band_rows.tobytes(), digest_size=8).digest(), 'big', signed=True)
+
+
+class UnionFind:
+    """并查集,用于把两两相似关系合并为重复组"""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+class DuplicateDetector:
+    """
+    MinHash + LSH 近似重复检测
+
+    - prompt_minhash: 每个提示词的签名(uint32 x 64)和内容摘要
+    - prompt_lsh_buckets: (user_id, band, bucket) -> prompt_id,同桶即为候选
+    """
+
+    def __init__(self):
+        self._coefficients = None
+
+    def _hash_coefficients(self):
+        """哈希函数系数 (a, b),固定随机种子保证跨进程签名一致"""
+        import numpy as np
+
+        if self._coefficients is None:
+            rng = np.random.RandomState(20240601)
+            self._coefficients = (
+                rng.randint(1, MINHASH_PRIME, size=MINHASH_PERMUTATIONS, dtype=np.uint64),
+                rng.randint(0, MINHASH_PRIME, size=MINHASH_PERMUTATIONS, dtype=np.uint64),
+            )
+        return self._coefficients
+
+    def signature(self, text):
+        """
+        计算 MinHash 签名
+
+        Returns:
+            numpy.ndarray: uint32 签名(空文本返回 None)
+        """
+        import numpy as np
+
+        values = shingles(text)
+        if not values:
+            return None
+
+        a, b = self._hash_coefficients()
+        x = np.fromiter(values, dtype=np.uint64, count=len(values))
+        # (a * x + b) mod p,a、x 均小于 2^32,乘积不会溢出 uint64
+        hashed = (a[:, None] * x[None, :] + b[:, None]) % np.uint64(MINHASH_PRIME)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def similarity(sig_a, sig_b):
+        """签名相同位置的比例即 Jaccard 相似度估计值"""
+        return float((sig_a == sig_b).mean())
+
+    def buckets(self, signature):
+        """签名分段后的桶号列表"""
+        return [
+            band_bucket(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])
+            for band in range(MINHASH_BANDS)
+        ]
+
+    async def _save(self, db, user_id, prompt_id, signature, digest):
+        """写入签名和桶索引"""
+        await db.execute("DELETE FROM prompt_lsh_buckets WHERE prompt_id = ?", [prompt_id])
+        if signature is not None:
+            await db.execute_many(
+                "INSERT INTO prompt_lsh_buckets (user_id, band, bucket, prompt_id) VALUES (?, ?, ?, ?)",
+                [[user_id, band, bucket, prompt_id] for band, bucket in enumerate(self.buckets(signature))]
+            )
+        await db.execute(
+            """
+            INSERT INTO prompt_minhash (prompt_id, user_id, signature, content_hash) VALUES (?, ?, ?, ?)
+            ON CONFLICT(prompt_id) DO UPDATE SET signature = excluded.signature,
+                content_hash = excluded.content_hash, update_time = CURRENT_TIMESTAMP
+            """,
+            [prompt_id, user_id, signature.tobytes() if signature is not None else None, digest]
+        )
+
+    async def upsert(self, db, user_id, prompt_id, text):
+        """
+        计算并保存提示词签名(内容未变化时跳过)
+
+        计算失败不影响提示词保存,仅记录警告
+        """
+        try:
+            digest = content_hash(text or '')
+            existing = await db.get("SELECT content_hash FROM prompt_minhash WHERE prompt_id = ?", [prompt_id])
+            if existing and existing['content_hash'] == digest:
+                return False
+
+            await self._save(db, user_id, prompt_id, self.signature(text), digest)
+            logger.debug('✅ 更新提示词签名: prompt_id={}', prompt_id)
+            return True
+
+        except Exception as e:
+            logger.warning(f'⚠️  更新提示词签名失败: prompt_id={prompt_id}, error={e}')
+            return False
+
+    async def backfill(self, db, user_id, batch_size=500):
+        """
+        为缺少签名的提示词补算签名(如功能上线前创建的提示词)
+
+        Returns:
+            int: 补算数量
+        """
+        rows = await db.query(
+            """
+            SELECT p.id FROM prompts p
+            LEFT JOIN prompt_minhash m ON m.prompt_id = p.id
+            WHERE p.user_id = ? AND m.prompt_id IS NULL
+            """,
+            [user_id]
+        )
+        missing = [row['id'] for row in rows]
+        loop = asyncio.get_running_loop()
+
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            prompts = await db.query(
+                "SELECT id, final_prompt FROM prompts WHERE id IN ("
+                + ",".join(str(prompt_id) for prompt_id in batch) + ")"
+            )
+
+            def compute():
+                return [
+                    (prompt['id'], self.signature(prompt['final_prompt']), content_hash(prompt['final_prompt'] or ''))
+                    for prompt in prompts
+                ]
+
+            # 签名计算为CPU密集操作,放到线程池避免阻塞事件循环
+            records = await loop.run_in_executor(None, compute)
+            await db.execute(
+                "DELETE FROM prompt_lsh_buckets WHERE prompt_id IN ("
+                + ",".join(str(prompt_id) for prompt_id in batch) + ")"
+            )
+            await db.execute_many(
+                "INSERT INTO prompt_lsh_buckets (user_id, band, bucket, prompt_id) VALUES (?, ?, ?, ?)",
+                [
+                    [user_id, band, bucket, prompt_id]
+                    for prompt_id, signature, _ in records if signature is not None
+                    for band, bucket in enumerate(self.buckets(signature))
+                ]
+            )
+            await db.execute_many(
+                "INSERT OR REPLACE INTO prompt_minhash (prompt_id, user_id, signature, content_hash) VALUES (?, ?, ?, ?)",
+                [
+                    [prompt_id, user_id, signature.tobytes() if signature is not None else None, digest]
+                    for prompt_id, signature, digest in records
+                ]
+            )
+
+        if missing:
+            logger.info(f'✅ 补算提示词签名: user_id={user_id}, count={len(missing)}')
+        return len(missing)
+
+    async def _signatures(self, db, prompt_ids):
+        """批量读取签名"""
+        import numpy as np
+
+        if not prompt_ids:
+            return {}
+        rows = await db.query(
+            "SELECT prompt_id, signature FROM prompt_minhash WHERE signature IS NOT NULL AND prompt_id IN ("
+            + ",".join(str(int(prompt_id)) for prompt_id in prompt_ids) + ")"
+        )
+        return {row['prompt_id']: np.frombuffer(row['signature'], dtype=np.uint32) for row in rows}
+
+    async def find_similar(self, db, user_id, prompt_id, threshold=None):
+        """
+        查找与指定提示词近似重复的提示词
+
+        Returns:
+            list: [(prompt_id, similarity), ...] 按相似度降序
+        """
+        threshold = DUPLICATE_THRESHOLD if threshold is None else threshold
+        rows = await db.query(
+            """
+            SELECT DISTINCT other.prompt_id
+            FROM prompt_lsh_buckets self_bucket
+            INNER JOIN prompt_lsh_buckets other
+                ON other.user_id = self_bucket.user_id
+               AND other.band = self_bucket.band
+               AND other.bucket = self_bucket.bucket
+            WHERE self_bucket.prompt_id = ? AND self_bucket.user_id = ? AND other.prompt_id != ?
+            """,
+            [prompt_id, user_id, prompt_id]
+        )
+        candidates = [row['prompt_id'] for row in rows]
+        if not candidates:
+            return []
+
+        signatures = await self._signatures(db, candidates + [prompt_id])
+        own = signatures.get(prompt_id)
+        if own is None:
+            return []
+
+        matches = []
+        for candidate in candidates:
+            if candidate in signatures:
+                score = self.similarity(own, signatures[candidate])
+                if score >= threshold:
+                    matches.append((candidate, score))
+        matches.sort(key=lambda entry: -entry[1])
+        return matches
+
+    async def find_groups(self, db, user_id, threshold=None):
+        """
+        检测用户全部提示词中的近似重复组
+
+        Returns:
+            list: [{'prompt_ids': [...], 'similarity': 组内最低相似度}, ...] 按组大小降序
+        """
+        threshold = DUPLICATE_THRESHOLD if threshold is None else threshold
+        await self.backfill(db, user_id)
+
+        rows = await db.query(
+            """
+            SELECT GROUP_CONCAT(prompt_id) AS prompt_ids
+            FROM prompt_lsh_buckets
+            WHERE user_id = ?
+            GROUP BY band, bucket
+            HAVING COUNT(*) > 1
+            """,
+            [user_id]
+        )
+
+        # 1. 从同桶成员生成候选对
+        pairs = set()
+        for row in rows:
+            members = sorted({int(prompt_id) for prompt_id in row['prompt_ids'].split(',')})
+            if len(members) <= MAX_PAIRWISE_BUCKET:
+                pairs.update(
+                    (members[i], members[j])
+                    for i in range(len(members)) for j in range(i + 1, len(members))
+                )
+            else:
+                pairs.update((members[0], member) for member in members[1:])
+
+        if not pairs:
+            return []
+
+        # 2. 用签名验证候选对,合并为重复组
+        signatures = await self._signatures(db, {prompt_id for pair in pairs for prompt_id in pair})
+        groups = UnionFind()
+        min_scores = {}
+        for a, b in pairs:
+            if a not in signatures or b not in signatures:
+                continue
+            score = self.similarity(signatures[a], signatures[b])
+            if score >= threshold:
+                groups.union(a, b)
+                min_scores[(a, b)] = score
+
+        clusters = {}
+        for (a, b), score in min_scores.items():
+            root = groups.find(a)
+            cluster = clusters.setdefault(root, {'prompt_ids': set(), 'similarity': 1.0})
+            cluster['prompt_ids'].update((a, b))
+            cluster['similarity'] = min(cluster['similarity'], score)
+
+        result = [
+            {'prompt_ids': sorted(cluster['prompt_ids']), 'similarity': round(cluster['similarity'], 4)}
+            for cluster in clusters.values()
+        ]
+        result.sort(key=lambda group: (-len(group['prompt_ids']), -group['similarity']))
+        return result
+
+
+# 进程内共享的重复检测器
+duplicate_detector = DuplicateDetector()
@@ -0,0 +1,335 @@
+"""
+本地语义搜索
+使用哈希向量化(支持中日韩文本)生成提示词向量,保存在内存映射文件中,
+查询时使用 NumPy 矩阵乘法暴力计算 top-k 余弦相似度,不依赖外部 API
+"""
+import asyncio
+import hashlib
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from loguru import logger
+
+from config.settings import Config
+from .services import normalize_text
+
+SEMANTIC_VECTOR_DIM = getattr(Config, 'SEMANTIC_VECTOR_DIM', 256)
+SEMANTIC_MAX_CHARS = getattr(Config, 'SEMANTIC_MAX_CHARS', 20000)
+
+# 拉丁字母/数字单词 与 中日韩字符序列
+LATIN_PATTERN = re.compile(r'[0-9a-z_]+')
+CJK_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+')
+
+# 每次矩阵乘法处理的行数(控制临时内存)
+CHUNK_ROWS = 8192
+
+
+def tokenize(text):
+    """
+    分词: 英文按单词,中日韩文本按单字 + 相邻双字
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        list: 词项列表
+    """
+    text = normalize_text(text)
+    tokens = LATIN_PATTERN.findall(text)
+    for run in CJK_PATTERN.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def semantic_document(title, description=None, final_prompt=None):
+    """组合参与向量化的文本: 标题 + 描述 + 最终提示词(截断)"""
+    return '\n'.join([title or '', description or '', (final_prompt or '')[:SEMANTIC_MAX_CHARS]])
+
+
+def content_hash(text):
+    """文本摘要,用于判断是否需要重新计算向量"""
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+class HashingVectorizer:
+    """
+    哈希向量化
+
+    词项通过 crc32 映射到固定维度(跨进程稳定),另取一位决定符号以抵消冲突,
+    词频使用 1 + log(tf) 平滑,最终做 L2 归一化
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def transform(self, text):
+        """
+        文本转向量
+
+        Returns:
+            numpy.ndarray: float32 单位向量(空文本返回全零)
+        """
+        import numpy as np
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token, tf in Counter(tokenize(text)).items():
+            h = zlib.crc32(token.encode('utf-8'))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dim] += sign * (1.0 + math.log(tf))
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class VectorStore:
+    """
+    内存映射向量文件
+
+    第 N 行保存 prompt_id = N 的 float16 向量,文件按需扩容;
+    其他进程扩容后,读取时检测文件大小并重新映射
+    """
+
+    def __init__(self, path, dim):
+        self.path = path
+        self.dim = dim
+        self.row_bytes = dim * 2
+        self._mmap = None
+        self._rows = 0
+
+    def _capacity(self):
+        """当前文件可容纳的行数"""
+        if not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // self.row_bytes
+
+    def _map(self, min_rows=0):
+        """映射文件,必要时扩容"""
+        import numpy as np
+
+        rows = self._capacity()
+        if rows < min_rows:
+            # 按 1.5 倍扩容,减少频繁重新映射
+            rows = max(min_rows, int(rows * 1.5), 1024)
+            with open(self.path, 'ab') as f:
+                f.truncate(rows * self.row_bytes)
+
+        if self._mmap is None or rows != self._rows:
+            if self._mmap is not None:
+                self._mmap.flush()
+            self._mmap = np.memmap(self.path, dtype=np.float16, mode='r+', shape=(rows, self.dim)) if rows else None
+            self._rows = rows
+
+        return self._mmap
+
+    def write(self, prompt_id, vector):
+        """写入向量"""
+        matrix = self._map(prompt_id + 1)
+        matrix[prompt_id] = vector
+
+    def clear(self, prompt_id):
+        """清空向量"""
+        if prompt_id < self._capacity():
+            self._map()[prompt_id] = 0
+
+    def read(self, prompt_ids):
+        """
+        读取向量
+
+        Args:
+            prompt_ids: numpy 整数数组
+
+        Returns:
+            numpy.ndarray: float16 矩阵(超出文件范围的行为零向量)
+        """
+        import numpy as np
+
+        matrix = self._map()
+        if matrix is not None and len(prompt_ids) and prompt_ids.max() < matrix.shape[0]:
+            return matrix[prompt_ids]
+
+        result = np.zeros((len(prompt_ids), self.dim), dtype=np.float16)
+        if matrix is None:
+            return result
+
+        valid = prompt_ids < matrix.shape[0]
+        result[valid] = matrix[prompt_ids[valid]]
+        return result
+
+    def flush(self):
+        """刷新到磁盘"""
+        if self._mmap is not None:
+            self._mmap.flush()
+
+
+class SemanticIndex:
+    """
+    语义搜索索引
+
+    - prompt_vectors 表记录每个提示词的内容摘要,内容不变时不重新计算
+    - 向量文件与数据库文件放在一起(<db_path>.vectors)
+    - 首次查询时为缺少向量的历史提示词批量补算
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.vectorizer = HashingVectorizer(dim)
+        self._stores = {}
+
+    def _store(self, db):
+        """获取数据库对应的向量文件"""
+        path = db.db_path + '.vectors'
+        store = self._stores.get(path)
+        if store is None:
+            store = self._stores[path] = VectorStore(path, self.dim)
+        return store
+
+    async def upsert(self, db, user_id, prompt_id, title, description=None, final_prompt=None):
+        """
+        计算并保存提示词向量(内容未变化时跳过)
+
+        向量化失败不影响提示词保存,仅记录警告
+        """
+        try:
+            text = semantic_document(title, description, final_prompt)
+            digest = content_hash(text)
+
+            existing = await db.get("SELECT content_hash FROM prompt_vectors WHERE prompt_id = ?", [prompt_id])
+            if existing and existing['content_hash'] == digest:
+                return False
+
+            self._store(db).write(prompt_id, self.vectorizer.transform(text))
+            await db.execute(
+                """
+                INSERT INTO prompt_vectors (prompt_id, user_id, content_hash) VALUES (?, ?, ?)
+                ON CONFLICT(prompt_id) DO UPDATE SET content_hash = excluded.content_hash,
+                    update_time = CURRENT_TIMESTAMP
+                """,
+                [prompt_id, user_id, digest]
+            )
+            logger.debug('✅ 更新提示词向量: prompt_id={}', prompt_id)
+            return True
+
+        except Exception as e:
+            logger.warning(f'⚠️  更新提示词向量失败: prompt_id={prompt_id}, error={e}')
+            return False
+
+    async def remove(self, db, prompt_id):
+        """删除提示词向量(元数据随 prompts 级联删除)"""
+        try:
+            self._store(db).clear(prompt_id)
+        except Exception as e:
+            logger.warning(f'⚠️  删除提示词向量失败: prompt_id={prompt_id}, error={e}')
+
+    async def backfill(self, db, user_id, batch_size=500):
+        """
+        为缺少向量的提示词补算向量(如功能上线前创建的提示词)
+
+        Returns:
+            int: 补算数量
+        """
+        rows = await db.query(
+            """
+            SELECT p.id FROM prompts p
+            LEFT JOIN prompt_vectors v ON v.prompt_id = p.id
+            WHERE p.user_id = ? AND v.prompt_id IS NULL
+            """,
+            [user_id]
+        )
+        missing = [row['id'] for row in rows]
+        if not missing:
+            return 0
+
+        store = self._store(db)
+        loop = asyncio.get_running_loop()
+
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            prompts = await db.query(
+                "SELECT id, title, description, final_prompt FROM prompts WHERE id IN ("
+                + ",".join(str(prompt_id) for prompt_id in batch) + ")"
+            )
+
+            def vectorize():
+                result = []
+                for prompt in prompts:
+                    text = semantic_document(prompt['title'], prompt['description'], prompt['final_prompt'])
+                    store.write(prompt['id'], self.vectorizer.transform(text))
+                    result.append([prompt['id'], user_id, content_hash(text)])
+                return result
+
+            # 向量化为CPU密集操作,放到线程池避免阻塞事件循环
+            records = await loop.run_in_executor(None, vectorize)
+            await db.execute_many(
+                "INSERT OR REPLACE INTO prompt_vectors (prompt_id, user_id, content_hash) VALUES (?, ?, ?)",
+                records
+            )
+
+        store.flush()
+        logger.info(f'✅ 补算提示词向量: user_id={user_id}, count={len(missing)}')
+        return len(missing)
+
+    async def _rank(self, db, user_id, query_vector, limit, exclude_id=None):
+        """在用户的全部向量中计算 top-k 余弦相似度"""
+        import numpy as np
+
+        await self.backfill(db, user_id)
+
+        rows = await db.query("SELECT prompt_id FROM prompt_vectors WHERE user_id = ?", [user_id])
+        prompt_ids = np.fromiter((row['prompt_id'] for row in rows), dtype=np.int64, count=len(rows))
+        if exclude_id is not None:
+            prompt_ids = prompt_ids[prompt_ids != exclude_id]
+        if not len(prompt_ids):
+            return []
+
+        store = self._store(db)
+        query_vector = query_vector.astype(np.float32)
+
+        best_ids = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(prompt_ids), CHUNK_ROWS):
+            chunk_ids = prompt_ids[start:start + CHUNK_ROWS]
+            scores = store.read(chunk_ids).astype(np.float32) @ query_vector
+
+            # 合并当前块与已有候选,保留 top-k
+            best_ids = np.concatenate([best_ids, chunk_ids])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > limit:
+                keep = np.argpartition(-best_scores, limit)[:limit]
+                best_ids, best_scores = best_ids[keep], best_scores[keep]
+
+        order = np.argsort(-best_scores)
+        return [
+            (int(best_ids[i]), float(best_scores[i]))
+            for i in order if best_scores[i] > 0
+        ]
+
+    async def search(self, db, user_id, query, limit=10):
+        """
+        按文本语义搜索
+
+        Returns:
+            list: [(prompt_id, score), ...] 按相似度降序
+        """
+        return await self._rank(db, user_id, self.vectorizer.transform(query), limit)
+
+    async def similar(self, db, user_id, prompt_id, limit=10):
+        """
+        查找相似提示词
+
+        Returns:
+            list: [(prompt_id, score), ...] 按相似度降序,不含自身
+        """
+        import numpy as np
+
+        await self.backfill(db, user_id)
+        vector = self._store(db).read(np.array([prompt_id], dtype=np.int64))[0]
+        return await self._rank(db, user_id, vector, limit, exclude_id=prompt_id)
+
+
+# 进程内共享的语义索引
+semantic_index = SemanticIndex(SEMANTIC_VECTOR_DIM)
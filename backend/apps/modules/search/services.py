@@ -0,0 +1,515 @@
+"""
+搜索服务
+提供基于内存索引的标签/标题自动补全和三元组模糊搜索
+"""
+import asyncio
+import bisect
+import heapq
+import re
+import unicodedata
+from array import array
+from collections import Counter, OrderedDict
+from loguru import logger
+
+from config.settings import Config
+from apps.utils.metrics import CACHE_REQUESTS, register_cache
+
+# 模糊搜索参数
+FUZZY_SEARCH_THRESHOLD = getattr(Config, 'FUZZY_SEARCH_THRESHOLD', 0.4)
+FUZZY_SEARCH_MAX_RESULTS = getattr(Config, 'FUZZY_SEARCH_MAX_RESULTS', 1000)
+FUZZY_DESCRIPTION_CHARS = getattr(Config, 'FUZZY_DESCRIPTION_CHARS', 500)
+
+# 每个前缀索引缓存的查询结果数
+AUTOCOMPLETE_QUERY_CACHE_SIZE = getattr(Config, 'AUTOCOMPLETE_QUERY_CACHE_SIZE', 256)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def normalize_text(text):
+    """
+    规范化文本(全角转半角、统一大小写、去除首尾空白)
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        str: 规范化后的文本
+    """
+    if not text:
+        return ''
+    return unicodedata.normalize('NFKC', str(text)).casefold().strip()
+
+
+class PrefixIndex:
+    """
+    有序前缀索引
+
+    keys 中保存按字典序排列的 (key, item_id),前缀查询通过二分定位区间,
+    再按 score 取 top-k;查询结果按 (前缀, 数量) 缓存,最多 cache_size 条(LRU淘汰),索引变化时清空
+    """
+
+    def __init__(self, cache_size=AUTOCOMPLETE_QUERY_CACHE_SIZE):
+        self.keys = []
+        self.items = {}
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item_id, text, score=0, keys=None):
+        """添加或替换条目"""
+        if item_id in self.items:
+            self.remove(item_id)
+
+        keys = keys if keys is not None else [normalize_text(text)]
+        keys = sorted({key for key in keys if key})
+
+        for key in keys:
+            bisect.insort(self.keys, (key, item_id))
+
+        self.items[item_id] = {'text': text, 'score': score or 0, 'keys': keys}
+        self._cache.clear()
+
+    def remove(self, item_id):
+        """删除条目"""
+        item = self.items.pop(item_id, None)
+        if not item:
+            return
+
+        for key in item['keys']:
+            pos = bisect.bisect_left(self.keys, (key, item_id))
+            if pos < len(self.keys) and self.keys[pos] == (key, item_id):
+                del self.keys[pos]
+        self._cache.clear()
+
+    def add_score(self, item_id, delta):
+        """调整条目得分"""
+        item = self.items.get(item_id)
+        if item:
+            item['score'] = max((item['score'] or 0) + delta, 0)
+            self._cache.clear()
+
+    def search(self, prefix, limit=10):
+        """
+        前缀查询
+
+        Args:
+            prefix: 规范化后的前缀
+            limit: 返回数量
+
+        Returns:
+            list: [(item_id, item), ...] 按 score 降序
+        """
+        cache_key = (prefix, limit)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            return cached
+
+        start = bisect.bisect_left(self.keys, (prefix,))
+        end = bisect.bisect_left(self.keys, (prefix + '\U0010ffff',), start)
+
+        items = self.items
+        matched = {item_id for _, item_id in self.keys[start:end]}
+
+        top = heapq.nsmallest(
+            limit,
+            ((item_id, items[item_id]) for item_id in matched),
+            key=lambda entry: (-entry[1]['score'], entry[1]['text'])
+        )
+        self._cache[cache_key] = top
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return top
+
+
+def title_keys(title):
+    """
+    生成标题的索引键: 整个标题 + 每个单词开头的后缀
+    例如 "Code Review Helper" -> ["code review helper", "review helper", "helper"]
+    """
+    normalized = normalize_text(title)
+    if not normalized:
+        return []
+
+    words = normalized.split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class UserIndexCache:
+    """
+    按用户划分的内存索引缓存基类
+
+    - 首次查询时通过 _build 从数据库加载该用户的索引
+    - 写入路径通过 on_* 方法增量更新,未加载的用户直接忽略
+    - 按 LRU 淘汰,最多保留 max_users 个用户
+    """
+
+    name = '索引'
+    # 指标中的缓存名
+    metric_name = 'index'
+
+    def __init__(self, max_users=1000):
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._generation = {}
+        self._epoch = 0
+        register_cache(self.metric_name, lambda: len(self._users))
+
+    def _get(self, user_id):
+        """获取已加载的用户索引"""
+        entry = self._users.get(user_id)
+        if entry is not None:
+            self._users.move_to_end(user_id)
+        return entry
+
+    def _touch(self, user_id):
+        """标记用户数据已变化(用于丢弃加载期间过期的结果)"""
+        self._generation[user_id] = self._generation.get(user_id, 0) + 1
+
+    async def _build(self, db, user_id):
+        """从数据库构建用户索引(子类实现)"""
+        raise NotImplementedError
+
+    async def _load(self, db, user_id):
+        """获取用户索引,未加载时从数据库构建"""
+        entry = self._get(user_id)
+        if entry is not None:
+            CACHE_REQUESTS.inc(self.metric_name, 'hit')
+            return entry
+
+        CACHE_REQUESTS.inc(self.metric_name, 'miss')
+        generation = (self._epoch, self._generation.get(user_id, 0))
+        entry = await self._build(db, user_id)
+
+        # 加载期间发生写入则不缓存,下次查询重新加载
+        if (self._epoch, self._generation.get(user_id, 0)) == generation:
+            self._users[user_id] = entry
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+        logger.debug('✅ 加载{}: user_id={}', self.name, user_id)
+        return entry
+
+    def invalidate(self, user_id=None):
+        """丢弃用户索引(批量变更后调用),user_id为空时清空全部"""
+        if user_id is None:
+            self._epoch += 1
+            self._users.clear()
+            return
+
+        self._touch(user_id)
+        self._users.pop(user_id, None)
+
+
+class AutocompleteIndex(UserIndexCache):
+    """自动补全索引: 每个用户一个标签前缀索引和一个标题前缀索引"""
+
+    name = '自动补全索引'
+    metric_name = 'autocomplete'
+
+    async def _build(self, db, user_id):
+        """从数据库加载用户的标签和提示词标题"""
+        tags = await db.query(
+            "SELECT tag_name, use_count FROM prompt_tags WHERE user_id = ?",
+            [user_id]
+        )
+        prompts = await db.query(
+            "SELECT id, title, use_count FROM prompts WHERE user_id = ?",
+            [user_id]
+        )
+
+        entry = {'tags': PrefixIndex(), 'titles': PrefixIndex()}
+        for tag in tags:
+            entry['tags'].add(tag['tag_name'], tag['tag_name'], tag['use_count'])
+        for prompt in prompts:
+            entry['titles'].add(prompt['id'], prompt['title'], prompt['use_count'], title_keys(prompt['title']))
+
+        return entry
+
+    async def complete(self, db, user_id, prefix, kind='all', limit=10):
+        """
+        查询自动补全候选
+
+        Args:
+            db: 数据库连接对象
+            user_id: 用户ID
+            prefix: 输入前缀
+            kind: all/tag/title
+            limit: 每类返回数量
+
+        Returns:
+            dict: {'tags': [...], 'titles': [...]}
+        """
+        entry = await self._load(db, user_id)
+
+        prefix = normalize_text(prefix)
+        result = {'tags': [], 'titles': []}
+
+        if kind in ('all', 'tag'):
+            result['tags'] = [
+                {'tag_name': item['text'], 'use_count': item['score']}
+                for _, item in entry['tags'].search(prefix, limit)
+            ]
+
+        if kind in ('all', 'title'):
+            result['titles'] = [
+                {'id': item_id, 'title': item['text'], 'use_count': item['score']}
+                for item_id, item in entry['titles'].search(prefix, limit)
+            ]
+
+        return result
+
+    # ============ 增量更新 ============
+
+    def on_prompt_saved(self, user_id, prompt_id, title, use_count=None):
+        """提示词新建或标题变更"""
+        self._touch(user_id)
+        entry = self._get(user_id)
+        if entry is None:
+            return
+
+        titles = entry['titles']
+        existing = titles.items.get(prompt_id)
+        if existing and existing['text'] == title and use_count is None:
+            return
+        if use_count is None:
+            use_count = existing['score'] if existing else 0
+        titles.add(prompt_id, title, use_count, title_keys(title))
+
+    def on_prompt_deleted(self, user_id, prompt_id):
+        """提示词删除"""
+        self._touch(user_id)
+        entry = self._get(user_id)
+        if entry is not None:
+            entry['titles'].remove(prompt_id)
+
+    def on_prompt_used(self, user_id, prompt_id):
+        """提示词使用次数+1"""
+        self._touch(user_id)
+        entry = self._get(user_id)
+        if entry is not None:
+            entry['titles'].add_score(prompt_id, 1)
+
+    def on_tags_changed(self, user_id, added=(), removed=()):
+        """标签使用次数变化(新增+1,移除-1)"""
+        self._touch(user_id)
+        entry = self._get(user_id)
+        if entry is None:
+            return
+
+        tags = entry['tags']
+        for tag in added:
+            if tag in tags.items:
+                tags.add_score(tag, 1)
+            else:
+                tags.add(tag, tag, 1)
+        for tag in removed:
+            tags.add_score(tag, -1)
+
+    def on_tag_created(self, user_id, tag_name):
+        """创建空标签"""
+        self._touch(user_id)
+        entry = self._get(user_id)
+        if entry is not None and tag_name not in entry['tags'].items:
+            entry['tags'].add(tag_name, tag_name, 0)
+
+    def on_tag_deleted(self, user_id, tag_name):
+        """删除标签"""
+        self._touch(user_id)
+        entry = self._get(user_id)
+        if entry is not None:
+            entry['tags'].remove(tag_name)
+
+
+def extract_trigrams(text):
+    """
+    提取文本的三元组(与 pg_trgm 一致: 每个词前补两个空格、后补一个空格)
+    CJK 文本按连续字符处理,短词也能产生三元组
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        set: 三元组集合
+    """
+    trigrams = set()
+    for word in set(WORD_PATTERN.findall(normalize_text(text))):
+        padded = '  ' + word + ' '
+        trigrams.update([padded[i:i + 3] for i in range(len(padded) - 2)])
+    return trigrams
+
+
+class TrigramIndex:
+    """
+    三元组倒排索引
+
+    - postings: trigram -> array('I') 存放文档槽位号,内存紧凑
+    - 文档更新时分配新槽位,旧槽位标记为失效(墓碑),查询时跳过
+    - 相似度为查询三元组在文档中出现的比例(同 pg_trgm 的 word_similarity)
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.slot_prompt = []
+        self.prompt_slot = {}
+        self.dead = 0
+
+    def __len__(self):
+        return len(self.prompt_slot)
+
+    def add(self, prompt_id, text):
+        """添加或替换文档"""
+        self.remove(prompt_id)
+
+        slot = len(self.slot_prompt)
+        self.slot_prompt.append(prompt_id)
+        self.prompt_slot[prompt_id] = slot
+
+        postings = self.postings
+        for trigram in extract_trigrams(text):
+            try:
+                postings[trigram].append(slot)
+            except KeyError:
+                postings[trigram] = array('I', [slot])
+
+    def remove(self, prompt_id):
+        """删除文档(标记槽位失效)"""
+        slot = self.prompt_slot.pop(prompt_id, None)
+        if slot is not None:
+            self.slot_prompt[slot] = None
+            self.dead += 1
+
+    def needs_compaction(self):
+        """失效槽位过多时需要重建"""
+        return self.dead > 1000 and self.dead > len(self.prompt_slot)
+
+    def search(self, query, threshold=0.4, limit=1000):
+        """
+        相似度查询
+
+        Args:
+            query: 查询文本
+            threshold: 最低相似度(0~1)
+            limit: 最多返回数量
+
+        Returns:
+            list: [(prompt_id, similarity), ...] 按相似度降序
+        """
+        query_trigrams = extract_trigrams(query)
+        if not query_trigrams:
+            return []
+
+        counts = Counter()
+        for trigram in query_trigrams:
+            posting = self.postings.get(trigram)
+            if posting:
+                counts.update(posting)
+
+        total = len(query_trigrams)
+        min_hits = max(1, int(total * threshold + 0.999999))
+        slot_prompt = self.slot_prompt
+
+        matched = [
+            (slot_prompt[slot], hits / total)
+            for slot, hits in counts.items()
+            if hits >= min_hits and slot_prompt[slot] is not None
+        ]
+        return heapq.nlargest(limit, matched, key=lambda entry: entry[1])
+
+
+def fuzzy_document(title, description=None, tags=None):
+    """组合参与模糊搜索的文本: 标题 + 描述(截断) + 标签"""
+    if isinstance(tags, (list, tuple)):
+        tags = ' '.join(tags)
+    return ' '.join([title or '', (description or '')[:FUZZY_DESCRIPTION_CHARS], tags or ''])
+
+
+class FuzzySearchIndex(UserIndexCache):
+    """模糊搜索索引: 每个用户一个基于标题、描述和标签的三元组索引"""
+
+    name = '模糊搜索索引'
+    metric_name = 'fuzzy_search'
+
+    async def _build(self, db, user_id):
+        """从数据库加载用户的提示词"""
+        prompts = await db.query(
+            "SELECT id, title, substr(description, 1, ?) AS description, tags FROM prompts WHERE user_id = ?",
+            [FUZZY_DESCRIPTION_CHARS, user_id]
+        )
+
+        def build():
+            index = TrigramIndex()
+            for prompt in prompts:
+                index.add(prompt['id'], fuzzy_document(prompt['title'], prompt['description'], prompt['tags']))
+            return index
+
+        # 大库构建耗时较长,放到线程池避免阻塞事件循环
+        return await asyncio.get_running_loop().run_in_executor(None, build)
+
+    async def search(self, db, user_id, keyword, threshold=None, limit=None):
+        """
+        模糊搜索提示词
+
+        Args:
+            db: 数据库连接对象
+            user_id: 用户ID
+            keyword: 搜索关键词
+            threshold: 最低相似度,默认 FUZZY_SEARCH_THRESHOLD
+            limit: 最多返回数量,默认 FUZZY_SEARCH_MAX_RESULTS
+
+        Returns:
+            list: [(prompt_id, similarity), ...] 按相似度降序
+        """
+        index = await self._load(db, user_id)
+        if index.needs_compaction():
+            self.invalidate(user_id)
+            index = await self._load(db, user_id)
+
+        return index.search(
+            keyword,
+            FUZZY_SEARCH_THRESHOLD if threshold is None else threshold,
+            FUZZY_SEARCH_MAX_RESULTS if limit is None else limit
+        )
+
+    def on_prompt_saved(self, user_id, prompt_id, title, description=None, tags=None):
+        """提示词新建或标题/描述/标签变更"""
+        self._touch(user_id)
+        index = self._get(user_id)
+        if index is not None:
+            index.add(prompt_id, fuzzy_document(title, description, tags))
+
+    def on_prompt_deleted(self, user_id, prompt_id):
+        """提示词删除"""
+        self._touch(user_id)
+        index = self._get(user_id)
+        if index is not None:
+            index.remove(prompt_id)
+
+
+# 进程内共享的索引
+autocomplete_index = AutocompleteIndex(getattr(Config, 'AUTOCOMPLETE_MAX_USERS', 1000))
+fuzzy_index = FuzzySearchIndex(getattr(Config, 'FUZZY_INDEX_MAX_USERS', 200))
+
+
+def notify_prompt_saved(user_id, prompt_id, title, description=None, tags=None, use_count=None):
+    """
+    提示词写入后同步更新搜索索引
+
+    Args:
+        user_id: 用户ID
+        prompt_id: 提示词ID
+        title: 标题
+        description: 描述
+        tags: 标签列表或逗号分隔字符串
+        use_count: 使用次数(新建时传0,为空表示不变)
+    """
+    autocomplete_index.on_prompt_saved(user_id, prompt_id, title, use_count)
+    fuzzy_index.on_prompt_saved(user_id, prompt_id, title, description, tags)
+
+
+def notify_prompt_deleted(user_id, prompt_id):
+    """提示词删除后同步更新搜索索引"""
+    autocomplete_index.on_prompt_deleted(user_id, prompt_id)
+    fuzzy_index.on_prompt_deleted(user_id, prompt_id)
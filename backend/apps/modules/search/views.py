@@ -0,0 +1,36 @@
+"""
+搜索路由（FastAPI）
+处理标签和提示词标题的自动补全
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from loguru import logger
+
+from apps.utils.access_log import TimedRoute
+from apps.utils.auth_middleware import get_current_user_id
+from apps.utils.dependencies import get_db
+from .services import autocomplete_index
+
+# 创建搜索路由
+router = APIRouter(prefix='/api/search', tags=['搜索'], route_class=TimedRoute)
+
+
+@router.get('/autocomplete')
+async def autocomplete(
+    q: str = Query('', max_length=100),
+    type: str = Query('all', pattern='^(all|tag|title)$'),
+    limit: int = Query(10, ge=1, le=50),
+    user_id: int = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """标签/标题自动补全(按使用次数排序)"""
+    try:
+        result = await autocomplete_index.complete(db, user_id, q, type, limit)
+        
+        return {
+            'code': 200,
+            'data': result
+        }
+        
+    except Exception as e:
+        logger.error(f'❌ 自动补全查询失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'查询失败: {str(e)}')
@@ -0,0 +1,161 @@
+"""
+用户统计服务类
+读取由触发器增量维护的 user_stats 汇总表,并按明细数据校准漂移
+"""
+from loguru import logger
+
+from apps.utils.metrics import USER_STATS_CORRECTED
+
+# 汇总表中的统计字段
+FIELDS = ('prompt_count', 'favorite_count', 'public_count', 'total_views', 'total_uses', 'version_count', 'tag_count')
+
+# 按明细重新计算各字段: (字段, 按用户分组的聚合语句, 只处理一个用户时的过滤条件)
+AGGREGATES = (
+    (
+        ('prompt_count', 'favorite_count', 'public_count', 'total_views', 'total_uses'),
+        """
+        SELECT user_id, COUNT(*), SUM(COALESCE(is_favorite, 0) != 0), SUM(COALESCE(is_public, 0) != 0),
+               COALESCE(SUM(view_count), 0), COALESCE(SUM(use_count), 0)
+        FROM prompts {filter} GROUP BY user_id
+        """,
+        'WHERE user_id = ?'
+    ),
+    (
+        ('version_count',),
+        """
+        SELECT p.user_id, COUNT(*)
+        FROM prompt_versions v JOIN prompts p ON p.id = v.prompt_id
+        WHERE COALESCE(v.is_deleted, 0) = 0 {filter} GROUP BY p.user_id
+        """,
+        'AND p.user_id = ?'
+    ),
+    (
+        ('tag_count',),
+        "SELECT user_id, COUNT(*) FROM prompt_tags WHERE use_count > 0 {filter} GROUP BY user_id",
+        'AND user_id = ?'
+    ),
+)
+
+
+def _reconcile(conn, user_id):
+    """
+    连接线程内执行: 计算和写入之间不会插入其他写入,修正时不会覆盖并发的增量更新
+
+    Returns:
+        tuple: (用户ID -> {字段: (汇总表中的值, 实际值)}(只包含有差异的字段), 检查的用户数)
+    """
+    params = [] if user_id is None else [user_id]
+    actual = {}
+    for fields, sql, user_filter in AGGREGATES:
+        sql = sql.format(filter='' if user_id is None else user_filter)
+        for row in conn.execute(sql, params).fetchall():
+            values = actual.setdefault(row[0], dict.fromkeys(FIELDS, 0))
+            values.update(zip(fields, row[1:]))
+
+    sql = f"SELECT user_id, {', '.join(FIELDS)} FROM user_stats" + ('' if user_id is None else ' WHERE user_id = ?')
+    current = {row[0]: dict(zip(FIELDS, row[1:])) for row in conn.execute(sql, params).fetchall()}
+
+    users = actual.keys() | current.keys()
+    drift = {}
+    rows = []
+    for uid in users:
+        expected = actual.get(uid) or dict.fromkeys(FIELDS, 0)
+        stored = current.get(uid) or dict.fromkeys(FIELDS, 0)
+        diff = {field: (stored[field], expected[field]) for field in FIELDS if stored[field] != expected[field]}
+        if diff:
+            drift[uid] = diff
+            rows.append([uid] + [expected[field] for field in FIELDS])
+
+    if rows:
+        conn.executemany(
+            f"""
+            INSERT INTO user_stats (user_id, {', '.join(FIELDS)}) VALUES (?{', ?' * len(FIELDS)})
+            ON CONFLICT(user_id) DO UPDATE SET
+                {', '.join(f'{field} = excluded.{field}' for field in FIELDS)},
+                update_time = CURRENT_TIMESTAMP
+            """,
+            rows
+        )
+        conn.commit()
+    return drift, len(users)
+
+
+class StatsService:
+    """用户统计服务类"""
+
+    def __init__(self, db):
+        """
+        初始化用户统计服务
+
+        Args:
+            db: 数据库连接对象(SQLite适配器)
+        """
+        self.db = db
+
+    async def get_stats(self, user_id, top_tags=10):
+        """
+        获取用户统计(读取汇总表的一行,不扫描明细)
+
+        Args:
+            user_id: 用户ID
+            top_tags: 返回使用次数最多的标签数
+
+        Returns:
+            dict: 各统计字段、update_time 和 tags(使用次数最多的标签 [{'tag_name', 'use_count'}])
+        """
+        try:
+            row = await self.db.get(
+                f"SELECT {', '.join(FIELDS)}, update_time FROM user_stats WHERE user_id = ?",
+                [user_id]
+            )
+            stats = dict(row) if row else dict.fromkeys(FIELDS, 0)
+            stats['update_time'] = str(stats['update_time']) if stats.get('update_time') else ''
+
+            # 标签分布: 按 (user_id, use_count, create_time) 索引倒序读取前 N 个
+            stats['tags'] = await self.db.query(
+                """
+                SELECT tag_name, use_count FROM prompt_tags
+                WHERE user_id = ? AND use_count > 0
+                ORDER BY use_count DESC, create_time DESC
+                LIMIT ?
+                """,
+                [user_id, top_tags]
+            ) if top_tags else []
+
+            return stats
+
+        except Exception as e:
+            logger.error(f'❌ 查询用户统计失败: {e}')
+            raise
+
+    async def reconcile(self, user_id=None):
+        """
+        根据明细数据重新计算统计(修正触发器遗漏或手工修改数据造成的漂移)
+
+        Args:
+            user_id: 用户ID,为空时处理所有用户
+
+        Returns:
+            dict: {'users': 检查的用户数, 'corrected': 修正的用户数, 'fields': {字段: 修正次数}}
+        """
+        try:
+            drift, checked = await self.db.run_sync(_reconcile, user_id)
+
+            fields = {}
+            for uid, diff in drift.items():
+                for field, (stored, expected) in diff.items():
+                    fields[field] = fields.get(field, 0) + 1
+                    USER_STATS_CORRECTED.inc(field)
+                logger.warning(f'⚠️  用户统计与明细不一致,已修正: user_id={uid}, {diff}')
+
+            logger.info(f'✅ 用户统计校准完成: users={checked}, corrected={len(drift)}')
+
+            return {
+                'users': checked,
+                'corrected': len(drift),
+                'fields': fields
+            }
+
+        except Exception as e:
+            logger.error(f'❌ 用户统计校准失败: {e}')
+            raise
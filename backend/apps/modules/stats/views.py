@@ -0,0 +1,61 @@
+"""
+用户统计路由（FastAPI）
+仪表盘统计读取汇总表,不再对提示词和版本做聚合扫描
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from loguru import logger
+
+from apps.utils.access_log import TimedRoute
+from apps.utils.auth_middleware import get_current_user_id
+from apps.utils.dependencies import get_db
+from .services import StatsService
+
+# 创建用户统计路由
+router = APIRouter(prefix='/api/stats', tags=['用户统计'], route_class=TimedRoute)
+
+
+@router.get('')
+async def get_stats(
+    tags: int = Query(10, ge=0, le=50),
+    user_id: int = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """
+    获取当前用户的统计
+
+    返回提示词数、收藏数、公开数、总浏览/使用次数、版本数(不含已删除)、标签数,
+    以及使用次数最多的 tags 个标签
+    """
+    try:
+        stats_service = StatsService(db)
+        result = await stats_service.get_stats(user_id, tags)
+
+        return {
+            'code': 200,
+            'data': result
+        }
+
+    except Exception as e:
+        logger.error(f'❌ 查询用户统计失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'查询失败: {str(e)}')
+
+
+@router.post('/reconcile')
+async def reconcile_stats(
+    user_id: int = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """根据明细数据校准当前用户的统计"""
+    try:
+        stats_service = StatsService(db)
+        result = await stats_service.reconcile(user_id)
+
+        return {
+            'code': 200,
+            'message': '校准完成',
+            'data': result
+        }
+
+    except Exception as e:
+        logger.error(f'❌ 校准用户统计失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'校准失败: {str(e)}')
@@ -0,0 +1,128 @@
+"""
+增量同步服务类
+按变更序列(change_log,由触发器维护)返回游标之后变化的数据
+"""
+from loguru import logger
+
+from apps.modules.prompts.services import PromptService
+
+
+def _format_times(row, *fields):
+    for field in fields:
+        row[field] = str(row[field]) if row.get(field) else ''
+    return row
+
+
+# 实体 -> (查询语句(IN 列表占位), 行后处理)
+# 版本只返回元数据,完整快照通过 /api/versions/{prompt_id}/versions/{version_id} 获取
+ENTITIES = {
+    'prompt': (
+        "SELECT * FROM prompts WHERE user_id = ? AND id IN ({})",
+        PromptService.format_detail
+    ),
+    'version': (
+        """
+        SELECT v.id, v.prompt_id, v.version_number, v.version_tag, v.version_type,
+               v.change_summary, v.change_type, v.content_size, v.use_count,
+               v.is_auto_save, v.is_deleted, v.created_by, v.create_time
+        FROM prompt_versions v
+        JOIN prompts p ON p.id = v.prompt_id
+        WHERE p.user_id = ? AND v.id IN ({})
+        """,
+        lambda row: _format_times(row, 'create_time')
+    ),
+    'tag': (
+        "SELECT id, tag_name, use_count, create_time FROM prompt_tags WHERE user_id = ? AND id IN ({})",
+        lambda row: _format_times(row, 'create_time')
+    ),
+    'rules': (
+        "SELECT * FROM user_prompt_rules WHERE user_id = ? AND id IN ({})",
+        lambda row: _format_times(row, 'create_time', 'update_time')
+    ),
+}
+
+
+class SyncService:
+    """增量同步服务类"""
+
+    def __init__(self, db):
+        """
+        初始化增量同步服务
+
+        Args:
+            db: 数据库连接对象(SQLite适配器)
+        """
+        self.db = db
+
+    async def get_changes(self, user_id, since=0, limit=500):
+        """
+        获取游标之后的变更
+
+        每行数据在变更序列中只保留最近一次变更,返回的是当前最新内容;
+        读取变更和读取数据之间被删除的行按删除返回
+
+        Args:
+            user_id: 用户ID
+            since: 客户端游标(上次返回的 cursor,首次同步传 0)
+            limit: 最多返回的变更数
+
+        Returns:
+            dict: {
+                'cursor': 新游标,
+                'has_more': 是否还有更多变更(为 True 时用新游标继续请求),
+                'reset': 游标大于服务端最大序号(数据库已恢复或重建),客户端应清空本地数据后从 0 同步,
+                'changes': [{'seq', 'entity', 'id', 'op': upsert/delete, 'data'}]
+            }
+        """
+        try:
+            rows = await self.db.query(
+                "SELECT seq, entity, entity_id, op FROM change_log WHERE user_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                [user_id, since, limit + 1]
+            )
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+            if not rows:
+                latest = await self.db.get("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+                latest_seq = latest['seq'] if latest else 0
+                return {
+                    'cursor': min(since, latest_seq),
+                    'has_more': False,
+                    'reset': since > latest_seq,
+                    'changes': []
+                }
+
+            # 按实体批量读取当前数据
+            upserts = {}
+            for row in rows:
+                if row['op'] == 'U':
+                    upserts.setdefault(row['entity'], []).append(row['entity_id'])
+
+            current = {}
+            for entity, ids in upserts.items():
+                sql, formatter = ENTITIES[entity]
+                items = await self.db.query(sql.format(', '.join('?' * len(ids))), [user_id] + ids)
+                current[entity] = {item['id']: formatter(item) for item in items}
+
+            changes = []
+            for row in rows:
+                data = current.get(row['entity'], {}).get(row['entity_id']) if row['op'] == 'U' else None
+                changes.append({
+                    'seq': row['seq'],
+                    'entity': row['entity'],
+                    'id': row['entity_id'],
+                    'op': 'upsert' if data is not None else 'delete',
+                    'data': data
+                })
+
+            logger.debug('✅ 增量同步: user_id={}, since={}, changes={}', user_id, since, len(changes))
+            return {
+                'cursor': rows[-1]['seq'],
+                'has_more': has_more,
+                'reset': False,
+                'changes': changes
+            }
+
+        except Exception as e:
+            logger.error(f'❌ 查询变更失败: {e}')
+            raise
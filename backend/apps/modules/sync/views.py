@@ -0,0 +1,42 @@
+"""
+增量同步路由（FastAPI）
+客户端保存游标,只拉取游标之后变化的提示词、版本、标签和提示词规则
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from loguru import logger
+
+from apps.utils.access_log import TimedRoute
+from apps.utils.auth_middleware import get_current_user_id
+from apps.utils.dependencies import get_db
+from .services import SyncService
+
+# 创建增量同步路由
+router = APIRouter(prefix='/api/sync', tags=['增量同步'], route_class=TimedRoute)
+
+
+@router.get('')
+async def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    user_id: int = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """
+    获取游标之后的变更
+
+    - 首次同步传 since=0,之后传上次返回的 cursor;has_more 为 True 时立即用新游标继续请求
+    - op=upsert 时 data 为该行的最新内容(覆盖本地数据),op=delete 时删除本地数据
+    - reset 为 True 时清空本地数据后从 since=0 重新同步
+    """
+    try:
+        sync_service = SyncService(db)
+        result = await sync_service.get_changes(user_id, since, limit)
+
+        return {
+            'code': 200,
+            'data': result
+        }
+
+    except Exception as e:
+        logger.error(f'❌ 增量同步失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'同步失败: {str(e)}')
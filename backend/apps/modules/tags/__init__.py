@@ -1,7 +1,13 @@
 """
 标签管理模块
 """
-from .views import tags
+__all__ = ['router']
 
-__all__ = ['tags']
+
+def __getattr__(name):
+    # 路由在首次访问时导入: 导入本包的服务层模块时不加载路由和请求模型
+    if name == 'router':
+        from .views import router
+        return router
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
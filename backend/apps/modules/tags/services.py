@@ -4,6 +4,10 @@
 """
 from loguru import logger
 
+from apps.modules.prompts.services import PromptService
+from apps.modules.search.services import autocomplete_index
+from apps.utils.single_flight import single_flight
+
 
 class TagService:
     """标签服务类"""
@@ -17,6 +21,7 @@ class TagService:
         """
         self.db = db
     
+    @single_flight('user_tags')
     async def get_user_tags(self, user_id, limit=50):
         """
         获取用户的标签列表
@@ -43,7 +48,7 @@ class TagService:
             for tag in tags:
                 tag['create_time'] = str(tag['create_time']) if tag.get('create_time') else ''
             
-            logger.debug(f'✅ 查询用户标签成功: user_id={user_id}, count={len(tags)}')
+            logger.debug('✅ 查询用户标签成功: user_id={}, count={}', user_id, len(tags))
             
             return tags
             
@@ -63,35 +68,23 @@ class TagService:
             dict: 标签信息,如果已存在则返回已有标签
         """
         try:
-            # 检查标签是否已存在
-            check_sql = f"""
-                SELECT id, tag_name, use_count
-                FROM prompt_tags
-                WHERE user_id = {user_id} AND tag_name = '{tag_name}'
+            # 不存在则插入,已存在则忽略(依赖 uk_user_tag 唯一索引)
+            insert_sql = """
+                INSERT INTO prompt_tags (tag_name, user_id, use_count) VALUES (?, ?, 0)
+                ON CONFLICT(user_id, tag_name) DO NOTHING
             """
-            existing = await self.db.get(check_sql)
-            
-            if existing:
-                logger.info(f'⚠️  标签已存在: tag_name={tag_name}, user_id={user_id}')
-                return existing
+            await self.db.execute(insert_sql, [tag_name, user_id])
+            autocomplete_index.on_tag_created(user_id, tag_name)
             
-            # 创建新标签
-            fields = {
-                'tag_name': tag_name,
-                'user_id': user_id,
-                'use_count': 0
-            }
+            # 返回标签信息(新建或已有)
+            tag = await self.db.get(
+                "SELECT id, tag_name, use_count FROM prompt_tags WHERE user_id = ? AND tag_name = ?",
+                [user_id, tag_name]
+            )
             
-            tag_id = await self.db.table_insert('prompt_tags', fields)
+            logger.info(f'✅ 创建标签成功: tag_id={tag["id"]}, tag_name={tag_name}, user_id={user_id}')
             
-            logger.info(f'✅ 创建标签成功: tag_id={tag_id}, tag_name={tag_name}, user_id={user_id}')
-            
-            # 返回新创建的标签
-            return {
-                'id': tag_id,
-                'tag_name': tag_name,
-                'use_count': 0
-            }
+            return tag
             
         except Exception as e:
             logger.error(f'❌ 创建标签失败: {e}')
@@ -110,7 +103,7 @@ class TagService:
         """
         try:
             # 先检查权限
-            check_sql = f"SELECT id FROM prompt_tags WHERE id = {tag_id} AND user_id = {user_id}"
+            check_sql = f"SELECT id, tag_name FROM prompt_tags WHERE id = {tag_id} AND user_id = {user_id}"
             exists = await self.db.get(check_sql)
             
             if not exists:
@@ -120,6 +113,7 @@ class TagService:
             # 删除标签
             delete_sql = f"DELETE FROM prompt_tags WHERE id = {tag_id} AND user_id = {user_id}"
             await self.db.execute(delete_sql)
+            autocomplete_index.on_tag_deleted(user_id, exists['tag_name'])
             
             logger.info(f'✅ 删除标签成功: tag_id={tag_id}, user_id={user_id}')
             return True
@@ -150,11 +144,81 @@ class TagService:
             
             tags = await self.db.query(sql)
             
-            logger.debug(f'✅ 查询热门标签成功: user_id={user_id}, count={len(tags)}')
+            logger.debug('✅ 查询热门标签成功: user_id={}, count={}', user_id, len(tags))
             
             return tags
             
         except Exception as e:
             logger.error(f'❌ 查询热门标签失败: {e}')
             raise
-
+    
+    async def reconcile_tag_counts(self, user_id=None):
+        """
+        根据提示词数据重新计算标签使用次数(修正计数漂移)
+        
+        Args:
+            user_id: 用户ID,为空时处理所有用户
+            
+        Returns:
+            dict: {'users': 处理的用户数, 'tags': 统计到的标签数, 'corrected': 修正的标签数}
+        """
+        try:
+            if user_id is None:
+                users = await self.db.query("SELECT DISTINCT user_id FROM prompt_tags UNION SELECT DISTINCT user_id FROM prompts")
+                user_ids = [row['user_id'] for row in users]
+            else:
+                user_ids = [user_id]
+            
+            total_tags = 0
+            total_corrected = 0
+            
+            for uid in user_ids:
+                # 1. 从提示词数据统计实际使用次数
+                rows = await self.db.query(
+                    "SELECT tags FROM prompts WHERE user_id = ? AND tags IS NOT NULL AND tags != ''",
+                    [uid]
+                )
+                actual = {}
+                for row in rows:
+                    for tag in set(PromptService.parse_tags(row['tags'])):
+                        actual[tag] = actual.get(tag, 0) + 1
+                
+                # 2. 与当前计数对比,只写入有差异的标签
+                current = await self.db.query(
+                    "SELECT tag_name, use_count FROM prompt_tags WHERE user_id = ?",
+                    [uid]
+                )
+                current_counts = {row['tag_name']: row['use_count'] for row in current}
+                
+                changed = [
+                    [tag, uid, count] for tag, count in actual.items()
+                    if current_counts.get(tag) != count
+                ]
+                changed.extend(
+                    [tag, uid, 0] for tag, count in current_counts.items()
+                    if tag not in actual and count != 0
+                )
+                
+                if changed:
+                    upsert_sql = """
+                        INSERT INTO prompt_tags (tag_name, user_id, use_count) VALUES (?, ?, ?)
+                        ON CONFLICT(user_id, tag_name) DO UPDATE SET use_count = excluded.use_count
+                    """
+                    await self.db.execute_many(upsert_sql, changed)
+                
+                total_tags += len(actual)
+                total_corrected += len(changed)
+            
+            autocomplete_index.invalidate(user_id)
+            
+            logger.info(f'✅ 标签计数校准完成: users={len(user_ids)}, tags={total_tags}, corrected={total_corrected}')
+            
+            return {
+                'users': len(user_ids),
+                'tags': total_tags,
+                'corrected': total_corrected
+            }
+            
+        except Exception as e:
+            logger.error(f'❌ 标签计数校准失败: {e}')
+            raise
@@ -7,12 +7,13 @@ from pydantic import BaseModel
 from typing import Optional, List
 from loguru import logger
 
+from apps.utils.access_log import TimedRoute
 from apps.utils.auth_middleware import get_current_user_id
 from apps.utils.dependencies import get_db
 from .services import TagService
 
 # 创建标签路由
-router = APIRouter(prefix='/api/tags', tags=['标签'])
+router = APIRouter(prefix='/api/tags', tags=['标签'], route_class=TimedRoute)
 
 
 class CreateTagRequest(BaseModel):
@@ -122,3 +123,24 @@ async def get_popular_tags(
     except Exception as e:
         logger.error(f'❌ 查询热门标签失败: {e}', exc_info=True)
         raise HTTPException(status_code=500, detail=f'查询失败: {str(e)}')
+
+
+@router.post('/reconcile')
+async def reconcile_tags(
+    user_id: int = Depends(get_current_user_id),
+    db = Depends(get_db)
+):
+    """根据提示词数据校准标签使用次数"""
+    try:
+        tag_service = TagService(db)
+        result = await tag_service.reconcile_tag_counts(user_id)
+        
+        return {
+            'code': 200,
+            'message': '校准完成',
+            'data': result
+        }
+        
+    except Exception as e:
+        logger.error(f'❌ 校准标签计数失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'校准失败: {str(e)}')
@@ -6,6 +6,12 @@ import json
 import datetime
 from loguru import logger
 
+from apps.modules.search.services import notify_prompt_saved
+from apps.modules.search.semantic import semantic_index
+from apps.modules.search.duplicates import duplicate_detector
+from apps.utils.event_hub import notify_prompt_changed
+from apps.utils.single_flight import single_flight
+
 
 class VersionService:
     """版本管理服务类"""
@@ -70,6 +76,36 @@ class VersionService:
         except:
             return 0
     
+    @staticmethod
+    def decode_version_fields(version: dict) -> dict:
+        """
+        版本详情后处理(原地修改): 解析 JSON 数组字段和标签,时间字段转字符串
+        """
+        if version.get('thinking_points'):
+            try:
+                version['thinking_points'] = json.loads(version['thinking_points'])
+            except:
+                version['thinking_points'] = []
+        else:
+            version['thinking_points'] = []
+        
+        if version.get('advice'):
+            try:
+                version['advice'] = json.loads(version['advice'])
+            except:
+                version['advice'] = []
+        else:
+            version['advice'] = []
+        
+        if version.get('tags'):
+            version['tags'] = version['tags'].split(',') if version['tags'] else []
+        else:
+            version['tags'] = []
+        
+        version['create_time'] = str(version['create_time']) if version.get('create_time') else ''
+        version['author_avatar'] = version.get('author_avatar', '')
+        return version
+    
     # ============ 核心业务方法 ============
     
     async def create_version(self, prompt_id: int, user_id: int, data: dict):
@@ -84,6 +120,7 @@ class VersionService:
                 - change_summary: 变更摘要（必填）
                 - change_log: 详细说明（可选）
                 - version_tag: 版本标签（可选）
+                - is_auto_save: 是否为自动保存创建的版本（可选）
         
         Returns:
             dict: {version_id, version_number, create_time}
@@ -105,7 +142,7 @@ class VersionService:
             version_data = {
                 'prompt_id': prompt_id,
                 'version_number': new_version,
-                'version_type': 'manual',
+                'version_type': 'auto' if data.get('is_auto_save') else 'manual',
                 'version_tag': data.get('version_tag', None),
                 
                 # 内容快照
@@ -129,7 +166,8 @@ class VersionService:
                 'change_summary': data.get('change_summary', '版本更新'),
                 'change_type': change_type,
                 'created_by': user_id,
-                'content_size': len(current_prompt.get('final_prompt', ''))
+                'content_size': len(current_prompt.get('final_prompt', '')),
+                'is_auto_save': 1 if data.get('is_auto_save') else 0
             }
             
             # 4. 插入版本表
@@ -145,6 +183,7 @@ class VersionService:
                 "WHERE id = " + str(prompt_id)
             )
             await self.db.execute(update_sql)
+            notify_prompt_changed(user_id, 'version.created', prompt_id, new_version, version_id=version_id)
             
             logger.info(f'✅ 版本创建成功: prompt_id={prompt_id}, version={new_version}')
             
@@ -158,6 +197,7 @@ class VersionService:
             logger.error(f'❌ 创建版本失败: {e}')
             raise
     
+    @single_flight('version_history')
     async def get_version_history(self, prompt_id: int, user_id: int, 
                                   page=1, limit=20, version_tag=None):
         """
@@ -226,7 +266,7 @@ class VersionService:
                 item['create_time'] = str(item['create_time']) if item.get('create_time') else ''
                 item['author_avatar'] = item.get('author_avatar', '')
             
-            logger.debug(f'✅ 查询版本列表成功: prompt_id={prompt_id}, total={total}')
+            logger.debug('✅ 查询版本列表成功: prompt_id={}, total={}', prompt_id, total)
             
             return {
                 'total': total,
@@ -269,33 +309,10 @@ class VersionService:
             if not version:
                 raise ValueError('版本不存在或无权限')
             
-            # 2. 解析JSON字段
-            if version.get('thinking_points'):
-                try:
-                    version['thinking_points'] = json.loads(version['thinking_points'])
-                except:
-                    version['thinking_points'] = []
-            else:
-                version['thinking_points'] = []
-            
-            if version.get('advice'):
-                try:
-                    version['advice'] = json.loads(version['advice'])
-                except:
-                    version['advice'] = []
-            else:
-                version['advice'] = []
-            
-            if version.get('tags'):
-                version['tags'] = version['tags'].split(',') if version['tags'] else []
-            else:
-                version['tags'] = []
+            # 2. 解析JSON字段、格式化时间
+            self.decode_version_fields(version)
             
-            # 3. 格式化时间
-            version['create_time'] = str(version['create_time']) if version.get('create_time') else ''
-            version['author_avatar'] = version.get('author_avatar', '')
-            
-            logger.debug(f'✅ 获取版本详情成功: version_id={version_id}')
+            logger.debug('✅ 获取版本详情成功: version_id={}', version_id)
             
             return version
             
@@ -362,7 +379,7 @@ class VersionService:
                 }
             }
             
-            logger.debug(f'✅ 版本对比成功: from={from_version_id}, to={to_version_id}')
+            logger.debug('✅ 版本对比成功: from={}, to={}', from_version_id, to_version_id)
             
             return result
             
@@ -447,6 +464,20 @@ class VersionService:
                 WHERE id = {prompt_id}
             """
             await self.db.execute(update_sql)
+
+            # 回滚可能改变标签: 与更新提示词一样按差异调整标签使用次数
+            from apps.modules.prompts.services import PromptService
+            await PromptService(self.db)._update_tags(
+                user_id,
+                PromptService.parse_tags(tags_value),
+                PromptService.parse_tags(current_prompt.get('tags') or '')
+            )
+            notify_prompt_saved(user_id, prompt_id, target_version['title'], target_version.get('description'), tags_value)
+            await semantic_index.upsert(
+                self.db, user_id, prompt_id,
+                target_version['title'], target_version.get('description'), target_version.get('final_prompt')
+            )
+            await duplicate_detector.upsert(self.db, user_id, prompt_id, target_version.get('final_prompt'))
             
             # 5. 直接更新主表版本号为目标版本（不创建新版本）
             target_version_num = target_version['version_number']
@@ -457,6 +488,7 @@ class VersionService:
                 WHERE id = {prompt_id}
             """
             await self.db.execute(update_version_sql)
+            notify_prompt_changed(user_id, 'prompt.updated', prompt_id, target_version['version_number'])
             
             # 6. 更新被回滚版本的统计
             update_stats_sql = f"""
@@ -6,13 +6,16 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Optional
 from loguru import logger
 
+from apps.utils.access_log import TimedRoute
 from apps.utils.auth_middleware import get_current_user_id
 from apps.utils.dependencies import get_db
+from apps.modules.prompts.autosave import autosaves
+from apps.utils.rate_limit import ConcurrencyLimit
 from .services import VersionService
 from .models import *
 
 # 创建版本管理路由
-router = APIRouter(prefix='/api/versions', tags=['版本管理'])
+router = APIRouter(prefix='/api/versions', tags=['版本管理'], route_class=TimedRoute)
 
 
 @router.post('/{prompt_id}', response_model=CreateVersionResponse)
@@ -30,7 +33,8 @@ async def create_version(
         
         data = request.dict(exclude_none=True)
         
-        # 创建版本
+        # 创建版本(先写入待写的自动保存,快照包含最新内容)
+        await autosaves.flush(user_id, prompt_id)
         version_service = VersionService(db)
         result = await version_service.create_version(prompt_id, user_id, data)
         
@@ -64,7 +68,8 @@ async def get_version_list(
 ):
     """获取版本列表"""
     try:
-        # 查询列表
+        # 查询列表(先写入待写的自动保存)
+        await autosaves.flush(user_id, prompt_id)
         version_service = VersionService(db)
         result = await version_service.get_version_history(
             prompt_id, user_id, page, limit, tag
@@ -91,22 +96,30 @@ async def get_version_list(
         raise HTTPException(status_code=500, detail=f'查询失败: {str(e)}')
 
 
-@router.get('/{prompt_id}/versions/{version_id}', response_model=VersionDetailResponse)
-async def get_version_detail(
+# 必须在 /{prompt_id}/versions/{version_id} 之前注册,否则 compare 会被当作 version_id 匹配
+@router.get(
+    '/{prompt_id}/versions/compare',
+    response_model=VersionCompareResponse,
+    dependencies=[Depends(ConcurrencyLimit('version_compare'))]
+)
+async def compare_versions(
     prompt_id: int,
-    version_id: int,
+    from_version: int = Query(..., alias='from'),
+    to_version: int = Query(..., alias='to'),
     user_id: int = Depends(get_current_user_id),
     db = Depends(get_db)
 ):
-    """获取版本详情"""
+    """版本对比"""
     try:
-        # 查询详情
+        # 对比版本
         version_service = VersionService(db)
-        version = await version_service.get_version_detail(prompt_id, user_id, version_id)
+        result = await version_service.compare_versions(
+            prompt_id, user_id, from_version, to_version
+        )
         
-        return VersionDetailResponse(
+        return VersionCompareResponse(
             code=200,
-            data=VersionDetail(**version)
+            data=VersionCompareData(**result)
         )
         
     except ValueError as e:
@@ -114,29 +127,26 @@ async def get_version_detail(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f'❌ 获取版本详情失败: {e}', exc_info=True)
-        raise HTTPException(status_code=500, detail=f'查询失败: {str(e)}')
+        logger.error(f'❌ 版本对比失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'对比失败: {str(e)}')
 
 
-@router.get('/{prompt_id}/versions/compare', response_model=VersionCompareResponse)
-async def compare_versions(
+@router.get('/{prompt_id}/versions/{version_id}', response_model=VersionDetailResponse)
+async def get_version_detail(
     prompt_id: int,
-    from_version: int = Query(..., alias='from'),
-    to_version: int = Query(..., alias='to'),
+    version_id: int,
     user_id: int = Depends(get_current_user_id),
     db = Depends(get_db)
 ):
-    """版本对比"""
+    """获取版本详情"""
     try:
-        # 对比版本
+        # 查询详情
         version_service = VersionService(db)
-        result = await version_service.compare_versions(
-            prompt_id, user_id, from_version, to_version
-        )
+        version = await version_service.get_version_detail(prompt_id, user_id, version_id)
         
-        return VersionCompareResponse(
+        return VersionDetailResponse(
             code=200,
-            data=VersionCompareData(**result)
+            data=VersionDetail(**version)
         )
         
     except ValueError as e:
@@ -144,8 +154,8 @@ async def compare_versions(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f'❌ 版本对比失败: {e}', exc_info=True)
-        raise HTTPException(status_code=500, detail=f'对比失败: {str(e)}')
+        logger.error(f'❌ 获取版本详情失败: {e}', exc_info=True)
+        raise HTTPException(status_code=500, detail=f'查询失败: {str(e)}')
 
 
 @router.post('/{prompt_id}/versions/{version_id}/rollback', response_model=RollbackResponse)
@@ -160,7 +170,8 @@ async def rollback_version(
     try:
         change_summary = request.change_summary if request else None
         
-        # 回滚
+        # 回滚(先写入待写的自动保存,避免回滚后被覆盖)
+        await autosaves.flush(user_id, prompt_id)
         version_service = VersionService(db)
         result = await version_service.rollback_to_version(
             prompt_id, user_id, version_id, change_summary
@@ -0,0 +1,291 @@
+"""
+结构化访问日志
+每个请求分配请求 ID(响应头 X-Request-ID),统计认证、数据库、序列化耗时,
+按采样率写一行 JSON 到 access.log(经由异步日志管道);慢请求和 5xx 请求始终记录
+
+记录字段:
+    time, request_id, method, path, route, status, duration_ms, auth_ms,
+    db_ms(含排队), db_wait_ms, db_queries, serialize_ms, bytes, user_id,
+    sampled(false 表示未被采样、因慢请求/错误而记录)
+
+离线汇总(在 backend 目录下):
+    python -m apps.utils.access_log ../data/logs/backend/access.log* --sort p99 --top 20
+    python -m apps.utils.access_log ../data/logs/backend/access.log --route /api/prompts --slowest 10
+"""
+import argparse
+import asyncio
+import functools
+import glob
+import json
+import random
+import re
+import sys
+import time
+import uuid
+import zipfile
+from collections import defaultdict
+from datetime import datetime
+from fastapi.routing import APIRoute
+from loguru import logger
+
+from apps.utils.request_context import begin_request, end_request, mark_endpoint_end
+
+REQUEST_ID_HEADER = b'x-request-id'
+# 接受客户端传入的请求 ID(便于与网关日志关联),不合法时重新生成
+REQUEST_ID_PATTERN = re.compile(r'^[\w.\-]{1,64}$')
+UNMATCHED_ROUTE = 'unmatched'
+
+# 访问日志记录通过 extra 中的 access 标记区分,只写入 access.log
+access_logger = logger.bind(access=True)
+
+
+def is_access_record(record):
+    """loguru filter: 是否为访问日志记录"""
+    return 'access' in record['extra']
+
+
+def _timed_endpoint(call):
+    """包装路由端点,返回时记录时间"""
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                mark_endpoint_end()
+    else:
+        @functools.wraps(call)
+        def endpoint(*args, **kwargs):
+            try:
+                return call(*args, **kwargs)
+            finally:
+                mark_endpoint_end()
+    endpoint.access_log_timed = True
+    return endpoint
+
+
+class TimedRoute(APIRoute):
+    """
+    记录端点返回时间的路由类(APIRouter(route_class=TimedRoute))
+
+    端点返回到开始发送响应之间是 FastAPI 的 jsonable_encoder 和 JSON 渲染,记为序列化耗时
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        if not getattr(endpoint, 'access_log_timed', False):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class AccessLogMiddleware:
+    """访问日志中间件(纯 ASGI 实现)"""
+
+    def __init__(self, app, sample_rate=1.0, slow_ms=1000, exclude_paths=('/metrics', '/healthz', '/readyz', '/api/events')):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_ms / 1000
+        self.exclude_paths = frozenset(exclude_paths)
+
+    @staticmethod
+    def _request_id(scope):
+        for name, value in scope['headers']:
+            if name == REQUEST_ID_HEADER:
+                value = value.decode('latin-1')
+                if REQUEST_ID_PATTERN.match(value):
+                    return value
+                break
+        return uuid.uuid4().hex
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        timing, token = begin_request(self._request_id(scope))
+        status = 500
+        size = 0
+        response_start = None
+
+        async def send_wrapper(message):
+            nonlocal status, size, response_start
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                response_start = time.perf_counter()
+                message['headers'] = list(message.get('headers', [])) + [
+                    (REQUEST_ID_HEADER, timing.request_id.encode('latin-1'))
+                ]
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_request(token)
+            elapsed = time.perf_counter() - started
+
+            sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+            if sampled or status >= 500 or elapsed >= self.slow_seconds:
+                route = getattr(scope.get('route'), 'path', None) or UNMATCHED_ROUTE
+                serialize = None
+                if timing.endpoint_end is not None and response_start is not None:
+                    serialize = _ms(response_start - timing.endpoint_end)
+
+                record = {
+                    'time': datetime.now().isoformat(timespec='milliseconds'),
+                    'request_id': timing.request_id,
+                    'method': scope['method'],
+                    'path': scope['path'],
+                    'route': route,
+                    'status': status,
+                    'duration_ms': _ms(elapsed),
+                    'auth_ms': _ms(timing.auth),
+                    'db_ms': _ms(timing.db),
+                    'db_wait_ms': _ms(timing.db_wait),
+                    'db_queries': timing.db_queries,
+                    'serialize_ms': serialize,
+                    'bytes': size,
+                    'user_id': timing.user_id,
+                    'sampled': sampled,
+                }
+                access_logger.info(json.dumps(record, ensure_ascii=False))
+
+
+# ==========================================
+# 离线汇总
+# ==========================================
+
+def _open_lines(path):
+    """读取日志文件(支持轮转后的 .zip)"""
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                with archive.open(name) as f:
+                    for line in f:
+                        yield line.decode('utf-8')
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from f
+
+
+def read_records(paths, route_prefix=None, since=None):
+    """解析访问日志记录(跳过无法解析的行)"""
+    for path in paths:
+        for line in _open_lines(path):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if route_prefix and not record.get('route', '').startswith(route_prefix):
+                continue
+            if since and record.get('time', '') < since:
+                continue
+            yield record
+
+
+def _percentile(ordered, ratio):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def _average(values):
+    values = [value for value in values if value is not None]
+    return round(sum(values) / len(values), 2) if values else None
+
+
+def aggregate(records):
+    """
+    按 方法 + 路由 汇总
+
+    延迟分位数只使用被采样的记录(因慢请求/错误强制记录的不计入,避免分位数偏高)
+
+    Returns:
+        list: [{'endpoint', 'count', 'errors', 'slow_logged', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms',
+                'auth_ms', 'db_ms', 'db_queries', 'serialize_ms'}, ...]
+    """
+    groups = defaultdict(list)
+    for record in records:
+        groups[f'{record["method"]} {record["route"]}'].append(record)
+
+    report = []
+    for endpoint, items in groups.items():
+        sampled = [item for item in items if item.get('sampled', True)] or items
+        durations = sorted(item['duration_ms'] for item in sampled)
+        report.append({
+            'endpoint': endpoint,
+            'count': len(sampled),
+            'errors': sum(1 for item in items if item['status'] >= 500),
+            'slow_logged': len(items) - len(sampled),
+            'p50_ms': _percentile(durations, 0.5),
+            'p95_ms': _percentile(durations, 0.95),
+            'p99_ms': _percentile(durations, 0.99),
+            'max_ms': max(item['duration_ms'] for item in items),
+            'auth_ms': _average(item.get('auth_ms') for item in sampled),
+            'db_ms': _average(item.get('db_ms') for item in sampled),
+            'db_queries': _average(item.get('db_queries') for item in sampled),
+            'serialize_ms': _average(item.get('serialize_ms') for item in sampled),
+        })
+    return report
+
+
+SORT_KEYS = {
+    'count': lambda row: row['count'],
+    'p50': lambda row: row['p50_ms'],
+    'p95': lambda row: row['p95_ms'],
+    'p99': lambda row: row['p99_ms'],
+    'max': lambda row: row['max_ms'],
+    'total': lambda row: row['count'] * row['p50_ms'],
+}
+
+
+def _format(value):
+    return '-' if value is None else f'{value:.1f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='访问日志按接口汇总延迟')
+    parser.add_argument('paths', nargs='+', help='access.log 文件(支持通配符和轮转后的 .zip)')
+    parser.add_argument('--route', help='只统计以该前缀开头的路由')
+    parser.add_argument('--since', help='起始时间,如 2024-06-01T12:00')
+    parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='p99', help='排序字段')
+    parser.add_argument('--top', type=int, default=30, help='显示的接口数')
+    parser.add_argument('--slowest', type=int, default=0, help='另外列出最慢的 N 个请求')
+    parser.add_argument('--json', action='store_true', help='输出 JSON')
+    args = parser.parse_args()
+
+    paths = sorted({path for pattern in args.paths for path in (glob.glob(pattern) or [pattern])})
+    records = list(read_records(paths, args.route, args.since))
+    if not records:
+        print('没有访问日志记录', file=sys.stderr)
+        sys.exit(1)
+
+    report = sorted(aggregate(records), key=SORT_KEYS[args.sort], reverse=True)[:args.top]
+    slowest = sorted(records, key=lambda record: record['duration_ms'], reverse=True)[:args.slowest]
+
+    if args.json:
+        print(json.dumps({'endpoints': report, 'slowest': slowest}, ensure_ascii=False, indent=2))
+        return
+
+    print(f'{len(records)} 条记录, {len(paths)} 个文件')
+    print(f'{"接口":<44}{"请求":>7}{"5xx":>5}{"p50":>8}{"p95":>8}{"p99":>8}{"max":>9}'
+          f'{"认证":>7}{"数据库":>8}{"SQL数":>6}{"序列化":>8}')
+    for row in report:
+        print(f'{row["endpoint"][:43]:<44}{row["count"]:>7}{row["errors"]:>5}'
+              f'{row["p50_ms"]:>8.1f}{row["p95_ms"]:>8.1f}{row["p99_ms"]:>8.1f}{row["max_ms"]:>9.1f}'
+              f'{_format(row["auth_ms"]):>7}{_format(row["db_ms"]):>8}{_format(row["db_queries"]):>6}'
+              f'{_format(row["serialize_ms"]):>8}')
+
+    if slowest:
+        print('\n最慢的请求:')
+        for record in slowest:
+            print(f'{record["duration_ms"]:>9.1f} ms  {record["time"]}  {record["request_id"]}  '
+                  f'{record["method"]} {record["path"]}  status={record["status"]}  '
+                  f'db={record.get("db_ms")} ms/{record.get("db_queries")} 条  serialize={record.get("serialize_ms")} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,17 +2,45 @@
 认证中间件（FastAPI 依赖）
 用于保护需要登录的API接口
 """
-from fastapi import Depends, HTTPException, Header
+import time
+from fastapi import Depends, HTTPException, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from loguru import logger
 
-from apps.utils.jwt_utils import JWTUtil
+from apps.utils.request_context import record_auth
+from apps.utils.jwt_utils import JWTUtil, STREAM_TICKET_TYPE
+from apps.utils.metrics import AUTH_VERIFY_SECONDS, AUTH_FAILURES
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
+# 请求 scope['state'] 中保存已校验 Token 的键
+VERIFIED_TOKEN_KEY = 'verified_token'
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+
+def verify_request_token(scope, token):
+    """
+    校验 Token,同一请求内只解码一次
+
+    限流中间件先校验并把结果保存在 scope['state'] 中,认证依赖直接复用
+
+    Returns:
+        tuple: (payload, 校验耗时);Token 无效时 payload 为 None
+    """
+    state = scope.setdefault('state', {})
+    verified = state.get(VERIFIED_TOKEN_KEY)
+    if verified is not None and verified[0] == token:
+        return verified[1], verified[2]
+
+    started = time.perf_counter()
+    payload = JWTUtil.verify_token(token)
+    elapsed = time.perf_counter() - started
+    state[VERIFIED_TOKEN_KEY] = (token, payload, elapsed)
+    return payload, elapsed
+
+
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     获取当前用户（FastAPI 依赖）
     
@@ -24,12 +52,18 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     
     如果认证失败,抛出 HTTPException 401
     """
-    token = credentials.credentials
-    
+    return _authenticate(request, credentials.credentials)
+
+
+def _authenticate(request, token):
+    """验证Token并返回当前用户,失败时抛出 HTTPException 401"""
     # 验证Token
-    payload = JWTUtil.verify_token(token)
+    payload, elapsed = verify_request_token(request.scope, token)
+    AUTH_VERIFY_SECONDS.observe(elapsed)
+    record_auth(elapsed, payload.get('user_id') if payload else None)
     
-    if not payload:
+    if not payload or payload.get('type') == STREAM_TICKET_TYPE:
+        AUTH_FAILURES.inc('invalid_token')
         logger.warning(f'❌ Token无效或已过期')
         raise HTTPException(
             status_code=401,
@@ -39,7 +73,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     user_id = payload.get('user_id')
     username = payload.get('username', payload.get('open_id', ''))
     
-    logger.debug(f'✅ 认证成功: user_id={user_id}, username={username}')
+    logger.debug('✅ 认证成功: user_id={}, username={}', user_id, username)
     
     return {
         'user_id': user_id,
@@ -59,8 +93,58 @@ async def get_current_user_id(current_user: dict = Depends(get_current_user)) ->
     return current_user['user_id']
 
 
+# 已使用的事件推送票据 jti -> 过期时间(时间戳)
+_redeemed_tickets = {}
+
+
+def _redeem_stream_ticket(ticket):
+    """校验并作废事件推送票据,返回 user_id;票据无效、过期或已使用时返回 None"""
+    payload = JWTUtil.verify_token(ticket)
+    if not payload or payload.get('type') != STREAM_TICKET_TYPE or not payload.get('jti'):
+        return None
+    
+    now = time.time()
+    for jti in [jti for jti, expires in _redeemed_tickets.items() if expires <= now]:
+        del _redeemed_tickets[jti]
+    if payload['jti'] in _redeemed_tickets:
+        return None
+    _redeemed_tickets[payload['jti']] = payload['exp']
+    return payload.get('user_id')
+
+
+async def get_stream_user_id(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    ticket: Optional[str] = Query(None)
+) -> int:
+    """
+    获取当前用户ID（事件推送长连接使用）
+    
+    浏览器的 EventSource 不能设置请求头: 除 Authorization 头外接受 ?ticket= 一次性票据
+    (POST /api/events/ticket 获取,有效期 SSE_TICKET_TTL 秒)。
+    查询参数会被访问日志、代理和浏览器历史记录,所以 URL 中不接受登录 Token
+    """
+    if credentials:
+        return _authenticate(request, credentials.credentials)['user_id']
+    if not ticket:
+        AUTH_FAILURES.inc('missing_token')
+        raise HTTPException(status_code=401, detail='未登录')
+    
+    started = time.perf_counter()
+    user_id = _redeem_stream_ticket(ticket)
+    elapsed = time.perf_counter() - started
+    AUTH_VERIFY_SECONDS.observe(elapsed)
+    record_auth(elapsed, user_id)
+    if user_id is None:
+        AUTH_FAILURES.inc('invalid_ticket')
+        logger.warning('❌ 事件推送票据无效、过期或已使用')
+        raise HTTPException(status_code=401, detail='票据无效、过期或已使用,请重新获取')
+    return user_id
+
+
 async def get_optional_user(
-    authorization: Optional[str] = Header(None)
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
 ) -> Optional[dict]:
     """
     可选认证依赖（FastAPI）
@@ -78,15 +162,16 @@ async def get_optional_user(
                 # 未登录用户的逻辑
                 ...
     """
-    if not authorization or not authorization.startswith('Bearer '):
+    if not credentials:
         logger.debug('⚠️  可选认证: 未登录用户访问')
         return None
     
-    token = authorization.split(' ')[1]
-    payload = JWTUtil.verify_token(token)
+    payload, elapsed = verify_request_token(request.scope, credentials.credentials)
+    AUTH_VERIFY_SECONDS.observe(elapsed)
+    record_auth(elapsed, payload.get('user_id') if payload else None)
     
-    if payload:
-        logger.debug(f'✅ 可选认证: 已登录用户访问 user_id={payload.get("user_id")}')
+    if payload and payload.get('type') != STREAM_TICKET_TYPE:
+        logger.debug('✅ 可选认证: 已登录用户访问 user_id={}', payload.get('user_id'))
         return {
             'user_id': payload.get('user_id'),
             'username': payload.get('username', payload.get('open_id', ''))
@@ -116,11 +201,12 @@ async def get_admin_user(current_user: dict = Depends(get_current_user)) -> dict
     
     # 示例: 假设user_id为1的是管理员
     if user_id != 1:
+        AUTH_FAILURES.inc('forbidden')
         logger.warning(f'❌ 权限不足: user_id={user_id} 尝试访问管理员接口')
         raise HTTPException(
             status_code=403,
             detail='权限不足,需要管理员权限'
         )
     
-    logger.debug(f'✅ 管理员认证成功: user_id={user_id}')
+    logger.debug('✅ 管理员认证成功: user_id={}', user_id)
     return current_user
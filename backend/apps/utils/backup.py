@@ -0,0 +1,563 @@
+"""
+数据库在线备份
+使用 SQLite 在线备份 API 分步复制页面(每步之间让出锁和 I/O),生成 gzip 压缩的完整快照并按数量保留;
+可选 WAL 归档: 定期把 WAL 新增帧复制为增量段并执行检查点,恢复时在快照上回放到指定时间点
+
+文件布局(BACKUP_DIR 下):
+    yprompt-20240601-030000.db.gz           完整快照
+    yprompt-20240601-030000.wal/            该快照之后的 WAL 增量段(仅开启 WAL 归档时)
+        000001-000001-20240601-030100.wal.gz  <WAL 代数>-<序号>-<归档时间>
+
+用法(在 backend 目录下):
+    # 列出快照和增量段
+    python -m apps.utils.backup list
+
+    # 立即生成一份快照(服务运行中也可执行)
+    python -m apps.utils.backup snapshot
+
+    # 恢复到新文件(--until 指定时间点,不指定时回放全部增量段)
+    python -m apps.utils.backup restore ../data/backups/yprompt-20240601-030000.db.gz \\
+        --output ../data/restored.db --until "2024-06-01 12:00:00"
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from loguru import logger
+
+from apps.utils.file_lock import try_lock
+
+SNAPSHOT_PATTERN = re.compile(r'^(?P<name>.+)-(?P<stamp>\d{8}-\d{6})\.db\.gz$')
+SEGMENT_PATTERN = re.compile(r'^(?P<generation>\d{6})-(?P<sequence>\d{6})-(?P<stamp>\d{8}-\d{6})\.wal\.gz$')
+STAMP_FORMAT = '%Y%m%d-%H%M%S'
+
+# WAL 文件头和帧头大小(字节)
+WAL_HEADER_SIZE = 32
+WAL_FRAME_HEADER_SIZE = 24
+
+# 默认每步复制页数和步间隔(秒)
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.005
+
+
+class WalGapError(Exception):
+    """WAL 在归档之外被重置(如其他进程执行了检查点),增量链断开"""
+    pass
+
+
+def _compress(source, target):
+    """gzip 压缩到临时文件后原子替换,避免留下不完整的备份"""
+    tmp = target + '.tmp'
+    with open(source, 'rb') as src, gzip.open(tmp, 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp, target)
+
+
+def _decompress(source, target):
+    with gzip.open(source, 'rb') as src, open(target, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def _remove_sidecars(db_path):
+    for suffix in ('-wal', '-shm', '-journal'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+def copy_database(src_path, dest_path, pages_per_step=PAGES_PER_STEP, step_sleep=STEP_SLEEP):
+    """
+    使用在线备份 API 复制数据库(同步执行,应放在线程池中调用)
+
+    WAL 模式下先开启读事务固定快照: 读事务不阻塞写入,备份也不会因其他连接写入而重新开始;
+    每步只复制 pages_per_step 页并休眠 step_sleep 秒,限制对磁盘 I/O 的占用
+
+    Returns:
+        int: 复制的页数
+    """
+    src = sqlite3.connect(src_path, isolation_level=None)
+    dst = sqlite3.connect(dest_path)
+    try:
+        # 目标文件只是压缩前的临时副本,不做 fsync,避免一次性刷盘拖慢同一磁盘上的请求写入
+        dst.execute('PRAGMA synchronous = OFF')
+        pinned = src.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        if pinned:
+            src.execute('BEGIN')
+            src.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchall()
+        # backup() 的 sleep 参数只在源库忙时生效,步间休眠放在进度回调中
+        progress = (lambda status, remaining, total: time.sleep(step_sleep)) if step_sleep > 0 else None
+        src.backup(dst, pages=pages_per_step, progress=progress)
+        if pinned:
+            src.execute('COMMIT')
+        return dst.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+
+
+def create_snapshot(db_path, backup_dir, pages_per_step=PAGES_PER_STEP, step_sleep=STEP_SLEEP):
+    """
+    生成一份 gzip 压缩的完整快照(同步执行,应放在线程池中调用)
+
+    Returns:
+        dict: {'path', 'size', 'pages', 'duration_ms'}
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    started = time.perf_counter()
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    path = os.path.join(backup_dir, f'{name}-{datetime.now().strftime(STAMP_FORMAT)}.db.gz')
+    if os.path.exists(path):
+        raise FileExistsError(f'快照已存在: {path}')
+
+    raw = path[:-len('.gz')] + '.tmp'
+    try:
+        pages = copy_database(db_path, raw, pages_per_step, step_sleep)
+        _compress(raw, path)
+    finally:
+        if os.path.exists(raw):
+            os.remove(raw)
+
+    return {
+        'path': path,
+        'size': os.path.getsize(path),
+        'pages': pages,
+        'duration_ms': int((time.perf_counter() - started) * 1000),
+    }
+
+
+def apply_retention(backup_dir, retention):
+    """只保留最近 retention 份快照(连同其增量段)"""
+    snapshots = list_snapshots(backup_dir)
+    for snapshot in snapshots[:max(0, len(snapshots) - retention)]:
+        os.remove(snapshot['path'])
+        shutil.rmtree(segment_dir(snapshot['path']), ignore_errors=True)
+        logger.info(f"📦 删除过期快照: {snapshot['path']}")
+
+
+def list_snapshots(backup_dir):
+    """按时间升序列出快照 [{'path', 'name', 'time', 'size', 'segments'}]"""
+    if not os.path.isdir(backup_dir):
+        return []
+    snapshots = []
+    for filename in sorted(os.listdir(backup_dir)):
+        match = SNAPSHOT_PATTERN.match(filename)
+        if not match:
+            continue
+        path = os.path.join(backup_dir, filename)
+        snapshots.append({
+            'path': path,
+            'name': match.group('name'),
+            'time': datetime.strptime(match.group('stamp'), STAMP_FORMAT),
+            'size': os.path.getsize(path),
+            'segments': list_segments(path),
+        })
+    snapshots.sort(key=lambda snapshot: snapshot['time'])
+    return snapshots
+
+
+def segment_dir(snapshot_path):
+    """快照对应的 WAL 增量段目录"""
+    return snapshot_path[:-len('.db.gz')] + '.wal'
+
+
+def list_segments(snapshot_path, until=None):
+    """
+    按序号列出快照之后的 WAL 增量段
+
+    Args:
+        until: 只返回归档时间不晚于该时间的增量段
+    """
+    directory = segment_dir(snapshot_path)
+    if not os.path.isdir(directory):
+        return []
+    segments = []
+    for filename in os.listdir(directory):
+        match = SEGMENT_PATTERN.match(filename)
+        if not match:
+            continue
+        archived = datetime.strptime(match.group('stamp'), STAMP_FORMAT)
+        if until is not None and archived > until:
+            continue
+        segments.append({
+            'path': os.path.join(directory, filename),
+            'generation': int(match.group('generation')),
+            'sequence': int(match.group('sequence')),
+            'time': archived,
+        })
+    segments.sort(key=lambda segment: segment['sequence'])
+    return segments
+
+
+def restore(snapshot_path, output_path, until=None):
+    """
+    从快照恢复数据库,并按代回放 WAL 增量段
+
+    同一代的增量段拼接后即为该代 WAL 文件的前缀,放到数据库旁由 SQLite 自行恢复并检查点写回;
+    最后一个事务不完整的帧会被 SQLite 忽略
+
+    Returns:
+        dict: {'path', 'segments', 'integrity'}
+    """
+    tmp = output_path + '.restoring'
+    _remove_sidecars(tmp)
+    _decompress(snapshot_path, tmp)
+
+    segments = list_segments(snapshot_path, until)
+    generations = {}
+    for segment in segments:
+        generations.setdefault(segment['generation'], []).append(segment)
+
+    for generation in sorted(generations):
+        with open(tmp + '-wal', 'wb') as wal:
+            for segment in generations[generation]:
+                with gzip.open(segment['path'], 'rb') as src:
+                    shutil.copyfileobj(src, wal, 1024 * 1024)
+        conn = sqlite3.connect(tmp)
+        try:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+        finally:
+            conn.close()
+
+    conn = sqlite3.connect(tmp)
+    try:
+        integrity = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        conn.close()
+    _remove_sidecars(tmp)
+    os.replace(tmp, output_path)
+    return {'path': output_path, 'segments': len(segments), 'integrity': integrity}
+
+
+class BackupManager:
+    """
+    定时快照与 WAL 归档
+
+    WAL 归档依赖所有写入都经过应用的单个数据库连接: 复制 WAL 尾部和检查点在该连接的线程中连续执行,
+    中间不会插入写入,因此不会漏帧;多 worker 部署时只做完整快照
+    """
+
+    def __init__(self, db, backup_dir, retention=7, pages_per_step=PAGES_PER_STEP,
+                 step_sleep=STEP_SLEEP, wal_shipping=False):
+        self.db = db
+        self.backup_dir = backup_dir
+        self.retention = retention
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.wal_shipping = wal_shipping
+        # 快照与归档互斥,保证增量链中的段都在快照完成之后
+        self._lock = asyncio.Lock()
+        # 当前增量链 {'dir', 'generation', 'sequence', 'offset', 'salt'},为 None 时不归档
+        self._chain = None
+
+    @property
+    def chain_active(self):
+        return self._chain is not None
+
+    def latest_snapshot_time(self):
+        snapshots = list_snapshots(self.backup_dir)
+        return snapshots[-1]['time'] if snapshots else None
+
+    async def snapshot(self):
+        """
+        生成一份完整快照
+
+        Returns:
+            dict: {'path', 'size', 'pages', 'duration_ms'}
+        """
+        async with self._lock:
+            # 新的增量链必须从 WAL 开头开始: 先把当前 WAL 归档到旧链并检查点截断
+            chain_ready, salt = False, None
+            if self.wal_shipping:
+                chain_ready, salt = await self._rollover()
+
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, create_snapshot, self.db.db_path, self.backup_dir, self.pages_per_step, self.step_sleep
+            )
+
+            self._chain = None
+            if chain_ready:
+                # 已知截断前的盐值时,第一段归档会识别为新的一代
+                self._chain = {
+                    'dir': segment_dir(result['path']), 'generation': 0 if salt else 1,
+                    'sequence': 0, 'offset': 0, 'salt': salt,
+                }
+                os.makedirs(self._chain['dir'], exist_ok=True)
+
+            apply_retention(self.backup_dir, self.retention)
+            logger.info(f"✅ 数据库快照完成: {result['path']}, {result['size']} 字节, 耗时 {result['duration_ms']} ms")
+            return result
+
+    async def _rollover(self):
+        """
+        归档当前链的剩余帧并截断 WAL
+
+        Returns:
+            tuple: (是否成功, 截断前的 WAL 盐值)
+        """
+        try:
+            if self._chain is not None:
+                truncated = await self._ship()
+                salt = self._chain['salt']
+            else:
+                _, salt, _, _, truncated = await self.db.run_sync(
+                    _copy_wal_tail, self.db.db_path + '-wal', 0, None
+                )
+        except WalGapError:
+            truncated, salt = False, None
+        if not truncated:
+            logger.warning('⚠️  WAL 检查点未能完成(存在未结束的读事务),本次快照不开启增量归档')
+        return truncated, salt
+
+    async def ship_wal(self):
+        """归档 WAL 新增帧(定时调用)"""
+        async with self._lock:
+            if self._chain is None:
+                return
+            try:
+                await self._ship()
+            except WalGapError:
+                logger.warning('⚠️  WAL 已在归档之外被重置,增量链中断,等待下一次快照')
+                self._chain = None
+
+    async def _ship(self):
+        """
+        复制 WAL 新增帧为增量段,然后执行检查点
+
+        Returns:
+            bool: WAL 是否已截断
+        """
+        chain = self._chain
+        data, salt, end, restarted, truncated = await self.db.run_sync(
+            _copy_wal_tail, self.db.db_path + '-wal', chain['offset'], chain['salt']
+        )
+
+        if restarted:
+            chain['generation'] += 1
+        if data:
+            chain['sequence'] += 1
+            stamp = datetime.now().strftime(STAMP_FORMAT)
+            path = os.path.join(chain['dir'], f"{chain['generation']:06d}-{chain['sequence']:06d}-{stamp}.wal.gz")
+            await asyncio.get_running_loop().run_in_executor(None, _write_segment, path, data)
+            logger.debug('📦 WAL 增量段已归档: {}, {} 字节', path, len(data))
+
+        chain['salt'] = salt
+        chain['offset'] = 0 if truncated else end
+        return truncated
+
+
+def _copy_wal_tail(conn, wal_path, offset, salt):
+    """
+    读取 WAL 中 offset 之后的完整帧,然后执行检查点(在连接线程中调用)
+
+    WAL 每次重新开始时 salt-1 加一: 盐值恰好加一说明上一代已全部归档并写回(新的一代),
+    其他变化说明 WAL 在归档之外被重新开始,之间的帧已丢失
+
+    Args:
+        offset: 当前代已归档的位置(截断后为 0)
+        salt: 最近一次读取到的 WAL 盐值(未知时为 None)
+
+    Returns:
+        tuple: (数据, WAL 盐值, 读取结束位置, 是否为新的一代, 是否已截断)
+    """
+    size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    if size < WAL_HEADER_SIZE:
+        if offset:
+            raise WalGapError()
+        # WAL 为空时不做检查点(空 WAL 检查点也会改变下一代的盐值)
+        return b'', salt, 0, False, True
+
+    with open(wal_path, 'rb') as f:
+        header = f.read(WAL_HEADER_SIZE)
+        restarted = False
+        if salt is not None and header[16:24] != salt:
+            expected = (int.from_bytes(salt[:4], 'big') + 1) & 0xFFFFFFFF
+            if int.from_bytes(header[16:20], 'big') != expected:
+                raise WalGapError()
+            restarted, offset = True, 0
+        elif size < offset:
+            raise WalGapError()
+
+        frame_size = WAL_FRAME_HEADER_SIZE + int.from_bytes(header[8:12], 'big')
+        end = WAL_HEADER_SIZE + (size - WAL_HEADER_SIZE) // frame_size * frame_size
+        f.seek(offset)
+        data = f.read(end - offset)
+
+    try:
+        busy, _, _ = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+    except sqlite3.Error:
+        busy = 1
+    return data, header[16:24], end, restarted, busy == 0
+
+
+def _write_segment(path, data):
+    tmp = path + '.tmp'
+    with gzip.open(tmp, 'wb', compresslevel=6) as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+async def run_backup_scheduler(manager, interval_hours, wal_interval):
+    """
+    定时快照和 WAL 归档
+
+    开启 WAL 归档时启动后立即生成快照(上次运行的 WAL 已在关闭时写回数据库,需要新的基础快照);
+    否则按最近一份快照的时间计算下一次快照
+    """
+    interval = interval_hours * 3600
+    if manager.wal_shipping:
+        next_snapshot = time.time()
+    else:
+        latest = manager.latest_snapshot_time()
+        next_snapshot = latest.timestamp() + interval if latest else time.time()
+
+    # 增量链未能建立时重新生成基础快照的间隔(秒)
+    retry = min(interval, 600)
+
+    while True:
+        try:
+            if time.time() >= next_snapshot:
+                await manager.snapshot()
+                next_snapshot = time.time() + interval
+                if manager.wal_shipping and not manager.chain_active:
+                    next_snapshot = time.time() + retry
+            elif manager.wal_shipping:
+                await manager.ship_wal()
+                if not manager.chain_active:
+                    # 增量链中断,立即生成新的基础快照
+                    next_snapshot = time.time()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f'❌ 数据库备份失败: {e}')
+            next_snapshot = time.time() + retry
+
+        delay = next_snapshot - time.time()
+        if manager.wal_shipping:
+            delay = min(delay, wal_interval)
+        await asyncio.sleep(max(1, delay))
+
+
+async def init_backup(app):
+    """启动定时备份(FastAPI 生命周期中调用)"""
+    from config.settings import Config
+
+    app.state.backup_manager = None
+    app.state.backup_task = None
+    if not getattr(Config, 'BACKUP_ENABLED', False):
+        return
+
+    db = app.state.db
+    backup_dir = getattr(Config, 'BACKUP_DIR', '../data/backups')
+    # 多 worker 部署时只在一个进程中执行定时备份
+    lock_file = try_lock(os.path.join(backup_dir, '.scheduler.lock'))
+    if lock_file is None:
+        logger.info('📦 其他 worker 已启动定时备份,跳过')
+        return
+
+    wal_shipping = getattr(Config, 'BACKUP_WAL_SHIPPING', False)
+    if wal_shipping:
+        mode = (await db.get('PRAGMA journal_mode'))['journal_mode']
+        if mode != 'wal':
+            logger.warning(f'⚠️  WAL 归档需要 WAL 日志模式(当前 {mode}),仅执行定时快照')
+            wal_shipping = False
+        elif getattr(Config, 'WORKERS', 1) > 1:
+            logger.warning('⚠️  WAL 归档仅支持单 worker 部署,仅执行定时快照')
+            wal_shipping = False
+        else:
+            # 检查点只由归档任务执行,避免未归档的帧被自动检查点覆盖
+            await db.execute('PRAGMA wal_autocheckpoint = 0')
+
+    manager = BackupManager(
+        db, backup_dir,
+        retention=getattr(Config, 'BACKUP_RETENTION', 7),
+        pages_per_step=getattr(Config, 'BACKUP_PAGES_PER_STEP', PAGES_PER_STEP),
+        step_sleep=getattr(Config, 'BACKUP_STEP_SLEEP_MS', STEP_SLEEP * 1000) / 1000,
+        wal_shipping=wal_shipping,
+    )
+    manager.lock_file = lock_file
+    app.state.backup_manager = manager
+    app.state.backup_task = asyncio.create_task(run_backup_scheduler(
+        manager,
+        getattr(Config, 'BACKUP_INTERVAL_HOURS', 24),
+        getattr(Config, 'BACKUP_WAL_INTERVAL_SECONDS', 60),
+    ))
+    logger.info(f"✅ 定时备份已启动: {backup_dir}{'(WAL 归档)' if wal_shipping else ''}")
+
+
+async def close_backup(app):
+    """停止定时备份,关闭数据库前归档最后的 WAL 帧"""
+    task = getattr(app.state, 'backup_task', None)
+    if task and not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    manager = getattr(app.state, 'backup_manager', None)
+    if manager is None:
+        return
+    if manager.chain_active:
+        try:
+            await manager.ship_wal()
+        except Exception as e:
+            logger.error(f'❌ 归档 WAL 失败: {e}')
+    manager.lock_file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite 在线备份与恢复')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help='列出快照')
+    list_parser.add_argument('--dir', help='备份目录(默认 Config.BACKUP_DIR)')
+
+    snapshot_parser = subparsers.add_parser('snapshot', help='立即生成快照')
+    snapshot_parser.add_argument('--db', help='数据库路径(默认 Config.SQLITE_DB_PATH)')
+    snapshot_parser.add_argument('--dir', help='备份目录(默认 Config.BACKUP_DIR)')
+
+    restore_parser = subparsers.add_parser('restore', help='从快照恢复到新文件')
+    restore_parser.add_argument('snapshot', help='快照文件(.db.gz)')
+    restore_parser.add_argument('--output', required=True, help='恢复后的数据库路径(不要直接指定运行中的数据库)')
+    restore_parser.add_argument('--until', help='回放 WAL 增量段截止时间,如 "2024-06-01 12:00:00"')
+    restore_parser.add_argument('--force', action='store_true', help='覆盖已存在的输出文件')
+    args = parser.parse_args()
+
+    from config.settings import Config
+
+    if args.command == 'list':
+        backup_dir = args.dir or getattr(Config, 'BACKUP_DIR', '../data/backups')
+        for snapshot in list_snapshots(backup_dir):
+            segments = snapshot['segments']
+            latest = f", 增量段 {len(segments)} 个, 最新 {segments[-1]['time']:%Y-%m-%d %H:%M:%S}" if segments else ''
+            print(f"{snapshot['time']:%Y-%m-%d %H:%M:%S}  {snapshot['size'] / 1024 / 1024:>8.1f} MB  {snapshot['path']}{latest}")
+
+    elif args.command == 'snapshot':
+        db_path = args.db or getattr(Config, 'SQLITE_DB_PATH', '../data/yprompt.db')
+        backup_dir = args.dir or getattr(Config, 'BACKUP_DIR', '../data/backups')
+        result = create_snapshot(
+            db_path, backup_dir,
+            getattr(Config, 'BACKUP_PAGES_PER_STEP', PAGES_PER_STEP),
+            getattr(Config, 'BACKUP_STEP_SLEEP_MS', STEP_SLEEP * 1000) / 1000
+        )
+        apply_retention(backup_dir, getattr(Config, 'BACKUP_RETENTION', 7))
+        print(f"✅ {result['path']} ({result['size'] / 1024 / 1024:.1f} MB, {result['duration_ms']} ms)")
+
+    else:
+        if os.path.exists(args.output) and not args.force:
+            print(f'❌ 输出文件已存在: {args.output}(使用 --force 覆盖)', file=sys.stderr)
+            sys.exit(1)
+        until = datetime.strptime(args.until, '%Y-%m-%d %H:%M:%S') if args.until else None
+        result = restore(args.snapshot, args.output, until)
+        print(f"✅ 已恢复到 {result['path']}, 回放增量段 {result['segments']} 个, 完整性检查: {result['integrity']}")
+        if result['integrity'] != 'ok':
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
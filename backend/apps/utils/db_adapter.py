@@ -5,10 +5,54 @@ SQLite 数据库适配器
 仅支持 SQLite 数据库
 """
 
+import asyncio
+import time
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
 from loguru import logger
 
+from apps.utils.request_context import record_db
+from apps.utils.metrics import DB_STATEMENT_SECONDS, DB_QUEUE_WAIT_SECONDS, DB_ERRORS, DB_PENDING, sql_template_label
+from apps.utils.query_stats import QueryStats
+from apps.utils.migrations import migration_lock, baseline_migrations, run_migrations
+
+# 同一模板的慢查询执行计划最短记录间隔(秒)
+SLOW_QUERY_EXPLAIN_INTERVAL = 60
+
+# 只读操作(记录样本语句供索引分析)
+READ_OPERATIONS = ('get', 'query')
+
+# 不做 EXPLAIN 的语句类型
+EXPLAIN_SKIP_PREFIXES = ('CREATE', 'DROP', 'ALTER', 'PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK', 'VACUUM', 'ANALYZE', 'EXPLAIN')
+
+# 已验证的 aiosqlite 版本,与 requirements.txt 中的固定版本一致
+# 适配器依赖其内部接口 Connection._execute(提交到连接线程) 和 Connection._conn(底层 sqlite3 连接):
+# 公开接口每条语句的执行、取结果、提交分别往返连接线程,且无法在连接线程中执行任意函数
+# (run_sync 的 WAL 归档、在线备份、统计校准需要与本连接的写入串行),因此固定版本,升级前需重新验证
+AIOSQLITE_VERSION = '0.22.1'
+
+
+def check_aiosqlite():
+    """
+    检查已安装的 aiosqlite 是否提供适配器使用的内部接口
+    
+    版本与固定版本不同时警告;内部接口缺失时直接报错,避免之后每条语句都失败
+    """
+    import aiosqlite
+    from importlib.metadata import PackageNotFoundError, version
+    
+    try:
+        installed = version('aiosqlite')
+    except PackageNotFoundError:
+        installed = getattr(aiosqlite, '__version__', '')
+    
+    if installed != AIOSQLITE_VERSION:
+        logger.warning(f"⚠️  aiosqlite {installed or '未知版本'} 与已验证的版本 {AIOSQLITE_VERSION} 不同")
+    
+    missing = [name for name in ('_execute', '_conn') if not hasattr(aiosqlite.Connection, name)]
+    if missing:
+        raise RuntimeError(f"aiosqlite {installed} 缺少内部接口: {', '.join(missing)}")
+
 
 class DatabaseAdapter(ABC):
     """数据库适配器基类"""
@@ -34,8 +78,18 @@ class DatabaseAdapter(ABC):
         pass
     
     @abstractmethod
-    async def execute(self, sql: str, params: Optional[List] = None):
-        """执行SQL"""
+    async def execute(self, sql: str, params: Optional[List] = None) -> int:
+        """执行SQL，返回影响行数"""
+        pass
+    
+    @abstractmethod
+    async def execute_script(self, script: str):
+        """执行多条SQL组成的脚本（用于数据库迁移）"""
+        pass
+    
+    @abstractmethod
+    async def execute_many(self, sql: str, params_list: List[List]):
+        """批量执行SQL（单次提交）"""
         pass
     
     @abstractmethod
@@ -62,6 +116,24 @@ class SQLiteAdapter(DatabaseAdapter):
         
         self.db_path = config['path']
         self.db = None
+        # 日志模式（如 WAL），为空时保持数据库当前设置
+        self.journal_mode = config.get('journal_mode')
+        # 已提交未完成的语句数(排队 + 执行中)
+        self.pending = 0
+        # 最近一次提交语句的时间(perf_counter),用于判断空闲
+        self.last_activity = 0.0
+        # 已提交的写语句数(读请求合并时作为数据版本,写入后到达的读请求不复用写入前的查询)
+        self.writes = 0
+        
+        # 语句统计与慢查询日志
+        self.stats = QueryStats()
+        self.slow_query_seconds = config.get('slow_query_ms', 200) / 1000
+        self.explain_slow_queries = config.get('explain_slow_queries', True)
+        self._explained = {}
+        self._explain_tasks = set()
+        
+        # 待服务启动后后台执行的在线迁移
+        self.online_migrations = []
         
         # 确保数据库目录存在
         db_dir = os.path.dirname(self.db_path)
@@ -73,6 +145,7 @@ class SQLiteAdapter(DatabaseAdapter):
         """建立SQLite连接"""
         import aiosqlite
         
+        check_aiosqlite()
         self.db = await aiosqlite.connect(self.db_path)
         
         # 设置Row Factory，返回字典格式
@@ -80,6 +153,16 @@ class SQLiteAdapter(DatabaseAdapter):
         
         # 启用外键约束
         await self.db.execute('PRAGMA foreign_keys = ON')
+        
+        # 新建数据库启用增量 vacuum（必须在建表和切换 WAL 之前设置；已有数据库由维护任务转换）
+        await self.db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        
+        # WAL 模式下读事务不阻塞写入（在线备份、只读分析连接可与请求并行）
+        if self.journal_mode:
+            async with self.db.execute(f'PRAGMA journal_mode = {self.journal_mode}') as cursor:
+                row = await cursor.fetchone()
+            if row and row[0].lower() != self.journal_mode.lower():
+                logger.warning(f"⚠️  SQLite日志模式设置失败: 期望 {self.journal_mode}，实际 {row[0]}")
         await self.db.commit()
         
         logger.info(f"✅ SQLite连接成功: {self.db_path}")
@@ -90,44 +173,212 @@ class SQLiteAdapter(DatabaseAdapter):
             await self.db.close()
             logger.info("✅ SQLite连接已关闭")
     
+    async def _run(self, operation: str, sql: str, fn, *args):
+        """
+        在连接线程中执行语句并记录指标
+        
+        整个操作(执行、取结果、转字典、提交)作为一个任务提交到 aiosqlite 的连接线程,
+        每条语句只往返一次;排队等待与执行耗时分开统计
+        """
+        submitted = time.perf_counter()
+        self.last_activity = submitted
+        if operation not in READ_OPERATIONS:
+            self.writes += 1
+        
+        self.pending += 1
+        DB_PENDING.inc()
+        try:
+            wait, elapsed, result = await self._in_thread(self._timed_call, fn, sql, args, submitted)
+        except Exception:
+            DB_ERRORS.inc(operation)
+            self.stats.record_error(sql_template_label(sql), operation)
+            raise
+        finally:
+            self.pending -= 1
+            DB_PENDING.dec()
+        
+        record_db(wait, elapsed)
+        template = sql_template_label(sql)
+        DB_QUEUE_WAIT_SECONDS.observe(wait)
+        DB_STATEMENT_SECONDS.observe(elapsed, operation, template)
+        self.stats.record(template, operation, elapsed, (sql, args[0]) if operation in READ_OPERATIONS else None)
+        
+        if elapsed >= self.slow_query_seconds:
+            self._on_slow_query(operation, sql, template, elapsed, args)
+        return result
+    
+    def _on_slow_query(self, operation, sql, template, elapsed, args):
+        """记录慢查询日志,并在后台获取执行计划(同一模板限频)"""
+        logger.warning(f'⚠️  慢查询: {elapsed * 1000:.1f} ms, operation={operation}, sql={template[:500]}')
+        
+        if not self.explain_slow_queries or template.lstrip().upper().startswith(EXPLAIN_SKIP_PREFIXES):
+            return
+        
+        now = time.monotonic()
+        if now - self._explained.get(template, -SLOW_QUERY_EXPLAIN_INTERVAL) < SLOW_QUERY_EXPLAIN_INTERVAL:
+            return
+        self._explained[template] = now
+        
+        # execute_many 使用第一组参数
+        params = args[0] if args else []
+        if operation == 'execute_many':
+            params = params[0] if params else []
+        
+        # 不阻塞当前请求,执行计划在连接线程队列中排队获取
+        task = asyncio.create_task(self._explain(sql, template, params))
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+    
+    async def _explain(self, sql, template, params):
+        """获取并记录执行计划"""
+        try:
+            plan = await self.explain(sql, params)
+            if not plan:
+                return
+            self.stats.record_plan(template, plan)
+            logger.warning(f'⚠️  慢查询执行计划: sql={template[:200]}\n' + '\n'.join(plan))
+        except Exception as e:
+            logger.debug('获取执行计划失败: {}', e)
+    
+    async def explain(self, sql: str, params: Optional[List] = None) -> List[str]:
+        """
+        获取 EXPLAIN QUERY PLAN 结果
+        
+        Returns:
+            list: 按层级缩进的计划步骤
+        """
+        def explain_plan(conn):
+            cursor = conn.execute('EXPLAIN QUERY PLAN ' + sql, params or [])
+            try:
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+            
+            # (id, parent, notused, detail),按 parent 计算缩进层级
+            depth = {0: -1}
+            lines = []
+            for row in rows:
+                level = depth.get(row[1], -1) + 1
+                depth[row[0]] = level
+                lines.append('  ' * level + row[3])
+            return lines
+        
+        return await self._in_thread(explain_plan)
+    
+    async def run_sync(self, fn, *args):
+        """
+        在连接线程中执行同步函数 fn(conn, *args)
+        
+        与其他语句串行执行，期间不会插入本连接的写入（用于 WAL 归档等需要与写入互斥的操作）
+        """
+        return await self._in_thread(fn, *args)
+    
+    async def _in_thread(self, fn, *args):
+        """
+        在 aiosqlite 的连接线程中执行 fn(conn, *args),conn 为底层 sqlite3 连接
+        
+        适配器中唯一使用 aiosqlite 内部接口的地方(版本范围由 check_aiosqlite 检查)
+        """
+        db = self.db
+        
+        def call():
+            return fn(db._conn, *args)
+        
+        return await db._execute(call)
+    
+    @staticmethod
+    def _timed_call(conn, fn, sql, args, submitted):
+        """连接线程内执行: 返回 (排队等待, 执行耗时, 结果)"""
+        started = time.perf_counter()
+        result = fn(conn, sql, *args)
+        return started - submitted, time.perf_counter() - started, result
+    
+    @staticmethod
+    def rows_to_dicts(rows) -> List[Dict]:
+        """sqlite3.Row 列表转为字典列表"""
+        return [dict(row) for row in rows]
+    
     async def get(self, sql: str, params: Optional[List] = None) -> Optional[Dict]:
         """查询单条记录"""
-        async with self.db.execute(sql, params or []) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                # aiosqlite.Row 转为字典
-                return dict(row)
-            return None
+        def fetch_one(conn, sql, params):
+            cursor = conn.execute(sql, params)
+            try:
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+            # sqlite3.Row 转为字典
+            return dict(row) if row else None
+        
+        return await self._run('get', sql, fetch_one, params or [])
     
     async def query(self, sql: str, params: Optional[List] = None) -> List[Dict]:
         """查询多条记录"""
-        async with self.db.execute(sql, params or []) as cursor:
-            rows = await cursor.fetchall()
-            # 转为字典列表
-            return [dict(row) for row in rows]
-    
-    async def execute(self, sql: str, params: Optional[List] = None):
-        """执行SQL"""
-        await self.db.execute(sql, params or [])
+        def fetch_all(conn, sql, params):
+            cursor = conn.execute(sql, params)
+            try:
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+            return self.rows_to_dicts(rows)
+        
+        return await self._run('query', sql, fetch_all, params or [])
+    
+    async def execute(self, sql: str, params: Optional[List] = None) -> int:
+        """执行SQL，返回影响行数"""
+        def execute_commit(conn, sql, params):
+            cursor = conn.execute(sql, params)
+            try:
+                rowcount = cursor.rowcount
+            finally:
+                cursor.close()
+            conn.commit()
+            return rowcount
+        
+        return await self._run('execute', sql, execute_commit, params or [])
+    
+    async def execute_script(self, script: str):
+        """执行多条SQL组成的脚本（用于数据库迁移）"""
+        await self.db.executescript(script)
         await self.db.commit()
     
+    async def execute_many(self, sql: str, params_list: List[List]):
+        """批量执行SQL（单次提交）"""
+        if not params_list:
+            return
+        
+        def execute_many_commit(conn, sql, params_list):
+            conn.executemany(sql, params_list).close()
+            conn.commit()
+        
+        await self._run('execute_many', sql, execute_many_commit, params_list)
+    
+    async def _insert(self, sql: str, params: List) -> int:
+        """执行插入并返回自增ID"""
+        def insert_commit(conn, sql, params):
+            cursor = conn.execute(sql, params)
+            try:
+                lastrowid = cursor.lastrowid
+            finally:
+                cursor.close()
+            conn.commit()
+            return lastrowid
+        
+        return await self._run('insert', sql, insert_commit, params)
+    
     async def table_insert(self, table: str, data: Dict) -> int:
         """插入数据"""
         columns = ', '.join(data.keys())
         placeholders = ', '.join(['?' for _ in data])
         sql = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
         
-        cursor = await self.db.execute(sql, list(data.values()))
-        await self.db.commit()
-        return cursor.lastrowid
+        return await self._insert(sql, list(data.values()))
     
     async def table_update(self, table: str, data: Dict, where: str):
         """更新数据"""
         set_clause = ', '.join([f"{k} = ?" for k in data.keys()])
         sql = f"UPDATE {table} SET {set_clause} WHERE {where}"
         
-        await self.db.execute(sql, list(data.values()))
-        await self.db.commit()
+        await self.execute(sql, list(data.values()))
     
     def transaction(self):
         """事务（SQLite自动提交模式下使用begin/commit）"""
@@ -153,8 +404,16 @@ async def create_database_adapter(db_type: str, config: Dict, app_config: Dict =
     adapter = SQLiteAdapter(config)
     await adapter.connect()
     
-    # 检查是否需要初始化数据库
-    await _initialize_sqlite_if_needed(adapter, app_config)
+    # 多个 worker 同时启动时只允许一个进程初始化和迁移，其余等待完成
+    async with migration_lock(adapter.db_path):
+        # 检查是否需要初始化数据库
+        created = await _initialize_sqlite_if_needed(adapter, app_config)
+        
+        if created:
+            # 初始化脚本已是最新表结构，直接标记所有迁移为已执行
+            await baseline_migrations(adapter)
+        else:
+            adapter.online_migrations = await run_migrations(adapter)
     
     return adapter
 
@@ -167,6 +426,9 @@ async def _initialize_sqlite_if_needed(adapter: SQLiteAdapter, config: Dict = No
     Args:
         adapter: SQLite适配器
         config: 应用配置（用于获取默认管理员账号配置）
+        
+    Returns:
+        bool: 是否新建了数据库
     """
     try:
         # 检查users表是否存在
@@ -198,19 +460,28 @@ async def _initialize_sqlite_if_needed(adapter: SQLiteAdapter, config: Dict = No
                 
                 # 创建默认管理员账号（从配置读取）
                 await _create_default_admin(adapter, config)
+                return True
                 
             else:
                 logger.warning(f"⚠️  未找到SQLite初始化脚本: {script_path}")
         else:
             logger.info("✅ SQLite数据库已存在，跳过表结构初始化")
-            # 数据库已存在，但仍然需要检查并同步管理员账号
-            await _sync_admin_account(adapter, config)
+        
+        return False
             
     except Exception as e:
         logger.error(f"❌ SQLite数据库初始化检查失败: {e}")
         raise
 
 
+async def _hash_password(password: str) -> str:
+    """bcrypt 计算密码哈希(约 0.3 秒,在线程池中执行,不占用事件循环)"""
+    import bcrypt
+    
+    salt = bcrypt.gensalt(rounds=12)
+    return (await asyncio.to_thread(bcrypt.hashpw, password.encode('utf-8'), salt)).decode('utf-8')
+
+
 async def _create_default_admin(adapter: SQLiteAdapter, config: Dict = None):
     """
     创建默认管理员账号（仅用于首次初始化）
@@ -241,19 +512,14 @@ async def _create_default_admin(adapter: SQLiteAdapter, config: Dict = None):
             logger.info(f"✅ 管理员账号已存在: {admin_username}")
             return
         
-        # 生成密码哈希
-        import bcrypt
-        password_bytes = admin_password.encode('utf-8')
-        salt = bcrypt.gensalt(rounds=12)
-        password_hash = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
-        
-        # 插入默认管理员账号
+        # 插入默认管理员账号（保证管理员 id 为 1）
+        # 密码哈希只在首次创建时计算一次，账号创建后立即可以登录；之后的启动由 sync_admin_account 只做校验
         await adapter.execute(
             """
             INSERT INTO users (username, password_hash, name, auth_type, is_admin, is_active)
             VALUES (?, ?, ?, 'local', 1, 1)
             """,
-            [admin_username, password_hash, admin_name]
+            [admin_username, await _hash_password(admin_password), admin_name]
         )
         
         logger.info(f"✅ 默认管理员账号创建成功: {admin_username} / {admin_password}")
@@ -263,19 +529,22 @@ async def _create_default_admin(adapter: SQLiteAdapter, config: Dict = None):
         raise
 
 
-async def _sync_admin_account(adapter: SQLiteAdapter, config: Dict = None):
+async def sync_admin_account(adapter: SQLiteAdapter, config: Dict = None):
     """
-    同步管理员账号（每次启动时执行）
+    同步管理员账号（每次启动后在后台执行，不阻塞服务启动）
     - 如果配置的管理员用户名对应的账号不存在，则创建
-    - 如果存在，则更新密码（仅当密码哈希不匹配时）
+    - 如果存在，先用 bcrypt.checkpw 校验当前哈希，仅当哈希为空或不匹配时才重新生成
     
-    这样可以确保环境变量 ADMIN_USERNAME 和 ADMIN_PASSWORD 始终生效
+    这样可以确保环境变量 ADMIN_USERNAME 和 ADMIN_PASSWORD 始终生效；
+    bcrypt 计算在线程池中执行，不占用事件循环
     
     Args:
         adapter: SQLite适配器
         config: 应用配置
     """
     try:
+        import bcrypt
+        
         # 从配置读取管理员账号信息
         admin_username = 'admin'
         admin_password = 'admin123'
@@ -287,12 +556,7 @@ async def _sync_admin_account(adapter: SQLiteAdapter, config: Dict = None):
             admin_name = config.get('DEFAULT_ADMIN_NAME', '管理员')
         
         logger.info(f"🔄 开始同步管理员账号: username={admin_username}")
-        
-        # 生成密码哈希
-        import bcrypt
         password_bytes = admin_password.encode('utf-8')
-        salt = bcrypt.gensalt(rounds=12)
-        password_hash = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
         
         # 检查管理员账号是否已存在
         existing_admin = await adapter.get(
@@ -303,34 +567,33 @@ async def _sync_admin_account(adapter: SQLiteAdapter, config: Dict = None):
         if existing_admin:
             # 账号已存在，检查密码是否需要更新
             # 注意：由于bcrypt每次生成的salt不同，我们需要验证密码而不是直接比较哈希
-            old_hash = existing_admin.get('password_hash', '')
+            old_hash = existing_admin.get('password_hash') or ''
             
             if not old_hash:
-                # 密码哈希为空，需要更新
-                logger.warning(f"⚠️  管理员账号密码哈希为空，正在更新...")
-                await adapter.execute(
-                    "UPDATE users SET password_hash = ?, name = ? WHERE id = ?",
-                    [password_hash, admin_name, existing_admin['id']]
-                )
-                logger.info(f"✅ 管理员账号密码已更新: {admin_username}")
+                # 密码哈希为空（旧版本首次启动创建的账号），需要更新
+                logger.info("🔄 管理员账号密码哈希为空，正在生成...")
+                is_password_correct = False
             else:
                 # 验证当前密码是否正确
                 try:
-                    is_password_correct = bcrypt.checkpw(password_bytes, old_hash.encode('utf-8'))
+                    is_password_correct = await asyncio.to_thread(
+                        bcrypt.checkpw, password_bytes, old_hash.encode('utf-8')
+                    )
                 except Exception as e:
                     logger.warning(f"⚠️  密码验证出错: {e}，将更新密码哈希")
                     is_password_correct = False
                 
                 if not is_password_correct:
-                    # 密码不匹配，需要更新
-                    logger.info(f"🔄 管理员账号密码不匹配，正在更新...")
-                    await adapter.execute(
-                        "UPDATE users SET password_hash = ?, name = ? WHERE id = ?",
-                        [password_hash, admin_name, existing_admin['id']]
-                    )
-                    logger.info(f"✅ 管理员账号密码已更新: {admin_username}")
-                else:
-                    logger.info(f"✅ 管理员账号配置正确: {admin_username}")
+                    logger.info("🔄 管理员账号密码不匹配，正在更新...")
+            
+            if is_password_correct:
+                logger.info(f"✅ 管理员账号配置正确: {admin_username}")
+            else:
+                await adapter.execute(
+                    "UPDATE users SET password_hash = ?, name = ? WHERE id = ?",
+                    [await _hash_password(admin_password), admin_name, existing_admin['id']]
+                )
+                logger.info(f"✅ 管理员账号密码已更新: {admin_username}")
         else:
             # 账号不存在，创建新账号
             await adapter.execute(
@@ -338,10 +601,10 @@ async def _sync_admin_account(adapter: SQLiteAdapter, config: Dict = None):
                 INSERT INTO users (username, password_hash, name, auth_type, is_admin, is_active)
                 VALUES (?, ?, ?, 'local', 1, 1)
                 """,
-                [admin_username, password_hash, admin_name]
+                [admin_username, await _hash_password(admin_password), admin_name]
             )
             logger.info(f"✅ 管理员账号创建成功: {admin_username} / {admin_password}")
     
     except Exception as e:
+        # 在后台任务中执行，失败只记录日志，下次启动时重试
         logger.error(f"❌ 同步管理员账号失败: {e}")
-        raise
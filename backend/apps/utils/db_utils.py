@@ -1,5 +1,7 @@
+import asyncio
 from loguru import logger
-from apps.utils.db_adapter import create_database_adapter
+from apps.utils.db_adapter import create_database_adapter, sync_admin_account
+from apps.utils.migrations import run_online_migrations
 from config.settings import Config
 
 
@@ -11,7 +13,10 @@ async def init_database(app):
     
     # SQLite配置
     config = {
-        'path': getattr(Config, 'SQLITE_DB_PATH', 'data/yprompt.db')
+        'path': getattr(Config, 'SQLITE_DB_PATH', 'data/yprompt.db'),
+        'journal_mode': getattr(Config, 'SQLITE_JOURNAL_MODE', 'WAL'),
+        'slow_query_ms': getattr(Config, 'SLOW_QUERY_MS', 200),
+        'explain_slow_queries': getattr(Config, 'SLOW_QUERY_EXPLAIN', True),
     }
     logger.info(f"📁 SQLite数据库路径: {config['path']}")
     
@@ -28,6 +33,15 @@ async def init_database(app):
     app.state.db = adapter
     app.state.db_type = 'sqlite'
     
+    # 管理员账号同步需要 bcrypt 校验（约 0.3 秒），启动后在后台执行
+    app.state.admin_sync_task = asyncio.create_task(sync_admin_account(adapter, app_config))
+    
+    # 耗时的数据回填迁移在后台分批执行，不阻塞服务启动
+    app.state.migration_task = None
+    if adapter.online_migrations:
+        logger.info(f"🔄 后台执行在线迁移: {adapter.online_migrations}")
+        app.state.migration_task = asyncio.create_task(run_online_migrations(adapter))
+    
     logger.info("✅ SQLite数据库初始化成功")
 
 
@@ -35,6 +49,16 @@ async def close_database(app):
     """
     关闭数据库连接（FastAPI）
     """
+    # 未完成的在线迁移和管理员账号同步下次启动时继续执行
+    for name in ('migration_task', 'admin_sync_task'):
+        task = getattr(app.state, name, None)
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    
     if hasattr(app.state, 'db'):
         await app.state.db.close()
         logger.info("✅ 数据库连接已关闭")
@@ -0,0 +1,187 @@
+"""
+进程内事件推送(发布/订阅)
+服务层写入提交后按用户发布轻量事件,SSE 连接(/api/events)订阅当前用户的事件:
+- 发布是同步调用,耗时只与该用户的连接数有关: 事件只序列化一次,各连接共享同一份字节串
+- 空闲连接只是一个等待 asyncio.Event 的协程;心跳由一个共享任务统一唤醒,不为每个连接创建定时器
+- 每个连接的缓冲区有上限,客户端读取过慢时丢弃最早的事件,并推送 resync 事件通知客户端通过 /api/sync 补齐
+- 队列在进程内,多 worker 部署时只能收到同一 worker 处理的写入;客户端重连后应先调用 /api/sync
+"""
+import asyncio
+import datetime
+import json
+from collections import deque
+
+from loguru import logger
+
+from apps.utils.metrics import SSE_CONNECTIONS, SSE_EVENTS
+from config.settings import Config
+
+HEARTBEAT = b': heartbeat\n\n'
+RESYNC = b'event: resync\ndata: {}\n\n'
+
+
+class Subscription:
+    """一个 SSE 连接的事件缓冲区"""
+
+    __slots__ = ('user_id', 'buffer', 'wakeup', 'dropped', 'heartbeat', 'closed')
+
+    def __init__(self, user_id, buffer_size):
+        self.user_id = user_id
+        self.buffer = deque(maxlen=buffer_size)
+        self.wakeup = asyncio.Event()
+        # 缓冲区满时丢弃的事件数(下次读取时先推送 resync)
+        self.dropped = 0
+        self.heartbeat = False
+        self.closed = False
+
+    def push(self, payload):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+            SSE_EVENTS.inc('dropped')
+        self.buffer.append(payload)
+        self.wakeup.set()
+
+    async def next_chunk(self):
+        """
+        等待并返回下一段要发送的数据
+
+        Returns:
+            bytes: 缓冲区中的全部事件,或心跳注释;连接被关闭时返回 None
+        """
+        while not self.buffer and not self.heartbeat and not self.closed:
+            self.wakeup.clear()
+            await self.wakeup.wait()
+        if self.closed:
+            return None
+
+        chunks = []
+        if self.dropped:
+            chunks.append(RESYNC)
+            self.dropped = 0
+        chunks.extend(self.buffer)
+        self.buffer.clear()
+        if not chunks:
+            chunks.append(HEARTBEAT)
+        self.heartbeat = False
+        return b''.join(chunks)
+
+
+class EventHub:
+    """
+    按用户分组的订阅表: user_id -> {Subscription}
+
+    heartbeat 为心跳间隔(秒),buffer_size 为每个连接最多缓存的事件数,
+    max_per_user 为每个用户的最大连接数(超出时拒绝新连接)
+    """
+
+    def __init__(self, heartbeat=15, buffer_size=100, max_per_user=10):
+        self.heartbeat = heartbeat
+        self.buffer_size = buffer_size
+        self.max_per_user = max_per_user
+        self._subscribers = {}
+        self._count = 0
+        self._next_id = 0
+        self._heartbeat_task = None
+
+    def __len__(self):
+        return self._count
+
+    def is_full(self, user_id):
+        """该用户的连接数是否已达上限"""
+        return len(self._subscribers.get(user_id, ())) >= self.max_per_user
+
+    def subscribe(self, user_id):
+        """
+        新建订阅
+
+        Returns:
+            Subscription: 已达到该用户的连接上限时返回 None
+        """
+        if self.is_full(user_id):
+            return None
+        subscriptions = self._subscribers.setdefault(user_id, set())
+        subscription = Subscription(user_id, self.buffer_size)
+        subscriptions.add(subscription)
+        self._count += 1
+        SSE_CONNECTIONS.inc()
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._send_heartbeats())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        self._count -= 1
+        SSE_CONNECTIONS.dec()
+        if not subscriptions:
+            del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, event, data):
+        """
+        向该用户的所有连接发布事件(同步调用,写入提交后执行)
+
+        Args:
+            user_id: 用户ID
+            event: 事件类型(SSE event 字段)
+            data: 事件数据(可 JSON 序列化)
+        """
+        subscriptions = self._subscribers.get(user_id)
+        if not subscriptions:
+            return
+        self._next_id += 1
+        payload = (
+            f'id: {self._next_id}\nevent: {event}\n'
+            f'data: {json.dumps(data, ensure_ascii=False, separators=(",", ":"))}\n\n'
+        ).encode('utf-8')
+        for subscription in subscriptions:
+            subscription.push(payload)
+        SSE_EVENTS.inc('delivered', amount=len(subscriptions))
+
+    async def _send_heartbeats(self):
+        """定时唤醒空闲连接发送心跳(保持代理和负载均衡器上的连接不被回收);没有连接时退出"""
+        while self._count:
+            await asyncio.sleep(self.heartbeat)
+            for subscriptions in self._subscribers.values():
+                for subscription in subscriptions:
+                    subscription.heartbeat = True
+                    subscription.wakeup.set()
+
+    async def close(self):
+        """关闭所有连接(服务关闭时调用,避免长连接阻塞关闭)"""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+        if self._count:
+            logger.info(f'🔄 关闭事件推送连接: {self._count} 个')
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.closed = True
+                subscription.wakeup.set()
+
+
+# 进程内共享的事件中心
+events = EventHub(
+    getattr(Config, 'SSE_HEARTBEAT_SECONDS', 15),
+    getattr(Config, 'SSE_BUFFER_SIZE', 100),
+    getattr(Config, 'SSE_MAX_CONNECTIONS_PER_USER', 10)
+)
+
+
+def notify_prompt_changed(user_id, event, prompt_id, current_version=None, **fields):
+    """
+    提示词或版本写入提交后推送事件
+
+    Args:
+        user_id: 用户ID
+        event: 事件类型(prompt.created/prompt.updated/prompt.deleted/version.created)
+        prompt_id: 提示词ID
+        current_version: 当前版本号(删除时为空)
+        fields: 其他字段(如 version_id)
+    """
+    data = {'prompt_id': prompt_id, **fields}
+    if event != 'prompt.deleted':
+        data['current_version'] = current_version
+        # 与触发器写入的 update_time(CURRENT_TIMESTAMP,UTC)格式一致
+        data['update_time'] = datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    events.publish(user_id, event, data)
@@ -0,0 +1,29 @@
+"""
+进程间文件锁
+多 worker 部署时保证后台任务(定时备份、数据库维护)只在一个进程中运行
+"""
+import os
+
+
+def try_lock(path):
+    """
+    尝试获取排他文件锁(不阻塞),锁在返回的文件对象关闭前一直持有
+
+    Returns:
+        文件对象(获得锁)或 None(其他进程持有锁)
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    lock_file = open(path, 'a')
+    try:
+        import fcntl
+    except ImportError:
+        # Windows 不支持 fcntl,单进程部署时无需加锁
+        return lock_file
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
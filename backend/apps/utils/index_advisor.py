@@ -0,0 +1,357 @@
+"""
+索引建议工具
+根据线上 SQL 模板的 EXPLAIN QUERY PLAN 找出全表扫描和临时 B 树排序,
+推荐组合索引(等值条件列 + 排序列),在数据库副本上对比建索引前后的耗时并生成迁移脚本
+
+用法(在 backend 目录下):
+    # 使用 GET /api/monitoring/queries?limit=200 导出的 JSON 中的样本语句
+    python -m apps.utils.index_advisor --db ../data/yprompt.db --queries queries.json --output advice.sql
+
+    # 不提供 --queries 时使用内置的常用列表查询
+    python -m apps.utils.index_advisor --db ../data/yprompt.db
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+FROM_PATTERN = re.compile(r'\bFROM\s+(\w+)(?:\s+(?:AS\s+)?(?!WHERE\b|LEFT\b|INNER\b|JOIN\b|ORDER\b|GROUP\b|LIMIT\b)(\w+))?', re.IGNORECASE)
+WHERE_PATTERN = re.compile(r'\bWHERE\b(.*?)(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|$)', re.IGNORECASE | re.DOTALL)
+ORDER_PATTERN = re.compile(r'\bORDER\s+BY\b(.*?)(?=\bLIMIT\b|$)', re.IGNORECASE | re.DOTALL)
+EQUALITY_PATTERN = re.compile(r'(?:\b(\w+)\.)?\b(\w+)\s*=\s*(?:\?|\'(?:[^\']|\'\')*\'|-?\d+(?:\.\d+)?)')
+ORDER_TERM_PATTERN = re.compile(r'^(?:(\w+)\.)?(\w+)(?:\s+(ASC|DESC))?$', re.IGNORECASE)
+PARENTHESES_PATTERN = re.compile(r'\([^()]*\)')
+
+# 需要关注的执行计划问题
+ISSUE_FULL_SCAN = 'full_scan'
+ISSUE_TEMP_BTREE = 'temp_btree'
+
+# 建索引后至少快多少倍才保留
+MIN_SPEEDUP = 1.2
+
+
+def connect_readonly(db_path):
+    """
+    打开只读连接
+
+    URI 中的路径需要百分号编码,否则路径含 ?、#、% 时被截断或解析错误
+    """
+    return sqlite3.connect(Path(db_path).resolve().as_uri() + '?mode=ro', uri=True)
+
+
+def explain(conn, sql, params=None):
+    """返回 EXPLAIN QUERY PLAN 的步骤描述列表"""
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params or []).fetchall()]
+
+
+def plan_issues(plan):
+    """
+    从执行计划中找出问题
+
+    Returns:
+        list: [(问题类型, 计划步骤), ...]
+    """
+    issues = []
+    for step in plan:
+        upper = step.upper()
+        # "SCAN prompts" / "SCAN TABLE prompts"(旧版本)且未使用索引
+        if upper.startswith('SCAN') and 'USING' not in upper:
+            issues.append((ISSUE_FULL_SCAN, step))
+        elif 'USE TEMP B-TREE' in upper:
+            issues.append((ISSUE_TEMP_BTREE, step))
+    return issues
+
+
+def table_columns(conn, table):
+    """表的列名集合"""
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})').fetchall()}
+
+
+def existing_indexes(conn, table):
+    """
+    表上已有索引的列序列
+
+    Returns:
+        dict: {索引名: (列1, 列2, ...)}
+    """
+    indexes = {}
+    for row in conn.execute(f'PRAGMA index_list({table})').fetchall():
+        name = row[1]
+        columns = [info[2] for info in conn.execute(f'PRAGMA index_info({name})').fetchall()]
+        indexes[name] = tuple(columns)
+    return indexes
+
+
+def propose_index(conn, sql):
+    """
+    根据语句推荐组合索引: 主表上 AND 连接的等值条件列在前,排序列在后
+
+    只处理 FROM 后的第一张表;OR/括号内的条件不参与推荐
+
+    Returns:
+        tuple: (表名, (列...)) 或 None
+    """
+    from_match = FROM_PATTERN.search(sql)
+    if not from_match:
+        return None
+    table, alias = from_match.group(1), from_match.group(2)
+    if table.lower().startswith('sqlite_'):
+        return None
+    qualifiers = {table.lower()} | ({alias.lower()} if alias else set())
+
+    columns = table_columns(conn, table)
+    if not columns:
+        return None
+
+    def own_column(qualifier, column):
+        return column in columns and (qualifier is None or qualifier.lower() in qualifiers)
+
+    # 1. 等值条件(去掉括号内的 OR 组合和 IN 列表)
+    equality = []
+    where_match = WHERE_PATTERN.search(sql[from_match.end():])
+    if where_match:
+        where = where_match.group(1)
+        while PARENTHESES_PATTERN.search(where):
+            where = PARENTHESES_PATTERN.sub(' ', where)
+        if re.search(r'\bOR\b', where, re.IGNORECASE):
+            return None
+        for qualifier, column in EQUALITY_PATTERN.findall(where):
+            if own_column(qualifier or None, column) and column not in equality:
+                equality.append(column)
+
+    # 2. 排序列(只接受主表的普通列)
+    ordering = []
+    order_match = ORDER_PATTERN.search(sql[from_match.end():])
+    if order_match:
+        for term in order_match.group(1).split(','):
+            term_match = ORDER_TERM_PATTERN.match(term.strip())
+            if not term_match or not own_column(term_match.group(1), term_match.group(2)):
+                ordering = []
+                break
+            if term_match.group(2) not in equality and term_match.group(2) not in ordering:
+                ordering.append(term_match.group(2))
+
+    if not ordering and len(equality) < 2:
+        # 单列等值条件通常已有单列索引,不值得额外推荐
+        return None
+
+    return table, tuple(equality + ordering)
+
+
+def compact(sql, length=120):
+    """折叠空白并截断,用于输出"""
+    return re.sub(r'\s+', ' ', sql).strip()[:length]
+
+
+def index_name(table, columns):
+    """推荐索引的名称"""
+    return 'idx_' + table + '_' + '_'.join(columns)
+
+
+def is_covered(conn, table, columns):
+    """已有索引是否以推荐列为前缀"""
+    return any(existing[:len(columns)] == columns for existing in existing_indexes(conn, table).values())
+
+
+def time_query(conn, sql, params, repeat):
+    """执行多次返回中位耗时(毫秒)"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params or []).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def builtin_queries(conn):
+    """内置的常用列表查询(使用提示词最多的用户作为参数)"""
+    row = conn.execute('SELECT user_id FROM prompts GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1').fetchone()
+    user_id = row[0] if row else 1
+    row = conn.execute('SELECT prompt_id FROM prompt_versions GROUP BY prompt_id ORDER BY COUNT(*) DESC LIMIT 1').fetchone()
+    prompt_id = row[0] if row else 1
+
+    queries = [
+        (f'SELECT id, title FROM prompts WHERE user_id = {user_id} ORDER BY {column} DESC LIMIT 20 OFFSET 0', [])
+        for column in ('create_time', 'update_time', 'view_count', 'use_count')
+    ]
+    queries.append((f'SELECT id, title FROM prompts WHERE user_id = {user_id} AND is_favorite = 1 '
+                    f'ORDER BY create_time DESC LIMIT 20 OFFSET 0', []))
+    queries.append((f'SELECT v.id, v.version_number FROM prompt_versions v WHERE v.prompt_id = {prompt_id} '
+                    f'ORDER BY v.create_time DESC LIMIT 20 OFFSET 0', []))
+    queries.append((f'SELECT tag_name, use_count FROM prompt_tags WHERE user_id = {user_id} '
+                    f'ORDER BY use_count DESC, create_time DESC', []))
+    return queries
+
+
+def load_queries(path):
+    """
+    从统计接口导出的 JSON 中读取样本语句
+
+    接受完整响应({'data': {'items': [...]}})或 items 列表
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = json.load(f)
+    if isinstance(content, dict):
+        content = content.get('data', content).get('items', [])
+    return [
+        (item['sample']['sql'], item['sample'].get('params') or [])
+        for item in content if item.get('sample')
+    ]
+
+
+def analyze(conn, queries):
+    """
+    分析语句执行计划并汇总推荐索引
+
+    Returns:
+        tuple: (每条语句的分析结果列表, {(表, 列): 推荐来源语句列表})
+    """
+    results = []
+    candidates = {}
+    for sql, params in queries:
+        try:
+            plan = explain(conn, sql, params)
+        except sqlite3.Error as e:
+            results.append({'sql': sql, 'error': str(e)})
+            continue
+
+        issues = plan_issues(plan)
+        proposal = propose_index(conn, sql) if issues else None
+        if proposal and is_covered(conn, *proposal):
+            proposal = None
+        if proposal:
+            candidates.setdefault(proposal, []).append((sql, params))
+
+        results.append({
+            'sql': sql,
+            'plan': plan,
+            'issues': [issue for issue, _ in issues],
+            'proposal': index_name(*proposal) if proposal else None,
+            'proposal_columns': list(proposal[1]) if proposal else None,
+        })
+    return results, candidates
+
+
+def evaluate(db_path, queries, candidates, repeat=20):
+    """
+    在数据库副本上对比建索引前后的耗时
+
+    Returns:
+        list: 每条语句的对比结果 {'sql', 'before_ms', 'after_ms', 'speedup', 'index', 'plan_before', 'plan_after'}
+    """
+    work_dir = tempfile.mkdtemp(prefix='index_advisor_')
+    copy_path = os.path.join(work_dir, 'copy.db')
+    try:
+        # 使用在线备份接口复制,不影响正在运行的服务
+        source = sqlite3.connect(db_path)
+        target = sqlite3.connect(copy_path)
+        source.backup(target)
+        source.close()
+
+        before = {}
+        for sql, params in queries:
+            before[sql] = (time_query(target, sql, params, repeat), explain(target, sql, params))
+
+        for table, columns in candidates:
+            target.execute(f'CREATE INDEX IF NOT EXISTS {index_name(table, columns)} ON {table}({", ".join(columns)})')
+        target.execute('ANALYZE')
+        target.commit()
+
+        comparisons = []
+        for sql, params in queries:
+            after_ms = time_query(target, sql, params, repeat)
+            after_plan = explain(target, sql, params)
+            used = next(
+                (name for name in (index_name(*candidate) for candidate in candidates)
+                 if any(name in step for step in after_plan)),
+                None
+            )
+            before_ms, before_plan = before[sql]
+            comparisons.append({
+                'sql': sql,
+                'before_ms': round(before_ms, 3),
+                'after_ms': round(after_ms, 3),
+                'speedup': round(before_ms / after_ms, 2) if after_ms > 0 else None,
+                'index': used,
+                'plan_before': before_plan,
+                'plan_after': after_plan,
+            })
+        target.close()
+        return comparisons
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def render_migration(candidates, comparisons):
+    """
+    生成迁移脚本: 只保留至少一条语句使用且提速达到 MIN_SPEEDUP 的索引
+    """
+    lines = [
+        '-- 索引建议(由 apps.utils.index_advisor 生成)',
+        f'-- 生成时间: {time.strftime("%Y-%m-%d %H:%M:%S")}',
+        '',
+    ]
+    accepted = 0
+    for table, columns in candidates:
+        name = index_name(table, columns)
+        used_by = [item for item in comparisons if item['index'] == name]
+        if not used_by or max(item['speedup'] or 0 for item in used_by) < MIN_SPEEDUP:
+            continue
+        accepted += 1
+        for item in used_by:
+            lines.append(f'-- {item["before_ms"]:.3f} ms -> {item["after_ms"]:.3f} ms: {compact(item["sql"], 150)}')
+        lines.append(f'CREATE INDEX IF NOT EXISTS {name} ON {table}({", ".join(columns)});')
+        lines.append('')
+    if not accepted:
+        lines.append('-- 没有需要新增的索引')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='根据执行计划推荐索引')
+    parser.add_argument('--db', required=True, help='SQLite 数据库路径(只读取,测试在副本上进行)')
+    parser.add_argument('--queries', help='GET /api/monitoring/queries 导出的 JSON 文件')
+    parser.add_argument('--output', help='迁移脚本输出路径(默认打印到标准输出)')
+    parser.add_argument('--repeat', type=int, default=20, help='每条语句的计时次数')
+    args = parser.parse_args()
+
+    conn = connect_readonly(args.db)
+    queries = load_queries(args.queries) if args.queries else builtin_queries(conn)
+    results, candidates = analyze(conn, queries)
+    conn.close()
+
+    for result in results:
+        sql = compact(result['sql'])
+        if 'error' in result:
+            print(f'❌ {sql}\n   {result["error"]}', file=sys.stderr)
+            continue
+        status = ', '.join(result['issues']) or 'ok'
+        print(f'[{status}] {sql}', file=sys.stderr)
+        for step in result['plan']:
+            print(f'    {step}', file=sys.stderr)
+        if result['proposal']:
+            print(f'    -> 推荐 {result["proposal"]}({", ".join(result["proposal_columns"])})', file=sys.stderr)
+
+    comparisons = evaluate(args.db, queries, candidates, args.repeat) if candidates else []
+    for item in comparisons:
+        print(f'{item["before_ms"]:>9.3f} ms -> {item["after_ms"]:>9.3f} ms  x{item["speedup"]}  '
+              f'{item["index"] or "-"}  {compact(item["sql"], 80)}', file=sys.stderr)
+
+    migration = render_migration(candidates, comparisons)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(migration)
+        print(f'✅ 迁移脚本已写入: {args.output}', file=sys.stderr)
+    else:
+        print(migration)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,9 +4,13 @@ JWT工具类
 """
 import jwt
 import datetime
+import secrets
 from loguru import logger
 from config.settings import Config
 
+# 事件推送连接票据的 Token 类型（不能作为普通登录 Token 使用）
+STREAM_TICKET_TYPE = 'stream_ticket'
+
 
 class JWTUtil:
     """JWT Token 工具类"""
@@ -53,13 +57,38 @@ class JWTUtil:
             if isinstance(token, bytes):
                 token = token.decode('utf-8')
             
-            logger.debug(f'✅ 为用户 {user_id} 生成Token成功, 有效期: {expire_hours}小时')
+            logger.debug('✅ 为用户 {} 生成Token成功, 有效期: {}小时', user_id, expire_hours)
             return token
             
         except Exception as e:
             logger.error(f'❌ 生成Token失败: {e}')
             raise
     
+    @classmethod
+    def generate_stream_ticket(cls, user_id, expire_seconds=60):
+        """
+        生成事件推送连接票据（短期、一次性，只能用于 /api/events 的 ?ticket= 参数）
+        
+        Args:
+            user_id: 用户ID
+            expire_seconds: 有效秒数
+            
+        Returns:
+            str: 票据字符串
+        """
+        if not cls.SECRET_KEY:
+            raise ValueError('SECRET_KEY未配置,请先调用init_app初始化')
+        
+        now = datetime.datetime.utcnow()
+        payload = {
+            'user_id': user_id,
+            'exp': now + datetime.timedelta(seconds=expire_seconds),
+            'iat': now,
+            'jti': secrets.token_urlsafe(16),
+            'type': STREAM_TICKET_TYPE
+        }
+        return jwt.encode(payload, cls.SECRET_KEY, algorithm=cls.ALGORITHM)
+    
     @classmethod
     def verify_token(cls, token):
         """
@@ -77,7 +106,7 @@ class JWTUtil:
         
         try:
             payload = jwt.decode(token, cls.SECRET_KEY, algorithms=[cls.ALGORITHM])
-            logger.debug(f'✅ Token验证成功, user_id: {payload.get("user_id")}')
+            logger.debug('✅ Token验证成功, user_id: {}', payload.get('user_id'))
             return payload
             
         except jwt.ExpiredSignatureError:
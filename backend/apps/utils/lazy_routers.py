@@ -0,0 +1,84 @@
+"""
+路由懒加载
+服务启动时不导入各业务模块的路由(请求模型和服务层依赖),某个路径前缀第一次收到请求时才导入并注册;
+访问 API 文档(/docs、/redoc、/openapi.json)时导入全部路由
+"""
+import importlib
+import time
+
+from loguru import logger
+
+
+class LazyRouters:
+    """
+    按路径前缀懒加载的路由
+
+    modules: {模块名: (路径前缀, ...)},模块需提供 router(APIRouter)
+    """
+
+    def __init__(self, app, modules):
+        self.app = app
+        self.modules = dict(modules)
+        self.loaded = set()
+        # 懒加载的路由插入到创建时已注册的路由之后,之后注册的兜底路由(SPA)仍然排在最后
+        self.insert_at = len(app.router.routes)
+        self._prefixes = [
+            (prefix, module) for module, prefixes in self.modules.items() for prefix in prefixes
+        ]
+
+    def module_for(self, path):
+        """路径对应的路由模块(不属于任何前缀时返回 None)"""
+        for prefix, module in self._prefixes:
+            if path == prefix or path.startswith(prefix + '/'):
+                return module
+        return None
+
+    def load(self, module):
+        """导入模块并注册路由(已加载时直接返回)"""
+        if module in self.loaded:
+            return
+        # 先标记: 导入失败时不在每个请求上重试
+        self.loaded.add(module)
+
+        started = time.perf_counter()
+        try:
+            router = importlib.import_module(module).router
+        except ImportError as e:
+            logger.warning(f'⚠️  路由模块导入失败: {module}, {e}')
+            return
+
+        routes = self.app.router.routes
+        count = len(routes)
+        self.app.include_router(router)
+        added = routes[count:]
+        del routes[count:]
+        routes[self.insert_at:self.insert_at] = added
+        self.insert_at += len(added)
+        # 已生成的 OpenAPI 文档不包含新路由
+        self.app.openapi_schema = None
+        logger.debug('✅ 加载路由: {}, 路由数={}, 耗时 {:.1f} ms', module, len(added), (time.perf_counter() - started) * 1000)
+
+    def load_all(self):
+        for module in self.modules:
+            self.load(module)
+
+
+class LazyRouterMiddleware:
+    """请求进入路由匹配前加载对应前缀的路由(纯 ASGI 实现)"""
+
+    def __init__(self, app, routers):
+        self.app = app
+        self.routers = routers
+        fastapi_app = routers.app
+        self.doc_paths = {path for path in (fastapi_app.openapi_url, fastapi_app.docs_url, fastapi_app.redoc_url) if path}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            path = scope['path']
+            if path in self.doc_paths:
+                self.routers.load_all()
+            else:
+                module = self.routers.module_for(path)
+                if module is not None:
+                    self.routers.load(module)
+        await self.app(scope, receive, send)
@@ -0,0 +1,254 @@
+"""
+异步日志管道
+loguru 的 sink 只把格式化后的日志放入有界队列,由独立的写入线程批量写文件/控制台,
+文件轮转后的 zip 压缩和过期清理在单独的压缩线程中执行,请求处理路径上没有磁盘 IO
+
+队列积压时按级别降级:
+- 超过高水位: DEBUG 丢弃,INFO 按 1/sample_rate 采样保留
+- 队列已满: INFO 及以下丢弃;WARNING 及以上最多等待 block_timeout 秒后丢弃
+丢弃数量记录在指标中,并由写入线程定期补写一条汇总警告
+"""
+import itertools
+import os
+import queue
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from loguru import logger
+
+from apps.utils.metrics import LOG_MESSAGES_DROPPED, LOG_QUEUE_SIZE
+
+INFO_LEVEL = 20
+WARNING_LEVEL = 30
+
+# 写入线程每批最多处理的日志条数(每批只 flush 一次)
+WRITE_BATCH_SIZE = 512
+# 丢弃汇总警告的最短间隔(秒)
+DROP_REPORT_INTERVAL = 10
+
+_STOP = object()
+
+
+class StreamWriter:
+    """
+    控制台输出
+
+    进程退出阶段控制台流可能已被关闭(如 pytest 还原捕获的 stdout),此时跳过输出
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        if getattr(self.stream, 'closed', False):
+            return
+        try:
+            self.stream.write(text)
+        except (ValueError, OSError):
+            pass
+
+    def flush(self):
+        if getattr(self.stream, 'closed', False):
+            return
+        try:
+            self.stream.flush()
+        except (ValueError, OSError):
+            pass
+
+    def close(self):
+        self.flush()
+
+
+class RotatingFileWriter:
+    """
+    按大小轮转的日志文件(仅在写入线程中调用)
+
+    轮转后的文件命名为 <名称>.<时间>.log,提交到压缩线程压缩为 .zip 并清理过期文件
+    """
+
+    def __init__(self, path, max_bytes, retention_days, compressor=None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.compressor = compressor
+        self.file = None
+        self.size = 0
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.size = self.file.tell()
+
+    def write(self, text):
+        if self.file is None:
+            self._open()
+        data_size = len(text.encode('utf-8'))
+        if self.size and self.size + data_size > self.max_bytes:
+            self._rotate()
+        self.file.write(text)
+        self.size += data_size
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def _rotate(self):
+        self.file.close()
+        stamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S_%f')
+        rotated = self.path.with_name(f'{self.path.stem}.{stamp}{self.path.suffix}')
+        os.replace(self.path, rotated)
+        self._open()
+        if self.compressor is not None:
+            self.compressor.submit(self._compress, rotated)
+        else:
+            self._compress(rotated)
+
+    def _compress(self, rotated):
+        """压缩轮转后的文件并清理过期文件(压缩线程中执行)"""
+        try:
+            with zipfile.ZipFile(f'{rotated}.zip', 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.write(rotated, rotated.name)
+            os.remove(rotated)
+            self._apply_retention()
+        except Exception as e:
+            sys.stderr.write(f'日志压缩失败: {rotated}, {e}\n')
+
+    def _apply_retention(self):
+        expire = time.time() - self.retention_days * 86400
+        for archived in self.path.parent.glob(f'{self.path.stem}.*{self.path.suffix}.zip'):
+            if archived.stat().st_mtime < expire:
+                archived.unlink()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class LogPipeline:
+    """日志队列和写入线程"""
+
+    def __init__(self, max_queue=10000, sample_rate=10, block_timeout=0.05):
+        self.queue = queue.Queue(max_queue)
+        self.high_water = max_queue // 2
+        self.sample_rate = max(1, sample_rate)
+        self.block_timeout = block_timeout
+        self.compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-compress')
+        self.writers = []
+        self.dropped = 0
+        self.closed = False
+        self._sample_counter = itertools.count()
+        self._reported = 0
+        self._reported_at = 0.0
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def file_writer(self, path, max_bytes, retention_days):
+        return self._register(RotatingFileWriter(path, max_bytes, retention_days, self.compressor))
+
+    def stream_writer(self, stream):
+        return self._register(StreamWriter(stream))
+
+    def _register(self, writer):
+        self.writers.append(writer)
+        return writer
+
+    def sink(self, writer):
+        """生成 loguru sink: logger.add(pipeline.sink(writer), ...)"""
+        def enqueue(message):
+            self.put(writer, message)
+        return enqueue
+
+    def put(self, writer, message):
+        """放入队列(在调用日志的线程中执行,不做 IO)"""
+        level = message.record['level'].no
+        text = str(message)
+
+        if self.closed:
+            # 关闭后(进程退出阶段)直接同步写入
+            writer.write(text)
+            writer.flush()
+            return
+
+        if level < WARNING_LEVEL and self.queue.qsize() >= self.high_water:
+            if level < INFO_LEVEL or next(self._sample_counter) % self.sample_rate:
+                self._drop(message, 'sampled')
+                return
+
+        try:
+            self.queue.put_nowait((writer, text))
+        except queue.Full:
+            if level < WARNING_LEVEL:
+                self._drop(message, 'full')
+                return
+            try:
+                self.queue.put((writer, text), timeout=self.block_timeout)
+            except queue.Full:
+                self._drop(message, 'full')
+
+    def _drop(self, message, reason):
+        self.dropped += 1
+        LOG_MESSAGES_DROPPED.inc(message.record['level'].name, reason)
+
+    def _run(self):
+        """写入线程: 批量取出日志写入,每批每个输出只 flush 一次"""
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            touched = set()
+            for item in batch:
+                if item is _STOP:
+                    stop = True
+                    continue
+                writer, text = item
+                try:
+                    writer.write(text)
+                    touched.add(writer)
+                except Exception as e:
+                    sys.stderr.write(f'日志写入失败: {e}\n')
+            for writer in touched:
+                try:
+                    writer.flush()
+                except Exception as e:
+                    sys.stderr.write(f'日志写入失败: {e}\n')
+
+            LOG_QUEUE_SIZE.set(self.queue.qsize())
+            if stop:
+                return
+            self._report_drops()
+
+    def _report_drops(self):
+        dropped = self.dropped
+        now = time.monotonic()
+        if dropped == self._reported or now - self._reported_at < DROP_REPORT_INTERVAL:
+            return
+        self._reported_at = now
+        logger.warning(f'⚠️  日志队列积压,已丢弃 {dropped - self._reported} 条日志(累计 {dropped} 条)')
+        self._reported = dropped
+
+    def close(self, timeout=5):
+        """写完队列中剩余日志并关闭文件(进程退出时调用)"""
+        if self.closed:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+            self._thread.join(timeout)
+        except queue.Full:
+            pass
+        self.closed = True
+        self.compressor.shutdown(wait=True)
+        for writer in self.writers:
+            try:
+                writer.close()
+            except (ValueError, OSError) as e:
+                sys.stderr.write(f'日志关闭失败: {e}\n')
@@ -0,0 +1,337 @@
+"""
+数据库维护任务
+在请求空闲时段于后台执行 ANALYZE、PRAGMA optimize、增量 vacuum、标签计数和用户统计校准
+
+- 所有语句通过应用的数据库连接分步执行,每步之间让出连接给请求
+- 每次运行有时间预算,预算用完或有请求排队时停止,剩余部分下次继续
+- 连续检测到请求时按指数退避推迟;任务逾期超过一个周期时不再等待空闲
+"""
+import asyncio
+import sqlite3
+import time
+from collections import deque
+from datetime import datetime
+from loguru import logger
+
+from apps.utils.file_lock import try_lock
+from apps.utils.metrics import MAINTENANCE_RUNS, MAINTENANCE_SECONDS
+
+# 各任务执行间隔(秒)
+TASK_INTERVALS = {
+    'optimize': 3600,
+    'analyze': 6 * 3600,
+    'vacuum': 24 * 3600,
+    'tag_counts': 24 * 3600,
+    'user_stats': 24 * 3600,
+}
+
+# 启动后首次执行的延迟(秒),标签和统计校准不在每次重启时执行
+INITIAL_DELAYS = {
+    'optimize': 0,
+    'analyze': 0,
+    'vacuum': 0,
+    'tag_counts': 3600,
+    'user_stats': 3600,
+}
+
+# 表行数相对上次统计变化超过该比例时重新 ANALYZE
+ANALYZE_CHANGE_RATIO = 0.25
+# ANALYZE 每个索引最多扫描的行数(近似统计,限制单步耗时)
+ANALYSIS_LIMIT = 1000
+
+# 空闲页比例超过该值时执行 vacuum
+VACUUM_FREE_RATIO = 0.1
+# 增量 vacuum 每步释放的页数
+VACUUM_STEP_PAGES = 256
+# 未开启 auto_vacuum 的数据库,不超过该大小(MB)时在空闲时段执行一次完整 VACUUM 转换为增量模式
+FULL_VACUUM_MAX_MB = 64
+
+# 保留的运行记录数
+HISTORY_SIZE = 100
+# 最长退避间隔(秒)
+MAX_BACKOFF = 300
+
+STATUS_DONE = 'done'
+STATUS_PARTIAL = 'partial'
+STATUS_SKIPPED = 'skipped'
+STATUS_FAILED = 'failed'
+
+
+class Budget:
+    """单次运行的时间预算"""
+
+    def __init__(self, db, seconds):
+        self.db = db
+        self.deadline = time.perf_counter() + seconds
+
+    def exhausted(self):
+        """预算用完或有请求在排队"""
+        return time.perf_counter() >= self.deadline or self.db.pending > 0
+
+
+def _stale_tables(conn):
+    """行数相对 sqlite_stat1 记录变化较大(或从未统计)的表"""
+    analyzed = {}
+    try:
+        for table, stat in conn.execute('SELECT tbl, stat FROM sqlite_stat1').fetchall():
+            analyzed[table] = max(analyzed.get(table, 0), int(stat.split()[0]))
+    except sqlite3.OperationalError:
+        # 从未执行过 ANALYZE
+        pass
+
+    stale = []
+    tables = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    for (table,) in tables:
+        count = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        previous = analyzed.get(table)
+        if previous is None:
+            if count:
+                stale.append((table, None, count))
+        elif abs(count - previous) > max(previous, 1) * ANALYZE_CHANGE_RATIO:
+            stale.append((table, previous, count))
+    return stale
+
+
+def _analyze_table(conn, table):
+    conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+    conn.execute(f'ANALYZE "{table}"')
+    conn.commit()
+
+
+def _optimize(conn):
+    conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+    conn.execute('PRAGMA optimize').fetchall()
+    conn.commit()
+
+
+def _page_stats(conn):
+    return {
+        'auto_vacuum': conn.execute('PRAGMA auto_vacuum').fetchone()[0],
+        'page_size': conn.execute('PRAGMA page_size').fetchone()[0],
+        'page_count': conn.execute('PRAGMA page_count').fetchone()[0],
+        'freelist_count': conn.execute('PRAGMA freelist_count').fetchone()[0],
+    }
+
+
+def _incremental_vacuum(conn, pages):
+    # sqlite3 模块的 execute 只单步执行该 PRAGMA(每次只释放一页),executescript 会执行到结束;
+    # executescript 会先提交未完成的事务,连接上有事务时本次不执行
+    if not conn.in_transaction:
+        conn.executescript(f'PRAGMA incremental_vacuum({pages})')
+    return conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+
+def _full_vacuum(conn):
+    # 切换 auto_vacuum 模式需要完整 VACUUM 重建数据库文件
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+
+
+class MaintenanceScheduler:
+    """数据库维护调度器"""
+
+    def __init__(self, db, idle_seconds=5, budget_seconds=0.5, check_interval=30):
+        self.db = db
+        self.idle_seconds = idle_seconds
+        self.budget_seconds = budget_seconds
+        self.check_interval = check_interval
+        self.tasks = {
+            'optimize': self._optimize,
+            'analyze': self._analyze,
+            'vacuum': self._vacuum,
+            'tag_counts': self._tag_counts,
+            'user_stats': self._user_stats,
+        }
+        now = time.time()
+        self.next_run = {name: now + INITIAL_DELAYS[name] for name in self.tasks}
+        self.history = deque(maxlen=HISTORY_SIZE)
+        # 因请求繁忙推迟的次数
+        self.deferred = 0
+        self._lock = asyncio.Lock()
+
+    def idle(self):
+        """连接上没有排队语句,且最近 idle_seconds 秒内没有新语句"""
+        return self.db.pending == 0 and time.perf_counter() - self.db.last_activity >= self.idle_seconds
+
+    def due_tasks(self):
+        now = time.time()
+        return [name for name in self.tasks if now >= self.next_run[name]]
+
+    def overdue(self, name):
+        """逾期超过一个周期(长时间没有空闲窗口)"""
+        return time.time() - self.next_run[name] >= TASK_INTERVALS[name]
+
+    async def run_task(self, name):
+        """
+        执行单个任务并记录结果
+
+        Returns:
+            dict: 运行记录 {'task', 'status', 'started', 'duration_ms', 'detail'}
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            started_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            budget = Budget(self.db, self.budget_seconds)
+            try:
+                status, detail = await self.tasks[name](budget)
+            except Exception as e:
+                status, detail = STATUS_FAILED, {'error': str(e)}
+                logger.error(f'❌ 数据库维护任务失败: {name}, error={e}')
+
+            elapsed = time.perf_counter() - started
+            # 未完成的任务在下一个检查周期继续
+            delay = self.check_interval if status in (STATUS_PARTIAL, STATUS_FAILED) else TASK_INTERVALS[name]
+            self.next_run[name] = time.time() + delay
+
+            record = {
+                'task': name,
+                'status': status,
+                'started': started_at,
+                'duration_ms': round(elapsed * 1000, 1),
+                'detail': detail,
+            }
+            self.history.append(record)
+            MAINTENANCE_RUNS.inc(name, status)
+            MAINTENANCE_SECONDS.observe(elapsed, name)
+            if status != STATUS_SKIPPED:
+                logger.info(f'🔄 数据库维护: {name} {status}, 耗时 {record["duration_ms"]} ms, {detail}')
+            return record
+
+    async def run(self):
+        """调度循环"""
+        backoff = self.check_interval
+        while True:
+            due = self.due_tasks()
+            if not due:
+                delay = min(self.check_interval, max(1, min(self.next_run.values()) - time.time()))
+            elif self.idle() or any(self.overdue(name) for name in due):
+                backoff = self.check_interval
+                delay = self.check_interval
+                for name in due:
+                    if not self.idle() and not self.overdue(name):
+                        break
+                    await self.run_task(name)
+            else:
+                # 请求繁忙,退避后再检查
+                self.deferred += 1
+                delay = backoff
+                backoff = min(backoff * 2, MAX_BACKOFF)
+            await asyncio.sleep(delay)
+
+    async def _optimize(self, budget):
+        """PRAGMA optimize: 由 SQLite 判断哪些表需要更新统计信息"""
+        await self.db.run_sync(_optimize)
+        return STATUS_DONE, {}
+
+    async def _analyze(self, budget):
+        """对行数变化较大的表重新收集统计信息"""
+        stale = await self.db.run_sync(_stale_tables)
+        if not stale:
+            return STATUS_SKIPPED, {'tables': []}
+
+        analyzed = []
+        for table, previous, count in stale:
+            if analyzed and budget.exhausted():
+                return STATUS_PARTIAL, {'tables': analyzed, 'remaining': len(stale) - len(analyzed)}
+            await self.db.run_sync(_analyze_table, table)
+            analyzed.append({'table': table, 'analyzed_rows': previous, 'rows': count})
+        return STATUS_DONE, {'tables': analyzed}
+
+    async def _vacuum(self, budget):
+        """回收空闲页: 增量模式分步释放,未开启增量模式的小数据库转换一次"""
+        stats = await self.db.run_sync(_page_stats)
+        free, total = stats['freelist_count'], stats['page_count']
+        detail = {'free_pages': free, 'total_pages': total}
+        if not free or free / total < VACUUM_FREE_RATIO:
+            return STATUS_SKIPPED, detail
+
+        if stats['auto_vacuum'] == 2:
+            remaining = free
+            while remaining and not (remaining != free and budget.exhausted()):
+                remaining = await self.db.run_sync(_incremental_vacuum, VACUUM_STEP_PAGES)
+            detail['freed_pages'] = free - remaining
+            return (STATUS_PARTIAL if remaining else STATUS_DONE), detail
+
+        size_mb = total * stats['page_size'] / 1024 / 1024
+        if size_mb > FULL_VACUUM_MAX_MB:
+            detail['reason'] = f'未开启 auto_vacuum,数据库 {size_mb:.0f} MB 超过在线转换上限,请停机执行 VACUUM'
+            return STATUS_SKIPPED, detail
+
+        await self.db.run_sync(_full_vacuum)
+        detail['converted'] = True
+        detail['freed_pages'] = free
+        return STATUS_DONE, detail
+
+    async def _tag_counts(self, budget):
+        """根据提示词数据校准标签使用次数"""
+        from apps.modules.tags.services import TagService
+
+        result = await TagService(self.db).reconcile_tag_counts()
+        return STATUS_DONE, result
+
+    async def _user_stats(self, budget):
+        """根据明细数据校准用户统计汇总表"""
+        from apps.modules.stats.services import StatsService
+
+        result = await StatsService(self.db).reconcile()
+        return STATUS_DONE, result
+
+    def status(self):
+        return {
+            'idle': self.idle(),
+            'deferred': self.deferred,
+            'next_run': {
+                name: datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+                for name, timestamp in self.next_run.items()
+            },
+            'history': list(reversed(self.history)),
+        }
+
+
+async def init_maintenance(app):
+    """启动数据库维护调度(FastAPI 生命周期中调用)"""
+    from config.settings import Config
+
+    app.state.maintenance = None
+    app.state.maintenance_task = None
+    if not getattr(Config, 'MAINTENANCE_ENABLED', True):
+        return
+
+    db = app.state.db
+    # 多 worker 部署时只在一个进程中执行维护
+    lock_file = try_lock(db.db_path + '.maintenance.lock')
+    if lock_file is None:
+        logger.info('🔄 其他 worker 已启动数据库维护,跳过')
+        return
+
+    scheduler = MaintenanceScheduler(
+        db,
+        idle_seconds=getattr(Config, 'MAINTENANCE_IDLE_SECONDS', 5),
+        budget_seconds=getattr(Config, 'MAINTENANCE_BUDGET_MS', 500) / 1000,
+    )
+    scheduler.lock_file = lock_file
+    app.state.maintenance = scheduler
+    app.state.maintenance_task = asyncio.create_task(scheduler.run())
+    logger.info('✅ 数据库维护调度已启动')
+
+
+async def close_maintenance(app):
+    """停止维护调度,关闭连接前执行一次 PRAGMA optimize(SQLite 推荐在关闭连接前执行)"""
+    task = getattr(app.state, 'maintenance_task', None)
+    if task and not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    scheduler = getattr(app.state, 'maintenance', None)
+    if scheduler is None:
+        return
+    try:
+        await scheduler.db.run_sync(_optimize)
+    except Exception as e:
+        logger.warning(f'⚠️  PRAGMA optimize 执行失败: {e}')
+    scheduler.lock_file.close()
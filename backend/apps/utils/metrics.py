@@ -0,0 +1,349 @@
+"""
+Prometheus 指标
+进程内轻量实现(Counter / Gauge / Histogram),输出 Prometheus 文本格式,
+记录路径上只做字典查找和加法,不依赖 prometheus_client
+"""
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+# 默认耗时分桶(秒)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 响应大小分桶(字节)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# SQL 模板标签的最大数量,超出后归入 other,避免标签基数失控
+MAX_SQL_TEMPLATES = 500
+
+SQL_STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER_PATTERN = re.compile(r'\b\d+(?:\.\d+)?\b')
+SQL_IN_LIST_PATTERN = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+SQL_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def normalize_sql(sql):
+    """
+    SQL 归一化为模板: 字符串/数字字面量替换为 ?,IN 列表折叠,空白折叠
+
+    代码中大量 SQL 通过字符串拼接内联参数,归一化后才能按语句聚合
+    """
+    template = SQL_STRING_PATTERN.sub('?', sql)
+    template = SQL_NUMBER_PATTERN.sub('?', template)
+    template = SQL_IN_LIST_PATTERN.sub('(?, ...)', template)
+    return SQL_WHITESPACE_PATTERN.sub(' ', template).strip()
+
+
+def _escape(value):
+    """标签值转义"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    """格式化标签 {a="x",b="y"}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    """格式化数值(整数不带小数点)"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """指标基类"""
+
+    type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+
+    def samples(self):
+        """输出样本行(子类实现)"""
+        raise NotImplementedError
+
+    def expose(self):
+        return self.header() + self.samples()
+
+
+class Counter(Metric):
+    """只增计数器"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        return [
+            f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    """可增可减的仪表值,也可以传入回调在采集时取值"""
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._callback = callback
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        values = self._values
+        if self._callback is not None:
+            # 回调返回 {标签元组: 值}
+            values = self._callback()
+        return [
+            f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+            for labels, value in values.items()
+        ]
+
+
+class Histogram(Metric):
+    """分桶直方图(每个标签组合保存各桶计数、总和与次数)"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, *labels):
+        entry = self._values.get(labels)
+        if entry is None:
+            # [各桶计数..., +Inf 桶计数, 总和]
+            entry = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def count(self, *labels):
+        entry = self._values.get(labels)
+        return sum(entry[:-1]) if entry else 0
+
+    def samples(self):
+        lines = []
+        for labels, entry in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), entry[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(entry[-1])}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'指标重复注册: {metric.name}')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def expose(self):
+        """输出 Prometheus 文本格式"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+# 进程内共享的注册表
+registry = MetricsRegistry()
+
+# ==========================================
+# HTTP 请求
+# ==========================================
+HTTP_REQUESTS = registry.counter(
+    'yprompt_http_requests_total', '请求总数', ('method', 'route', 'status')
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'yprompt_http_request_duration_seconds', '请求耗时(秒)', ('method', 'route')
+)
+HTTP_RESPONSE_BYTES = registry.histogram(
+    'yprompt_http_response_size_bytes', '响应体大小(字节)', ('method', 'route'), SIZE_BUCKETS
+)
+HTTP_ERRORS = registry.counter(
+    'yprompt_http_errors_total', '错误请求数(4xx/5xx/未捕获异常)', ('method', 'route', 'kind')
+)
+HTTP_IN_PROGRESS = registry.gauge(
+    'yprompt_http_requests_in_progress', '正在处理的请求数'
+)
+
+# ==========================================
+# 数据库
+# ==========================================
+DB_STATEMENT_SECONDS = registry.histogram(
+    'yprompt_db_statement_duration_seconds', 'SQL 执行耗时(秒,不含排队)', ('operation', 'template')
+)
+DB_QUEUE_WAIT_SECONDS = registry.histogram(
+    'yprompt_db_queue_wait_seconds', 'SQL 在连接线程队列中的等待时间(秒)'
+)
+DB_ERRORS = registry.counter(
+    'yprompt_db_errors_total', 'SQL 执行失败次数', ('operation',)
+)
+DB_PENDING = registry.gauge(
+    'yprompt_db_pending_statements', '已提交未完成的 SQL 数(排队 + 执行中)'
+)
+
+# ==========================================
+# 数据库维护
+# ==========================================
+MAINTENANCE_RUNS = registry.counter(
+    'yprompt_maintenance_runs_total', '数据库维护任务执行次数', ('task', 'status')
+)
+MAINTENANCE_SECONDS = registry.histogram(
+    'yprompt_maintenance_duration_seconds', '数据库维护任务耗时(秒)', ('task',)
+)
+
+# ==========================================
+# 日志
+# ==========================================
+LOG_MESSAGES_DROPPED = registry.counter(
+    'yprompt_log_messages_dropped_total', '日志队列积压时丢弃的日志数', ('level', 'reason')
+)
+LOG_QUEUE_SIZE = registry.gauge(
+    'yprompt_log_queue_size', '日志队列中待写入的条数'
+)
+
+# ==========================================
+# 认证
+# ==========================================
+AUTH_VERIFY_SECONDS = registry.histogram(
+    'yprompt_auth_token_verify_duration_seconds', 'Token 校验耗时(秒)'
+)
+AUTH_FAILURES = registry.counter(
+    'yprompt_auth_failures_total', '认证失败次数', ('reason',)
+)
+AUTH_LOGINS = registry.counter(
+    'yprompt_auth_logins_total', '登录次数', ('method', 'result')
+)
+
+# ==========================================
+# 限流
+# ==========================================
+RATE_LIMITED = registry.counter(
+    'yprompt_rate_limited_total', '被限流的请求数(scope: ip/user/concurrency)', ('scope', 'kind')
+)
+
+# ==========================================
+# 缓存
+# ==========================================
+CACHE_REQUESTS = registry.counter(
+    'yprompt_cache_requests_total', '缓存访问次数', ('cache', 'result')
+)
+
+_caches = {}
+
+
+def register_cache(name, size_getter):
+    """注册缓存,采集时通过 size_getter() 读取当前条目数"""
+    _caches[name] = size_getter
+
+
+CACHE_ENTRIES = registry.gauge(
+    'yprompt_cache_entries', '缓存条目数', ('cache',),
+    callback=lambda: {(name,): size_getter() for name, size_getter in _caches.items()}
+)
+
+# ==========================================
+# 相同读请求合并
+# ==========================================
+SINGLE_FLIGHT_REQUESTS = registry.counter(
+    'yprompt_single_flight_requests_total', '服务层读调用次数(leader: 实际执行查询; shared: 共享进行中的查询)',
+    ('operation', 'result')
+)
+SINGLE_FLIGHT_FANOUT = registry.histogram(
+    'yprompt_single_flight_fanout', '每次实际执行的查询被多少个调用方共享', ('operation',),
+    (1, 2, 4, 8, 16, 32, 64)
+)
+
+# ==========================================
+# 自动保存合并
+# ==========================================
+AUTOSAVE_REQUESTS = registry.counter(
+    'yprompt_autosave_requests_total', '自动保存请求数(queued: 已接收; written/failed/discarded: 合并写入成功/失败/被删除丢弃)',
+    ('result',)
+)
+AUTOSAVE_COALESCED = registry.histogram(
+    'yprompt_autosave_coalesced_saves', '每次写入合并的自动保存请求数', (),
+    (1, 2, 4, 8, 16, 32, 64)
+)
+
+# ==========================================
+# 事件推送(SSE)
+# ==========================================
+SSE_CONNECTIONS = registry.gauge(
+    'yprompt_sse_connections', '事件推送(SSE)连接数'
+)
+SSE_EVENTS = registry.counter(
+    'yprompt_sse_events_total', '推送到连接缓冲区的事件数(delivered: 写入缓冲区; dropped: 缓冲区满被丢弃)', ('result',)
+)
+
+# ==========================================
+# 用户统计汇总
+# ==========================================
+USER_STATS_CORRECTED = registry.counter(
+    'yprompt_user_stats_corrected_total', '校准时发现与明细不一致并修正的统计项数(按字段)', ('field',)
+)
+
+_sql_templates = set()
+
+
+def sql_template_label(sql):
+    """SQL 模板标签(超过上限的新模板归入 other)"""
+    template = normalize_sql(sql)
+    if template in _sql_templates:
+        return template
+    if len(_sql_templates) >= MAX_SQL_TEMPLATES:
+        return 'other'
+    _sql_templates.add(template)
+    return template
@@ -0,0 +1,69 @@
+"""
+请求指标中间件(纯 ASGI 实现)
+按路由模板记录请求数、耗时、响应大小和错误数
+"""
+import time
+
+from apps.utils.metrics import (
+    HTTP_REQUESTS, HTTP_REQUEST_SECONDS, HTTP_RESPONSE_BYTES, HTTP_ERRORS, HTTP_IN_PROGRESS
+)
+
+# 未匹配任何路由的请求统一记为该标签,避免随机路径撑大标签基数
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    请求指标中间件
+
+    不使用 BaseHTTPMiddleware(会为每个请求额外创建任务和内存流),
+    直接包装 ASGI send 读取状态码和响应体大小;
+    事件推送长连接(/api/events)不计入,否则会拉高进行中请求数和耗时分布(连接数见 yprompt_sse_connections)
+    """
+
+    def __init__(self, app, exclude_paths=('/metrics', '/healthz', '/readyz', '/api/events')):
+        self.app = app
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_PROGRESS.inc()
+        failed = False
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            elapsed = time.perf_counter() - started
+
+            # 路由匹配后 FastAPI 会把路由对象写入 scope,取其路径模板(如 /api/prompts/{prompt_id})
+            route = scope.get('route')
+            route = getattr(route, 'path', None) or UNMATCHED_ROUTE
+            method = scope['method']
+
+            HTTP_REQUESTS.inc(method, route, status)
+            HTTP_REQUEST_SECONDS.observe(elapsed, method, route)
+            HTTP_RESPONSE_BYTES.observe(size, method, route)
+            if failed:
+                HTTP_ERRORS.inc(method, route, 'exception')
+            elif status >= 500:
+                HTTP_ERRORS.inc(method, route, '5xx')
+            elif status >= 400:
+                HTTP_ERRORS.inc(method, route, '4xx')
@@ -0,0 +1,254 @@
+"""
+数据库迁移
+按编号顺序执行 migrations/ 下的 NNN_名称.sql / NNN_名称.py,已执行的版本记录在 schema_migrations 表,
+通过文件锁保证多 worker 同时启动时只有一个进程执行迁移
+
+- .sql 迁移: 启动时同步执行(应保持短小,只包含建表/建索引等结构变更)
+- .py 迁移: 定义 async def upgrade(db, migrator);
+  模块中 ONLINE = True 时在服务启动后于后台执行,适合耗时的数据回填,
+  应通过 migrator.run_batched 等方式分批提交,避免长时间占用连接
+"""
+import asyncio
+import hashlib
+import importlib.util
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from loguru import logger
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '../../migrations')
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d{3,})_(\w+)\.(sql|py)$')
+
+# 分批回填的默认批大小和批间隔(秒)
+BACKFILL_BATCH_SIZE = 500
+BACKFILL_PAUSE = 0.05
+
+
+class Migration:
+    """单个迁移文件"""
+
+    def __init__(self, path):
+        match = MIGRATION_FILE_PATTERN.match(os.path.basename(path))
+        self.path = path
+        self.version = int(match.group(1))
+        self.name = match.group(2)
+        self.kind = match.group(3)
+        with open(path, 'rb') as f:
+            content = f.read()
+        self.checksum = hashlib.sha256(content).hexdigest()
+        self._module = None
+
+    @property
+    def module(self):
+        """加载 Python 迁移模块"""
+        if self._module is None:
+            spec = importlib.util.spec_from_file_location(f'migration_{self.version:03d}_{self.name}', self.path)
+            self._module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._module)
+        return self._module
+
+    @property
+    def online(self):
+        """是否在服务启动后后台执行"""
+        return self.kind == 'py' and getattr(self.module, 'ONLINE', False)
+
+    def __repr__(self):
+        return f'{self.version:03d}_{self.name}.{self.kind}'
+
+
+class Migrator:
+    """迁移执行上下文(传给 Python 迁移的 upgrade 函数)"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def run_batched(self, sql, params=None, batch_size=BACKFILL_BATCH_SIZE, pause=BACKFILL_PAUSE):
+        """
+        分批执行更新语句直到没有行被修改
+
+        Args:
+            sql: 以最后一个 ? 作为批大小的语句,
+                 如 UPDATE t SET a = 1 WHERE id IN (SELECT id FROM t WHERE a IS NULL LIMIT ?)
+            params: 批大小之前的参数
+            batch_size: 每批行数
+            pause: 批间隔(让出连接给正常请求)
+
+        Returns:
+            int: 累计修改行数
+        """
+        total = 0
+        while True:
+            changed = await self.db.execute(sql, list(params or []) + [batch_size])
+            total += changed or 0
+            if not changed or changed < batch_size:
+                return total
+            await asyncio.sleep(pause)
+
+    async def table_exists(self, table):
+        row = await self.db.get("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", [table])
+        return row is not None
+
+    async def column_exists(self, table, column):
+        columns = await self.db.query(f'PRAGMA table_info({table})')
+        return any(row['name'] == column for row in columns)
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """按版本号排序列出迁移文件"""
+    migrations = []
+    for filename in os.listdir(directory):
+        if MIGRATION_FILE_PATTERN.match(filename):
+            migrations.append(Migration(os.path.join(directory, filename)))
+    migrations.sort(key=lambda migration: migration.version)
+
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f'迁移版本号重复: {versions}')
+    return migrations
+
+
+@asynccontextmanager
+async def migration_lock(db_path, blocking=True):
+    """
+    迁移文件锁(<数据库路径>.migrate.lock)
+
+    Args:
+        blocking: False 时锁被占用立即返回 False
+
+    Yields:
+        bool: 是否获得锁
+    """
+    try:
+        import fcntl
+    except ImportError:
+        # Windows 不支持 fcntl,单进程部署时无需加锁
+        yield True
+        return
+
+    lock_file = open(db_path + '.migrate.lock', 'a')
+    try:
+        if blocking:
+            # 等待锁时不阻塞事件循环
+            await asyncio.get_running_loop().run_in_executor(None, fcntl.flock, lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    finally:
+        lock_file.close()
+
+
+async def _ensure_table(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version INTEGER PRIMARY KEY,
+          name VARCHAR(200) NOT NULL,
+          checksum VARCHAR(64) NOT NULL,
+          duration_ms INTEGER DEFAULT 0,
+          applied_time DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+async def applied_versions(db):
+    """已执行的迁移 {版本号: checksum}"""
+    await _ensure_table(db)
+    rows = await db.query("SELECT version, checksum FROM schema_migrations")
+    return {row['version']: row['checksum'] for row in rows}
+
+
+async def _apply(db, migration):
+    """执行单个迁移并记录"""
+    started = time.perf_counter()
+    logger.info(f'🔄 执行数据库迁移: {migration}')
+
+    if migration.kind == 'sql':
+        with open(migration.path, 'r', encoding='utf-8') as f:
+            await db.execute_script(f.read())
+    else:
+        await migration.module.upgrade(db, Migrator(db))
+
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    await db.execute(
+        "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (?, ?, ?, ?)",
+        [migration.version, migration.name, migration.checksum, duration_ms]
+    )
+    logger.info(f'✅ 数据库迁移完成: {migration}, 耗时 {duration_ms} ms')
+
+
+def _pending(migrations, applied):
+    """未执行的迁移(同时检查已执行迁移文件是否被修改)"""
+    pending = []
+    for migration in migrations:
+        checksum = applied.get(migration.version)
+        if checksum is None:
+            pending.append(migration)
+        elif checksum != migration.checksum:
+            logger.warning(f'⚠️  已执行的迁移文件被修改: {migration}(不会重新执行)')
+    return pending
+
+
+async def baseline_migrations(db, directory=MIGRATIONS_DIR):
+    """
+    标记所有迁移为已执行(新建数据库时调用)
+
+    init_sqlite.sql 始终是最新的完整表结构,新库无需再执行迁移
+    """
+    applied = await applied_versions(db)
+    records = [
+        [migration.version, migration.name, migration.checksum]
+        for migration in discover_migrations(directory) if migration.version not in applied
+    ]
+    await db.execute_many("INSERT INTO schema_migrations (version, name, checksum) VALUES (?, ?, ?)", records)
+
+
+async def run_migrations(db, directory=MIGRATIONS_DIR):
+    """
+    执行所有未执行的同步迁移(调用方需持有迁移锁)
+
+    Returns:
+        list: 待后台执行的在线迁移
+    """
+    pending = _pending(discover_migrations(directory), await applied_versions(db))
+
+    online = []
+    for migration in pending:
+        if migration.online:
+            online.append(migration)
+            continue
+        await _apply(db, migration)
+
+    if not pending:
+        logger.info('✅ 数据库结构已是最新版本')
+    return online
+
+
+async def run_online_migrations(db, directory=MIGRATIONS_DIR):
+    """
+    后台执行在线迁移(服务启动后调用)
+
+    其他进程正在执行时直接返回,由持有锁的进程完成
+    """
+    async with migration_lock(db.db_path, blocking=False) as locked:
+        if not locked:
+            logger.info('⚠️  其他进程正在执行在线迁移,跳过')
+            return
+
+        # 获得锁后重新读取,避免重复执行其他进程已完成的迁移
+        pending = _pending(discover_migrations(directory), await applied_versions(db))
+        for migration in pending:
+            if not migration.online:
+                continue
+            try:
+                await _apply(db, migration)
+            except Exception as e:
+                # 失败后保持未执行状态,下次启动重试
+                logger.error(f'❌ 在线迁移失败: {migration}, error={e}')
+                return
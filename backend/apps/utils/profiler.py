@@ -0,0 +1,260 @@
+"""
+按需性能分析
+- 采样 CPU 分析: 后台线程按固定间隔读取各线程的调用栈(sys._current_frames),
+  输出 flamegraph.pl / speedscope 可直接读取的折叠栈格式("帧;帧;帧 次数")
+- 内存分析: 按需开启 tracemalloc,保存快照并对比两次快照之间的内存增长
+
+不调用接口时没有任何开销: 采样线程只在分析期间存在,tracemalloc 只在手动开启后跟踪分配
+"""
+import asyncio
+import functools
+import os
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from config.settings import Config
+
+# 最多保留的内存快照数(超出时丢弃最早的)
+MAX_SNAPSHOTS = 5
+
+# 栈顶为这些函数的线程处于等待状态(I/O 多路复用、锁、队列),cpu 模式下不计入
+IDLE_FRAMES = {
+    ('selectors.py', 'select'),
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+    ('core.py', '_connection_worker_thread'),
+}
+
+# 快照统计时忽略的分配来源
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+class ProfilerBusy(Exception):
+    """同时进行的分析数已达上限"""
+
+
+@functools.lru_cache(maxsize=None)
+def path_prefixes():
+    """
+    标准库、第三方库和项目目录(栈帧只显示相对路径)
+
+    首次分析时才计算: sysconfig.get_paths() 需要约 20ms,不放在模块导入时执行
+    """
+    paths = sysconfig.get_paths()
+    prefixes = {paths.get('purelib'), paths.get('platlib'), paths.get('stdlib'),
+                os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))}
+    return tuple(sorted((os.path.join(prefix, '') for prefix in prefixes if prefix), key=len, reverse=True))
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    for prefix in path_prefixes():
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+class SamplingProfiler:
+    """
+    调用栈采样
+
+    mode:
+        wall: 所有采样都计入(包括等待 I/O 和锁的时间,适合分析请求为什么慢)
+        cpu: 忽略栈顶处于等待状态的线程(近似 CPU 时间,适合分析 CPU 占用)
+    """
+
+    def __init__(self, interval=0.005, mode='wall', thread_ids=None):
+        self.interval = interval
+        self.mode = mode
+        # 为空时采样所有线程
+        self.thread_ids = thread_ids
+        self.stacks = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._labels = {}
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _idle(self, frame):
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+    def sample(self, own_id, thread_names):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (self.thread_ids and thread_id not in self.thread_ids):
+                continue
+            if self.mode == 'cpu' and self._idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, f'thread-{thread_id}'))
+            stack.reverse()
+            self.stacks[';'.join(stack)] += 1
+        self.samples += 1
+
+    def run(self, seconds):
+        """采样 seconds 秒(阻塞,在独立线程中调用)"""
+        own_id = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + seconds
+        next_sample = started
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self.sample(own_id, thread_names)
+            next_sample += self.interval
+            # 采样落后时不补采,从当前时间重新对齐
+            next_sample = max(next_sample, time.perf_counter())
+            time.sleep(max(0.0, next_sample - time.perf_counter()))
+        self.duration = time.perf_counter() - started
+        return self
+
+    def collapsed(self):
+        """折叠栈文本(按次数从多到少)"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def _stat_item(stat):
+    frames = stat.traceback
+    return {
+        'file': f'{frames[0].filename}:{frames[0].lineno}',
+        'size_kb': round(stat.size / 1024, 1),
+        'count': stat.count,
+        'traceback': [f'{frame.filename}:{frame.lineno}' for frame in frames] if len(frames) > 1 else None,
+    }
+
+
+def _diff_item(stat):
+    item = _stat_item(stat)
+    item['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+    item['count_diff'] = stat.count_diff
+    return item
+
+
+class MemoryTracker:
+    """tracemalloc 快照管理(快照按 id 保存在内存中)"""
+
+    def __init__(self, max_snapshots=MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self.snapshots = OrderedDict()
+        self._next_id = 1
+        # 是否由本模块开启 tracemalloc(停止时只关闭自己开启的)
+        self._started = False
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._started = True
+
+    def stop(self):
+        """停止跟踪并丢弃所有快照"""
+        self.snapshots.clear()
+        if self._started and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started = False
+
+    def take(self):
+        """保存快照(阻塞,在独立线程中调用)"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        snapshot_id = self._next_id
+        self._next_id += 1
+        self.snapshots[snapshot_id] = (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), snapshot)
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+        return snapshot_id
+
+    def get(self, snapshot_id):
+        if snapshot_id not in self.snapshots:
+            raise KeyError(f'快照不存在: {snapshot_id}')
+        return self.snapshots[snapshot_id]
+
+    def top(self, snapshot_id, group='lineno', limit=20):
+        taken_at, snapshot = self.get(snapshot_id)
+        stats = snapshot.statistics(group)
+        return {
+            'id': snapshot_id,
+            'time': taken_at,
+            'total_kb': round(sum(stat.size for stat in stats) / 1024, 1),
+            'items': [_stat_item(stat) for stat in stats[:limit]],
+        }
+
+    def diff(self, base_id, snapshot_id, group='lineno', limit=20):
+        """两次快照之间按分配位置统计的增长(按增长量从大到小)"""
+        base_time, base = self.get(base_id)
+        taken_at, snapshot = self.get(snapshot_id)
+        stats = snapshot.compare_to(base, group)
+        return {
+            'base': {'id': base_id, 'time': base_time},
+            'snapshot': {'id': snapshot_id, 'time': taken_at},
+            'total_diff_kb': round(sum(stat.size_diff for stat in stats) / 1024, 1),
+            'items': [_diff_item(stat) for stat in stats[:limit]],
+        }
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory() if self.tracing else (0, 0)
+        return {
+            'tracing': self.tracing,
+            'frames': tracemalloc.get_traceback_limit() if self.tracing else 0,
+            'traced_kb': round(current / 1024, 1),
+            'peak_kb': round(peak / 1024, 1),
+            'snapshots': [{'id': snapshot_id, 'time': taken_at} for snapshot_id, (taken_at, _) in self.snapshots.items()],
+        }
+
+
+class Profiling:
+    """分析任务的并发控制(超出上限时立即拒绝,不排队)"""
+
+    def __init__(self, max_concurrent=1):
+        self.max_concurrent = max_concurrent
+        self.active = 0
+        self.memory = MemoryTracker()
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.active >= self.max_concurrent:
+            raise ProfilerBusy(f'已有 {self.active} 个分析任务在执行,请稍后重试')
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+
+    async def profile_cpu(self, seconds, interval=0.005, mode='wall', thread_ids=None):
+        """采样 seconds 秒,返回 SamplingProfiler(采样在独立线程中进行,不阻塞事件循环)"""
+        async with self.slot():
+            profiler = SamplingProfiler(interval, mode, thread_ids)
+            return await asyncio.to_thread(profiler.run, seconds)
+
+    async def take_snapshot(self, frames=1):
+        async with self.slot():
+            self.memory.start(frames)
+            return await asyncio.to_thread(self.memory.take)
+
+
+profiling = Profiling(getattr(Config, 'PROFILING_MAX_CONCURRENT', 1))
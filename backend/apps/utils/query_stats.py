@@ -0,0 +1,139 @@
+"""
+SQL 语句统计
+按归一化模板累计执行次数、总耗时、最大耗时,并保留最近样本计算 p95
+"""
+import time
+from collections import deque
+
+# 每个模板保留的最近耗时样本数(用于计算 p95)
+SAMPLE_SIZE = 256
+
+
+class TemplateStats:
+    """单个 SQL 模板的统计"""
+
+    __slots__ = ('template', 'operations', 'count', 'errors', 'total', 'max', 'samples', 'last_seen', 'plan', 'sample')
+
+    def __init__(self, template):
+        self.template = template
+        self.operations = set()
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+        self.last_seen = 0.0
+        # 最近一次慢查询的执行计划
+        self.plan = None
+        # 最近一次执行的原始语句和参数(仅查询语句,用于索引分析)
+        self.sample = None
+
+    def p95(self):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def to_dict(self):
+        return {
+            'template': self.template,
+            'operations': sorted(self.operations),
+            'count': self.count,
+            'errors': self.errors,
+            'total_ms': round(self.total * 1000, 3),
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0,
+            'max_ms': round(self.max * 1000, 3),
+            'p95_ms': round(self.p95() * 1000, 3),
+            'last_seen': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_seen)) if self.last_seen else '',
+            'plan': self.plan,
+            'sample': self._sample_dict(),
+        }
+
+    def _sample_dict(self):
+        """样本语句(参数含二进制等无法序列化的值时不返回)"""
+        if self.sample is None:
+            return None
+        sql, params = self.sample
+        if not all(param is None or isinstance(param, (str, int, float)) for param in params):
+            return None
+        return {'sql': sql, 'params': list(params)}
+
+
+class QueryStats:
+    """按模板聚合的 SQL 统计"""
+
+    # 支持的排序字段
+    SORT_KEYS = {
+        'total': lambda entry: entry.total,
+        'avg': lambda entry: entry.total / entry.count if entry.count else 0,
+        'max': lambda entry: entry.max,
+        'p95': lambda entry: entry.p95(),
+        'count': lambda entry: entry.count,
+        'errors': lambda entry: entry.errors,
+    }
+
+    def __init__(self):
+        self._templates = {}
+        self.started = time.time()
+
+    def _entry(self, template):
+        entry = self._templates.get(template)
+        if entry is None:
+            entry = self._templates[template] = TemplateStats(template)
+        return entry
+
+    def record(self, template, operation, elapsed, sample=None):
+        """
+        记录一次执行
+
+        Args:
+            sample: (原始语句, 参数),用于后续 EXPLAIN 分析
+        """
+        entry = self._entry(template)
+        entry.operations.add(operation)
+        entry.count += 1
+        entry.total += elapsed
+        if elapsed > entry.max:
+            entry.max = elapsed
+        entry.samples.append(elapsed)
+        entry.last_seen = time.time()
+        if sample is not None:
+            entry.sample = sample
+
+    def record_error(self, template, operation):
+        """记录一次执行失败"""
+        entry = self._entry(template)
+        entry.operations.add(operation)
+        entry.errors += 1
+        entry.last_seen = time.time()
+
+    def record_plan(self, template, plan):
+        """记录执行计划"""
+        self._entry(template).plan = plan
+
+    def top(self, limit=20, sort='total'):
+        """
+        按指定字段取耗时最高的模板
+
+        Args:
+            limit: 返回数量
+            sort: total/avg/max/p95/count/errors
+
+        Returns:
+            list: 模板统计字典列表
+        """
+        key = self.SORT_KEYS.get(sort, self.SORT_KEYS['total'])
+        entries = sorted(self._templates.values(), key=key, reverse=True)[:limit]
+        return [entry.to_dict() for entry in entries]
+
+    def sample_queries(self):
+        """所有模板的样本语句 [(sql, params), ...]"""
+        return [entry.sample for entry in self._templates.values() if entry.sample is not None]
+
+    def reset(self):
+        """清空统计"""
+        self._templates.clear()
+        self.started = time.time()
+
+    def __len__(self):
+        return len(self._templates)
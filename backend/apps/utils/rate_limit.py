@@ -0,0 +1,218 @@
+"""
+请求限流
+- 令牌桶: 每个客户端 IP 和每个登录用户(JWT 中的 user_id)各有一个桶,读请求(GET/HEAD)和写请求分别计算;
+  请求需同时通过 IP 桶和用户桶(未登录只检查 IP 桶),不足时返回 429 和 Retry-After
+- 并发上限: 耗时接口(版本对比、相似推荐、重复检测、语义搜索)每个用户同时进行的请求数,超出时立即返回 429
+
+每个请求只做常数次字典操作;桶数超过上限时淘汰最久未使用的桶(被淘汰的桶下次按满桶重新开始)
+"""
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException
+from fastapi.responses import JSONResponse
+from loguru import logger
+
+from apps.utils.auth_middleware import get_current_user_id, verify_request_token
+from apps.utils.jwt_utils import JWTUtil
+from apps.utils.metrics import RATE_LIMITED, register_cache
+from config.settings import Config
+
+READ_METHODS = frozenset({'GET', 'HEAD'})
+
+
+class TokenBuckets:
+    """
+    一组令牌桶(按 key 区分)
+
+    rate 为每秒补充的令牌数,burst 为桶容量(允许的突发请求数)
+    """
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> [令牌数, 上次补充时间]
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def refill(self, key, now):
+        """按经过的时间补充令牌,返回桶状态 [令牌数, 时间]"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return bucket
+        self._buckets.move_to_end(key)
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        return bucket
+
+    def wait_time(self, bucket):
+        """桶中不足一个令牌时需要等待的秒数"""
+        return 0.0 if bucket[0] >= 1 else (1 - bucket[0]) / self.rate
+
+
+class RateLimiter:
+    """
+    IP 和用户两级令牌桶
+
+    limits: {(范围, 类型): (rate, burst)},范围为 ip/user,类型为 read/write;
+    rate 为 0 或未配置的组合不限流
+    """
+
+    def __init__(self, limits, max_keys=10000):
+        self.buckets = {
+            scope: TokenBuckets(rate, burst, max_keys)
+            for scope, (rate, burst) in limits.items() if rate and burst
+        }
+
+    def __len__(self):
+        return sum(len(buckets) for buckets in self.buckets.values())
+
+    def acquire(self, kind, ip, user_id=None, now=None):
+        """
+        为一个请求取令牌(所有相关的桶都有令牌时才扣减)
+
+        Returns:
+            tuple: (拒绝的范围, 需要等待的秒数);通过时返回 None
+        """
+        now = time.monotonic() if now is None else now
+        checked = []
+        for scope, key in (('ip', ip), ('user', user_id)):
+            buckets = self.buckets.get((scope, kind))
+            if buckets is None or key is None:
+                continue
+            bucket = buckets.refill(key, now)
+            wait = buckets.wait_time(bucket)
+            if wait > 0:
+                return scope, wait
+            checked.append(bucket)
+
+        for bucket in checked:
+            bucket[0] -= 1
+        return None
+
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+class RateLimitMiddleware:
+    """
+    令牌桶限流中间件(纯 ASGI 实现)
+
+    只限制 /api/ 下的接口(探针、指标、静态文件不受限制);CORS 预检请求不计数
+    """
+
+    def __init__(self, app, limiter, trust_proxy=False, prefix='/api/'):
+        self.app = app
+        self.limiter = limiter
+        self.trust_proxy = trust_proxy
+        self.prefix = prefix
+
+    def _client_ip(self, scope):
+        if self.trust_proxy:
+            forwarded = _header(scope, b'x-forwarded-for')
+            if forwarded:
+                return forwarded.split(',')[0].strip()
+        client = scope.get('client')
+        return client[0] if client else 'unknown'
+
+    @staticmethod
+    def _user_id(scope):
+        """
+        校验 JWT 签名后取 user_id(无效 Token 按未登录处理,由认证依赖返回 401)
+
+        校验结果保存在 scope 中,认证依赖不再重复解码
+        """
+        authorization = _header(scope, b'authorization')
+        if not authorization or not authorization.startswith('Bearer ') or not JWTUtil.SECRET_KEY:
+            return None
+        payload, _ = verify_request_token(scope, authorization[7:])
+        return payload.get('user_id') if payload else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not scope['path'].startswith(self.prefix) or scope['method'] == 'OPTIONS':
+            await self.app(scope, receive, send)
+            return
+
+        kind = 'read' if scope['method'] in READ_METHODS else 'write'
+        ip = self._client_ip(scope)
+        user_id = self._user_id(scope)
+        denied = self.limiter.acquire(kind, ip, user_id)
+        if denied is None:
+            await self.app(scope, receive, send)
+            return
+
+        limited_scope, wait = denied
+        RATE_LIMITED.inc(limited_scope, kind)
+        logger.debug('请求被限流: scope={}, kind={}, ip={}, user_id={}, path={}',
+                     limited_scope, kind, ip, user_id, scope['path'])
+        response = JSONResponse(
+            {'detail': '请求过于频繁,请稍后重试'},
+            status_code=429,
+            headers={'Retry-After': str(max(1, math.ceil(wait)))}
+        )
+        await response(scope, receive, send)
+
+
+def create_rate_limiter():
+    """按配置创建限流器"""
+    limiter = RateLimiter(
+        {
+            ('ip', 'read'): getattr(Config, 'RATE_LIMIT_IP_READ', (50, 200)),
+            ('ip', 'write'): getattr(Config, 'RATE_LIMIT_IP_WRITE', (10, 40)),
+            ('user', 'read'): getattr(Config, 'RATE_LIMIT_USER_READ', (20, 100)),
+            ('user', 'write'): getattr(Config, 'RATE_LIMIT_USER_WRITE', (5, 20)),
+        },
+        getattr(Config, 'RATE_LIMIT_MAX_KEYS', 10000)
+    )
+    register_cache('rate_limit_buckets', lambda: len(limiter))
+    return limiter
+
+
+class ConcurrencyLimit:
+    """
+    耗时接口的并发上限(FastAPI 依赖,按用户计数)
+
+    使用方法:
+        @router.get('/expensive', dependencies=[Depends(ConcurrencyLimit('expensive'))])
+    """
+
+    def __init__(self, name, limit=None):
+        self.name = name
+        self.limit = limit
+        # user_id -> 进行中的请求数
+        self.active = {}
+
+    async def __call__(self, user_id: int = Depends(get_current_user_id)):
+        limit = self.limit or getattr(Config, 'RATE_LIMIT_EXPENSIVE_CONCURRENCY', 2)
+        if not getattr(Config, 'RATE_LIMIT_ENABLED', True) or not limit:
+            yield
+            return
+
+        if self.active.get(user_id, 0) >= limit:
+            RATE_LIMITED.inc('concurrency', self.name)
+            raise HTTPException(
+                status_code=429,
+                detail=f'同时进行的请求过多(上限 {limit}),请等待之前的请求完成',
+                headers={'Retry-After': '1'}
+            )
+
+        self.active[user_id] = self.active.get(user_id, 0) + 1
+        try:
+            yield
+        finally:
+            remaining = self.active[user_id] - 1
+            if remaining:
+                self.active[user_id] = remaining
+            else:
+                del self.active[user_id]
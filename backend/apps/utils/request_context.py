@@ -0,0 +1,69 @@
+"""
+请求上下文
+访问日志中间件为每个请求设置 RequestTiming,认证和数据库适配器通过 contextvar 累计耗时;
+不在请求中(后台任务、命令行)或未启用访问日志时,记录函数为空操作
+"""
+import time
+from contextvars import ContextVar
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """单个请求的耗时累计"""
+
+    __slots__ = ('request_id', 'user_id', 'auth', 'db', 'db_wait', 'db_queries', 'endpoint_end')
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.user_id = None
+        self.auth = 0.0
+        self.db = 0.0
+        self.db_wait = 0.0
+        self.db_queries = 0
+        self.endpoint_end = None
+
+
+def begin_request(request_id):
+    """
+    开始记录请求(由访问日志中间件调用)
+
+    Returns:
+        tuple: (RequestTiming, 用于 end_request 的 token)
+    """
+    timing = RequestTiming(request_id)
+    return timing, _current.set(timing)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_request_id():
+    timing = _current.get()
+    return timing.request_id if timing else None
+
+
+def record_auth(seconds, user_id=None):
+    """记录 Token 校验耗时"""
+    timing = _current.get()
+    if timing is not None:
+        timing.auth += seconds
+        if user_id is not None:
+            timing.user_id = user_id
+
+
+def record_db(wait, elapsed):
+    """记录一条 SQL 的排队和执行耗时"""
+    timing = _current.get()
+    if timing is not None:
+        timing.db += wait + elapsed
+        timing.db_wait += wait
+        timing.db_queries += 1
+
+
+def mark_endpoint_end():
+    """记录路由端点返回的时间(之后到开始发送响应为序列化耗时)"""
+    timing = _current.get()
+    if timing is not None:
+        timing.endpoint_end = time.perf_counter()
@@ -0,0 +1,91 @@
+"""
+相同读请求合并(single-flight)
+多个调用方同时发起参数完全相同的查询时,只执行一次,其余调用方等待并共享结果:
+- 查询在独立任务中执行,发起者被取消(客户端断开)不影响其他等待者
+- 等待者拿到结果的深拷贝,视图层修改返回值不会互相影响
+- 合并键包含数据库的写入计数,写入提交后到达的读请求不会加入写入前发起的查询,
+  保证写后读一致
+"""
+import asyncio
+import copy
+import functools
+
+from apps.utils.metrics import SINGLE_FLIGHT_FANOUT, SINGLE_FLIGHT_REQUESTS
+from config.settings import Config
+
+
+class _Call:
+    """一次正在执行的查询"""
+
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task):
+        self.task = task
+        # 等待该查询的调用方数(含发起者)
+        self.waiters = 1
+
+
+class SingleFlight:
+    """进程内的合并表: key -> 正在执行的查询"""
+
+    def __init__(self):
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, name, key, fn):
+        """
+        执行 fn()(返回协程),相同 key 的并发调用共享同一次执行
+
+        Args:
+            name: 指标中的操作名
+            key: 合并键(必须可哈希)
+            fn: 无参函数,返回要执行的协程
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            call.waiters += 1
+            SINGLE_FLIGHT_REQUESTS.inc(name, 'shared')
+        else:
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(functools.partial(self._finish, name, key, call))
+            SINGLE_FLIGHT_REQUESTS.inc(name, 'leader')
+
+        result = await asyncio.shield(call.task)
+        # 查询完成时已从合并表移除,waiters 不会再变化;被共享的结果每个调用方各拿一份拷贝
+        return copy.deepcopy(result) if call.waiters > 1 else result
+
+    def _finish(self, name, key, call, task):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        SINGLE_FLIGHT_FANOUT.observe(call.waiters, name)
+        # 所有调用方都已取消时,避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+
+# 进程内共享的合并表
+flights = SingleFlight()
+
+
+def single_flight(name):
+    """
+    服务层读方法装饰器: 参数相同的并发调用合并为一次执行
+
+    合并键为 (name, 数据库写入计数, 位置参数, 关键字参数);参数不可哈希时直接执行
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            if not getattr(Config, 'SINGLE_FLIGHT_ENABLED', True):
+                return await method(self, *args, **kwargs)
+
+            key = (name, id(self.db), getattr(self.db, 'writes', 0), args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return await method(self, *args, **kwargs)
+            return await flights.do(name, key, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
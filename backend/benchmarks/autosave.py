@@ -0,0 +1,152 @@
+"""
+自动保存合并的写放大
+
+模拟多个编辑器同时打开不同的提示词,每隔固定时间通过 POST /api/prompts/ 自动保存一次(每次内容都有变化),
+分别在逐次写入(direct,等同于合并前的行为)和合并写入(coalesced)两种模式下测量:
+- 数据库写语句数(SQLiteAdapter.writes,含提示词更新、版本快照、索引维护)
+- 新增的版本数
+- 保存请求的延迟
+
+时间按比例缩短(默认每 0.2 秒保存一次、防抖 1 秒),写入次数的比例与实际编辑器(每几秒保存一次)相同
+
+用法(在 backend 目录下):
+    python -m benchmarks.autosave
+    python -m benchmarks.autosave --editors 16 --interval-ms 100 --debounce-ms 500 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from loguru import logger
+
+MODES = ['direct', 'coalesced']
+
+
+async def editor(client, headers, prompt_id, interval, deadline, latencies):
+    """一个编辑器: 每 interval 秒自动保存一次,内容逐渐增长"""
+    revision = 0
+    while time.monotonic() < deadline:
+        revision += 1
+        started = time.perf_counter()
+        response = await client.post('/api/prompts/', headers=headers, json={
+            'id': prompt_id,
+            'title': f'自动保存测试 {prompt_id}',
+            'final_prompt': f'你是一名写作助手。第 {revision} 次编辑。' + '请保持简洁。' * revision,
+            'auto_save': True,
+        })
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            sys.exit(f'❌ 自动保存失败: {response.status_code} {response.text[:200]}')
+        await asyncio.sleep(interval)
+
+
+async def run_mode(mode, args, data_dir):
+    import main
+    from apps.modules.prompts.autosave import autosaves
+    from apps.utils.jwt_utils import JWTUtil
+    from apps.utils.log_pipeline import StreamWriter
+    from config.settings import Config
+
+    # 只丢弃控制台输出(应用日志照常写入日志文件)
+    for writer in main.log_pipeline.writers:
+        if isinstance(writer, StreamWriter):
+            writer.stream = open(os.devnull, 'w')
+
+    Config.SQLITE_DB_PATH = os.path.join(data_dir, f'{mode}.db')
+    autosaves.debounce = args.debounce_ms / 1000 if mode == 'coalesced' else 0
+    autosaves.max_delay = args.max_delay_ms / 1000
+
+    async with main.lifespan(main.app):
+        db = main.app.state.db
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://autosave', timeout=60) as client:
+            headers = {'Authorization': f'Bearer {JWTUtil.generate_token(1, "admin")}'}
+            prompt_ids = []
+            for i in range(args.editors):
+                response = await client.post('/api/prompts/', headers=headers, json={
+                    'title': f'自动保存测试 {i}', 'final_prompt': '你是一名写作助手。'
+                })
+                prompt_ids.append(response.json()['data']['id'])
+
+            # 等待建索引等后台写入完成后再开始计数
+            await asyncio.sleep(0.2)
+            writes_before = db.writes
+            versions_before = (await db.get("SELECT COUNT(*) AS n FROM prompt_versions"))['n']
+
+            latencies = []
+            deadline = time.monotonic() + args.duration
+            await asyncio.gather(*(
+                editor(client, headers, prompt_id, args.interval_ms / 1000, deadline, latencies)
+                for prompt_id in prompt_ids
+            ))
+            # 编辑器关闭后写入剩余的自动保存
+            await autosaves.close()
+
+            writes = db.writes - writes_before
+            versions = (await db.get("SELECT COUNT(*) AS n FROM prompt_versions"))['n'] - versions_before
+            auto_versions = (await db.get("SELECT COUNT(*) AS n FROM prompt_versions WHERE is_auto_save = 1"))['n']
+            # 最终内容必须是最后一次保存的内容
+            for prompt_id in prompt_ids:
+                response = await client.get(f'/api/prompts/{prompt_id}', headers=headers)
+                if '次编辑' not in response.json()['data']['final_prompt']:
+                    sys.exit(f'❌ 提示词 {prompt_id} 的内容不是最后一次自动保存的内容')
+
+    latencies.sort()
+    return {
+        'saves': len(latencies),
+        'writes': writes,
+        'versions': versions,
+        'auto_versions': auto_versions,
+        'writes_per_save': round(writes / len(latencies), 2),
+        'p50_ms': round(statistics.median(latencies), 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='自动保存合并的写放大')
+    parser.add_argument('--editors', type=int, default=8, help='同时编辑的提示词数')
+    parser.add_argument('--interval-ms', type=float, default=200, help='每个编辑器的自动保存间隔(毫秒)')
+    parser.add_argument('--debounce-ms', type=float, default=1000, help='合并模式的防抖时间(毫秒)')
+    parser.add_argument('--max-delay-ms', type=float, default=5000, help='合并模式的最长写入延迟(毫秒)')
+    parser.add_argument('--duration', type=float, default=6, help='每种模式的编辑时长(秒)')
+    parser.add_argument('--output', help='保存结果的 JSON 文件')
+    args = parser.parse_args()
+
+    from config.settings import Config
+    # 所有编辑器使用同一个用户,不启用限流
+    Config.RATE_LIMIT_ENABLED = False
+    from benchmarks.loadtest.runner import environment
+
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    data_dir = tempfile.mkdtemp(prefix='autosave-')
+    try:
+        results = {mode: asyncio.run(run_mode(mode, args, data_dir)) for mode in MODES}
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f'{"模式":<12}{"保存请求":>8}{"写语句":>8}{"每次保存写语句":>14}{"新增版本":>8}{"自动版本":>8}{"p50(ms)":>9}{"p95(ms)":>9}')
+    for mode, result in results.items():
+        print(f'{mode:<14}{result["saves"]:>8}{result["writes"]:>10}{result["writes_per_save"]:>14}'
+              f'{result["versions"]:>10}{result["auto_versions"]:>10}{result["p50_ms"]:>9}{result["p95_ms"]:>9}')
+
+    direct, coalesced = results['direct'], results['coalesced']
+    print(f'\n✅ 每次保存的写语句数 {direct["writes_per_save"]} → {coalesced["writes_per_save"]}'
+          f'(减少 {1 - coalesced["writes_per_save"] / direct["writes_per_save"]:.0%}),'
+          f'每次保存的新增版本数 {direct["versions"] / direct["saves"]:.2f} → {coalesced["versions"] / coalesced["saves"]:.2f}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'meta': dict(environment(), **vars(args)), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
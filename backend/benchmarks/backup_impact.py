@@ -0,0 +1,130 @@
+"""
+在线备份对请求延迟的影响
+
+构造一个较大的数据库,用多个并发客户端通过 SQLiteAdapter 持续执行读写(按 id 查询、列表查询、插入),
+分别测量无备份时、不同分步参数的在线备份期间,以及完整快照(备份 + gzip 压缩)期间的请求延迟
+
+用法(在 backend 目录下):
+    python -m benchmarks.backup_impact --rows 50000 --clients 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from loguru import logger
+
+from apps.utils.backup import copy_database, create_snapshot
+from apps.utils.db_adapter import create_database_adapter
+
+# (每步页数, 步间隔秒);-1 表示一步复制完成
+BACKUP_SETTINGS = [(-1, 0), (1024, 0), (256, 0.005), (64, 0.005)]
+
+
+async def build_database(path, rows):
+    adapter = await create_database_adapter('sqlite', {'path': path, 'journal_mode': 'WAL'}, {})
+    text = '这是一段用于测试备份性能的提示词内容。' * 40
+    batch = 5000
+    for start in range(0, rows, batch):
+        await adapter.execute_many(
+            "INSERT INTO prompts (user_id, title, description, final_prompt, tags) VALUES (1, ?, ?, ?, ?)",
+            [[f'提示词 {i}', f'描述 {i}', text, '写作,翻译'] for i in range(start, min(rows, start + batch))]
+        )
+    return adapter
+
+
+async def client(adapter, rows, stop, latencies):
+    """随机执行读写,记录每次请求的耗时(毫秒)"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        choice = random.random()
+        if choice < 0.6:
+            await adapter.get("SELECT * FROM prompts WHERE id = ?", [random.randint(1, rows)])
+        elif choice < 0.9:
+            await adapter.query(
+                "SELECT id, title FROM prompts WHERE user_id = ? ORDER BY create_time DESC LIMIT 20", [1]
+            )
+        else:
+            await adapter.execute(
+                "INSERT INTO prompts (user_id, title, final_prompt) VALUES (1, ?, ?)", ['新提示词', '内容']
+            )
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0)
+
+
+async def measure(adapter, rows, clients, backup=None, duration=3.0):
+    """
+    运行负载,backup 不为空时同时在线程池中执行备份(负载持续到备份结束)
+
+    Returns:
+        tuple: (延迟列表, 备份耗时秒)
+    """
+    stop = asyncio.Event()
+    latencies = []
+    tasks = [asyncio.create_task(client(adapter, rows, stop, latencies)) for _ in range(clients)]
+
+    backup_seconds = None
+    started = time.perf_counter()
+    if backup is None:
+        await asyncio.sleep(duration)
+    else:
+        await asyncio.get_running_loop().run_in_executor(None, backup)
+        backup_seconds = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies, backup_seconds
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    return (
+        f'请求 {len(ordered):>6}  p50 {statistics.median(ordered):6.2f} ms  '
+        f'p99 {ordered[int(len(ordered) * 0.99)]:7.2f} ms  max {ordered[-1]:7.2f} ms'
+    )
+
+
+async def run(rows, clients):
+    logger.remove()
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, 'bench.db')
+    target = os.path.join(directory, 'backup.db')
+
+    print(f'构造数据库: {rows} 条提示词 ...')
+    adapter = await build_database(db_path, rows)
+    print(f'数据库大小: {os.path.getsize(db_path) / 1024 / 1024:.1f} MB, 并发客户端: {clients}')
+
+    latencies, _ = await measure(adapter, rows, clients)
+    print(f'{"无备份":<28}{summarize(latencies)}')
+
+    for pages, sleep in BACKUP_SETTINGS:
+        def backup():
+            if os.path.exists(target):
+                os.remove(target)
+            copy_database(db_path, target, pages, sleep)
+
+        latencies, seconds = await measure(adapter, rows, clients, backup)
+        label = '一步完成' if pages < 0 else f'{pages} 页/步, 间隔 {sleep * 1000:g} ms'
+        print(f'{label:<24}{seconds:5.2f}s  {summarize(latencies)}')
+
+    snapshot_dir = os.path.join(directory, 'snapshots')
+    latencies, seconds = await measure(adapter, rows, clients, lambda: create_snapshot(db_path, snapshot_dir))
+    print(f'{"完整快照(含压缩)":<20}{seconds:5.2f}s  {summarize(latencies)}')
+
+    await adapter.close()
+    shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='在线备份对请求延迟的影响')
+    parser.add_argument('--rows', type=int, default=50000, help='提示词数量')
+    parser.add_argument('--clients', type=int, default=8, help='并发客户端数')
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.clients))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+模糊搜索基准测试
+
+生成指定数量的提示词,对比三元组索引与 LIKE 扫描的查询耗时
+
+用法(在 backend 目录下):
+    python -m benchmarks.fuzzy_search --prompts 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from apps.utils.db_adapter import create_database_adapter
+from apps.modules.search.services import TrigramIndex, fuzzy_document
+
+WORDS = [
+    'code', 'review', 'helper', 'translate', 'summary', 'writer', 'assistant', 'email',
+    'marketing', 'python', 'debug', 'refactor', 'explain', 'teacher', 'interview', 'resume',
+    '代码', '审查', '助手', '翻译', '总结', '写作', '邮件', '营销', '调试', '重构', '解释', '老师',
+]
+
+# (查询, 说明)
+QUERIES = [
+    ('reveiw', '拼写错误'),
+    ('translat', '前缀'),
+    ('代码', 'CJK'),
+    ('marketng emial', '多处拼写错误'),
+    ('python', '精确词'),
+]
+
+
+def build_vocabulary(rng, size=5000):
+    """生成词表: 常用词 + 随机拼音/英文伪词,按 Zipf 分布取词"""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    cjk = [chr(code) for code in range(0x4e00, 0x4e00 + 2000)]
+    vocabulary = list(WORDS)
+    while len(vocabulary) < size:
+        if rng.random() < 0.5:
+            vocabulary.append(''.join(rng.choices(letters, k=rng.randint(4, 9))))
+        else:
+            vocabulary.append(''.join(rng.choices(cjk, k=rng.randint(2, 4))))
+    rng.shuffle(vocabulary)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return vocabulary, weights
+
+
+def generate_prompts(db_path, count, user_id=1):
+    """直接写入 SQLite 生成测试数据"""
+    rng = random.Random(42)
+    vocabulary, weights = build_vocabulary(rng)
+    conn = sqlite3.connect(db_path)
+    rows = []
+    for i in range(count):
+        title = ' '.join(rng.choices(vocabulary, weights, k=3)) + f' {i}'
+        description = ' '.join(rng.choices(vocabulary, weights, k=20))
+        tags = ','.join(rng.choices(vocabulary, weights, k=2))
+        rows.append((user_id, title, description, 'final prompt', tags))
+    conn.executemany(
+        "INSERT INTO prompts (user_id, title, description, final_prompt, tags) VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(func, repeat):
+    """重复执行并返回耗时列表(毫秒)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    """计算百分位"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(count, repeat):
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    adapter = await create_database_adapter('sqlite', {'path': db_path}, {})
+
+    print(f'生成 {count} 条提示词...')
+    generate_prompts(db_path, count)
+
+    # 1. 构建索引
+    rows = await adapter.query(
+        "SELECT id, title, substr(description, 1, 500) AS description, tags FROM prompts WHERE user_id = 1"
+    )
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    index = TrigramIndex()
+    for row in rows:
+        index.add(row['id'], fuzzy_document(row['title'], row['description'], row['tags']))
+    build_ms = (time.perf_counter() - start) * 1000
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    postings = sum(len(posting) for posting in index.postings.values())
+    print(f'索引构建: {build_ms:.0f} ms, 三元组数 {len(index.postings)}, 倒排条目 {postings}, '
+          f'RSS 增长约 {(rss_after - rss_before) / 1024:.1f} MB')
+
+    # 2. 查询对比
+    conn = sqlite3.connect(db_path)
+    print(f'{"查询":<20}{"说明":<12}{"命中":>8}{"trigram p50":>14}{"p99":>10}{"LIKE命中":>10}{"LIKE p50":>12}')
+    for query, label in QUERIES:
+        matches = index.search(query)
+        samples = timed(lambda: index.search(query), repeat)
+
+        like = f'%{query}%'
+        like_sql = "SELECT id FROM prompts WHERE user_id = 1 AND (title LIKE ? OR description LIKE ?)"
+        like_hits = len(conn.execute(like_sql, [like, like]).fetchall())
+        like_samples = timed(lambda: conn.execute(like_sql, [like, like]).fetchall(), max(3, repeat // 10))
+
+        print(f'{query:<20}{label:<12}{len(matches):>8}'
+              f'{statistics.median(samples):>12.2f}ms{percentile(samples, 99):>8.2f}ms'
+              f'{like_hits:>10}{statistics.median(like_samples):>10.2f}ms')
+
+    # 3. 增量更新
+    samples = timed(lambda: index.add(1, fuzzy_document('code review helper', 'updated description', 'code')), repeat)
+    print(f'增量更新单条: p50 {statistics.median(samples):.3f} ms')
+
+    conn.close()
+    await adapter.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模糊搜索基准测试')
+    parser.add_argument('--prompts', type=int, default=100000, help='提示词数量')
+    parser.add_argument('--repeat', type=int, default=50, help='每个查询重复次数')
+    args = parser.parse_args()
+    asyncio.run(run(args.prompts, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
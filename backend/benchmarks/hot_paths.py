@@ -0,0 +1,254 @@
+"""
+服务层热点函数微基准
+
+单独测量各热点函数的单次调用耗时,不经过 HTTP 和数据库连接线程:
+- 列表项后处理 PromptService.format_list_item(每次处理一页 20 条)
+- 版本详情 JSON 解析 VersionService.decode_version_fields
+- 版本号计算 generate_next_version / compare_version_numbers
+- JWTUtil.verify_token、PasswordUtil.verify_password(bcrypt 12 轮)
+- SQLiteAdapter.rows_to_dicts(一页 20 行 SELECT *)
+
+数据相关的函数在不同规模的数据集上分别测量(输入取自数据集中的真实行);
+每轮测量前准备好输入(不计时),取多轮中的最小值和中位数。
+结果可保存为基线,之后的运行与基线对比,变慢超过阈值的项标记出来
+
+用法(在 backend 目录下):
+    python -m benchmarks.hot_paths --save-baseline
+    python -m benchmarks.hot_paths --sizes small,medium,large --check
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+from loguru import logger
+
+from apps.modules.prompts.services import PromptService
+from apps.modules.versions.services import VersionService
+from apps.utils.db_adapter import SQLiteAdapter
+from apps.utils.jwt_utils import JWTUtil
+from apps.utils.password_utils import PasswordUtil
+from benchmarks.loadtest.dataset import cached_dataset
+from benchmarks.loadtest.runner import BACKEND_DIR, environment
+
+DATA_DIR = os.path.normpath(os.path.join(BACKEND_DIR, '..', 'data', 'benchmarks'))
+DEFAULT_BASELINE = os.path.join(DATA_DIR, 'hot_paths_baseline.json')
+
+# 数据集规模: (用户数, 提示词数, 每个提示词最多版本数)
+SIZES = {
+    'small': (5, 200, 4),
+    'medium': (20, 2000, 8),
+    'large': (50, 20000, 12),
+}
+PAGE_SIZE = 20
+# 每个数据集取样的行数(每轮从中随机选取输入)
+SAMPLE_ROWS = 400
+
+# 单轮最短计时(秒)和轮数
+MIN_ROUND_SECONDS = 0.05
+ROUNDS = 7
+
+
+def measure(fn, setup=None, rounds=ROUNDS):
+    """
+    测量 fn 的单次调用耗时(微秒)
+
+    setup 每次调用前执行(不计时),返回 fn 的参数元组;
+    每轮调用次数根据首次调用耗时确定,使单轮不少于 MIN_ROUND_SECONDS
+
+    Returns:
+        dict: {'min_us', 'median_us', 'stdev_us', 'calls'}
+    """
+    args = setup() if setup else ()
+    started = time.perf_counter()
+    fn(*args)
+    single = max(time.perf_counter() - started, 1e-7)
+    number = max(1, min(100000, int(MIN_ROUND_SECONDS / single)))
+
+    per_call = []
+    for _ in range(rounds):
+        inputs = [setup() for _ in range(number)] if setup else [()] * number
+        # 与 timeit 相同,计时期间关闭垃圾回收
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            for args in inputs:
+                fn(*args)
+            per_call.append((time.perf_counter() - started) / number * 1e6)
+        finally:
+            gc.enable()
+
+    return {
+        'min_us': round(min(per_call), 3),
+        'median_us': round(statistics.median(per_call), 3),
+        'stdev_us': round(statistics.stdev(per_call), 3),
+        'calls': number * rounds,
+    }
+
+
+def load_samples(db_path, seed=0):
+    """从数据集读取真实行作为输入"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        list_rows = conn.execute(
+            """
+            SELECT id, title, description, final_prompt, language, format,
+                   prompt_type, system_prompt, conversation_history,
+                   is_favorite, is_public, view_count, use_count, tags,
+                   current_version, total_versions, last_version_time,
+                   create_time, update_time
+            FROM prompts ORDER BY RANDOM() LIMIT ?
+            """,
+            [SAMPLE_ROWS]
+        ).fetchall()
+        version_rows = conn.execute(
+            """
+            SELECT v.*, u.name as author_name, u.avatar as author_avatar
+            FROM prompt_versions v LEFT JOIN users u ON v.created_by = u.id
+            ORDER BY RANDOM() LIMIT ?
+            """,
+            [SAMPLE_ROWS]
+        ).fetchall()
+        full_rows = conn.execute("SELECT * FROM prompts ORDER BY RANDOM() LIMIT ?", [SAMPLE_ROWS]).fetchall()
+    finally:
+        conn.close()
+    rng = random.Random(seed)
+    return rng, [dict(row) for row in list_rows], [dict(row) for row in version_rows], full_rows
+
+
+def format_page(items):
+    for item in items:
+        PromptService.format_list_item(item)
+
+
+def data_benchmarks(db_path):
+    """数据相关的基准(每个数据集规模分别测量)"""
+    rng, list_rows, version_rows, full_rows = load_samples(db_path)
+
+    def list_page():
+        return ([dict(row) for row in rng.sample(list_rows, PAGE_SIZE)],)
+
+    def version_row():
+        return (dict(rng.choice(version_rows)),)
+
+    def raw_page():
+        return (rng.sample(full_rows, PAGE_SIZE),)
+
+    return {
+        'list_format_page': measure(format_page, list_page),
+        'version_decode': measure(VersionService.decode_version_fields, version_row),
+        'rows_to_dicts_page': measure(SQLiteAdapter.rows_to_dicts, raw_page),
+    }
+
+
+def static_benchmarks():
+    """与数据规模无关的基准"""
+    rng = random.Random(0)
+    versions = [f'{rng.randint(0, 9)}.{rng.randint(0, 30)}.{rng.randint(0, 99)}' for _ in range(1000)]
+    change_types = ['major', 'minor', 'patch']
+
+    if not JWTUtil.SECRET_KEY:
+        JWTUtil.init_app()
+    token = JWTUtil.generate_token(1, 'admin')
+    password_hash = PasswordUtil.hash_password('admin123')
+
+    return {
+        'generate_next_version': measure(
+            VersionService.generate_next_version, lambda: (rng.choice(versions), rng.choice(change_types))
+        ),
+        'compare_version_numbers': measure(
+            VersionService.compare_version_numbers, lambda: (rng.choice(versions), rng.choice(versions))
+        ),
+        'jwt_verify_token': measure(JWTUtil.verify_token, lambda: (token,)),
+        'password_verify': measure(PasswordUtil.verify_password, lambda: ('admin123', password_hash), rounds=3),
+    }
+
+
+def compare_baseline(results, baseline, threshold):
+    """
+    与基线对比(按最小值,受干扰最小)
+
+    Returns:
+        list: 变慢超过阈值的项
+    """
+    regressions = []
+    print(f'\n与基线对比: {baseline["meta"]["git"] or "-"} ({baseline["meta"]["time"]})')
+    for name, stats in results.items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        change = (stats['min_us'] - before['min_us']) / before['min_us']
+        mark = ''
+        if change > threshold:
+            mark = '  ❌'
+            regressions.append(name)
+        print(f'{name:<38}{before["min_us"]:>12.2f}{stats["min_us"]:>12.2f}{change * 100:>+9.1f}%{mark}')
+    return regressions
+
+
+async def run(args):
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    for size in sizes:
+        if size not in SIZES:
+            sys.exit(f'未知数据集规模: {size},可选: {", ".join(SIZES)}')
+
+    results = {}
+    for name, stats in static_benchmarks().items():
+        results[name] = stats
+    for size in sizes:
+        users, prompts, versions = SIZES[size]
+        db_path, _ = await cached_dataset(DATA_DIR, users, prompts, versions, progress=print)
+        for name, stats in data_benchmarks(db_path).items():
+            results[f'{name}[{size}]'] = stats
+
+    print(f'{"基准":<36}{"最小(µs)":>12}{"中位数(µs)":>12}{"标准差":>10}{"调用次数":>10}')
+    for name, stats in results.items():
+        print(f'{name:<38}{stats["min_us"]:>12.2f}{stats["median_us"]:>12.2f}'
+              f'{stats["stdev_us"]:>10.2f}{stats["calls"]:>10}')
+
+    report = {'meta': environment(), 'results': results}
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare_baseline(results, json.load(f), args.threshold)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'\n✅ 基线已保存: {args.baseline}')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if regressions:
+        print(f'\n❌ {len(regressions)} 项变慢超过 {args.threshold * 100:g}%: {", ".join(regressions)}')
+        if args.check:
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='服务层热点函数微基准')
+    parser.add_argument('--sizes', default='small,medium', help=f'数据集规模,逗号分隔({"/".join(SIZES)})')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基线')
+    parser.add_argument('--threshold', type=float, default=0.15, help='判定变慢的比例')
+    parser.add_argument('--check', action='store_true', help='有变慢项时退出码为 1')
+    parser.add_argument('--output', help='另存本次结果的 JSON 文件')
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+"""
+API 压测
+生成合成数据集,以混合读写负载驱动完整应用(进程内或本地端口),统计各接口吞吐和延迟分位数,
+结果保存为 JSON 并可与基准对比发现性能退化
+
+用法见 python -m benchmarks.loadtest --help
+"""
@@ -0,0 +1,165 @@
+"""
+API 压测命令行
+
+用法(在 backend 目录下):
+    # 进程内压测(默认),结果保存为 JSON
+    python -m benchmarks.loadtest run --concurrency 16 --duration 30 --output before.json
+    # 修改代码后再测一次并与基准对比,退化超过阈值时退出码为 1
+    python -m benchmarks.loadtest run --concurrency 16 --duration 30 --output after.json
+    python -m benchmarks.loadtest compare before.json after.json --threshold 0.1
+
+    # 通过本地端口压测(uvicorn 子进程,可测多 worker)或压测已启动的服务
+    python -m benchmarks.loadtest run --transport serve --workers 2
+    python -m benchmarks.loadtest run --transport http --url http://127.0.0.1:8888 --db ../data/yprompt.db
+
+    # 只读负载 / 调整单个操作的权重
+    python -m benchmarks.loadtest run --mix read
+    python -m benchmarks.loadtest run --weights update=20,login=0
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from loguru import logger
+
+from .dataset import build_dataset, cached_dataset
+from .report import compare, print_comparison, print_results
+from .runner import BACKEND_DIR, asgi_client, copy_database, environment, http_client, run_load, served_client
+from .workload import MIXES, WorkloadState, parse_weights
+
+DATA_DIR = os.path.normpath(os.path.join(BACKEND_DIR, '..', 'data', 'loadtest'))
+
+
+def progress(message):
+    print(message, file=sys.stderr)
+
+
+async def prepare_dataset(args):
+    """生成(或复用已生成的)数据集,复制一份供本次压测修改"""
+    source, dataset = await cached_dataset(
+        DATA_DIR, args.users, args.prompts, args.versions, args.seed, args.rebuild, progress
+    )
+    target = os.path.join(DATA_DIR, 'run.db')
+    copy_database(source, target)
+    return target, dataset
+
+
+async def command_dataset(args):
+    dataset = await build_dataset(args.db, args.users, args.prompts, args.versions, args.seed, progress)
+    print(json.dumps(dataset, ensure_ascii=False))
+
+
+async def command_run(args):
+    weights = parse_weights(args.mix, args.weights)
+
+    if args.transport == 'http':
+        if not args.db:
+            sys.exit('--transport http 需要 --db 指定被测服务使用的数据库(读取用户和提示词 id)')
+        db_path = args.db
+        dataset = {'path': os.path.abspath(db_path)}
+        client = http_client(args.url, args.concurrency)
+    else:
+        db_path, dataset = await prepare_dataset(args)
+        if args.transport == 'serve':
+            client = served_client(db_path, args.concurrency, args.workers)
+        else:
+            client = asgi_client(db_path)
+
+    state = WorkloadState.load(db_path, args.seed)
+    if 'users' not in dataset:
+        dataset.update(
+            users=len(state.users),
+            prompts=sum(len(ids) for ids in state.prompts.values()),
+            versions=sum(len(ids) for ids in state.versions.values()),
+        )
+
+    async with client as session:
+        overall, operations = await run_load(
+            session, state, weights, args.concurrency, args.duration, args.warmup, progress
+        )
+
+    result = {
+        'meta': {
+            'transport': args.transport if args.transport != 'serve' else f'serve x{args.workers}',
+            'mix': args.mix,
+            'weights': weights,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'dataset': dataset,
+            'environment': environment(),
+        },
+        'overall': overall,
+        'operations': operations,
+    }
+    print_results(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        progress(f'✅ 结果已保存: {args.output}')
+
+
+def command_compare(args):
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+    rows, regressions = compare(base, new, args.threshold, args.min_requests)
+    print_comparison(base, new, rows, regressions, args.threshold)
+    if regressions:
+        sys.exit(1)
+
+
+def add_dataset_arguments(parser):
+    parser.add_argument('--users', type=int, default=20, help='用户数(含管理员)')
+    parser.add_argument('--prompts', type=int, default=2000, help='提示词总数')
+    parser.add_argument('--versions', type=int, default=8, help='每个提示词最多的版本数')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest', description='YPrompt API 压测')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    dataset_parser = commands.add_parser('dataset', help='只生成数据集')
+    dataset_parser.add_argument('db', help='数据库文件路径(已存在时覆盖)')
+    add_dataset_arguments(dataset_parser)
+
+    run_parser = commands.add_parser('run', help='执行压测')
+    add_dataset_arguments(run_parser)
+    run_parser.add_argument('--transport', choices=['asgi', 'serve', 'http'], default='asgi',
+                            help='asgi: 进程内调用; serve: 启动 uvicorn 子进程; http: 压测 --url 指定的服务')
+    run_parser.add_argument('--url', default='http://127.0.0.1:8888', help='--transport http 时的服务地址')
+    run_parser.add_argument('--db', help='--transport http 时被测服务使用的数据库')
+    run_parser.add_argument('--workers', type=int, default=1, help='--transport serve 时的 uvicorn worker 数')
+    run_parser.add_argument('--mix', choices=sorted(MIXES), default='mixed', help='负载模式')
+    run_parser.add_argument('--weights', help='覆盖操作权重,如 update=20,login=0')
+    run_parser.add_argument('--concurrency', type=int, default=16, help='并发客户端数')
+    run_parser.add_argument('--duration', type=float, default=20, help='统计时长(秒)')
+    run_parser.add_argument('--warmup', type=float, default=3, help='预热时长(秒,不计入统计)')
+    run_parser.add_argument('--rebuild', action='store_true', help='重新生成数据集')
+    run_parser.add_argument('--output', help='保存结果的 JSON 文件')
+
+    compare_parser = commands.add_parser('compare', help='对比两次压测结果')
+    compare_parser.add_argument('base', help='基准结果 JSON')
+    compare_parser.add_argument('new', help='当前结果 JSON')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='判定退化的变化比例')
+    compare_parser.add_argument('--min-requests', type=int, default=100, help='请求数少于该值的操作不判定')
+
+    args = parser.parse_args()
+    # 生成数据集时只输出警告以上的日志(进程内压测时应用会重新配置日志)
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    if args.command == 'compare':
+        command_compare(args)
+    elif args.command == 'dataset':
+        asyncio.run(command_dataset(args))
+    else:
+        asyncio.run(command_run(args))
+
+
+if __name__ == '__main__':
+    main()
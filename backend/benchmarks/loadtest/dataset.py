@@ -0,0 +1,268 @@
+"""
+压测数据集
+不经过接口,直接批量写入 SQLite: 用户、提示词(中文为主,长度按对数正态分布)、历史版本、标签统计,
+并补算语义向量和近似重复签名,使数据库状态与正常使用一致
+
+同一 seed 生成的数据完全相同,便于不同提交之间对比
+"""
+import datetime
+import json
+import math
+import os
+import random
+from collections import Counter
+
+import bcrypt
+
+from apps.modules.search.duplicates import duplicate_detector
+from apps.modules.search.semantic import semantic_index
+from apps.utils.db_adapter import create_database_adapter
+
+# 压测用户的密码(仅用于生成真实格式的哈希,登录走配置的管理员账号)
+BENCH_PASSWORD = 'bench-password'
+BATCH_SIZE = 2000
+
+ROLES = ['资深产品经理', '法律顾问', '小学数学老师', '数据分析师', '营销文案专家', '英语翻译', 'Python 工程师',
+         '心理咨询师', '旅行规划师', '面试官', '健身教练', '学术论文审稿人', '客服主管', '短视频编剧']
+TOPICS = ['需求文档', '合同条款', '应用题讲解', '销售报表', '新品发布', '技术博客', '代码评审', '情绪疏导',
+          '行程安排', '简历筛选', '训练计划', '论文摘要', '投诉处理', '分镜脚本', '周报总结', '用户调研']
+SENTENCES = [
+    '请根据用户提供的信息,给出结构清晰、重点突出的回答。',
+    '回答时先概括结论,再分点说明理由,每点不超过三句话。',
+    '如果信息不足,先列出需要用户补充的关键问题,不要自行编造事实。',
+    '使用简洁、专业的中文,避免空话和套话,必要时给出具体示例。',
+    '输出必须遵循下面的格式要求,不要添加额外的解释性文字。',
+    '对涉及数字的内容进行核对,保留两位小数,并标注数据来源。',
+    '语气保持友好耐心,面向没有专业背景的读者解释术语。',
+    '遇到与任务无关或违反规定的请求时,礼貌地拒绝并说明原因。',
+    '在给出建议之前,先分析当前方案存在的主要风险和限制条件。',
+    '最后用一段话总结要点,并给出下一步可以执行的行动清单。',
+    'Please keep the original English terms in parentheses when translating.',
+    '参考以下评价标准: 准确性、完整性、可执行性、表达清晰度。',
+    '每次只处理一个问题,处理完成后询问用户是否继续。',
+    '对代码片段给出逐行注释,并指出潜在的性能问题和边界情况。',
+]
+SECTIONS = ['# 角色', '## 背景', '## 任务', '## 约束', '## 工作流程', '## 输出格式', '## 示例', '## 注意事项']
+TAGS = ['写作', '翻译', '编程', '营销', '教育', '法律', '数据分析', '产品', '客服', '面试', '旅行', '健康',
+        '心理', '学术', '视频', '总结', '代码评审', '文案', '英语', '效率', 'GPT-4', 'Claude', 'SQL', 'Python',
+        '创意', '办公', '角色扮演', '头脑风暴', '长文本', '结构化输出']
+CHANGE_TYPES = ['patch'] * 6 + ['minor'] * 3 + ['major']
+
+
+def lognormal_length(rng, median, sigma, low, high):
+    """对数正态分布的文本长度(少数提示词很长)"""
+    return int(min(high, max(low, rng.lognormvariate(math.log(median), sigma))))
+
+
+def make_text(rng, length):
+    """拼接句子直到达到指定字符数"""
+    parts = []
+    size = 0
+    while size < length:
+        sentence = rng.choice(SENTENCES)
+        parts.append(sentence)
+        size += len(sentence)
+    return ''.join(parts)[:length]
+
+
+def make_prompt_body(rng, length):
+    """Markdown 结构的提示词正文"""
+    sections = rng.sample(SECTIONS, rng.randint(3, len(SECTIONS)))
+    per_section = max(40, length // len(sections))
+    lines = []
+    for title in sections:
+        lines.append(title)
+        lines.append(f'你是一名{rng.choice(ROLES)},负责{rng.choice(TOPICS)}相关的工作。')
+        for _ in range(max(1, per_section // 60)):
+            lines.append(f'- {make_text(rng, rng.randint(30, 90))}')
+    return '\n'.join(lines)[:length]
+
+
+def make_prompt(rng, user_tags):
+    role, topic = rng.choice(ROLES), rng.choice(TOPICS)
+    tags = rng.sample(user_tags, min(len(user_tags), rng.choice([0, 1, 2, 2, 3, 3, 4, 5])))
+    return {
+        'title': f'{role}的{topic}助手',
+        'description': make_text(rng, lognormal_length(rng, 80, 0.5, 20, 300)),
+        'requirement_report': make_text(rng, lognormal_length(rng, 400, 0.6, 50, 3000)),
+        'thinking_points': json.dumps(
+            [make_text(rng, rng.randint(15, 40)) for _ in range(rng.randint(3, 6))], ensure_ascii=False
+        ),
+        'initial_prompt': make_prompt_body(rng, lognormal_length(rng, 600, 0.6, 100, 6000)),
+        'advice': json.dumps(
+            [make_text(rng, rng.randint(20, 60)) for _ in range(rng.randint(2, 5))], ensure_ascii=False
+        ),
+        'final_prompt': make_prompt_body(rng, lognormal_length(rng, 1200, 0.7, 150, 12000)),
+        'tags': tags,
+    }
+
+
+def mutate(rng, text):
+    """模拟一次编辑: 替换或追加一句"""
+    if rng.random() < 0.5 and len(text) > 100:
+        position = rng.randint(0, len(text) - 50)
+        return text[:position] + rng.choice(SENTENCES) + text[position + 30:]
+    return text + '\n- ' + rng.choice(SENTENCES)
+
+
+def next_version(version, change_type):
+    major, minor, patch = (int(part) for part in version.split('.'))
+    if change_type == 'major':
+        return f'{major + 1}.0.0'
+    if change_type == 'minor':
+        return f'{major}.{minor + 1}.0'
+    return f'{major}.{minor}.{patch + 1}'
+
+
+def allocate(rng, total, users):
+    """按幂律分配每个用户的提示词数(少数重度用户占大部分数据),每人至少 1 条"""
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(users)]
+    scale = total / sum(weights)
+    counts = [max(1, int(weight * scale)) for weight in weights]
+    counts[0] += total - sum(counts)
+    return counts
+
+
+def _format_time(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+async def build_dataset(path, users=20, prompts=2000, max_versions=8, seed=42, progress=print):
+    """
+    生成压测数据库(path 已存在时先删除)
+
+    Args:
+        path: 数据库文件路径
+        users: 用户数(含管理员)
+        prompts: 提示词总数
+        max_versions: 每个提示词最多的版本数(按几何分布,大多数提示词只有 1~2 个版本)
+
+    Returns:
+        dict: 数据集规模 {'users', 'prompts', 'versions', 'tags', 'bytes'}
+    """
+    for suffix in ('', '-wal', '-shm', '.vectors'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    rng = random.Random(seed)
+    db = await create_database_adapter('sqlite', {'path': path, 'journal_mode': 'WAL'}, {})
+    try:
+        password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+        await db.execute_many(
+            "INSERT INTO users (username, password_hash, name, auth_type, is_active) VALUES (?, ?, ?, 'local', 1)",
+            [[f'bench{i}', password_hash, f'压测用户{i}'] for i in range(2, users + 1)]
+        )
+        user_ids = [row['id'] for row in await db.query("SELECT id FROM users ORDER BY id")]
+
+        now = datetime.datetime.now()
+        prompt_rows = []
+        versions = []
+        tag_counts = Counter()
+        for user_id, count in zip(user_ids, allocate(rng, prompts, len(user_ids))):
+            user_tags = rng.sample(TAGS, rng.randint(5, 15))
+            for _ in range(count):
+                prompt = make_prompt(rng, user_tags)
+                created = now - datetime.timedelta(seconds=rng.randint(3600, 365 * 86400))
+                history = [dict(prompt, version='1.0.0', change_type='minor', time=created)]
+                while len(history) < max_versions and rng.random() < 0.45:
+                    previous = history[-1]
+                    change_type = rng.choice(CHANGE_TYPES)
+                    history.append(dict(
+                        previous,
+                        final_prompt=mutate(rng, previous['final_prompt']),
+                        version=next_version(previous['version'], change_type),
+                        change_type=change_type,
+                        time=min(now, previous['time'] + datetime.timedelta(seconds=rng.randint(60, 30 * 86400))),
+                    ))
+                for tag in prompt['tags']:
+                    tag_counts[(user_id, tag)] += 1
+                prompt_rows.append((user_id, history))
+
+        for start in range(0, len(prompt_rows), BATCH_SIZE):
+            batch = prompt_rows[start:start + BATCH_SIZE]
+            await db.execute_many(
+                """
+                INSERT INTO prompts (user_id, title, description, requirement_report, thinking_points,
+                    initial_prompt, advice, final_prompt, is_favorite, view_count, use_count, tags,
+                    current_version, total_versions, last_version_time, create_time, update_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    [user_id, latest['title'], latest['description'], latest['requirement_report'],
+                     latest['thinking_points'], latest['initial_prompt'], latest['advice'], latest['final_prompt'],
+                     int(rng.random() < 0.15), rng.randint(0, 500), rng.randint(0, 200),
+                     ','.join(latest['tags']) or None, latest['version'], len(history),
+                     _format_time(latest['time']), _format_time(history[0]['time']), _format_time(latest['time'])]
+                    for user_id, history in batch
+                    for latest in [history[-1]]
+                ]
+            )
+            progress(f'📝 提示词 {min(start + BATCH_SIZE, len(prompt_rows))}/{len(prompt_rows)}')
+
+        # 提示词按插入顺序自增,与 prompt_rows 一一对应
+        prompt_ids = [row['id'] for row in await db.query("SELECT id FROM prompts ORDER BY id")]
+        for prompt_id, (user_id, history) in zip(prompt_ids, prompt_rows):
+            for index, snapshot in enumerate(history):
+                versions.append([
+                    prompt_id, snapshot['version'], 'initial' if index == 0 else 'stable',
+                    snapshot['title'], snapshot['description'], snapshot['requirement_report'],
+                    snapshot['thinking_points'], snapshot['initial_prompt'], snapshot['advice'],
+                    snapshot['final_prompt'], ','.join(snapshot['tags']) or None,
+                    '初始版本' if index == 0 else f'更新提示词({snapshot["change_type"]})',
+                    snapshot['change_type'], user_id, len(snapshot['final_prompt'].encode('utf-8')),
+                    _format_time(snapshot['time']),
+                ])
+        for start in range(0, len(versions), BATCH_SIZE):
+            await db.execute_many(
+                """
+                INSERT INTO prompt_versions (prompt_id, version_number, version_tag, title, description,
+                    requirement_report, thinking_points, initial_prompt, advice, final_prompt, tags,
+                    change_summary, change_type, created_by, content_size, create_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                versions[start:start + BATCH_SIZE]
+            )
+
+        await db.execute_many(
+            "INSERT INTO prompt_tags (user_id, tag_name, use_count) VALUES (?, ?, ?)",
+            [[user_id, tag, count] for (user_id, tag), count in tag_counts.items()]
+        )
+
+        progress('🔄 补算语义向量和近似重复签名')
+        for user_id in user_ids:
+            await semantic_index.backfill(db, user_id)
+            await duplicate_detector.backfill(db, user_id)
+
+        await db.execute('ANALYZE')
+        await db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        await db.close()
+
+    return {
+        'users': len(user_ids),
+        'prompts': len(prompt_rows),
+        'versions': len(versions),
+        'tags': len(tag_counts),
+        'bytes': os.path.getsize(path),
+    }
+
+
+async def cached_dataset(directory, users, prompts, max_versions, seed=42, rebuild=False, progress=print):
+    """
+    按规模和 seed 缓存的数据集(不存在或 rebuild 时生成)
+
+    Returns:
+        tuple: (数据库路径, 数据集规模)
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'dataset-u{users}-p{prompts}-v{max_versions}-s{seed}.db')
+    meta_path = path + '.json'
+    if rebuild or not os.path.exists(meta_path):
+        progress(f'📦 生成数据集: {path}')
+        dataset = await build_dataset(path, users, prompts, max_versions, seed, progress)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(dataset, f)
+        return path, dataset
+
+    with open(meta_path, encoding='utf-8') as f:
+        return path, json.load(f)
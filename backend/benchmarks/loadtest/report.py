@@ -0,0 +1,97 @@
+"""
+压测结果输出和对比
+"""
+# 对比的指标: (字段, 数值越大越差)
+COMPARED_METRICS = [('rps', False), ('p50_ms', True), ('p95_ms', True), ('p99_ms', True)]
+
+
+def _row(name, stats):
+    if not stats['requests']:
+        return f'{name:<16}{0:>8}{stats["errors"]:>7}'
+    return (
+        f'{name:<16}{stats["requests"]:>8}{stats["errors"]:>7}{stats["rps"]:>9.1f}'
+        f'{stats["mean_ms"]:>9.1f}{stats["p50_ms"]:>9.1f}{stats["p95_ms"]:>9.1f}{stats["p99_ms"]:>9.1f}'
+        f'{stats["max_ms"]:>10.1f}'
+    )
+
+
+def print_results(result):
+    meta = result['meta']
+    dataset = meta['dataset']
+    print(f'\n{meta["transport"]} | 负载 {meta["mix"]} | 并发 {meta["concurrency"]} | {meta["duration"]:g}s | '
+          f'数据集 {dataset["users"]} 用户 / {dataset["prompts"]} 提示词 / {dataset["versions"]} 版本 | '
+          f'{meta["environment"]["git"] or "-"}')
+    print(f'{"操作":<14}{"请求":>8}{"错误":>5}{"请求/秒":>7}{"平均":>7}{"p50":>9}{"p95":>9}{"p99":>9}{"max":>10}')
+    for name, stats in sorted(result['operations'].items(), key=lambda item: -item[1]['requests']):
+        print(_row(name, stats))
+    print(_row('总计', result['overall']))
+
+    for name, stats in result['operations'].items():
+        for sample in stats.get('error_samples', []):
+            print(f'⚠️  {name} {sample}')
+
+
+def _change(base, new):
+    if not base:
+        return None
+    return (new - base) / base
+
+
+def compare(base, new, threshold=0.1, min_requests=100):
+    """
+    对比两次压测结果
+
+    请求数少于 min_requests 的操作分位数波动大,只显示不判定
+
+    Returns:
+        tuple: (rows, regressions)
+            rows: [(操作, 指标, 基准值, 当前值, 变化比例, 是否退化)]
+            regressions: 退化的行
+    """
+    rows = []
+    pairs = [('总计', base['overall'], new['overall'])]
+    for name in sorted(set(base['operations']) & set(new['operations'])):
+        pairs.append((name, base['operations'][name], new['operations'][name]))
+
+    for name, before, after in pairs:
+        judged = min(before['requests'], after['requests']) >= min_requests
+        for metric, higher_is_worse in COMPARED_METRICS:
+            if metric not in before or metric not in after:
+                continue
+            change = _change(before[metric], after[metric])
+            worse = change is not None and (change > threshold if higher_is_worse else change < -threshold)
+            rows.append((name, metric, before[metric], after[metric], change, judged and worse))
+
+        before_rate = before['errors'] / max(1, before['requests'])
+        after_rate = after['errors'] / max(1, after['requests'])
+        rows.append((name, 'error_rate', round(before_rate, 4), round(after_rate, 4),
+                     _change(before_rate, after_rate), after_rate > before_rate + 0.001))
+
+    return rows, [row for row in rows if row[5]]
+
+
+def config_differences(base, new):
+    """两次压测配置不同时结果不可直接比较"""
+    keys = ['transport', 'mix', 'concurrency', 'duration', 'seed', 'dataset']
+    return [
+        f'{key}: {base["meta"].get(key)} -> {new["meta"].get(key)}'
+        for key in keys if base['meta'].get(key) != new['meta'].get(key)
+    ]
+
+
+def print_comparison(base, new, rows, regressions, threshold):
+    print(f'基准: {base["meta"]["environment"]["git"] or "-"} ({base["meta"]["environment"]["time"]})  '
+          f'当前: {new["meta"]["environment"]["git"] or "-"} ({new["meta"]["environment"]["time"]})')
+    for difference in config_differences(base, new):
+        print(f'⚠️  配置不同 {difference}')
+
+    print(f'{"操作":<14}{"指标":<12}{"基准":>10}{"当前":>10}{"变化":>9}')
+    for name, metric, before, after, change, regressed in rows:
+        change_text = '-' if change is None else f'{change * 100:+.1f}%'
+        mark = '  ❌' if regressed else ''
+        print(f'{name:<16}{metric:<12}{before:>10}{after:>10}{change_text:>9}{mark}')
+
+    if regressions:
+        print(f'\n❌ {len(regressions)} 项指标退化超过 {threshold * 100:g}%')
+    else:
+        print(f'\n✅ 没有超过 {threshold * 100:g}% 的退化')
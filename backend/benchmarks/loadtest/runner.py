@@ -0,0 +1,245 @@
+"""
+压测执行和统计
+闭环模型: concurrency 个虚拟客户端各自循环发送请求(上一个请求完成后立即发送下一个),
+预热阶段的请求不计入统计
+"""
+import asyncio
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import httpx
+
+from .workload import WRITE_OPERATIONS, next_request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 每个操作保留的错误示例数
+ERROR_SAMPLES = 3
+
+
+def percentile(ordered, ratio):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def summarize(latencies, errors, seconds):
+    """延迟列表(毫秒)的统计"""
+    ordered = sorted(latencies)
+    if not ordered:
+        return {'requests': 0, 'errors': errors, 'rps': 0.0}
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'rps': round(len(ordered) / seconds, 1),
+        'mean_ms': round(sum(ordered) / len(ordered), 2),
+        'p50_ms': round(percentile(ordered, 0.5), 2),
+        'p90_ms': round(percentile(ordered, 0.9), 2),
+        'p95_ms': round(percentile(ordered, 0.95), 2),
+        'p99_ms': round(percentile(ordered, 0.99), 2),
+        'max_ms': round(ordered[-1], 2),
+    }
+
+
+class Recorder:
+    """按操作记录延迟、状态码和错误示例"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+        self.error_samples = defaultdict(list)
+
+    def record(self, name, elapsed_ms, status, detail=None):
+        self.latencies[name].append(elapsed_ms)
+        self.statuses[name][status] += 1
+        if status == 'error' or status >= 400:
+            self.errors[name] += 1
+            if len(self.error_samples[name]) < ERROR_SAMPLES:
+                self.error_samples[name].append(f'{status}: {(detail or "")[:200]}')
+
+    def results(self, seconds):
+        operations = {}
+        for name in sorted(self.latencies):
+            stats = summarize(self.latencies[name], self.errors[name], seconds)
+            stats['write'] = name in WRITE_OPERATIONS
+            stats['status'] = {str(status): count for status, count in sorted(self.statuses[name].items(), key=str)}
+            if self.error_samples[name]:
+                stats['error_samples'] = self.error_samples[name]
+            operations[name] = stats
+
+        everything = [value for values in self.latencies.values() for value in values]
+        overall = summarize(everything, sum(self.errors.values()), seconds)
+        for kind, is_write in (('read', False), ('write', True)):
+            values = [value for name, values in self.latencies.items()
+                      if (name in WRITE_OPERATIONS) == is_write for value in values]
+            overall[f'{kind}_requests'] = len(values)
+            if values:
+                overall[f'{kind}_p95_ms'] = round(percentile(sorted(values), 0.95), 2)
+        return overall, operations
+
+
+async def _client_loop(client, state, weights, recorder, measure_from, stop_at):
+    while True:
+        now = time.perf_counter()
+        if now >= stop_at:
+            return
+        request = next_request(state, weights)
+        if request is None:
+            return
+        operation, user_id, method, path, options = request
+        options = dict(options)
+        headers = {} if options.pop('anonymous', False) else state.headers(user_id)
+
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, headers=headers, **options)
+            status, detail = response.status_code, None
+            if status >= 400:
+                detail = response.text
+            elif operation.on_success:
+                operation.on_success(state, user_id, response)
+        except Exception as e:
+            status, detail = 'error', f'{type(e).__name__}: {e}'
+        if started >= measure_from:
+            recorder.record(operation.name, (time.perf_counter() - started) * 1000, status, detail)
+
+
+async def run_load(client, state, weights, concurrency, duration, warmup, progress=print):
+    """
+    执行压测
+
+    Returns:
+        tuple: (overall, operations) 统计结果
+    """
+    recorder = Recorder()
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+    progress(f'🔄 预热 {warmup:g}s,压测 {duration:g}s,并发 {concurrency}')
+
+    tasks = [
+        asyncio.create_task(_client_loop(client, state, weights, recorder, measure_from, stop_at))
+        for _ in range(concurrency)
+    ]
+    await asyncio.gather(*tasks)
+    # 统计窗口内发出的请求可能在截止时间后才完成,按实际结束时间计算吞吐
+    seconds = max(duration, time.perf_counter() - measure_from)
+    return recorder.results(seconds)
+
+
+# ==========================================
+# 被测服务
+# ==========================================
+
+@asynccontextmanager
+async def asgi_client(db_path):
+    """进程内调用应用(httpx ASGITransport),包含完整的启动/关闭流程"""
+    from config.settings import Config
+    Config.SQLITE_DB_PATH = db_path
+    # 压测客户端都来自同一个 IP 和同一批用户,不启用限流
+    Config.RATE_LIMIT_ENABLED = False
+
+    import main
+    from apps.utils.log_pipeline import StreamWriter
+
+    # 应用日志照常格式化并写入日志文件,只丢弃控制台输出,避免与压测输出混在一起
+    devnull = open(os.devnull, 'w')
+    for writer in main.log_pipeline.writers:
+        if isinstance(writer, StreamWriter):
+            writer.stream = devnull
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=60) as client:
+            yield client
+
+
+@asynccontextmanager
+async def http_client(url, concurrency):
+    """通过网络访问已启动的服务"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        yield client
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def served_client(db_path, concurrency, workers=1, startup_timeout=60):
+    """在子进程中用 uvicorn 启动服务(使用压测数据库),通过本地端口访问"""
+    port = _free_port()
+    env = dict(os.environ, SQLITE_DB_PATH=os.path.abspath(db_path), RATE_LIMIT_ENABLED='false')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port),
+         '--workers', str(workers), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    url = f'http://127.0.0.1:{port}'
+    try:
+        async with http_client(url, concurrency) as client:
+            deadline = time.monotonic() + startup_timeout
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f'服务启动失败,退出码 {process.returncode}')
+                try:
+                    if (await client.get('/api/auth/config')).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f'服务 {startup_timeout}s 内未就绪')
+                await asyncio.sleep(0.2)
+            yield client
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# ==========================================
+# 运行环境
+# ==========================================
+
+def git_revision():
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+        return revision + ('-dirty' if dirty and revision else '')
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def environment():
+    return {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def copy_database(source, target):
+    """复制数据集(含语义向量文件),每次压测使用干净的副本"""
+    for suffix in ('', '-wal', '-shm', '.vectors'):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+        if os.path.exists(source + suffix):
+            shutil.copyfile(source + suffix, target + suffix)
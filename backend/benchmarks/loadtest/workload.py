@@ -0,0 +1,267 @@
+"""
+压测负载
+每个操作是一次 API 调用,按权重随机选择;用户按数据量加权选择(重度用户请求更多)
+
+写操作只修改已有提示词或本轮新建的提示词,删除只针对本轮新建的提示词,
+读操作引用的 id 在压测期间始终有效
+"""
+import random
+import sqlite3
+from collections import defaultdict
+
+from apps.utils.jwt_utils import JWTUtil
+from config.settings import Config
+
+from .dataset import SENTENCES, make_prompt
+
+# 各负载模式下的操作权重
+MIXES = {
+    'read': {
+        'list': 30, 'list_filtered': 8, 'detail': 25, 'versions': 10, 'version_detail': 5,
+        'tags': 8, 'popular_tags': 4, 'autocomplete': 5, 'search': 2, 'similar': 1, 'userinfo': 2,
+    },
+    'mixed': {
+        'list': 25, 'list_filtered': 6, 'detail': 20, 'versions': 8, 'version_detail': 4,
+        'tags': 6, 'popular_tags': 3, 'autocomplete': 4, 'search': 2, 'similar': 1, 'userinfo': 2,
+        'update': 7, 'create': 3, 'favorite': 3, 'use': 3, 'delete': 1, 'login': 2,
+    },
+    'write': {
+        'list': 10, 'detail': 10, 'versions': 5,
+        'update': 30, 'create': 15, 'favorite': 10, 'use': 10, 'delete': 5, 'login': 5,
+    },
+}
+
+WRITE_OPERATIONS = {'update', 'create', 'favorite', 'use', 'delete', 'login'}
+
+
+class WorkloadState:
+    """压测期间共享的数据: 用户令牌、各用户的提示词/版本 id 和标签"""
+
+    def __init__(self, users, prompts, versions, tags, rng):
+        self.rng = rng
+        # [(user_id, username)]
+        self.users = users
+        # user_id -> [prompt_id]
+        self.prompts = prompts
+        # prompt_id -> [version_id]
+        self.versions = versions
+        # user_id -> [tag_name]
+        self.tags = tags
+        # user_id -> [本轮新建的 prompt_id](可删除)
+        self.created = defaultdict(list)
+        self.weights = [len(prompts.get(user_id, ())) + 1 for user_id, _ in users]
+
+        if not JWTUtil.SECRET_KEY:
+            JWTUtil.init_app()
+        self.tokens = {user_id: JWTUtil.generate_token(user_id, username) for user_id, username in users}
+
+    @classmethod
+    def load(cls, db_path, seed=0):
+        """从压测数据库读取 id(压测开始前执行)"""
+        conn = sqlite3.connect(db_path)
+        try:
+            users = conn.execute("SELECT id, username FROM users WHERE is_active = 1 ORDER BY id").fetchall()
+            prompts = defaultdict(list)
+            for prompt_id, user_id in conn.execute("SELECT id, user_id FROM prompts"):
+                prompts[user_id].append(prompt_id)
+            versions = defaultdict(list)
+            for version_id, prompt_id in conn.execute("SELECT id, prompt_id FROM prompt_versions"):
+                versions[prompt_id].append(version_id)
+            tags = defaultdict(list)
+            for user_id, tag_name in conn.execute("SELECT user_id, tag_name FROM prompt_tags"):
+                tags[user_id].append(tag_name)
+        finally:
+            conn.close()
+        return cls(users, dict(prompts), dict(versions), dict(tags), random.Random(seed))
+
+    def pick_user(self):
+        return self.rng.choices(self.users, self.weights)[0][0]
+
+    def headers(self, user_id):
+        return {'Authorization': f'Bearer {self.tokens[user_id]}'}
+
+    def pick_prompt(self, user_id):
+        prompts = self.prompts.get(user_id)
+        return self.rng.choice(prompts) if prompts else None
+
+
+class Operation:
+    """一次请求: 名称(用于统计)和发送函数;prepare 返回 None 表示当前状态下无法执行(如用户没有提示词)"""
+
+    def __init__(self, name, prepare, on_success=None):
+        self.name = name
+        self.prepare = prepare
+        self.on_success = on_success
+
+
+def _list(state, user_id):
+    params = {
+        'page': state.rng.choice([1, 1, 1, 1, 2, 2, 3, 5]),
+        'limit': 20,
+        'sort': state.rng.choice(['create_time', 'create_time', 'update_time', 'use_count', 'view_count']),
+    }
+    return 'GET', '/api/prompts/', {'params': params}
+
+
+def _list_filtered(state, user_id):
+    params = {'page': 1, 'limit': 20}
+    choice = state.rng.random()
+    if choice < 0.4 and state.tags.get(user_id):
+        params['tag'] = state.rng.choice(state.tags[user_id])
+    elif choice < 0.7:
+        params['is_favorite'] = '1'
+    else:
+        params['keyword'] = state.rng.choice(['助手', '翻译', '代码', '报表', '计划', '合同'])
+        params['fuzzy'] = state.rng.random() < 0.3
+    return 'GET', '/api/prompts/', {'params': params}
+
+
+def _detail(state, user_id):
+    prompt_id = state.pick_prompt(user_id)
+    return prompt_id and ('GET', f'/api/prompts/{prompt_id}', {})
+
+
+def _versions(state, user_id):
+    prompt_id = state.pick_prompt(user_id)
+    return prompt_id and ('GET', f'/api/versions/{prompt_id}/versions', {'params': {'limit': 20}})
+
+
+def _version_detail(state, user_id):
+    prompt_id = state.pick_prompt(user_id)
+    versions = state.versions.get(prompt_id)
+    if not versions:
+        return None
+    return 'GET', f'/api/versions/{prompt_id}/versions/{state.rng.choice(versions)}', {}
+
+
+def _tags(state, user_id):
+    return 'GET', '/api/tags/', {}
+
+
+def _popular_tags(state, user_id):
+    return 'GET', '/api/tags/popular', {'params': {'limit': 20}}
+
+
+def _autocomplete(state, user_id):
+    prefix = state.rng.choice(['写', '翻', '编', '数据', '产品', '法', 'P', 'G', '资深', '英语'])
+    return 'GET', '/api/search/autocomplete', {'params': {'q': prefix, 'limit': 10}}
+
+
+def _search(state, user_id):
+    return 'GET', '/api/prompts/search', {'params': {'semantic': state.rng.choice(SENTENCES), 'limit': 10}}
+
+
+def _similar(state, user_id):
+    prompt_id = state.pick_prompt(user_id)
+    return prompt_id and ('GET', f'/api/prompts/{prompt_id}/similar', {'params': {'limit': 10}})
+
+
+def _userinfo(state, user_id):
+    return 'GET', '/api/auth/userinfo', {}
+
+
+def _payload(state, user_id):
+    prompt = make_prompt(state.rng, state.tags.get(user_id) or ['压测'])
+    prompt['thinking_points'] = [prompt['title']]
+    prompt['advice'] = [state.rng.choice(SENTENCES)]
+    return prompt
+
+
+def _update(state, user_id):
+    prompt_id = state.pick_prompt(user_id)
+    if not prompt_id:
+        return None
+    body = dict(_payload(state, user_id), id=prompt_id, change_summary='压测更新')
+    return 'POST', '/api/prompts/', {'json': body}
+
+
+def _create(state, user_id):
+    return 'POST', '/api/prompts/', {'json': _payload(state, user_id)}
+
+
+def _created(state, user_id, response):
+    prompt_id = response.json()['data']['id']
+    state.created[user_id].append(prompt_id)
+
+
+def _favorite(state, user_id):
+    prompt_id = state.pick_prompt(user_id)
+    return prompt_id and (
+        'POST', f'/api/prompts/{prompt_id}/favorite', {'json': {'is_favorite': state.rng.random() < 0.5}}
+    )
+
+
+def _use(state, user_id):
+    prompt_id = state.pick_prompt(user_id)
+    return prompt_id and ('POST', f'/api/prompts/{prompt_id}/use', {})
+
+
+def _delete(state, user_id):
+    created = state.created.get(user_id)
+    if not created:
+        return None
+    # 先从状态中移除,避免其他并发请求引用
+    prompt_id = created.pop(state.rng.randrange(len(created)))
+    return 'DELETE', f'/api/prompts/{prompt_id}', {}
+
+
+def _login(state, user_id):
+    body = {'username': Config.LOGIN_USERNAME, 'password': Config.LOGIN_PASSWORD}
+    return 'POST', '/api/auth/local/login', {'json': body, 'anonymous': True}
+
+
+OPERATIONS = {
+    'list': Operation('list', _list),
+    'list_filtered': Operation('list_filtered', _list_filtered),
+    'detail': Operation('detail', _detail),
+    'versions': Operation('versions', _versions),
+    'version_detail': Operation('version_detail', _version_detail),
+    'tags': Operation('tags', _tags),
+    'popular_tags': Operation('popular_tags', _popular_tags),
+    'autocomplete': Operation('autocomplete', _autocomplete),
+    'search': Operation('search', _search),
+    'similar': Operation('similar', _similar),
+    'userinfo': Operation('userinfo', _userinfo),
+    'update': Operation('update', _update),
+    'create': Operation('create', _create, _created),
+    'favorite': Operation('favorite', _favorite),
+    'use': Operation('use', _use),
+    'delete': Operation('delete', _delete),
+    'login': Operation('login', _login),
+}
+
+
+def parse_weights(mix, overrides=None):
+    """
+    负载模式权重,可用 "update=20,login=0" 覆盖单个操作
+
+    Returns:
+        dict: {操作名: 权重}(去掉权重为 0 的操作)
+    """
+    weights = dict(MIXES[mix])
+    for item in filter(None, (overrides or '').split(',')):
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f'未知操作: {name},可选: {", ".join(OPERATIONS)}')
+        weights[name] = float(value)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def next_request(state, weights):
+    """
+    选择下一个请求(无法执行的操作重新选择,最多 10 次)
+
+    Returns:
+        tuple: (Operation, user_id, method, path, options) 或 None
+    """
+    names = list(weights)
+    values = list(weights.values())
+    for _ in range(10):
+        operation = OPERATIONS[state.rng.choices(names, values)[0]]
+        user_id = state.pick_user()
+        request = operation.prepare(state, user_id)
+        if request:
+            method, path, options = request
+            return operation, user_id, method, path, options
+    return None
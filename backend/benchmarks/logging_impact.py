@@ -0,0 +1,172 @@
+"""
+日志写入方式对请求延迟的影响
+
+多个并发客户端模拟请求,每个请求写 3 条 INFO 日志和 2 条 DEBUG 日志(DEBUG 未启用),
+分别测量以下方式的请求耗时:
+- 同步写入: 原 setup_logging 配置(文件 sink 在请求中写入,轮转时在请求中压缩)
+- loguru enqueue=True: 写入在 loguru 后台线程,队列无界
+- 异步日志管道: apps.utils.log_pipeline(有界队列 + 批量写入 + 后台压缩)
+另外用每次 flush 耗时 1 ms 的慢速输出模拟磁盘繁忙(请求数取 1/10),观察同步写入的阻塞和管道的采样/丢弃,
+以及 DEBUG 日志使用 f-string 和 {} 参数两种写法的开销
+
+用法(在 backend 目录下):
+    python -m benchmarks.logging_impact --requests 20000 --clients 16
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import timeit
+
+from loguru import logger
+
+from apps.utils.log_pipeline import LogPipeline
+
+FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+# 轮转大小设得较小,使测试期间发生多次轮转和压缩
+ROTATION_BYTES = 2 * 1024 * 1024
+
+
+class SlowStream:
+    """每次 flush 耗时固定时间的输出(模拟繁忙的磁盘或日志采集管道)"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        time.sleep(self.delay)
+
+
+def setup_sync(directory):
+    logger.add(
+        os.path.join(directory, 'info.log'), format=FORMAT, level='INFO',
+        rotation=ROTATION_BYTES, compression='zip', encoding='utf-8'
+    )
+
+
+def setup_enqueue(directory):
+    logger.add(
+        os.path.join(directory, 'info.log'), format=FORMAT, level='INFO',
+        rotation=ROTATION_BYTES, compression='zip', encoding='utf-8', enqueue=True
+    )
+
+
+def setup_pipeline(directory):
+    pipeline = LogPipeline()
+    writer = pipeline.file_writer(os.path.join(directory, 'info.log'), ROTATION_BYTES, 1)
+    logger.add(pipeline.sink(writer), format=FORMAT, level='INFO')
+    return pipeline
+
+
+def setup_slow_sync(directory):
+    logger.add(SlowStream(0.001), format=FORMAT, level='INFO')
+
+
+def setup_slow_pipeline(directory):
+    pipeline = LogPipeline()
+    logger.add(pipeline.sink(pipeline.stream_writer(SlowStream(0.001))), format=FORMAT, level='INFO')
+    return pipeline
+
+
+# (名称, 配置函数, 请求数比例)
+SCENARIOS = [
+    ('同步写入', setup_sync, 1),
+    ('loguru enqueue=True', setup_enqueue, 1),
+    ('异步日志管道', setup_pipeline, 1),
+    ('慢速输出 + 同步写入', setup_slow_sync, 0.1),
+    ('慢速输出 + 异步日志管道', setup_slow_pipeline, 0.1),
+]
+
+
+async def handle_request(request_id, user_id):
+    """模拟一次请求的日志"""
+    logger.info(f'📥 收到请求: request_id={request_id}, user_id={user_id}')
+    logger.debug('✅ 认证成功: user_id={}, username={}', user_id, 'bench')
+    await asyncio.sleep(0)
+    logger.info(f'✅ 查询提示词列表成功: user_id={user_id}, total=20, page=1')
+    logger.debug('✅ 查询用户标签成功: user_id={}, count={}', user_id, 12)
+    logger.info(f'📤 请求完成: request_id={request_id}, status=200')
+
+
+async def client(client_id, requests, latencies):
+    for i in range(requests):
+        started = time.perf_counter()
+        await handle_request(f'{client_id}-{i}', client_id)
+        latencies.append((time.perf_counter() - started) * 1e6)
+
+
+def summarize(latencies, seconds):
+    ordered = sorted(latencies)
+    return (
+        f'{len(ordered) / seconds:>8.0f} 请求/秒  p50 {statistics.median(ordered):7.1f} µs  '
+        f'p99 {ordered[int(len(ordered) * 0.99)]:8.1f} µs  max {ordered[-1] / 1000:7.2f} ms'
+    )
+
+
+async def run_scenario(setup, requests, clients):
+    directory = tempfile.mkdtemp()
+    logger.remove()
+    pipeline = setup(directory)
+
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(client(c, requests // clients, latencies) for c in range(clients)))
+    seconds = time.perf_counter() - started
+
+    # 等待后台写入完成(不计入请求耗时)
+    flush_started = time.perf_counter()
+    if pipeline is not None:
+        pipeline.close()
+    logger.remove()
+    drained = time.perf_counter() - flush_started
+
+    archives = len([name for name in os.listdir(directory) if name.endswith('.zip')])
+    extra = f'  轮转 {archives} 次  退出时写入剩余 {drained:5.2f}s'
+    if pipeline is not None:
+        extra += f'  丢弃 {pipeline.dropped}'
+    shutil.rmtree(directory)
+    return summarize(latencies, seconds) + extra
+
+
+def debug_formatting_cost():
+    """DEBUG 未启用时两种写法的单次调用耗时(ns)"""
+    logger.remove()
+    logger.add(lambda message: None, level='INFO')
+    user_id, payload = 42, {'user_id': 42, 'username': 'bench'}
+    eager = min(timeit.repeat(
+        lambda: logger.debug(f'✅ Token验证成功, user_id: {payload.get("user_id")}, payload={payload}'),
+        number=100000, repeat=5
+    ))
+    lazy = min(timeit.repeat(
+        lambda: logger.debug('✅ Token验证成功, user_id: {}, payload={}', payload.get('user_id'), payload),
+        number=100000, repeat=5
+    ))
+    logger.remove()
+    return eager * 1e4, lazy * 1e4
+
+
+async def run(requests, clients):
+    print(f'请求数: {requests}, 并发客户端: {clients}, 每请求 3 条 INFO + 2 条 DEBUG')
+    for label, setup, ratio in SCENARIOS:
+        print(f'{label:<24}{await run_scenario(setup, int(requests * ratio), clients)}')
+
+    eager, lazy = debug_formatting_cost()
+    print(f'DEBUG 未启用时单次调用: f-string {eager:.0f} ns, {{}} 参数 {lazy:.0f} ns')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日志写入方式对请求延迟的影响')
+    parser.add_argument('--requests', type=int, default=20000, help='请求总数')
+    parser.add_argument('--clients', type=int, default=16, help='并发客户端数')
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.clients))
+
+
+if __name__ == '__main__':
+    main()
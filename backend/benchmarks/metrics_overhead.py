@@ -0,0 +1,130 @@
+"""
+指标采集开销基准测试
+
+1. 请求中间件: 同一个最简接口分别在有/无 MetricsMiddleware 时直接按 ASGI 调用,
+   对比单请求耗时
+2. 数据库适配器: 对比 SQLiteAdapter.get(带计时)与直接使用 aiosqlite 的耗时
+
+用法(在 backend 目录下):
+    python -m benchmarks.metrics_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import aiosqlite
+from fastapi import FastAPI
+
+from apps.utils.db_adapter import create_database_adapter
+from apps.utils.metrics_middleware import MetricsMiddleware
+
+
+def build_app(with_metrics):
+    """构建只有一个接口的应用"""
+    app = FastAPI()
+
+    @app.get('/api/items/{item_id}')
+    async def get_item(item_id: int):
+        return {'code': 200, 'data': {'id': item_id}}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def call(app, path):
+    """直接按 ASGI 协议调用应用(不经过网络和 HTTP 解析)"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': b'', 'headers': [(b'host', b'bench')], 'server': ('bench', 80), 'client': ('127.0.0.1', 1),
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def time_requests(app, count):
+    """返回每请求耗时(微秒)的分批中位数列表"""
+    batch = 500
+    samples = []
+    for start in range(0, count, batch):
+        started = time.perf_counter()
+        for i in range(batch):
+            await call(app, f'/api/items/{start + i}')
+        samples.append((time.perf_counter() - started) / batch * 1e6)
+    return samples
+
+
+async def bench_middleware(count):
+    plain, instrumented = build_app(False), build_app(True)
+
+    # 预热(路由编译、依赖解析缓存)
+    await time_requests(plain, 1000)
+    await time_requests(instrumented, 1000)
+
+    # 交替执行,减少 CPU 频率波动带来的偏差
+    plain_samples, metric_samples = [], []
+    for _ in range(5):
+        plain_samples += await time_requests(plain, count // 5)
+        metric_samples += await time_requests(instrumented, count // 5)
+
+    plain_us = statistics.median(plain_samples)
+    metric_us = statistics.median(metric_samples)
+    print(f'请求中间件: 无指标 {plain_us:.1f} µs/请求, 有指标 {metric_us:.1f} µs/请求, '
+          f'开销 {metric_us - plain_us:.1f} µs ({(metric_us / plain_us - 1) * 100:.1f}%)')
+
+
+async def bench_adapter(count):
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    adapter = await create_database_adapter('sqlite', {'path': db_path}, {})
+    raw = await aiosqlite.connect(db_path)
+    raw.row_factory = aiosqlite.Row
+    sql = "SELECT id, username, name FROM users WHERE id = ?"
+
+    async def via_adapter():
+        await adapter.get(sql, [1])
+
+    async def via_aiosqlite():
+        async with raw.execute(sql, [1]) as cursor:
+            row = await cursor.fetchone()
+            dict(row)
+
+    results = {}
+    for name, func in (('aiosqlite', via_aiosqlite), ('adapter', via_adapter)):
+        for _ in range(200):
+            await func()
+        started = time.perf_counter()
+        for _ in range(count):
+            await func()
+        results[name] = (time.perf_counter() - started) / count * 1e6
+
+    print(f'单条查询: aiosqlite 直接调用 {results["aiosqlite"]:.1f} µs, '
+          f'SQLiteAdapter.get(含计时) {results["adapter"]:.1f} µs')
+
+    await raw.close()
+    await adapter.close()
+
+
+async def run(count):
+    await bench_middleware(count)
+    await bench_adapter(count // 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='指标采集开销基准测试')
+    parser.add_argument('--requests', type=int, default=20000, help='请求次数')
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+服务启动耗时基准
+
+每次测量启动一个新的 Python 进程,依次记录:
+- 导入 main(fastapi、路由模块、日志配置)的耗时
+- lifespan 启动阶段(数据库连接、迁移检查、备份和维护调度)的耗时
+- 第一个请求的耗时
+- 从创建进程到第一个请求返回的总耗时(含解释器启动)
+
+分两种场景: existing(已有数据库,即普通重启)和 fresh(空数据库,首次部署)。
+普通重启的启动到首个请求(lifespan + 第一个请求)中位数超过目标时标记出来;
+首次部署包含一次性的管理员密码哈希(bcrypt 约 0.3 秒),只输出不做检查(tests/test_startup.py 做同样的断言);
+--importtime 额外用 python -X importtime 运行一次,输出按包汇总的导入耗时
+
+用法(在 backend 目录下):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --importtime --check
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.normpath(os.path.join(BACKEND_DIR, '..', 'data', 'benchmarks', 'startup'))
+
+SCENARIOS = ['existing', 'fresh']
+# 检查目标耗时的场景
+TARGET_SCENARIOS = ['existing']
+TARGET_MS = 300
+# 各阶段(毫秒)
+STAGES = ['import_ms', 'lifespan_ms', 'first_request_ms', 'ttfr_ms', 'process_ms']
+FIRST_REQUEST = '/api/auth/config'
+
+
+def child(result_path):
+    """
+    子进程: 测量本进程的启动各阶段
+
+    计时开始前只导入了标准库,保证 main 的依赖都计入导入耗时
+    """
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+
+    import httpx
+
+    async def serve_first_request():
+        lifespan_started = time.perf_counter()
+        async with main.lifespan(main.app):
+            ready = time.perf_counter()
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://startup') as client:
+                response = await client.get(FIRST_REQUEST)
+            done = time.perf_counter()
+            finished_at = time.time()
+        return response.status_code, lifespan_started, ready, done, finished_at
+
+    status, lifespan_started, ready, done, finished_at = asyncio.run(serve_first_request())
+    result = {
+        'status': status,
+        'import_ms': (imported - started) * 1000,
+        'lifespan_ms': (ready - lifespan_started) * 1000,
+        'first_request_ms': (done - ready) * 1000,
+        'ttfr_ms': (done - lifespan_started) * 1000,
+        'finished_at': finished_at,
+    }
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+
+
+def remove_database(db_path):
+    for suffix in ('', '-wal', '-shm', '.vectors'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+def spawn(db_path, extra_args=()):
+    """
+    启动子进程测量一次
+
+    Returns:
+        tuple: (各阶段耗时, 子进程 stderr)
+    """
+    env = dict(os.environ, SQLITE_DB_PATH=db_path)
+    fd, result_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        spawned_at = time.time()
+        process = subprocess.run(
+            [sys.executable, *extra_args, '-m', 'benchmarks.startup', '--child', result_path],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        if process.returncode != 0:
+            sys.exit(f'❌ 子进程启动失败:\n{process.stderr[-2000:]}')
+        with open(result_path, encoding='utf-8') as f:
+            result = json.load(f)
+    finally:
+        os.remove(result_path)
+    if result['status'] != 200:
+        sys.exit(f'❌ 首个请求 {FIRST_REQUEST} 返回 {result["status"]}')
+    result['process_ms'] = (result.pop('finished_at') - spawned_at) * 1000
+    return result, process.stderr
+
+
+async def prepare_database(db_path):
+    """创建数据库并写入管理员密码哈希(之后每次启动都相当于普通重启)"""
+    from apps.utils.db_adapter import create_database_adapter, sync_admin_account
+    from config.settings import Config
+
+    adapter = await create_database_adapter('sqlite', {'path': db_path}, {})
+    await sync_admin_account(adapter, {
+        'DEFAULT_ADMIN_USERNAME': Config.DEFAULT_ADMIN_USERNAME,
+        'DEFAULT_ADMIN_PASSWORD': Config.DEFAULT_ADMIN_PASSWORD,
+        'DEFAULT_ADMIN_NAME': Config.DEFAULT_ADMIN_NAME,
+    })
+    await adapter.close()
+
+
+def run_scenario(scenario, runs):
+    """某个场景测量 runs 次,返回各阶段的中位数和最大值"""
+    db_path = os.path.join(DATA_DIR, f'{scenario}.db')
+    remove_database(db_path)
+    if scenario == 'existing':
+        asyncio.run(prepare_database(db_path))
+
+    samples = defaultdict(list)
+    for _ in range(runs):
+        if scenario == 'fresh':
+            remove_database(db_path)
+        result, _ = spawn(db_path)
+        for stage in STAGES:
+            samples[stage].append(result[stage])
+    remove_database(db_path)
+    return {
+        stage: {'median': round(statistics.median(values), 1), 'max': round(max(values), 1)}
+        for stage, values in samples.items()
+    }
+
+
+def parse_importtime(output):
+    """
+    解析 python -X importtime 的输出
+
+    Returns:
+        list: [(模块, 自身耗时 µs, 累计耗时 µs)]
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def import_profile(top):
+    """用 -X importtime 启动一次,按顶层包汇总导入耗时"""
+    db_path = os.path.join(DATA_DIR, 'importtime.db')
+    remove_database(db_path)
+    _, stderr = spawn(db_path, ['-X', 'importtime'])
+    remove_database(db_path)
+    modules = parse_importtime(stderr)
+    main_cumulative = next((cumulative for name, _, cumulative in modules if name == 'main'), 0)
+
+    packages = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.split('.')[0]] += self_us
+    return {
+        'main_ms': round(main_cumulative / 1000, 1),
+        'packages': [
+            {'package': package, 'self_ms': round(self_us / 1000, 1)}
+            for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        ],
+        'modules': [
+            {'module': name, 'self_ms': round(self_us / 1000, 1), 'cumulative_ms': round(cumulative_us / 1000, 1)}
+            for name, self_us, cumulative_us in sorted(modules, key=lambda item: -item[1])[:top]
+        ],
+    }
+
+
+def print_import_profile(profile):
+    print(f'\n导入 main 共 {profile["main_ms"]} ms(-X importtime,含计时开销)')
+    print(f'{"包":<28}{"自身(ms)":>10}')
+    for item in profile['packages']:
+        print(f'{item["package"]:<29}{item["self_ms"]:>10.1f}')
+    print(f'\n{"模块":<50}{"自身(ms)":>10}{"累计(ms)":>10}')
+    for item in profile['modules']:
+        print(f'{item["module"]:<52}{item["self_ms"]:>10.1f}{item["cumulative_ms"]:>10.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='服务启动耗时基准')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--runs', type=int, default=5, help='每个场景的启动次数')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f'场景,逗号分隔({"/".join(SCENARIOS)})')
+    parser.add_argument('--target-ms', type=float, default=TARGET_MS, help='启动到首个请求的目标耗时(毫秒)')
+    parser.add_argument('--importtime', action='store_true', help='输出导入耗时分析')
+    parser.add_argument('--top', type=int, default=15, help='导入耗时分析显示的条数')
+    parser.add_argument('--check', action='store_true', help='超过目标耗时时退出码为 1')
+    parser.add_argument('--output', help='保存结果的 JSON 文件')
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(',') if scenario.strip()]
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            sys.exit(f'未知场景: {scenario},可选: {", ".join(SCENARIOS)}')
+
+    from loguru import logger
+    from benchmarks.loadtest.runner import environment
+
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    results = {scenario: run_scenario(scenario, args.runs) for scenario in scenarios}
+    print(f'{"场景":<10}{"导入":>10}{"lifespan":>12}{"首个请求":>10}{"启动到首个请求":>14}{"进程总耗时":>12}  (中位数/最大值 ms)')
+    over = []
+    for scenario, stages in results.items():
+        cells = ''.join(f'{stages[stage]["median"]:>8.1f}/{stages[stage]["max"]:<6.0f}' for stage in STAGES)
+        mark = ''
+        if scenario in TARGET_SCENARIOS and stages['ttfr_ms']['median'] > args.target_ms:
+            mark = '  ❌'
+            over.append(scenario)
+        print(f'{scenario:<12}{cells}{mark}')
+
+    report = {'meta': dict(environment(), runs=args.runs, target_ms=args.target_ms), 'results': results}
+    if args.importtime:
+        report['importtime'] = import_profile(args.top)
+        print_import_profile(report['importtime'])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+    if over:
+        print(f'\n❌ 启动到首个请求超过 {args.target_ms:g} ms: {", ".join(over)}')
+        if args.check:
+            sys.exit(1)
+    else:
+        print(f'\n✅ 普通重启的启动到首个请求在 {args.target_ms:g} ms 以内')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,17 @@
 # -*- coding: utf-8 -*-
 
-from importlib import util
+from importlib import import_module, util
 import os
 
 env = os.environ.get('APP_ENV', 'dev')
 try:
-    spec = util.spec_from_file_location('', 'config/{}.py'.format(env))
-    cfg_mod = util.module_from_spec(spec)
-    spec.loader.exec_module(cfg_mod)
-except Exception as e:
+    # 作为 config 包的子模块导入（只执行一次，之后从 sys.modules 复用）
+    cfg_mod = import_module('config.{}'.format(env))
+except ModuleNotFoundError:
+    # 兼容放在项目根目录 config/ 下的环境配置
     spec = util.spec_from_file_location('', '../../config/{}.py'.format(env))
     cfg_mod = util.module_from_spec(spec)
     spec.loader.exec_module(cfg_mod)
 
 
 cf = getattr(cfg_mod,'Config')()
-
-
@@ -13,6 +13,37 @@ class BaseConfig(object):
     # ==========================================
     # SQLite配置（零配置启动）
     SQLITE_DB_PATH = '../data/yprompt.db'
+    # 日志模式（WAL 下读不阻塞写，在线备份和 WAL 归档依赖该模式）
+    SQLITE_JOURNAL_MODE = 'WAL'
+
+    # ==========================================
+    # 备份配置
+    # ==========================================
+    # 是否启用定时快照
+    BACKUP_ENABLED = False
+    # 快照目录
+    BACKUP_DIR = '../data/backups'
+    # 快照间隔（小时）
+    BACKUP_INTERVAL_HOURS = 24
+    # 保留的快照数量
+    BACKUP_RETENTION = 7
+    # 在线备份每步复制的页数和步间隔（毫秒），步越小对请求延迟影响越小，备份耗时越长
+    BACKUP_PAGES_PER_STEP = 256
+    BACKUP_STEP_SLEEP_MS = 5
+    # 是否归档 WAL 增量段（可恢复到任意归档时间点，仅单 worker 部署有效）
+    BACKUP_WAL_SHIPPING = False
+    # WAL 归档间隔（秒）
+    BACKUP_WAL_INTERVAL_SECONDS = 60
+
+    # ==========================================
+    # 数据库维护配置
+    # ==========================================
+    # 是否在空闲时段执行 ANALYZE / PRAGMA optimize / 增量 vacuum / 标签计数校准
+    MAINTENANCE_ENABLED = True
+    # 连续多少秒没有 SQL 执行视为空闲
+    MAINTENANCE_IDLE_SECONDS = 5
+    # 单次维护的时间预算（毫秒），超出或有请求排队时暂停，下次继续
+    MAINTENANCE_BUDGET_MS = 500
 
     # ==========================================
     # 前端静态文件配置
@@ -23,7 +54,110 @@ class BaseConfig(object):
     # 自定义路径: 可以设置为绝对路径，如 /path/to/dist
     FRONTEND_DIST_PATH = '../dist'
 
+    # 访问日志（每个请求一行 JSON，写入 access.log，可用 python -m apps.utils.access_log 汇总）
     ACCESS_LOG = False
+    # 访问日志采样率（0~1），慢请求和 5xx 请求始终记录
+    ACCESS_LOG_SAMPLE_RATE = 1.0
+    # 超过该耗时（毫秒）的请求始终记录
+    ACCESS_LOG_SLOW_MS = 1000
+
+    # ==========================================
+    # 监控配置
+    # ==========================================
+    # 是否启用请求指标中间件和 /metrics 接口
+    METRICS_ENABLED = True
+    # /metrics 访问令牌（必须配置，请求需携带 Authorization: Bearer <token>；为空时接口拒绝所有请求）
+    METRICS_TOKEN = ''
+    # 慢查询阈值（毫秒），超过时记录日志
+    SLOW_QUERY_MS = 200
+    # 慢查询是否附带 EXPLAIN QUERY PLAN（同一语句模板每分钟最多一次）
+    SLOW_QUERY_EXPLAIN = True
+    # 是否启用管理员性能分析接口（/api/monitoring/profile/*，仅在调用时产生开销）
+    PROFILING_ENABLED = True
+    # 同时进行的分析任务数上限（CPU 采样和内存快照合计）
+    PROFILING_MAX_CONCURRENT = 1
+    # 单次 CPU 采样最长秒数
+    PROFILING_MAX_SECONDS = 60
+    # 就绪探针 /readyz：数据库探测（SELECT 1，与请求 SQL 同队列排队）超时毫秒数
+    READINESS_TIMEOUT_MS = 500
+    # 就绪探针：连接队列中已提交未完成的 SQL 数达到该值时返回 503（过载，暂停接收流量）
+    READINESS_MAX_PENDING = 64
+
+    # ==========================================
+    # 限流配置
+    # ==========================================
+    # 是否启用限流（环境变量 RATE_LIMIT_ENABLED=false 可关闭，如压测时）
+    RATE_LIMIT_ENABLED = True
+    # 令牌桶 (每秒补充令牌数, 桶容量)；读为 GET/HEAD，写为其他方法；每秒令牌数为 0 时不限制
+    # 同一 IP 可能有多个用户（NAT、公司出口），IP 额度应大于单用户额度
+    RATE_LIMIT_IP_READ = (50, 200)
+    RATE_LIMIT_IP_WRITE = (10, 40)
+    RATE_LIMIT_USER_READ = (20, 100)
+    RATE_LIMIT_USER_WRITE = (5, 20)
+    # 最多保留的令牌桶数（超出时淘汰最久未使用的）
+    RATE_LIMIT_MAX_KEYS = 10000
+    # 是否信任 X-Forwarded-For 取客户端 IP（仅在反向代理之后部署时开启）
+    RATE_LIMIT_TRUST_PROXY = False
+    # 耗时接口（版本对比、相似推荐、重复检测、语义搜索）每个用户同时进行的请求数上限
+    RATE_LIMIT_EXPENSIVE_CONCURRENCY = 2
+
+    # ==========================================
+    # 读请求合并
+    # ==========================================
+    # 参数相同的并发读调用（提示词列表/详情、版本历史、用户标签）只查询一次数据库，结果共享
+    SINGLE_FLIGHT_ENABLED = True
+
+    # ==========================================
+    # 自动保存合并
+    # ==========================================
+    # 带 auto_save 的保存请求先进入待写队列并立即返回，最后一次保存后该毫秒数内没有新的保存时合并写入（0 表示不合并，逐次写入）
+    AUTOSAVE_DEBOUNCE_MS = 3000
+    # 持续自动保存时，第一次保存后最迟该毫秒数内写入一次
+    AUTOSAVE_MAX_DELAY_MS = 15000
+
+    # ==========================================
+    # 事件推送（SSE /api/events）
+    # ==========================================
+    # 心跳间隔秒数（保持代理和负载均衡器上的空闲连接）
+    SSE_HEARTBEAT_SECONDS = 15
+    # 每个连接最多缓存的事件数（客户端读取过慢时丢弃最早的事件并推送 resync）
+    SSE_BUFFER_SIZE = 100
+    # 每个用户的最大连接数（每个标签页一个连接）
+    SSE_MAX_CONNECTIONS_PER_USER = 10
+    # 连接票据有效秒数（EventSource 不能设置请求头，用一次性票据代替 Token 放在 URL 中）
+    SSE_TICKET_TTL = 60
+
+    # ==========================================
+    # 提示词规则
+    # ==========================================
+    # 默认规则文件（JSON，字段名 -> 规则文本），用户未自定义的字段使用其中的内容；为空时未自定义的字段返回 null
+    PROMPT_RULES_DEFAULTS_FILE = None
+    # 缓存的用户规则数（超出时淘汰最久未使用的）
+    PROMPT_RULES_CACHE_SIZE = 1000
+    # 缓存有效秒数（多 worker 部署时其他 worker 的修改最迟在该时间后生效）
+    PROMPT_RULES_CACHE_TTL = 60
+
+    # ==========================================
+    # 搜索配置
+    # ==========================================
+    # 自动补全索引最多缓存的用户数（LRU淘汰）
+    AUTOCOMPLETE_MAX_USERS = 1000
+    # 每个前缀索引最多缓存的查询结果数（LRU淘汰）
+    AUTOCOMPLETE_QUERY_CACHE_SIZE = 256
+    # 模糊搜索索引最多缓存的用户数（LRU淘汰）
+    FUZZY_INDEX_MAX_USERS = 200
+    # 模糊搜索最低相似度（查询三元组命中比例）
+    FUZZY_SEARCH_THRESHOLD = 0.4
+    # 模糊搜索最多返回的候选数
+    FUZZY_SEARCH_MAX_RESULTS = 1000
+    # 描述参与索引的最大字符数
+    FUZZY_DESCRIPTION_CHARS = 500
+    # 语义搜索向量维度（修改后需删除 <数据库路径>.vectors 和 prompt_vectors 表重建）
+    SEMANTIC_VECTOR_DIM = 256
+    # 参与向量化的最终提示词最大字符数
+    SEMANTIC_MAX_CHARS = 20000
+    # 近似重复判定阈值(MinHash 估计的 Jaccard 相似度)
+    DUPLICATE_THRESHOLD = 0.8
 
     # 服务worker数量
     WORKERS = 1
@@ -41,6 +175,14 @@ class BaseConfig(object):
     # 保留这些路径配置用于兼容性（可选）
     LOGGING_INFO_FILE = '../data/logs/backend/info.log'
     LOGGING_ERROR_FILE = '../data/logs/backend/error.log'
+    # 日志目录（为空时依次尝试 ../data/logs/backend、data/logs/backend、/app/data/logs/backend）
+    LOG_DIR = ''
+    # 日志写入队列长度（由独立线程写入文件和控制台）
+    LOG_QUEUE_SIZE = 10000
+    # 队列超过一半时 INFO 日志每 N 条保留 1 条，DEBUG 日志丢弃
+    LOG_SAMPLE_RATE = 10
+    # 错误日志的异常堆栈是否附带变量值（开销较大，且可能把密码、Token 写入日志）
+    LOG_DIAGNOSE = False
 
     # 告警源和派生表映射关系
     S2T = {
@@ -10,6 +10,15 @@ class Config(BaseConfig):
     # JWT配置（优先使用环境变量）
     SECRET_KEY = os.getenv('SECRET_KEY') or cf.SECRET_KEY
 
+    # /metrics 访问令牌（环境变量优先，未配置时指标接口不可访问）
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN') or getattr(cf, 'METRICS_TOKEN', '')
+
+    # 日志目录（环境变量优先，为空时自动选择）
+    LOG_DIR = os.getenv('LOG_DIR') or getattr(cf, 'LOG_DIR', '')
+
+    # 限流开关（环境变量优先）
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+
     # 登录用户配置（仅从环境变量读取）
     LOGIN_USERNAME = os.getenv('LOGIN_USERNAME', 'admin')
     LOGIN_PASSWORD = os.getenv('LOGIN_PASSWORD', 'admin123')
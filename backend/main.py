@@ -1,8 +1,10 @@
 """
 FastAPI 应用入口
 """
+import atexit
 import os
 import sys
+import time
 from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,35 +13,57 @@ from fastapi.responses import FileResponse, HTMLResponse
 from contextlib import asynccontextmanager
 from loguru import logger
 
+from apps.utils.access_log import AccessLogMiddleware, TimedRoute, is_access_record
 from apps.utils.db_utils import init_database, close_database
+from apps.utils.backup import init_backup, close_backup
+from apps.utils.maintenance import init_maintenance, close_maintenance
 from apps.utils.jwt_utils import JWTUtil
+from apps.utils.lazy_routers import LazyRouterMiddleware, LazyRouters
+from apps.utils.log_pipeline import LogPipeline
+from apps.utils.metrics_middleware import MetricsMiddleware
+from apps.utils.rate_limit import RateLimitMiddleware, create_rate_limiter
+from apps.modules.prompts.autosave import autosaves
+from apps.utils.event_hub import events
 from config.settings import Config
 
 
 # 配置 loguru 日志
 def setup_logging():
-    """配置 loguru 日志系统"""
+    """
+    配置 loguru 日志系统
+    
+    所有输出都经由异步日志管道: 请求中只把日志放入队列,由写入线程写控制台和文件,
+    文件轮转压缩在后台线程执行
+    """
     # 移除默认的handler
     logger.remove()
     
+    pipeline = LogPipeline(
+        max_queue=getattr(Config, 'LOG_QUEUE_SIZE', 10000),
+        sample_rate=getattr(Config, 'LOG_SAMPLE_RATE', 10)
+    )
+    # 进程退出时写完队列中剩余的日志
+    atexit.register(pipeline.close)
+    
     # 控制台输出（带颜色）
     logger.add(
-        sys.stdout,
+        pipeline.sink(pipeline.stream_writer(sys.stdout)),
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level="INFO",
-        colorize=True
+        colorize=True,
+        filter=is_app_record
     )
     
     # 日志文件输出
-    # 尝试多个可能的路径
+    # 优先使用配置的目录，否则尝试多个可能的路径
     possible_log_dirs = [
         Path('../data/logs/backend'),
         Path('data/logs/backend'),
         Path('/app/data/logs/backend'),
     ]
     
-    log_dir = None
-    for dir_path in possible_log_dirs:
+    log_dir = Path(Config.LOG_DIR) if getattr(Config, 'LOG_DIR', '') else None
+    for dir_path in ([] if log_dir else possible_log_dirs):
         if dir_path.exists() or dir_path.parent.exists():
             log_dir = dir_path
             break
@@ -50,34 +74,43 @@ def setup_logging():
     
     log_dir.mkdir(parents=True, exist_ok=True)
     
-    # INFO级别日志
+    # INFO级别日志（10 MB 轮转，保留 10 天）
     logger.add(
-        log_dir / 'info.log',
+        pipeline.sink(pipeline.file_writer(log_dir / 'info.log', 10 * 1024 * 1024, 10)),
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
         level="INFO",
-        rotation="10 MB",
-        retention="10 days",
-        compression="zip",
-        encoding="utf-8"
+        filter=is_app_record
     )
     
-    # ERROR级别日志
+    # ERROR级别日志（10 MB 轮转，保留 30 天）
     logger.add(
-        log_dir / 'error.log',
+        pipeline.sink(pipeline.file_writer(log_dir / 'error.log', 10 * 1024 * 1024, 30)),
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
         level="ERROR",
-        rotation="10 MB",
-        retention="30 days",
-        compression="zip",
-        encoding="utf-8",
+        filter=is_app_record,
         backtrace=True,
-        diagnose=True
+        diagnose=getattr(Config, 'LOG_DIAGNOSE', False)
     )
     
+    # 访问日志（每行一条 JSON）
+    if getattr(Config, 'ACCESS_LOG', False):
+        logger.add(
+            pipeline.sink(pipeline.file_writer(log_dir / 'access.log', 50 * 1024 * 1024, 7)),
+            format="{message}",
+            level="INFO",
+            filter=is_access_record
+        )
+    
     logger.info(f"📝 日志系统初始化完成，日志目录: {log_dir}")
+    return pipeline
+
+
+def is_app_record(record):
+    """访问日志只写入 access.log"""
+    return not is_access_record(record)
 
 # 初始化日志
-setup_logging()
+log_pipeline = setup_logging()
 
 
 @asynccontextmanager
@@ -85,19 +118,30 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时初始化
     logger.info("🚀 启动 YPrompt 服务...")
+    started = time.perf_counter()
     
     # 初始化数据库
     await init_database(app)
     
+    # 启动定时备份
+    await init_backup(app)
+    
+    # 启动数据库维护调度
+    await init_maintenance(app)
+    
     # 初始化 JWT
     JWTUtil.init_app()
     
-    logger.info("✅ 服务启动完成")
+    logger.info(f"✅ 服务启动完成，耗时 {(time.perf_counter() - started) * 1000:.0f} ms")
     
     yield
     
     # 关闭时清理
     logger.info("🛑 关闭 YPrompt 服务...")
+    await events.close()
+    await autosaves.close()
+    await close_maintenance(app)
+    await close_backup(app)
     await close_database(app)
     logger.info("✅ 服务已关闭")
 
@@ -109,6 +153,16 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan
 )
+# 应用上直接注册的路由(SPA)同样记录端点耗时
+app.router.route_class = TimedRoute
+
+# 限流(最内层: 429 响应同样带 CORS 头,并计入请求指标和访问日志)
+if getattr(Config, 'RATE_LIMIT_ENABLED', True):
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=create_rate_limiter(),
+        trust_proxy=getattr(Config, 'RATE_LIMIT_TRUST_PROXY', False)
+    )
 
 # 配置 CORS
 app.add_middleware(
@@ -119,21 +173,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 导入并注册路由
-try:
-    from apps.modules.auth.views import router as auth_router
-    from apps.modules.prompts.views import router as prompts_router
-    from apps.modules.tags.views import router as tags_router
-    from apps.modules.versions.views import router as versions_router
-    from apps.modules.prompt_rules.views import router as prompt_rules_router
-    
-    app.include_router(auth_router)
-    app.include_router(prompts_router)
-    app.include_router(tags_router)
-    app.include_router(versions_router)
-    app.include_router(prompt_rules_router)
-except ImportError as e:
-    logger.warning(f"⚠️  部分路由模块导入失败: {e}")
+# 请求指标(/metrics)
+if getattr(Config, 'METRICS_ENABLED', True):
+    app.add_middleware(MetricsMiddleware)
+    if not getattr(Config, 'METRICS_TOKEN', ''):
+        logger.warning('⚠️  未配置 METRICS_TOKEN，/metrics 接口将拒绝所有请求')
+
+# 访问日志(access.log)
+if getattr(Config, 'ACCESS_LOG', False):
+    app.add_middleware(
+        AccessLogMiddleware,
+        sample_rate=getattr(Config, 'ACCESS_LOG_SAMPLE_RATE', 1.0),
+        slow_ms=getattr(Config, 'ACCESS_LOG_SLOW_MS', 1000)
+    )
+
+# 注册路由: 按路径前缀懒加载,首次请求对应前缀时才导入路由模块(见 apps/utils/lazy_routers.py)
+routers = LazyRouters(app, {
+    'apps.modules.auth.views': ('/api/auth',),
+    'apps.modules.prompts.views': ('/api/prompts',),
+    'apps.modules.tags.views': ('/api/tags',),
+    'apps.modules.versions.views': ('/api/versions',),
+    'apps.modules.prompt_rules.views': ('/api/prompt-rules',),
+    'apps.modules.search.views': ('/api/search',),
+    'apps.modules.monitoring.views': ('/healthz', '/readyz', '/metrics', '/api/monitoring'),
+    'apps.modules.sync.views': ('/api/sync',),
+    'apps.modules.events.views': ('/api/events',),
+    'apps.modules.stats.views': ('/api/stats',),
+})
+app.add_middleware(LazyRouterMiddleware, routers=routers)
 
 
 # 配置静态文件服务
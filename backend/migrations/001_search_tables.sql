@@ -0,0 +1,36 @@
+-- 语义搜索和近似重复检测表(与 init_sqlite.sql 中定义一致)
+
+CREATE TABLE IF NOT EXISTS prompt_vectors (
+  prompt_id INTEGER PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  content_hash VARCHAR(32) NOT NULL,
+  update_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+  
+  FOREIGN KEY (prompt_id) REFERENCES prompts(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_prompt_vectors_user_id ON prompt_vectors(user_id);
+
+CREATE TABLE IF NOT EXISTS prompt_minhash (
+  prompt_id INTEGER PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  signature BLOB DEFAULT NULL,
+  content_hash VARCHAR(32) NOT NULL,
+  update_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+  
+  FOREIGN KEY (prompt_id) REFERENCES prompts(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_prompt_minhash_user_id ON prompt_minhash(user_id);
+
+CREATE TABLE IF NOT EXISTS prompt_lsh_buckets (
+  user_id INTEGER NOT NULL,
+  band INTEGER NOT NULL,
+  bucket INTEGER NOT NULL,
+  prompt_id INTEGER NOT NULL,
+  
+  FOREIGN KEY (prompt_id) REFERENCES prompts(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON prompt_lsh_buckets(user_id, band, bucket);
+CREATE INDEX IF NOT EXISTS idx_lsh_prompt_id ON prompt_lsh_buckets(prompt_id);
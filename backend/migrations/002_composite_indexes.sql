@@ -0,0 +1,9 @@
+-- 组合索引: 列表页按用户过滤后排序,避免临时 B 树排序(apps.utils.index_advisor 生成)
+
+CREATE INDEX IF NOT EXISTS idx_prompts_user_id_create_time ON prompts(user_id, create_time);
+CREATE INDEX IF NOT EXISTS idx_prompts_user_id_update_time ON prompts(user_id, update_time);
+CREATE INDEX IF NOT EXISTS idx_prompts_user_id_view_count ON prompts(user_id, view_count);
+CREATE INDEX IF NOT EXISTS idx_prompts_user_id_use_count ON prompts(user_id, use_count);
+CREATE INDEX IF NOT EXISTS idx_prompts_user_id_is_favorite_create_time ON prompts(user_id, is_favorite, create_time);
+CREATE INDEX IF NOT EXISTS idx_prompt_versions_prompt_id_create_time ON prompt_versions(prompt_id, create_time);
+CREATE INDEX IF NOT EXISTS idx_prompt_tags_user_id_use_count_create_time ON prompt_tags(user_id, use_count, create_time);
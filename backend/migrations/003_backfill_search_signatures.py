@@ -0,0 +1,20 @@
+"""
+为已有提示词补算语义向量和 MinHash 签名
+
+在服务启动后后台执行,逐用户分批写入(每批单独提交),不阻塞正常请求
+"""
+import asyncio
+
+from apps.modules.search.duplicates import duplicate_detector
+from apps.modules.search.semantic import semantic_index
+
+ONLINE = True
+
+
+async def upgrade(db, migrator):
+    users = await db.query("SELECT DISTINCT user_id FROM prompts")
+    for row in users:
+        await semantic_index.backfill(db, row['user_id'])
+        await duplicate_detector.backfill(db, row['user_id'])
+        # 用户之间让出事件循环
+        await asyncio.sleep(0)
@@ -0,0 +1,119 @@
+-- 增量同步变更序列: change_log 表及 prompts / prompt_versions / prompt_tags / user_prompt_rules 上的触发器(与 init_sqlite.sql 中定义一致)
+
+-- 变更序列（增量同步 GET /api/sync 使用）
+-- 每行数据只保留最近一次变更: 同一行再次变更时替换旧记录并分配新的 seq（AUTOINCREMENT 保证单调递增、不复用）
+-- op: U 新增或修改, D 删除（墓碑）
+CREATE TABLE IF NOT EXISTS change_log (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL,
+  entity VARCHAR(20) NOT NULL,
+  entity_id INTEGER NOT NULL,
+  op CHAR(1) NOT NULL,
+  change_time DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uk_change_log_entity ON change_log(entity, entity_id);
+CREATE INDEX IF NOT EXISTS idx_change_log_user_id_seq ON change_log(user_id, seq);
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompts_insert
+AFTER INSERT ON prompts
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'prompt', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompts_update
+AFTER UPDATE ON prompts
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'prompt', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompts_delete
+AFTER DELETE ON prompts
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op) VALUES (OLD.user_id, 'prompt', OLD.id, 'D');
+END;
+
+-- 版本表没有 user_id,取所属提示词的用户（提示词级联删除时已不存在,取版本创建者）
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_versions_insert
+AFTER INSERT ON prompt_versions
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op)
+  SELECT user_id, 'version', NEW.id, 'U' FROM prompts WHERE id = NEW.prompt_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_versions_update
+AFTER UPDATE ON prompt_versions
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op)
+  SELECT user_id, 'version', NEW.id, 'U' FROM prompts WHERE id = NEW.prompt_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_versions_delete
+AFTER DELETE ON prompt_versions
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op)
+  SELECT user_id, 'version', OLD.id, 'D'
+  FROM (SELECT COALESCE((SELECT user_id FROM prompts WHERE id = OLD.prompt_id), OLD.created_by) AS user_id)
+  WHERE user_id IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_tags_insert
+AFTER INSERT ON prompt_tags
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'tag', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_tags_update
+AFTER UPDATE ON prompt_tags
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'tag', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_tags_delete
+AFTER DELETE ON prompt_tags
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op) VALUES (OLD.user_id, 'tag', OLD.id, 'D');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_user_prompt_rules_insert
+AFTER INSERT ON user_prompt_rules
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'rules', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_user_prompt_rules_update
+AFTER UPDATE ON user_prompt_rules
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'rules', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_user_prompt_rules_delete
+AFTER DELETE ON user_prompt_rules
+FOR EACH ROW
+BEGIN
+  INSERT OR REPLACE INTO change_log (user_id, entity, entity_id, op) VALUES (OLD.user_id, 'rules', OLD.id, 'D');
+END;
+
+-- 已有数据登记为一次变更,seq=0 的客户端可以通过 /api/sync 取得全部数据
+INSERT OR IGNORE INTO change_log (user_id, entity, entity_id, op)
+SELECT user_id, 'prompt', id, 'U' FROM prompts;
+
+INSERT OR IGNORE INTO change_log (user_id, entity, entity_id, op)
+SELECT p.user_id, 'version', v.id, 'U' FROM prompt_versions v JOIN prompts p ON p.id = v.prompt_id;
+
+INSERT OR IGNORE INTO change_log (user_id, entity, entity_id, op)
+SELECT user_id, 'tag', id, 'U' FROM prompt_tags;
+
+INSERT OR IGNORE INTO change_log (user_id, entity, entity_id, op)
+SELECT user_id, 'rules', id, 'U' FROM user_prompt_rules;
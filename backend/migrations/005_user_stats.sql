@@ -0,0 +1,142 @@
+-- 用户统计汇总: user_stats 表及 prompts / prompt_versions / prompt_tags 上的触发器(与 init_sqlite.sql 中定义一致)
+
+-- 用户统计汇总（GET /api/stats 使用）
+-- 由 prompts / prompt_versions / prompt_tags 上的触发器增量维护,与写入在同一事务内提交;维护任务 user_stats 定期按明细重新计算并修正漂移
+-- version_count 不含已删除的版本,tag_count 只统计使用次数大于 0 的标签
+CREATE TABLE IF NOT EXISTS user_stats (
+  user_id INTEGER PRIMARY KEY,
+  prompt_count INTEGER NOT NULL DEFAULT 0,
+  favorite_count INTEGER NOT NULL DEFAULT 0,
+  public_count INTEGER NOT NULL DEFAULT 0,
+  total_views INTEGER NOT NULL DEFAULT 0,
+  total_uses INTEGER NOT NULL DEFAULT 0,
+  version_count INTEGER NOT NULL DEFAULT 0,
+  tag_count INTEGER NOT NULL DEFAULT 0,
+  update_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+  FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompts_insert
+AFTER INSERT ON prompts
+FOR EACH ROW
+BEGIN
+  INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id);
+  UPDATE user_stats SET
+    prompt_count = prompt_count + 1,
+    favorite_count = favorite_count + (COALESCE(NEW.is_favorite, 0) != 0),
+    public_count = public_count + (COALESCE(NEW.is_public, 0) != 0),
+    total_views = total_views + COALESCE(NEW.view_count, 0),
+    total_uses = total_uses + COALESCE(NEW.use_count, 0),
+    update_time = CURRENT_TIMESTAMP
+  WHERE user_id = NEW.user_id;
+END;
+
+-- 只在统计相关的列变化时触发,编辑内容不写入汇总表
+CREATE TRIGGER IF NOT EXISTS user_stats_prompts_update
+AFTER UPDATE OF user_id, is_favorite, is_public, view_count, use_count ON prompts
+FOR EACH ROW
+BEGIN
+  UPDATE user_stats SET
+    prompt_count = prompt_count - 1,
+    favorite_count = favorite_count - (COALESCE(OLD.is_favorite, 0) != 0),
+    public_count = public_count - (COALESCE(OLD.is_public, 0) != 0),
+    total_views = total_views - COALESCE(OLD.view_count, 0),
+    total_uses = total_uses - COALESCE(OLD.use_count, 0)
+  WHERE user_id = OLD.user_id;
+  INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id);
+  UPDATE user_stats SET
+    prompt_count = prompt_count + 1,
+    favorite_count = favorite_count + (COALESCE(NEW.is_favorite, 0) != 0),
+    public_count = public_count + (COALESCE(NEW.is_public, 0) != 0),
+    total_views = total_views + COALESCE(NEW.view_count, 0),
+    total_uses = total_uses + COALESCE(NEW.use_count, 0),
+    update_time = CURRENT_TIMESTAMP
+  WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompts_delete
+AFTER DELETE ON prompts
+FOR EACH ROW
+BEGIN
+  UPDATE user_stats SET
+    prompt_count = prompt_count - 1,
+    favorite_count = favorite_count - (COALESCE(OLD.is_favorite, 0) != 0),
+    public_count = public_count - (COALESCE(OLD.is_public, 0) != 0),
+    total_views = total_views - COALESCE(OLD.view_count, 0),
+    total_uses = total_uses - COALESCE(OLD.use_count, 0),
+    update_time = CURRENT_TIMESTAMP
+  WHERE user_id = OLD.user_id;
+END;
+
+-- 版本表没有 user_id,取所属提示词的用户（提示词级联删除时已不存在,取版本创建者）
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_versions_insert
+AFTER INSERT ON prompt_versions
+FOR EACH ROW
+WHEN COALESCE(NEW.is_deleted, 0) = 0
+BEGIN
+  INSERT OR IGNORE INTO user_stats (user_id) SELECT user_id FROM prompts WHERE id = NEW.prompt_id;
+  UPDATE user_stats SET version_count = version_count + 1, update_time = CURRENT_TIMESTAMP
+  WHERE user_id = (SELECT user_id FROM prompts WHERE id = NEW.prompt_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_versions_update
+AFTER UPDATE OF is_deleted ON prompt_versions
+FOR EACH ROW
+WHEN (COALESCE(OLD.is_deleted, 0) = 0) != (COALESCE(NEW.is_deleted, 0) = 0)
+BEGIN
+  UPDATE user_stats
+  SET version_count = version_count + (CASE WHEN COALESCE(NEW.is_deleted, 0) = 0 THEN 1 ELSE -1 END),
+      update_time = CURRENT_TIMESTAMP
+  WHERE user_id = (SELECT user_id FROM prompts WHERE id = NEW.prompt_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_versions_delete
+AFTER DELETE ON prompt_versions
+FOR EACH ROW
+WHEN COALESCE(OLD.is_deleted, 0) = 0
+BEGIN
+  UPDATE user_stats SET version_count = version_count - 1, update_time = CURRENT_TIMESTAMP
+  WHERE user_id = COALESCE((SELECT user_id FROM prompts WHERE id = OLD.prompt_id), OLD.created_by);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_tags_insert
+AFTER INSERT ON prompt_tags
+FOR EACH ROW
+WHEN COALESCE(NEW.use_count, 0) > 0
+BEGIN
+  INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id);
+  UPDATE user_stats SET tag_count = tag_count + 1, update_time = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_tags_update
+AFTER UPDATE OF use_count ON prompt_tags
+FOR EACH ROW
+WHEN (COALESCE(OLD.use_count, 0) > 0) != (COALESCE(NEW.use_count, 0) > 0)
+BEGIN
+  INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id);
+  UPDATE user_stats
+  SET tag_count = tag_count + (CASE WHEN COALESCE(NEW.use_count, 0) > 0 THEN 1 ELSE -1 END),
+      update_time = CURRENT_TIMESTAMP
+  WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_tags_delete
+AFTER DELETE ON prompt_tags
+FOR EACH ROW
+WHEN COALESCE(OLD.use_count, 0) > 0
+BEGIN
+  UPDATE user_stats SET tag_count = tag_count - 1, update_time = CURRENT_TIMESTAMP WHERE user_id = OLD.user_id;
+END;
+
+-- 按现有数据回填
+INSERT OR IGNORE INTO user_stats (user_id, prompt_count, favorite_count, public_count, total_views, total_uses, version_count, tag_count)
+SELECT u.id,
+  (SELECT COUNT(*) FROM prompts p WHERE p.user_id = u.id),
+  (SELECT COUNT(*) FROM prompts p WHERE p.user_id = u.id AND p.is_favorite != 0),
+  (SELECT COUNT(*) FROM prompts p WHERE p.user_id = u.id AND p.is_public != 0),
+  (SELECT COALESCE(SUM(p.view_count), 0) FROM prompts p WHERE p.user_id = u.id),
+  (SELECT COALESCE(SUM(p.use_count), 0) FROM prompts p WHERE p.user_id = u.id),
+  (SELECT COUNT(*) FROM prompt_versions v JOIN prompts p ON p.id = v.prompt_id WHERE p.user_id = u.id AND COALESCE(v.is_deleted, 0) = 0),
+  (SELECT COUNT(*) FROM prompt_tags t WHERE t.user_id = u.id AND t.use_count > 0)
+FROM users u;
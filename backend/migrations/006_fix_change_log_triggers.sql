@@ -0,0 +1,117 @@
+-- 重建 change_log 触发器: 旧定义使用 INSERT OR REPLACE,prompt_tags 上的 UPSERT（ON CONFLICT DO UPDATE）会覆盖该冲突策略,
+-- 标签已存在时写入因 change_log 唯一约束冲突而失败（标签计数无法递增）;新定义先删除旧记录再插入(与 init_sqlite.sql 中定义一致)
+
+DROP TRIGGER IF EXISTS change_log_prompts_insert;
+DROP TRIGGER IF EXISTS change_log_prompts_update;
+DROP TRIGGER IF EXISTS change_log_prompts_delete;
+DROP TRIGGER IF EXISTS change_log_prompt_versions_insert;
+DROP TRIGGER IF EXISTS change_log_prompt_versions_update;
+DROP TRIGGER IF EXISTS change_log_prompt_versions_delete;
+DROP TRIGGER IF EXISTS change_log_prompt_tags_insert;
+DROP TRIGGER IF EXISTS change_log_prompt_tags_update;
+DROP TRIGGER IF EXISTS change_log_prompt_tags_delete;
+DROP TRIGGER IF EXISTS change_log_user_prompt_rules_insert;
+DROP TRIGGER IF EXISTS change_log_user_prompt_rules_update;
+DROP TRIGGER IF EXISTS change_log_user_prompt_rules_delete;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompts_insert
+AFTER INSERT ON prompts
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'prompt' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'prompt', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompts_update
+AFTER UPDATE ON prompts
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'prompt' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'prompt', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompts_delete
+AFTER DELETE ON prompts
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'prompt' AND entity_id = OLD.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (OLD.user_id, 'prompt', OLD.id, 'D');
+END;
+
+-- 版本表没有 user_id,取所属提示词的用户（提示词级联删除时已不存在,取版本创建者）
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_versions_insert
+AFTER INSERT ON prompt_versions
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'version' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op)
+  SELECT user_id, 'version', NEW.id, 'U' FROM prompts WHERE id = NEW.prompt_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_versions_update
+AFTER UPDATE ON prompt_versions
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'version' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op)
+  SELECT user_id, 'version', NEW.id, 'U' FROM prompts WHERE id = NEW.prompt_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_versions_delete
+AFTER DELETE ON prompt_versions
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'version' AND entity_id = OLD.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op)
+  SELECT user_id, 'version', OLD.id, 'D'
+  FROM (SELECT COALESCE((SELECT user_id FROM prompts WHERE id = OLD.prompt_id), OLD.created_by) AS user_id)
+  WHERE user_id IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_tags_insert
+AFTER INSERT ON prompt_tags
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'tag' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'tag', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_tags_update
+AFTER UPDATE ON prompt_tags
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'tag' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'tag', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_tags_delete
+AFTER DELETE ON prompt_tags
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'tag' AND entity_id = OLD.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (OLD.user_id, 'tag', OLD.id, 'D');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_user_prompt_rules_insert
+AFTER INSERT ON user_prompt_rules
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'rules' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'rules', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_user_prompt_rules_update
+AFTER UPDATE ON user_prompt_rules
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'rules' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'rules', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_user_prompt_rules_delete
+AFTER DELETE ON user_prompt_rules
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'rules' AND entity_id = OLD.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (OLD.user_id, 'rules', OLD.id, 'D');
+END;
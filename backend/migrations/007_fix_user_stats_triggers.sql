@@ -0,0 +1,80 @@
+-- 重建 user_stats 触发器: 旧定义用 INSERT OR IGNORE 创建汇总行,prompt_tags 上的 UPSERT（ON CONFLICT DO UPDATE）会覆盖该冲突策略,
+-- 标签使用次数从 0 变为 1 时写入因 user_stats 主键冲突而失败;新定义用 NOT EXISTS 判断(与 init_sqlite.sql 中定义一致)
+
+DROP TRIGGER IF EXISTS user_stats_prompts_insert;
+DROP TRIGGER IF EXISTS user_stats_prompts_update;
+DROP TRIGGER IF EXISTS user_stats_prompt_versions_insert;
+DROP TRIGGER IF EXISTS user_stats_prompt_tags_insert;
+DROP TRIGGER IF EXISTS user_stats_prompt_tags_update;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompts_insert
+AFTER INSERT ON prompts
+FOR EACH ROW
+BEGIN
+  INSERT INTO user_stats (user_id) SELECT NEW.user_id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.user_id);
+  UPDATE user_stats SET
+    prompt_count = prompt_count + 1,
+    favorite_count = favorite_count + (COALESCE(NEW.is_favorite, 0) != 0),
+    public_count = public_count + (COALESCE(NEW.is_public, 0) != 0),
+    total_views = total_views + COALESCE(NEW.view_count, 0),
+    total_uses = total_uses + COALESCE(NEW.use_count, 0),
+    update_time = CURRENT_TIMESTAMP
+  WHERE user_id = NEW.user_id;
+END;
+
+-- 只在统计相关的列变化时触发,编辑内容不写入汇总表
+CREATE TRIGGER IF NOT EXISTS user_stats_prompts_update
+AFTER UPDATE OF user_id, is_favorite, is_public, view_count, use_count ON prompts
+FOR EACH ROW
+BEGIN
+  UPDATE user_stats SET
+    prompt_count = prompt_count - 1,
+    favorite_count = favorite_count - (COALESCE(OLD.is_favorite, 0) != 0),
+    public_count = public_count - (COALESCE(OLD.is_public, 0) != 0),
+    total_views = total_views - COALESCE(OLD.view_count, 0),
+    total_uses = total_uses - COALESCE(OLD.use_count, 0)
+  WHERE user_id = OLD.user_id;
+  INSERT INTO user_stats (user_id) SELECT NEW.user_id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.user_id);
+  UPDATE user_stats SET
+    prompt_count = prompt_count + 1,
+    favorite_count = favorite_count + (COALESCE(NEW.is_favorite, 0) != 0),
+    public_count = public_count + (COALESCE(NEW.is_public, 0) != 0),
+    total_views = total_views + COALESCE(NEW.view_count, 0),
+    total_uses = total_uses + COALESCE(NEW.use_count, 0),
+    update_time = CURRENT_TIMESTAMP
+  WHERE user_id = NEW.user_id;
+END;
+
+-- 版本表没有 user_id,取所属提示词的用户（提示词级联删除时已不存在,取版本创建者）
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_versions_insert
+AFTER INSERT ON prompt_versions
+FOR EACH ROW
+WHEN COALESCE(NEW.is_deleted, 0) = 0
+BEGIN
+  INSERT INTO user_stats (user_id)
+  SELECT p.user_id FROM prompts p
+  WHERE p.id = NEW.prompt_id AND NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = p.user_id);
+  UPDATE user_stats SET version_count = version_count + 1, update_time = CURRENT_TIMESTAMP
+  WHERE user_id = (SELECT user_id FROM prompts WHERE id = NEW.prompt_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_tags_insert
+AFTER INSERT ON prompt_tags
+FOR EACH ROW
+WHEN COALESCE(NEW.use_count, 0) > 0
+BEGIN
+  INSERT INTO user_stats (user_id) SELECT NEW.user_id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.user_id);
+  UPDATE user_stats SET tag_count = tag_count + 1, update_time = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_tags_update
+AFTER UPDATE OF use_count ON prompt_tags
+FOR EACH ROW
+WHEN (COALESCE(OLD.use_count, 0) > 0) != (COALESCE(NEW.use_count, 0) > 0)
+BEGIN
+  INSERT INTO user_stats (user_id) SELECT NEW.user_id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.user_id);
+  UPDATE user_stats
+  SET tag_count = tag_count + (CASE WHEN COALESCE(NEW.use_count, 0) > 0 THEN 1 ELSE -1 END),
+      update_time = CURRENT_TIMESTAMP
+  WHERE user_id = NEW.user_id;
+END;
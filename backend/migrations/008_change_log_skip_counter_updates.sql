@@ -0,0 +1,14 @@
+-- 重建提示词更新的 change_log 触发器: 旧定义在任意列更新时触发,每次查看详情的 view_count 递增
+-- （以及随之执行的 update_time 触发器）都会写入变更序列;新定义只在内容列被更新时触发(与 init_sqlite.sql 中定义一致)
+
+DROP TRIGGER IF EXISTS change_log_prompts_update;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompts_update
+AFTER UPDATE OF user_id, title, description, requirement_report, thinking_points, initial_prompt, advice,
+  final_prompt, language, format, prompt_type, system_prompt, conversation_history, is_favorite, is_public,
+  tags, current_version, total_versions, last_version_time ON prompts
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'prompt' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'prompt', NEW.id, 'U');
+END;
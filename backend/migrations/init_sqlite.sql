@@ -115,6 +115,13 @@ CREATE INDEX IF NOT EXISTS idx_prompts_is_favorite ON prompts(is_favorite);
 CREATE INDEX IF NOT EXISTS idx_prompts_is_public ON prompts(is_public);
 CREATE INDEX IF NOT EXISTS idx_prompts_create_time ON prompts(create_time);
 
+-- 组合索引: 列表页按用户过滤后排序,避免临时 B 树排序（apps.utils.index_advisor 生成）
+CREATE INDEX IF NOT EXISTS idx_prompts_user_id_create_time ON prompts(user_id, create_time);
+CREATE INDEX IF NOT EXISTS idx_prompts_user_id_update_time ON prompts(user_id, update_time);
+CREATE INDEX IF NOT EXISTS idx_prompts_user_id_view_count ON prompts(user_id, view_count);
+CREATE INDEX IF NOT EXISTS idx_prompts_user_id_use_count ON prompts(user_id, use_count);
+CREATE INDEX IF NOT EXISTS idx_prompts_user_id_is_favorite_create_time ON prompts(user_id, is_favorite, create_time);
+
 -- 提示词版本表
 CREATE TABLE IF NOT EXISTS prompt_versions (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -168,6 +175,7 @@ CREATE UNIQUE INDEX IF NOT EXISTS uk_prompt_version ON prompt_versions(prompt_id
 CREATE INDEX IF NOT EXISTS idx_versions_prompt_id ON prompt_versions(prompt_id);
 CREATE INDEX IF NOT EXISTS idx_versions_created_by ON prompt_versions(created_by);
 CREATE INDEX IF NOT EXISTS idx_versions_create_time ON prompt_versions(create_time);
+CREATE INDEX IF NOT EXISTS idx_prompt_versions_prompt_id_create_time ON prompt_versions(prompt_id, create_time);
 
 -- 标签表
 CREATE TABLE IF NOT EXISTS prompt_tags (
@@ -182,6 +190,45 @@ CREATE TABLE IF NOT EXISTS prompt_tags (
 
 CREATE UNIQUE INDEX IF NOT EXISTS uk_user_tag ON prompt_tags(user_id, tag_name);
 CREATE INDEX IF NOT EXISTS idx_tags_user_id ON prompt_tags(user_id);
+CREATE INDEX IF NOT EXISTS idx_prompt_tags_user_id_use_count_create_time ON prompt_tags(user_id, use_count, create_time);
+
+-- 提示词语义向量元数据（向量保存在 <数据库路径>.vectors 内存映射文件中）
+CREATE TABLE IF NOT EXISTS prompt_vectors (
+  prompt_id INTEGER PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  content_hash VARCHAR(32) NOT NULL,
+  update_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+  
+  FOREIGN KEY (prompt_id) REFERENCES prompts(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_prompt_vectors_user_id ON prompt_vectors(user_id);
+
+-- 近似重复检测签名表(MinHash)
+CREATE TABLE IF NOT EXISTS prompt_minhash (
+  prompt_id INTEGER PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  signature BLOB DEFAULT NULL,
+  content_hash VARCHAR(32) NOT NULL,
+  update_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+  
+  FOREIGN KEY (prompt_id) REFERENCES prompts(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_prompt_minhash_user_id ON prompt_minhash(user_id);
+
+-- 近似重复检测 LSH 桶索引(同一分段同一桶的提示词为候选)
+CREATE TABLE IF NOT EXISTS prompt_lsh_buckets (
+  user_id INTEGER NOT NULL,
+  band INTEGER NOT NULL,
+  bucket INTEGER NOT NULL,
+  prompt_id INTEGER NOT NULL,
+  
+  FOREIGN KEY (prompt_id) REFERENCES prompts(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON prompt_lsh_buckets(user_id, band, bucket);
+CREATE INDEX IF NOT EXISTS idx_lsh_prompt_id ON prompt_lsh_buckets(prompt_id);
 
 -- 分享表
 CREATE TABLE IF NOT EXISTS prompt_shares (
@@ -229,3 +276,256 @@ FOR EACH ROW
 BEGIN
   UPDATE prompts SET update_time = CURRENT_TIMESTAMP WHERE id = OLD.id;
 END;
+
+-- 变更序列（增量同步 GET /api/sync 使用）
+-- 每行数据只保留最近一次变更: 同一行再次变更时删除旧记录再插入,分配新的 seq（AUTOINCREMENT 保证单调递增、不复用）
+-- 触发器不使用 INSERT OR REPLACE: 外层语句是 UPSERT（ON CONFLICT DO UPDATE）时其冲突策略会覆盖触发器内的 OR REPLACE,导致唯一约束冲突
+-- op: U 新增或修改, D 删除（墓碑）
+CREATE TABLE IF NOT EXISTS change_log (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL,
+  entity VARCHAR(20) NOT NULL,
+  entity_id INTEGER NOT NULL,
+  op CHAR(1) NOT NULL,
+  change_time DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uk_change_log_entity ON change_log(entity, entity_id);
+CREATE INDEX IF NOT EXISTS idx_change_log_user_id_seq ON change_log(user_id, seq);
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompts_insert
+AFTER INSERT ON prompts
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'prompt' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'prompt', NEW.id, 'U');
+END;
+
+-- 只在内容列被更新时记录: 查看/使用次数递增和 update_time 触发器不产生变更
+CREATE TRIGGER IF NOT EXISTS change_log_prompts_update
+AFTER UPDATE OF user_id, title, description, requirement_report, thinking_points, initial_prompt, advice,
+  final_prompt, language, format, prompt_type, system_prompt, conversation_history, is_favorite, is_public,
+  tags, current_version, total_versions, last_version_time ON prompts
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'prompt' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'prompt', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompts_delete
+AFTER DELETE ON prompts
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'prompt' AND entity_id = OLD.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (OLD.user_id, 'prompt', OLD.id, 'D');
+END;
+
+-- 版本表没有 user_id,取所属提示词的用户（提示词级联删除时已不存在,取版本创建者）
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_versions_insert
+AFTER INSERT ON prompt_versions
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'version' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op)
+  SELECT user_id, 'version', NEW.id, 'U' FROM prompts WHERE id = NEW.prompt_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_versions_update
+AFTER UPDATE ON prompt_versions
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'version' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op)
+  SELECT user_id, 'version', NEW.id, 'U' FROM prompts WHERE id = NEW.prompt_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_versions_delete
+AFTER DELETE ON prompt_versions
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'version' AND entity_id = OLD.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op)
+  SELECT user_id, 'version', OLD.id, 'D'
+  FROM (SELECT COALESCE((SELECT user_id FROM prompts WHERE id = OLD.prompt_id), OLD.created_by) AS user_id)
+  WHERE user_id IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_tags_insert
+AFTER INSERT ON prompt_tags
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'tag' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'tag', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_tags_update
+AFTER UPDATE ON prompt_tags
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'tag' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'tag', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_prompt_tags_delete
+AFTER DELETE ON prompt_tags
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'tag' AND entity_id = OLD.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (OLD.user_id, 'tag', OLD.id, 'D');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_user_prompt_rules_insert
+AFTER INSERT ON user_prompt_rules
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'rules' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'rules', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_user_prompt_rules_update
+AFTER UPDATE ON user_prompt_rules
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'rules' AND entity_id = NEW.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (NEW.user_id, 'rules', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_user_prompt_rules_delete
+AFTER DELETE ON user_prompt_rules
+FOR EACH ROW
+BEGIN
+  DELETE FROM change_log WHERE entity = 'rules' AND entity_id = OLD.id;
+  INSERT INTO change_log (user_id, entity, entity_id, op) VALUES (OLD.user_id, 'rules', OLD.id, 'D');
+END;
+
+-- 用户统计汇总（GET /api/stats 使用）
+-- 由 prompts / prompt_versions / prompt_tags 上的触发器增量维护,与写入在同一事务内提交;维护任务 user_stats 定期按明细重新计算并修正漂移
+-- version_count 不含已删除的版本,tag_count 只统计使用次数大于 0 的标签
+-- 触发器用 NOT EXISTS 创建汇总行而不用 INSERT OR IGNORE: 外层 UPSERT（ON CONFLICT DO UPDATE）的冲突策略会覆盖触发器内的 OR IGNORE
+CREATE TABLE IF NOT EXISTS user_stats (
+  user_id INTEGER PRIMARY KEY,
+  prompt_count INTEGER NOT NULL DEFAULT 0,
+  favorite_count INTEGER NOT NULL DEFAULT 0,
+  public_count INTEGER NOT NULL DEFAULT 0,
+  total_views INTEGER NOT NULL DEFAULT 0,
+  total_uses INTEGER NOT NULL DEFAULT 0,
+  version_count INTEGER NOT NULL DEFAULT 0,
+  tag_count INTEGER NOT NULL DEFAULT 0,
+  update_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+  FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompts_insert
+AFTER INSERT ON prompts
+FOR EACH ROW
+BEGIN
+  INSERT INTO user_stats (user_id) SELECT NEW.user_id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.user_id);
+  UPDATE user_stats SET
+    prompt_count = prompt_count + 1,
+    favorite_count = favorite_count + (COALESCE(NEW.is_favorite, 0) != 0),
+    public_count = public_count + (COALESCE(NEW.is_public, 0) != 0),
+    total_views = total_views + COALESCE(NEW.view_count, 0),
+    total_uses = total_uses + COALESCE(NEW.use_count, 0),
+    update_time = CURRENT_TIMESTAMP
+  WHERE user_id = NEW.user_id;
+END;
+
+-- 只在统计相关的列变化时触发,编辑内容不写入汇总表
+CREATE TRIGGER IF NOT EXISTS user_stats_prompts_update
+AFTER UPDATE OF user_id, is_favorite, is_public, view_count, use_count ON prompts
+FOR EACH ROW
+BEGIN
+  UPDATE user_stats SET
+    prompt_count = prompt_count - 1,
+    favorite_count = favorite_count - (COALESCE(OLD.is_favorite, 0) != 0),
+    public_count = public_count - (COALESCE(OLD.is_public, 0) != 0),
+    total_views = total_views - COALESCE(OLD.view_count, 0),
+    total_uses = total_uses - COALESCE(OLD.use_count, 0)
+  WHERE user_id = OLD.user_id;
+  INSERT INTO user_stats (user_id) SELECT NEW.user_id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.user_id);
+  UPDATE user_stats SET
+    prompt_count = prompt_count + 1,
+    favorite_count = favorite_count + (COALESCE(NEW.is_favorite, 0) != 0),
+    public_count = public_count + (COALESCE(NEW.is_public, 0) != 0),
+    total_views = total_views + COALESCE(NEW.view_count, 0),
+    total_uses = total_uses + COALESCE(NEW.use_count, 0),
+    update_time = CURRENT_TIMESTAMP
+  WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompts_delete
+AFTER DELETE ON prompts
+FOR EACH ROW
+BEGIN
+  UPDATE user_stats SET
+    prompt_count = prompt_count - 1,
+    favorite_count = favorite_count - (COALESCE(OLD.is_favorite, 0) != 0),
+    public_count = public_count - (COALESCE(OLD.is_public, 0) != 0),
+    total_views = total_views - COALESCE(OLD.view_count, 0),
+    total_uses = total_uses - COALESCE(OLD.use_count, 0),
+    update_time = CURRENT_TIMESTAMP
+  WHERE user_id = OLD.user_id;
+END;
+
+-- 版本表没有 user_id,取所属提示词的用户（提示词级联删除时已不存在,取版本创建者）
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_versions_insert
+AFTER INSERT ON prompt_versions
+FOR EACH ROW
+WHEN COALESCE(NEW.is_deleted, 0) = 0
+BEGIN
+  INSERT INTO user_stats (user_id)
+  SELECT p.user_id FROM prompts p
+  WHERE p.id = NEW.prompt_id AND NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = p.user_id);
+  UPDATE user_stats SET version_count = version_count + 1, update_time = CURRENT_TIMESTAMP
+  WHERE user_id = (SELECT user_id FROM prompts WHERE id = NEW.prompt_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_versions_update
+AFTER UPDATE OF is_deleted ON prompt_versions
+FOR EACH ROW
+WHEN (COALESCE(OLD.is_deleted, 0) = 0) != (COALESCE(NEW.is_deleted, 0) = 0)
+BEGIN
+  UPDATE user_stats
+  SET version_count = version_count + (CASE WHEN COALESCE(NEW.is_deleted, 0) = 0 THEN 1 ELSE -1 END),
+      update_time = CURRENT_TIMESTAMP
+  WHERE user_id = (SELECT user_id FROM prompts WHERE id = NEW.prompt_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_versions_delete
+AFTER DELETE ON prompt_versions
+FOR EACH ROW
+WHEN COALESCE(OLD.is_deleted, 0) = 0
+BEGIN
+  UPDATE user_stats SET version_count = version_count - 1, update_time = CURRENT_TIMESTAMP
+  WHERE user_id = COALESCE((SELECT user_id FROM prompts WHERE id = OLD.prompt_id), OLD.created_by);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_tags_insert
+AFTER INSERT ON prompt_tags
+FOR EACH ROW
+WHEN COALESCE(NEW.use_count, 0) > 0
+BEGIN
+  INSERT INTO user_stats (user_id) SELECT NEW.user_id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.user_id);
+  UPDATE user_stats SET tag_count = tag_count + 1, update_time = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_tags_update
+AFTER UPDATE OF use_count ON prompt_tags
+FOR EACH ROW
+WHEN (COALESCE(OLD.use_count, 0) > 0) != (COALESCE(NEW.use_count, 0) > 0)
+BEGIN
+  INSERT INTO user_stats (user_id) SELECT NEW.user_id WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = NEW.user_id);
+  UPDATE user_stats
+  SET tag_count = tag_count + (CASE WHEN COALESCE(NEW.use_count, 0) > 0 THEN 1 ELSE -1 END),
+      update_time = CURRENT_TIMESTAMP
+  WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_prompt_tags_delete
+AFTER DELETE ON prompt_tags
+FOR EACH ROW
+WHEN COALESCE(OLD.use_count, 0) > 0
+BEGIN
+  UPDATE user_stats SET tag_count = tag_count - 1, update_time = CURRENT_TIMESTAMP WHERE user_id = OLD.user_id;
+END;
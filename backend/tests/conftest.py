@@ -0,0 +1,67 @@
+"""
+测试夹具
+每个测试使用临时 SQLite 数据库启动完整应用(lifespan),通过 httpx ASGITransport 发送请求
+
+在 backend 目录执行: python -m pytest -q
+"""
+import asyncio
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# 测试连续发送请求,关闭限流(需在导入 main 之前设置)
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+# 日志写入临时目录,不写入仓库的 data/logs
+os.environ['LOG_DIR'] = tempfile.mkdtemp(prefix='yprompt-test-logs-')
+# 先于日志管道注册,在日志管道关闭之后执行
+atexit.register(shutil.rmtree, os.environ['LOG_DIR'], ignore_errors=True)
+
+import httpx  # noqa: E402
+
+from config.settings import Config  # noqa: E402
+
+
+@pytest.fixture
+def run_app(tmp_path, monkeypatch):
+    """
+    在临时数据库上运行测试场景
+
+    用法: run_app(scenario),scenario 为 async def scenario(client, db),
+    client 已带管理员(user_id=1)的 Authorization 头
+    """
+    monkeypatch.setattr(Config, 'SQLITE_DB_PATH', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(Config, 'BACKUP_ENABLED', False, raising=False)
+    monkeypatch.setattr(Config, 'MAINTENANCE_ENABLED', False, raising=False)
+
+    import main
+    from apps.modules.prompt_rules.services import rules_cache
+    from apps.modules.search.services import autocomplete_index, fuzzy_index
+    from apps.utils.jwt_utils import JWTUtil
+
+    # 进程内的按用户缓存在测试之间共享,每个测试使用新数据库,先清空
+    autocomplete_index.invalidate()
+    fuzzy_index.invalidate()
+    rules_cache.invalidate(1)
+
+    async def run(scenario):
+        # lifespan 的关闭流程不在 finally 中: 场景失败时先正常关闭应用再抛出,避免数据库线程阻止进程退出
+        error = None
+        async with main.lifespan(main.app):
+            headers = {'Authorization': 'Bearer ' + JWTUtil.generate_token(1, 'admin')}
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test', headers=headers) as client:
+                try:
+                    result = await scenario(client, main.app.state.db)
+                except BaseException as e:
+                    error = e
+        if error is not None:
+            raise error
+        return result
+
+    return lambda scenario: asyncio.run(run(scenario))
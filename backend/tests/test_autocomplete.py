@@ -0,0 +1,38 @@
+"""
+自动补全前缀索引: 写入后结果立即更新,查询结果缓存有上限
+"""
+from apps.modules.search.services import PrefixIndex
+
+
+def test_prefix_cache_is_bounded_and_invalidated():
+    index = PrefixIndex(cache_size=3)
+    index.add('python', 'python', 1)
+    index.add('pytest', 'pytest', 2)
+
+    assert [item_id for item_id, _ in index.search('py', 10)] == ['pytest', 'python']
+    for limit in range(1, 20):
+        index.search('p', limit)
+    assert len(index._cache) == 3
+
+    # 得分变化、新增、删除后缓存的结果不能继续返回
+    index.add_score('python', 5)
+    assert [item_id for item_id, _ in index.search('py', 10)] == ['python', 'pytest']
+    index.add('pydantic', 'pydantic', 10)
+    assert [item_id for item_id, _ in index.search('py', 1)] == ['pydantic']
+    index.remove('pydantic')
+    assert [item_id for item_id, _ in index.search('py', 1)] == ['python']
+
+
+def test_autocomplete_follows_saved_tags(run_app):
+    async def scenario(client, db):
+        await client.post('/api/prompts/', json={'title': 'Code Review', 'final_prompt': 'A', 'tags': ['python']})
+        data = (await client.get('/api/search/autocomplete?q=py')).json()['data']
+        assert data['tags'] == [{'tag_name': 'python', 'use_count': 1}]
+
+        # 索引已加载并缓存了 "py" 的结果,保存后需要反映新的标签和标题
+        await client.post('/api/prompts/', json={'title': 'Pytest Helper', 'final_prompt': 'B', 'tags': ['python', 'pytest']})
+        data = (await client.get('/api/search/autocomplete?q=py')).json()['data']
+        assert data['tags'] == [{'tag_name': 'python', 'use_count': 2}, {'tag_name': 'pytest', 'use_count': 1}]
+        assert [title['title'] for title in data['titles']] == ['Pytest Helper']
+
+    run_app(scenario)
@@ -0,0 +1,43 @@
+"""
+近似重复检测: 保存提示词时更新 MinHash 签名和 LSH 桶
+"""
+
+BASE_PROMPT = (
+    'You are a senior python reviewer. Read the pull request carefully, list every bug you find, '
+    'explain why each one is a problem and suggest a minimal fix. Keep the tone friendly and concise.'
+)
+
+
+async def _duplicate_ids(client):
+    groups = (await client.get('/api/prompts/duplicates')).json()['data']
+    return [sorted(item['id'] for item in group['items']) for group in groups]
+
+
+def test_save_upserts_signature_for_duplicate_detection(run_app):
+    async def scenario(client, db):
+        first = (await client.post('/api/prompts/', json={'title': 'a', 'final_prompt': BASE_PROMPT})).json()['data']['id']
+        second = (await client.post('/api/prompts/', json={
+            'title': 'b', 'final_prompt': BASE_PROMPT.replace('friendly', 'polite')
+        })).json()['data']['id']
+        other = (await client.post('/api/prompts/', json={
+            'title': 'c', 'final_prompt': 'Translate the following marketing copy into French and keep the brand names.'
+        })).json()['data']['id']
+
+        # 创建时写入签名和桶索引
+        row = await db.get("SELECT COUNT(*) AS count FROM prompt_minhash WHERE prompt_id IN (?, ?, ?)", [first, second, other])
+        assert row['count'] == 3
+        assert await _duplicate_ids(client) == [sorted([first, second])]
+
+        # 修改内容后签名随保存更新,不再与原提示词重复
+        response = await client.put(f'/api/prompts/{second}', json={
+            'title': 'b', 'final_prompt': 'Summarize the meeting notes into three bullet points with owners and due dates.'
+        })
+        assert response.status_code == 200
+        assert await _duplicate_ids(client) == []
+
+        # 改成与另一条相同的内容: 新的重复组立即可见
+        response = await client.put(f'/api/prompts/{other}', json={'title': 'c', 'final_prompt': BASE_PROMPT})
+        assert response.status_code == 200
+        assert await _duplicate_ids(client) == [sorted([first, other])]
+
+    run_app(scenario)
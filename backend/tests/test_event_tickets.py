@@ -0,0 +1,61 @@
+"""
+事件推送连接认证: URL 中只接受一次性票据,不接受登录 Token
+"""
+import asyncio
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from apps.utils.auth_middleware import get_stream_user_id
+from apps.utils.jwt_utils import JWTUtil
+
+
+def _stream_auth_app():
+    """只包含流接口认证依赖的应用(SSE 响应不会结束,不通过完整的 /api/events 测试)"""
+    app = FastAPI()
+
+    @app.get('/api/events')
+    async def events(user_id: int = Depends(get_stream_user_id)):
+        return {'user_id': user_id}
+
+    return app
+
+
+def test_query_string_rejects_login_token():
+    JWTUtil.init_app()
+
+    async def scenario():
+        token = JWTUtil.generate_token(1, 'admin')
+        transport = httpx.ASGITransport(app=_stream_auth_app())
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            assert (await client.get('/api/events', params={'ticket': token})).status_code == 401
+            assert (await client.get('/api/events', params={'token': token})).status_code == 401
+
+            response = await client.get('/api/events', headers={'Authorization': 'Bearer ' + token})
+            assert response.json() == {'user_id': 1}
+
+            # 票据只能使用一次
+            ticket = JWTUtil.generate_stream_ticket(1)
+            assert (await client.get('/api/events', params={'ticket': ticket})).json() == {'user_id': 1}
+            assert (await client.get('/api/events', params={'ticket': ticket})).status_code == 401
+
+            expired = JWTUtil.generate_stream_ticket(1, expire_seconds=-1)
+            assert (await client.get('/api/events', params={'ticket': expired})).status_code == 401
+
+    asyncio.run(scenario())
+
+
+def test_ticket_endpoint_and_ticket_is_not_a_login_token(run_app):
+    async def scenario(client, db):
+        response = await client.post('/api/events/ticket')
+        ticket = response.json()['data']['ticket']
+
+        # 票据不能当作登录 Token 使用
+        response = await client.get('/api/prompts/', headers={'Authorization': 'Bearer ' + ticket})
+        assert response.status_code == 401
+
+        transport = httpx.ASGITransport(app=_stream_auth_app())
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as stream_client:
+            assert (await stream_client.get('/api/events', params={'ticket': ticket})).json() == {'user_id': 1}
+
+    run_app(scenario)
@@ -0,0 +1,21 @@
+"""
+索引建议的只读连接: 路径中的特殊字符需要编码
+"""
+import sqlite3
+
+import pytest
+
+from apps.utils.index_advisor import connect_readonly
+
+
+def test_connect_readonly_encodes_path(tmp_path):
+    path = tmp_path / 'data?v=1#a%20.db'
+    sqlite3.connect(path).execute('CREATE TABLE t (a)').connection.commit()
+
+    conn = connect_readonly(str(path))
+    try:
+        assert conn.execute("SELECT name FROM sqlite_master").fetchall() == [('t',)]
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute('INSERT INTO t VALUES (1)')
+    finally:
+        conn.close()
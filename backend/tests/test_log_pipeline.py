@@ -0,0 +1,20 @@
+"""
+日志管道关闭: 控制台流已关闭时不抛异常
+"""
+import io
+
+from apps.utils.log_pipeline import LogPipeline
+
+
+def test_close_skips_closed_stream(tmp_path):
+    pipeline = LogPipeline()
+    stream = io.StringIO()
+    console = pipeline.stream_writer(stream)
+    log_file = pipeline.file_writer(tmp_path / 'info.log', 1024 * 1024, 1)
+    pipeline.queue.put((log_file, 'written\n'))
+
+    stream.close()
+    console.write('dropped\n')
+    pipeline.close()
+
+    assert (tmp_path / 'info.log').read_text(encoding='utf-8') == 'written\n'
@@ -0,0 +1,22 @@
+"""
+/metrics 访问令牌校验: 未配置令牌时拒绝所有请求
+"""
+from config.settings import Config
+
+
+def test_metrics_requires_token(run_app, monkeypatch):
+    monkeypatch.setattr(Config, 'METRICS_TOKEN', '')
+
+    async def scenario(client, db):
+        response = await client.get('/metrics', headers={'Authorization': ''})
+        assert response.status_code == 403
+
+        monkeypatch.setattr(Config, 'METRICS_TOKEN', 'scrape-token')
+        response = await client.get('/metrics', headers={'Authorization': 'Bearer wrong'})
+        assert response.status_code == 401
+
+        response = await client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+        assert response.status_code == 200
+        assert 'yprompt_http_requests_total' in response.text
+
+    run_app(scenario)
@@ -0,0 +1,57 @@
+"""
+提示词规则: 响应格式、ETag/304 与保存后失效
+"""
+from apps.modules.prompt_rules import services
+
+
+def test_rules_response_shape_and_etag(run_app):
+    async def scenario(client, db):
+        response = await client.get('/api/prompt-rules/')
+        assert response.json() == {'code': 200, 'data': None, 'message': '用户暂无自定义规则'}
+        etag = response.headers['etag']
+
+        response = await client.get('/api/prompt-rules/', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+        response = await client.post('/api/prompt-rules/', json={'system_prompt_rules': 'R' * 2000})
+        data = response.json()['data']
+        assert data['system_prompt_rules'] == 'R' * 2000
+        assert not {'system_prompt', 'user_prompt', 'rules'} & set(data)
+
+        # 保存后缓存失效: 旧 ETag 不再匹配,返回新内容(较大的响应体 gzip 压缩)
+        response = await client.get('/api/prompt-rules/', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['content-encoding'] == 'gzip'
+        assert response.headers['etag'] != etag
+        assert response.json()['data']['system_prompt_rules'] == 'R' * 2000
+
+        await client.delete('/api/prompt-rules/')
+        response = await client.get('/api/prompt-rules/')
+        assert response.json()['data'] is None
+        assert response.headers['etag'] == etag
+
+    run_app(scenario)
+
+
+def test_bundle_etag_follows_customized(run_app, monkeypatch):
+    monkeypatch.setattr(services, '_defaults', {'system_prompt_rules': 'default'})
+
+    async def scenario(client, db):
+        response = await client.get('/api/prompt-rules/bundle')
+        bundle = response.json()['data']
+        assert bundle['system_prompt_rules'] == 'default'
+        assert bundle['customized'] == []
+        etag = response.headers['etag']
+
+        # 保存与默认值相同的规则: 合并后的规则不变,但 customized 和 update_time 变化,不能返回 304
+        await client.post('/api/prompt-rules/', json={'system_prompt_rules': 'default'})
+        response = await client.get('/api/prompt-rules/bundle', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        bundle = response.json()['data']
+        assert bundle['customized'] == ['system_prompt_rules']
+        assert bundle['update_time']
+
+        row = await db.get("SELECT update_time FROM user_prompt_rules WHERE user_id = 1")
+        assert bundle['update_time'] == str(row['update_time'])
+
+    run_app(scenario)
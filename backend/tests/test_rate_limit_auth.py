@@ -0,0 +1,50 @@
+"""
+限流中间件与认证依赖共享 Token 校验结果: 每个请求只解码一次
+"""
+import asyncio
+
+import httpx
+import jwt
+from fastapi import Depends, FastAPI
+
+from apps.utils import jwt_utils
+from apps.utils.auth_middleware import get_current_user_id
+from apps.utils.jwt_utils import JWTUtil
+from apps.utils.rate_limit import RateLimiter, RateLimitMiddleware
+
+
+def test_token_decoded_once_per_request(monkeypatch):
+    JWTUtil.init_app()
+    decoded = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decoded.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt_utils.jwt, 'decode', counting_decode)
+
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=RateLimiter({('user', 'read'): (1, 1)}))
+
+    @app.get('/api/me')
+    async def me(user_id: int = Depends(get_current_user_id)):
+        return {'user_id': user_id}
+
+    async def scenario():
+        headers = {'Authorization': 'Bearer ' + JWTUtil.generate_token(7, 'u')}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test', headers=headers) as client:
+            response = await client.get('/api/me')
+            assert response.json() == {'user_id': 7}
+            assert len(decoded) == 1
+
+            # 用户桶按中间件解出的 user_id 计数
+            assert (await client.get('/api/me')).status_code == 429
+
+            # 无效 Token 同样只校验一次,由认证依赖返回 401
+            response = await client.get('/api/me', headers={'Authorization': 'Bearer invalid'})
+            assert response.status_code == 401
+            assert decoded.count('invalid') == 1
+
+    asyncio.run(scenario())
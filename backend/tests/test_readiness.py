@@ -0,0 +1,32 @@
+"""
+就绪探针: 数据库卡住时重复探测不在连接线程队列中堆积
+"""
+import asyncio
+import time
+
+from apps.modules.monitoring import views
+from config.settings import Config
+
+
+def test_readyz_does_not_pile_up_probes(run_app, monkeypatch):
+    monkeypatch.setattr(Config, 'READINESS_TIMEOUT_MS', 50)
+    probes = []
+    probe_database = views._probe_database
+    monkeypatch.setattr(views, '_probe_database', lambda conn: probes.append(1) or probe_database(conn))
+
+    async def scenario(client, db):
+        assert (await client.get('/readyz')).status_code == 200
+
+        # 连接线程被占用 0.5 秒,期间的探测都超时
+        stall = asyncio.ensure_future(db.run_sync(lambda conn: time.sleep(0.5)))
+        await asyncio.sleep(0.05)
+        for _ in range(3):
+            assert (await client.get('/readyz')).status_code == 503
+        await stall
+        await asyncio.sleep(0.05)
+
+        # 三次超时的检查只排队了一条探测
+        assert len(probes) == 2
+        assert (await client.get('/readyz')).status_code == 200
+
+    run_app(scenario)
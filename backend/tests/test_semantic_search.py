@@ -0,0 +1,50 @@
+"""
+语义搜索: 保存提示词时写入向量,内容变化时重新计算,内容不变时跳过
+"""
+from apps.modules.search import semantic
+
+
+async def _vector_hash(db, prompt_id):
+    row = await db.get("SELECT content_hash FROM prompt_vectors WHERE prompt_id = ?", [prompt_id])
+    return row['content_hash'] if row else None
+
+
+def test_save_upserts_vector_and_search_follows_content(run_app, monkeypatch):
+    writes = []
+    write = semantic.VectorStore.write
+    monkeypatch.setattr(semantic.VectorStore, 'write', lambda store, prompt_id, vector: writes.append(prompt_id) or write(store, prompt_id, vector))
+
+    async def scenario(client, db):
+        review = (await client.post('/api/prompts/', json={
+            'title': 'code review', 'final_prompt': 'review python code for bugs and style issues'
+        })).json()['data']['id']
+        email = (await client.post('/api/prompts/', json={
+            'title': 'email polish', 'final_prompt': 'polish english email tone and grammar'
+        })).json()['data']['id']
+
+        # 创建时即写入向量,搜索不依赖补算
+        digest = await _vector_hash(db, email)
+        assert digest is not None
+        items = (await client.get('/api/prompts/search', params={'semantic': 'email grammar'})).json()['data']
+        assert items[0]['id'] == email
+
+        # 内容不变(只改标签): 向量不重新计算
+        response = await client.put(f'/api/prompts/{email}', json={
+            'title': 'email polish', 'final_prompt': 'polish english email tone and grammar', 'tags': ['writing']
+        })
+        assert response.status_code == 200
+        assert await _vector_hash(db, email) == digest
+        assert writes == [review, email]
+
+        # 内容变化: 向量随保存更新,搜索结果立即反映新内容
+        response = await client.put(f'/api/prompts/{email}', json={
+            'title': 'bug finder', 'final_prompt': 'find python bugs in pull requests'
+        })
+        assert response.status_code == 200
+        assert await _vector_hash(db, email) != digest
+        items = (await client.get('/api/prompts/search', params={'semantic': 'python bugs'})).json()['data']
+        assert {item['id'] for item in items[:2]} == {review, email}
+        items = (await client.get('/api/prompts/search', params={'semantic': 'email grammar'})).json()['data']
+        assert email not in [item['id'] for item in items[:1]]
+
+    run_app(scenario)
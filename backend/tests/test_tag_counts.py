@@ -0,0 +1,78 @@
+"""
+标签使用次数与变更序列
+"""
+
+
+async def _tag_counts(db, user_id=1):
+    rows = await db.query("SELECT tag_name, use_count FROM prompt_tags WHERE user_id = ?", [user_id])
+    return {row['tag_name']: row['use_count'] for row in rows}
+
+
+def test_shared_tags_increment_and_appear_in_sync(run_app):
+    async def scenario(client, db):
+        response = await client.post('/api/prompts/', json={'title': 'a', 'final_prompt': 'A', 'tags': ['x', 'y']})
+        assert response.status_code == 200
+        cursor = (await client.get('/api/sync?since=0')).json()['data']['cursor']
+
+        # 第二个提示词使用相同标签: UPSERT 走 DO UPDATE 分支,触发器写入变更序列不能冲突
+        response = await client.post('/api/prompts/', json={'title': 'b', 'final_prompt': 'B', 'tags': ['x', 'y']})
+        assert response.status_code == 200
+        assert await _tag_counts(db) == {'x': 2, 'y': 2}
+
+        changes = (await client.get(f'/api/sync?since={cursor}')).json()['data']['changes']
+        tags = {change['data']['tag_name']: change['data']['use_count'] for change in changes if change['entity'] == 'tag'}
+        assert tags == {'x': 2, 'y': 2}
+
+    run_app(scenario)
+
+
+def test_update_and_delete_adjust_only_changed_tags(run_app):
+    async def scenario(client, db):
+        first = (await client.post('/api/prompts/', json={'title': 'a', 'final_prompt': 'A', 'tags': ['x', 'y']})).json()['data']['id']
+        await client.post('/api/prompts/', json={'title': 'b', 'final_prompt': 'B', 'tags': ['y']})
+
+        # 更新: 移除的标签 -1,新增的 +1,保留的不变(重复和空白标签不重复计数)
+        response = await client.put(f'/api/prompts/{first}', json={'title': 'a', 'final_prompt': 'A', 'tags': ['y', 'z', ' z ', '']})
+        assert response.status_code == 200
+        assert await _tag_counts(db) == {'x': 0, 'y': 2, 'z': 1}
+
+        # 删除: 该提示词的标签全部 -1
+        assert (await client.delete(f'/api/prompts/{first}')).status_code == 200
+        assert await _tag_counts(db) == {'x': 0, 'y': 1, 'z': 0}
+
+    run_app(scenario)
+
+
+def test_reconcile_repairs_counts(run_app):
+    async def scenario(client, db):
+        for title in ('a', 'b', 'c'):
+            await client.post('/api/prompts/', json={'title': title, 'final_prompt': title, 'tags': ['x']})
+        await db.execute("UPDATE prompt_tags SET use_count = 1 WHERE user_id = 1")
+
+        response = await client.post('/api/tags/reconcile')
+        assert response.status_code == 200
+        assert response.json()['data']['corrected'] == 1
+        assert await _tag_counts(db) == {'x': 3}
+
+    run_app(scenario)
+
+
+def test_counter_updates_do_not_enter_sync_feed(run_app):
+    async def scenario(client, db):
+        response = await client.post('/api/prompts/', json={'title': 'a', 'final_prompt': 'A'})
+        prompt_id = response.json()['data']['id']
+        cursor = (await client.get('/api/sync?since=0')).json()['data']['cursor']
+
+        # 查看详情和使用只递增计数,不应产生变更
+        await client.get(f'/api/prompts/{prompt_id}')
+        await client.post(f'/api/prompts/{prompt_id}/use')
+        row = await db.get("SELECT view_count, use_count FROM prompts WHERE id = ?", [prompt_id])
+        assert (row['view_count'], row['use_count']) == (1, 1)
+        data = (await client.get(f'/api/sync?since={cursor}')).json()['data']
+        assert data['changes'] == []
+
+        await client.post(f'/api/prompts/{prompt_id}/favorite', json={'is_favorite': True})
+        changes = (await client.get(f'/api/sync?since={cursor}')).json()['data']['changes']
+        assert [(change['entity'], change['id']) for change in changes] == [('prompt', prompt_id)]
+
+    run_app(scenario)
@@ -0,0 +1,76 @@
+"""
+用户统计汇总表(触发器维护)与明细重新计算一致
+"""
+from apps.modules.stats.services import StatsService
+
+
+async def _recount(db, user_id=1):
+    """按明细重新计算统计"""
+    prompts = await db.get(
+        """
+        SELECT COUNT(*) AS prompt_count,
+               COALESCE(SUM(is_favorite != 0), 0) AS favorite_count,
+               COALESCE(SUM(is_public != 0), 0) AS public_count,
+               COALESCE(SUM(view_count), 0) AS total_views,
+               COALESCE(SUM(use_count), 0) AS total_uses
+        FROM prompts WHERE user_id = ?
+        """,
+        [user_id]
+    )
+    versions = await db.get(
+        """
+        SELECT COUNT(*) AS version_count FROM prompt_versions v JOIN prompts p ON p.id = v.prompt_id
+        WHERE p.user_id = ? AND v.is_deleted = 0
+        """,
+        [user_id]
+    )
+    tags = await db.get("SELECT COUNT(*) AS tag_count FROM prompt_tags WHERE user_id = ? AND use_count > 0", [user_id])
+    return {**prompts, **versions, **tags}
+
+
+async def _stats(client):
+    data = (await client.get('/api/stats')).json()['data']
+    return {field: data[field] for field in (
+        'prompt_count', 'favorite_count', 'public_count', 'total_views', 'total_uses', 'version_count', 'tag_count'
+    )}
+
+
+def test_stats_follow_tag_upserts_and_reconcile(run_app):
+    async def scenario(client, db):
+        a = (await client.post('/api/prompts/', json={'title': 'a', 'final_prompt': 'A', 'tags': ['x', 'y']})).json()['data']['id']
+        b = (await client.post('/api/prompts/', json={'title': 'b', 'final_prompt': 'B', 'tags': ['x']})).json()['data']['id']
+
+        # y 的使用次数降为 0 后再次使用: UPSERT 走 DO UPDATE 分支且 tag_count 从 0 变为 1
+        assert (await client.put(f'/api/prompts/{a}', json={'title': 'a', 'final_prompt': 'A', 'tags': ['x']})).status_code == 200
+        assert (await client.put(f'/api/prompts/{b}', json={'title': 'b', 'final_prompt': 'B', 'tags': ['x', 'y']})).status_code == 200
+        await client.post(f'/api/prompts/{a}/favorite', json={'is_favorite': True})
+        await client.post(f'/api/prompts/{b}/use')
+        await client.get(f'/api/prompts/{a}')
+
+        rows = await db.query("SELECT tag_name, use_count FROM prompt_tags WHERE user_id = 1")
+        assert {row['tag_name']: row['use_count'] for row in rows} == {'x': 2, 'y': 1}
+        assert await _stats(client) == await _recount(db)
+
+        # 计数被改坏后由标签校准修复,汇总表随之更新
+        await db.execute("UPDATE prompt_tags SET use_count = 0 WHERE user_id = 1")
+        assert (await client.post('/api/tags/reconcile')).status_code == 200
+        stats = await _stats(client)
+        assert stats == await _recount(db)
+        assert stats['tag_count'] == 2
+
+        assert (await StatsService(db).reconcile())['corrected'] == 0
+
+    run_app(scenario)
+
+
+def test_reconcile_corrects_drift(run_app):
+    async def scenario(client, db):
+        await client.post('/api/prompts/', json={'title': 'a', 'final_prompt': 'A', 'tags': ['x']})
+        await db.execute("UPDATE user_stats SET prompt_count = 5, tag_count = 0 WHERE user_id = 1")
+
+        response = await client.post('/api/stats/reconcile')
+        assert response.status_code == 200
+        assert response.json()['data']['fields'] == {'prompt_count': 1, 'tag_count': 1}
+        assert await _stats(client) == await _recount(db)
+
+    run_app(scenario)
@@ -0,0 +1,30 @@
+"""
+版本回滚
+"""
+
+
+def test_rollback_adjusts_tag_counts(run_app):
+    async def scenario(client, db):
+        prompt_id = (await client.post(
+            '/api/prompts/', json={'title': 'a', 'final_prompt': 'A', 'tags': ['x', 'y']}
+        )).json()['data']['id']
+        versions = (await client.get(f'/api/versions/{prompt_id}/versions')).json()['data']['items']
+        first_version = min(versions, key=lambda item: item['id'])['id']
+
+        # 修改标签并创建新版本
+        await client.put(f'/api/prompts/{prompt_id}', json={'title': 'a', 'final_prompt': 'A2', 'tags': ['y', 'z']})
+        await client.post(f'/api/versions/{prompt_id}', json={'change_type': 'minor', 'change_summary': 'tags'})
+
+        # 回滚到第一个版本: 标签恢复为 x,y
+        response = await client.post(f'/api/versions/{prompt_id}/versions/{first_version}/rollback', json={})
+        assert response.status_code == 200
+
+        prompt = await db.get("SELECT tags FROM prompts WHERE id = ?", [prompt_id])
+        assert sorted(prompt['tags'].split(',')) == ['x', 'y']
+        rows = await db.query("SELECT tag_name, use_count FROM prompt_tags WHERE user_id = 1")
+        assert {row['tag_name']: row['use_count'] for row in rows} == {'x': 1, 'y': 1, 'z': 0}
+
+        # 与按提示词数据重新统计的结果一致
+        assert (await client.post('/api/tags/reconcile')).json()['data']['corrected'] == 0
+
+    run_app(scenario)